@@ -0,0 +1,85 @@
+"""
+Бенчмарк CheckpointManager: усиление записи при обновлении прогресса задачи
+
+Каждое изменение состояния задачи перезаписывает весь файл checkpoint (и при
+create_backup копирует предыдущую версию), поэтому объем записи растет с
+историей задач. Метрика write_amplification - отношение записанных байт к
+размеру записи самой задачи.
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from src.checkpoint_manager import CheckpointManager
+
+from .harness import benchmark
+
+HISTORY_TASKS = 200
+INSTRUCTIONS = 8
+
+
+def _fill_history(manager: CheckpointManager, tasks: int) -> None:
+    for index in range(tasks):
+        task_id = f"history_{index}"
+        manager.checkpoint_data["tasks"].append(
+            {
+                "task_id": task_id,
+                "task_text": f"Выполненная задача номер {index}",
+                "state": "completed",
+                "start_time": "2026-01-01T00:00:00",
+                "end_time": "2026-01-01T00:30:00",
+                "attempts": 1,
+                "error_message": None,
+                "result": None,
+                "metadata": {"task_number": index, "total_tasks": tasks},
+                "instruction_progress": {
+                    "last_completed_instruction": INSTRUCTIONS,
+                    "total_instructions": INSTRUCTIONS,
+                    "completed_instructions": list(range(1, INSTRUCTIONS + 1)),
+                },
+            }
+        )
+    manager._save_checkpoint(create_backup=False)
+
+
+@benchmark(repeat=5)
+def write_amplification() -> Dict[str, float]:
+    """Запись checkpoint за жизненный цикл одной задачи при истории из 200 задач"""
+    with tempfile.TemporaryDirectory(prefix="codeagent-bench-") as tmp:
+        manager = CheckpointManager(Path(tmp), "checkpoint.json")
+        _fill_history(manager, HISTORY_TASKS)
+
+        written = {"bytes": 0, "saves": 0}
+        backup_ctime = [None]
+
+        def on_save() -> None:
+            written["saves"] += 1
+            written["bytes"] += manager.checkpoint_file.stat().st_size
+            if manager.backup_file.exists():
+                ctime = manager.backup_file.stat().st_ctime_ns
+                if ctime != backup_ctime[0]:
+                    backup_ctime[0] = ctime
+                    written["bytes"] += manager.backup_file.stat().st_size
+
+        manager.add_change_listener(on_save)
+        started = time.perf_counter()
+        manager.add_task("bench_task", "Задача бенчмарка")
+        manager.mark_task_start("bench_task")
+        for instruction in range(1, INSTRUCTIONS + 1):
+            manager.update_instruction_progress("bench_task", instruction, INSTRUCTIONS)
+        manager.mark_task_completed("bench_task")
+        elapsed = time.perf_counter() - started
+
+        task_bytes = len(
+            json.dumps(manager._find_task("bench_task"), indent=2, ensure_ascii=False).encode()
+        )
+
+    return {
+        "seconds": elapsed,
+        "saves": written["saves"],
+        "bytes_per_save": written["bytes"] / max(1, written["saves"]),
+        "write_amplification": written["bytes"] / task_bytes,
+    }
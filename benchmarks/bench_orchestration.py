@@ -0,0 +1,126 @@
+"""
+Бенчмарки оркестрации: CodeAgentServer.run_iteration с поддельным агентом
+
+Полный цикл задачи (инструкции default из config/config.yaml, проверки
+репортов через LLM, checkpoint, статусы, снимки ChangeTracker) выполняется без
+Docker и сети: агент пишет отчеты сразу или с задержкой, LLM отвечает "continue".
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from .fakes import llm_stub
+from .harness import benchmark
+from .workspace import server_workspace
+
+
+def run_tasks(
+    tasks: int,
+    execute_delay: float = 0.0,
+    result_delay: float = 0.0,
+    llm_latency: float = 0.0,
+    overrides: Optional[Dict[str, Any]] = None,
+) -> Dict[str, float]:
+    """
+    Выполнить одну итерацию сервера над tasks задачами
+
+    Args:
+        tasks: Количество задач в TODO
+        execute_delay: Длительность вызова агента (секунды)
+        result_delay: Задержка появления отчета (секунды)
+        llm_latency: Задержка ответа LLM (секунды)
+        overrides: Переопределения конфигурации сервера
+
+    Returns:
+        Время итерации, количество вызовов и чатов агента, вызовы LLM, выполненные задачи
+    """
+    texts = [f"Реализовать обработчик событий номер {index}" for index in range(tasks)]
+    with llm_stub(llm_latency) as stub, server_workspace(
+        texts, execute_delay=execute_delay, result_delay=result_delay, overrides=overrides
+    ) as server:
+        asyncio.run(server.todo_manager.ensure_loaded())
+        started = time.perf_counter()
+        asyncio.run(server.run_iteration(1))
+        elapsed = time.perf_counter() - started
+        agent = server.cursor_cli
+        return {
+            "seconds": elapsed,
+            "instructions": agent.calls,
+            # Новые чаты агента: созданные для сессий задач и вызовы без продолжения чата
+            "agent_chats": agent.chats_created + agent.calls - agent.resumed_calls,
+            "llm_calls": stub.calls,
+            "tasks_done": sum(1 for item in server.todo_manager.items if item.done),
+        }
+
+
+@benchmark(repeat=3, higher_is_better=["tasks_per_min"])
+def task_throughput() -> Dict[str, float]:
+    """Пропускная способность: 4 задачи, агент 20 мс, LLM 10 мс"""
+    stats = run_tasks(4, execute_delay=0.02, llm_latency=0.01)
+    stats["tasks_per_min"] = stats["tasks_done"] * 60 / stats["seconds"]
+    return stats
+
+
+@benchmark(repeat=3)
+def instruction_overhead() -> Dict[str, float]:
+    """Накладные расходы сервера на инструкцию при мгновенных агенте и LLM"""
+    stats = run_tasks(2)
+    stats["overhead_ms_per_instruction"] = stats["seconds"] * 1000 / max(1, stats["instructions"])
+    return stats
+
+
+@benchmark(repeat=1)
+def result_pickup_latency() -> Dict[str, float]:
+    """Задержка обнаружения отчета, который появляется через 50 мс после вызова агента"""
+    result_delay = 0.05
+    stats = run_tasks(1, result_delay=result_delay)
+    instructions = max(1, stats["instructions"])
+    stats["pickup_s_per_instruction"] = stats["seconds"] / instructions - result_delay
+    return stats
+
+
+@benchmark(repeat=1, higher_is_better=["speedup"])
+def instruction_parallelism() -> Dict[str, float]:
+    """Время задачи по очереди и с опережающим запуском инструкций (агент 1 с)"""
+    sequential = run_tasks(1, execute_delay=1.0, overrides={"server.parallel_instructions": 1})
+    parallel = run_tasks(1, execute_delay=1.0, overrides={"server.parallel_instructions": 2})
+    return {
+        "seconds": parallel["seconds"],
+        "seconds_sequential": sequential["seconds"],
+        "speedup": sequential["seconds"] / parallel["seconds"],
+    }
+
+
+def make_test_report(tests: int, failed: int = 3) -> str:
+    """Отчет о тестировании: полный лог pytest, трейсбек и итоговый чеклист"""
+    lines = ["# Отчет о тестировании", "", "## Лог pytest", "```"]
+    lines += [f"test/unit/test_module_{i}.py::test_case_{i} PASSED" for i in range(tests)]
+    lines += [f"test/unit/test_failed_{i}.py::test_case FAILED" for i in range(failed)]
+    lines += ["```", "", "## Ошибки", "```", "Traceback (most recent call last):"]
+    lines += [f'  File "src/module_{i}.py", line {i}, in handler' for i in range(50)]
+    lines += ["AssertionError: expected 200, got 500", "```", "", "## Итог"]
+    lines += [f"- [ ] Исправить test/unit/test_failed_{i}.py" for i in range(failed)]
+    lines += [f"===== {failed} failed, {tests} passed in 42.0s =====", "Отчет завершен!"]
+    return "\n".join(lines)
+
+
+@benchmark(repeat=3, higher_is_better=["compression"])
+def report_digest() -> Dict[str, float]:
+    """Дайджест отчета о 3000 тестах для промпта анализа отчета"""
+    from src.report_digest import ReportDigester
+
+    report = make_test_report(3000)
+    digester = ReportDigester()
+    started = time.perf_counter()
+    digest = digester.digest(report)
+    cold_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    digester.digest(report)
+    return {
+        "seconds": cold_seconds,
+        "cached_seconds": time.perf_counter() - started,
+        "report_chars": len(report),
+        "digest_chars": len(digest),
+        "compression": len(report) / len(digest),
+    }
@@ -0,0 +1,148 @@
+"""
+Бенчмарки TodoManager: разбор большого TODO, семантическая дедупликация и
+пакетная оценка полезности пунктов
+"""
+
+import asyncio
+import json
+import math
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src.todo_manager import TodoManager
+from src.usefulness_triage import UsefulnessTriage
+
+from .fakes import llm_stub
+from .harness import benchmark
+
+# Ключевые слова группировки TodoManager._group_similar_tasks встречаются в части задач
+_KEYWORDS = ["server", "api", "cache", "config", "logging", "validation", "auth", "module"]
+_VERBS = ["Добавить", "Исправить", "Обновить", "Переписать", "Проверить", "Удалить"]
+
+
+def make_tasks(count: int, seed: int = 42) -> List[str]:
+    """Детерминированный набор задач (около трети содержат общие ключевые слова)"""
+    rng = random.Random(seed)
+    tasks = []
+    for index in range(count):
+        words = [f"w{rng.randrange(count * 4)}" for _ in range(4)]
+        if rng.random() < 0.3:
+            words.append(rng.choice(_KEYWORDS))
+        tasks.append(f"{rng.choice(_VERBS)} {' '.join(words)} #{index}")
+    return tasks
+
+
+def write_markdown_todo(path: Path, lines: int) -> int:
+    """Записать TODO на lines строк (разделы, вложенные и выполненные задачи)"""
+    content = ["# Задачи проекта"]
+    tasks = 0
+    while len(content) < lines:
+        if len(content) % 50 == 1:
+            content.extend(["", f"## Этап {len(content) // 50 + 1}", ""])
+            continue
+        mark = "x" if tasks % 4 == 0 else " "
+        indent = "  " if tasks % 5 == 0 else ""
+        content.append(f"{indent}- [{mark}] Реализовать функцию обработки запроса номер {tasks}")
+        tasks += 1
+    path.write_text("\n".join(content[:lines]) + "\n", encoding="utf-8")
+    return tasks
+
+
+@benchmark(repeat=5)
+def parse_10k_lines() -> Dict[str, float]:
+    """Разбор markdown TODO на 10 000 строк и отметка задачи выполненной"""
+    with tempfile.TemporaryDirectory(prefix="codeagent-bench-") as tmp:
+        path = Path(tmp) / "todo.md"
+        write_markdown_todo(path, 10_000)
+        manager = TodoManager(Path(tmp), todo_format="md")
+
+        started = time.perf_counter()
+        manager.items = manager._load_from_file(path, "md")
+        parse_seconds = time.perf_counter() - started
+
+        pending = manager.get_pending_tasks()
+        started = time.perf_counter()
+        manager.mark_task_done(pending[len(pending) // 2].text)
+        mark_seconds = time.perf_counter() - started
+
+    return {
+        "seconds": parse_seconds,
+        "items": len(manager.items),
+        "mark_done_seconds": mark_seconds,
+    }
+
+
+def _dedup_seconds(count: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory(prefix="codeagent-bench-") as tmp:
+        todo = Path(tmp) / "todo.md"
+        todo.write_text(
+            "\n".join(f"- [ ] {task}" for task in make_tasks(count)) + "\n", encoding="utf-8"
+        )
+        manager = TodoManager(Path(tmp), todo_format="md")
+        with llm_stub(latency=0.001, responder=lambda prompt: "NO") as stub:
+            started = time.perf_counter()
+            asyncio.run(manager.ensure_loaded())
+            return {"seconds": time.perf_counter() - started, "llm_calls": stub.calls}
+
+
+@benchmark(repeat=3)
+def dedup_scaling() -> Dict[str, float]:
+    """Дедупликация задач при загрузке: время для 100, 400 и 1600 задач"""
+    metrics: Dict[str, float] = {}
+    for count in (100, 400, 1600):
+        stats = _dedup_seconds(count)
+        metrics[f"seconds_n{count}"] = stats["seconds"]
+        metrics[f"llm_calls_n{count}"] = stats["llm_calls"]
+    # Показатель степени роста времени: 1 - линейно, 2 - квадратично
+    metrics["growth_exponent"] = math.log(
+        metrics["seconds_n1600"] / metrics["seconds_n400"]
+    ) / math.log(4)
+    metrics["seconds"] = sum(metrics[f"seconds_n{count}"] for count in (100, 400, 1600))
+    return metrics
+
+
+def _score_all(prompt: str) -> str:
+    """Ответ LLM на промпт триажа: 80% для каждого пункта пакета"""
+    ids = [
+        json.loads(line)["id"] for line in prompt.splitlines() if line.startswith('{"id"')
+    ]
+    return json.dumps({"items": [{"id": i, "usefulness_percent": 80} for i in ids]})
+
+
+@benchmark(repeat=3)
+def usefulness_triage() -> Dict[str, float]:
+    """Оценка полезности 40 пунктов при задержке LLM 50 мс: первый старт и повторный"""
+    from src.llm.llm_manager import LLMManager
+
+    texts = make_tasks(40)
+    with tempfile.TemporaryDirectory(prefix="codeagent-bench-") as tmp, llm_stub(
+        latency=0.05, responder=_score_all
+    ) as stub:
+        llm_manager = LLMManager()
+
+        async def generate(prompt: str) -> str:
+            response = await llm_manager.generate_response(
+                prompt=prompt, use_fastest=False, response_format={"type": "json_object"}
+            )
+            return response.content
+
+        triage = UsefulnessTriage(Path(tmp) / "usefulness.json")
+        started = time.perf_counter()
+        scored = asyncio.run(triage.triage(texts, generate))
+        cold_seconds = time.perf_counter() - started
+        cold_calls = stub.calls
+
+        started = time.perf_counter()
+        asyncio.run(UsefulnessTriage(Path(tmp) / "usefulness.json").triage(texts, generate))
+        warm_seconds = time.perf_counter() - started
+
+    return {
+        "seconds": cold_seconds,
+        "warm_seconds": warm_seconds,
+        "scored": scored,
+        "llm_calls": cold_calls,
+        "warm_llm_calls": stub.calls - cold_calls,
+    }
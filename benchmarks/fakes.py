@@ -0,0 +1,218 @@
+"""
+Поддельный агент CLI и заглушка LLM для бенчмарков
+
+FakeAgentCLI повторяет интерфейс CursorCLIInterface, который использует сервер
+(is_available, execute_instruction, prepare_for_new_task, create_chat,
+current_chat_id), и
+вместо запуска агента пишет файлы отчетов, упомянутые в инструкции, с
+контрольными фразами и дописывает строку в исходный файл задачи (чтобы проверка
+реальной работы видела изменения). Задержки настраиваются: execute_delay -
+сколько длится вызов агента, result_delay - через сколько после возврата
+появляется отчет.
+
+FakeAsyncOpenAI подменяет SDK провайдера openrouter в LLMManager, поэтому
+вызовы LLM проходят через реальный код менеджера (выбор модели, метрики,
+события) с заданной задержкой ответа.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Файлы отчетов, которые инструкции просят создать
+_REPORT_PATH_RE = re.compile(r"docs[/\\](?:results|reviews)[/\\][\w.{}-]+\.md")
+# Контрольные фразы: короткие строки в кавычках, заканчивающиеся на "!"
+_CONTROL_PHRASE_RE = re.compile(r"\"([^\"\n]{3,60}!)\"")
+
+DEFAULT_LLM_RESPONSE = json.dumps(
+    {
+        "decision": "continue",
+        "reason": "benchmark",
+        "next_instruction_name": "",
+        "free_instruction_text": "",
+        "usefulness_percent": 90,
+        "matches": True,
+    }
+)
+
+
+class FakeAgentCLI:
+    """Агент CLI, который пишет отчеты инструкций вместо выполнения работы"""
+
+    cli_command = "fake-agent"
+
+    def __init__(
+        self,
+        project_dir: Path,
+        execute_delay: float = 0.0,
+        result_delay: float = 0.0,
+        fail_every: int = 0,
+    ):
+        """
+        Инициализация
+
+        Args:
+            project_dir: Директория проекта, в которую пишутся отчеты
+            execute_delay: Длительность вызова агента (секунды)
+            result_delay: Задержка появления отчета после возврата вызова (секунды)
+            fail_every: Каждый N-й вызов завершается ошибкой (0 - без ошибок)
+        """
+        self.project_dir = Path(project_dir)
+        self.execute_delay = execute_delay
+        self.result_delay = result_delay
+        self.fail_every = fail_every
+        self.current_chat_id: Optional[str] = None
+        self.calls = 0
+        self.reports_written = 0
+        self.model_overrides = 0  # Вызовы с переопределением модели (политика downgrade)
+        self.chats_created = 0
+        self.resumed_calls = 0  # Вызовы с продолжением чата задачи
+        self._timers: List[threading.Timer] = []
+
+    def is_available(self) -> bool:
+        return True
+
+    def get_status(self) -> str:
+        return "available"
+
+    def prepare_for_new_task(self) -> bool:
+        self.current_chat_id = None
+        return True
+
+    def create_chat(self) -> Optional[str]:
+        self.chats_created += 1
+        self.current_chat_id = f"chat-{self.chats_created}"
+        return self.current_chat_id
+
+    def _write_reports(self, instruction: str, task_id: str) -> None:
+        source = self.project_dir / "src" / f"{task_id}.py"
+        source.parent.mkdir(parents=True, exist_ok=True)
+        with open(source, "a", encoding="utf-8") as f:
+            f.write(f"STEP_{self.calls} = True\n")
+        phrases = _CONTROL_PHRASE_RE.findall(instruction) or ["Отчет завершен!"]
+        body = "Изменения выполнены.\n\n" + "\n".join(dict.fromkeys(phrases)) + "\n"
+        for relative in dict.fromkeys(_REPORT_PATH_RE.findall(instruction)):
+            path = self.project_dir / relative.replace("\\", "/")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(body, encoding="utf-8")
+            self.reports_written += 1
+
+    def execute_instruction(
+        self,
+        instruction: str,
+        task_id: str,
+        working_dir: Optional[str] = None,
+        timeout: Optional[int] = None,
+        model: Optional[str] = None,
+        chat_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Выполнить инструкцию (сигнатура CursorCLIInterface.execute_instruction)"""
+        self.calls += 1
+        if model:
+            self.model_overrides += 1
+        if chat_id:
+            self.resumed_calls += 1
+        self.current_chat_id = chat_id or f"chat-{task_id}"
+        if self.execute_delay:
+            time.sleep(self.execute_delay)
+        failed = bool(self.fail_every) and self.calls % self.fail_every == 0
+        if not failed:
+            if self.result_delay:
+                timer = threading.Timer(
+                    self.result_delay, self._write_reports, (instruction, task_id)
+                )
+                timer.daemon = True
+                timer.start()
+                self._timers.append(timer)
+            else:
+                self._write_reports(instruction, task_id)
+        return {
+            "task_id": task_id,
+            "success": not failed,
+            "stdout": "fake agent output",
+            "stderr": "",
+            "return_code": 1 if failed else 0,
+            "cli_available": True,
+            "error_message": "fake failure" if failed else None,
+            "fallback_used": False,
+            "primary_model_failed": False,
+        }
+
+    def close(self) -> None:
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+
+
+class FakeAsyncOpenAI:
+    """Клиент с интерфейсом AsyncOpenAI (chat.completions.create) и задержкой ответа"""
+
+    latency = 0.0
+    responder: Callable[[str], str] = staticmethod(lambda prompt: DEFAULT_LLM_RESPONSE)
+    calls = 0
+
+    def __init__(self, **kwargs: Any):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **params: Any) -> SimpleNamespace:
+        type(self).calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        prompt = params["messages"][-1]["content"]
+        content = type(self).responder(prompt)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=16),
+        )
+
+    async def close(self) -> None:
+        return None
+
+
+@contextmanager
+def llm_stub(
+    latency: float = 0.0, responder: Optional[Callable[[str], str]] = None
+) -> Iterator[type]:
+    """
+    Подменить SDK openrouter в LLMManager на FakeAsyncOpenAI
+
+    Args:
+        latency: Задержка ответа LLM (секунды)
+        responder: Функция prompt -> текст ответа (по умолчанию JSON "continue")
+
+    Yields:
+        Класс клиента (счетчик вызовов в атрибуте calls)
+    """
+    from src.llm import llm_manager
+
+    client_class = type(
+        "StubAsyncOpenAI",
+        (FakeAsyncOpenAI,),
+        {
+            "latency": latency,
+            "calls": 0,
+            "responder": staticmethod(responder or (lambda prompt: DEFAULT_LLM_RESPONSE)),
+        },
+    )
+    previous_sdk = llm_manager.__dict__.get("AsyncOpenAI")
+    previous_key = os.environ.get("OPENROUTER_API_KEY")
+    llm_manager.AsyncOpenAI = client_class
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+    try:
+        yield client_class
+    finally:
+        if previous_sdk is None:
+            del llm_manager.AsyncOpenAI
+        else:
+            llm_manager.AsyncOpenAI = previous_sdk
+        if previous_key is None:
+            os.environ.pop("OPENROUTER_API_KEY", None)
+        else:
+            os.environ["OPENROUTER_API_KEY"] = previous_key
@@ -0,0 +1,178 @@
+"""
+Минимальный раннер бенчмарков с базовой линией
+
+Бенчмарк - функция, помеченная декоратором @benchmark, которая возвращает
+словарь метрик одного прогона ({"seconds": 0.12, "tasks_per_min": 480}).
+Раннер повторяет прогон repeat раз и хранит медиану каждой метрики.
+Результаты сравниваются с сохраненной базовой линией (benchmarks/baseline.json):
+метрика считается регрессией, если ухудшилась больше чем на порог. Направление
+"лучше" задается в декораторе (higher_is_better), по умолчанию меньше - лучше.
+"""
+
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+
+@dataclass
+class Benchmark:
+    """Зарегистрированный бенчмарк"""
+
+    name: str
+    func: Callable[[], Dict[str, float]]
+    repeat: int = 3
+    higher_is_better: Iterable[str] = ()
+    description: str = ""
+
+
+@dataclass
+class BenchResult:
+    """Результат бенчмарка (медианы метрик по повторам)"""
+
+    name: str
+    metrics: Dict[str, float] = field(default_factory=dict)
+    runs: List[Dict[str, float]] = field(default_factory=list)
+    higher_is_better: List[str] = field(default_factory=list)
+
+
+REGISTRY: Dict[str, Benchmark] = {}
+
+
+def benchmark(
+    name: Optional[str] = None, repeat: int = 3, higher_is_better: Iterable[str] = ()
+) -> Callable[[Callable[[], Dict[str, float]]], Callable[[], Dict[str, float]]]:
+    """
+    Зарегистрировать бенчмарк
+
+    Args:
+        name: Имя (по умолчанию <модуль>.<функция> без префикса bench_)
+        repeat: Количество повторов
+        higher_is_better: Метрики, у которых большее значение лучше
+
+    Returns:
+        Декоратор
+    """
+
+    def decorator(func: Callable[[], Dict[str, float]]) -> Callable[[], Dict[str, float]]:
+        module = func.__module__.rsplit(".", 1)[-1]
+        default_name = f"{module.removeprefix('bench_')}.{func.__name__}"
+        bench_name = name or default_name
+        REGISTRY[bench_name] = Benchmark(
+            name=bench_name,
+            func=func,
+            repeat=repeat,
+            higher_is_better=tuple(higher_is_better),
+            description=(func.__doc__ or "").strip().splitlines()[0] if func.__doc__ else "",
+        )
+        return func
+
+    return decorator
+
+
+def run_benchmark(bench: Benchmark, repeat: Optional[int] = None) -> BenchResult:
+    """
+    Выполнить бенчмарк
+
+    Args:
+        bench: Бенчмарк
+        repeat: Количество повторов (по умолчанию из декоратора)
+
+    Returns:
+        Результат с медианами метрик
+    """
+    result = BenchResult(name=bench.name, higher_is_better=list(bench.higher_is_better))
+    for _ in range(repeat or bench.repeat):
+        started = time.perf_counter()
+        metrics = dict(bench.func())
+        metrics.setdefault("seconds", time.perf_counter() - started)
+        result.runs.append(metrics)
+    for key in result.runs[0]:
+        values = [run[key] for run in result.runs if key in run]
+        result.metrics[key] = statistics.median(values)
+    return result
+
+
+def environment() -> Dict[str, str]:
+    """Описание окружения для сравнения результатов"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or "",
+    }
+
+
+def load_baseline(path: Path = BASELINE_FILE) -> Dict[str, Any]:
+    """Загрузить базовую линию (пустую, если файла нет)"""
+    if not path.exists():
+        return {"results": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results: List[BenchResult], path: Path, merge: bool = True) -> None:
+    """
+    Сохранить результаты (базовую линию или файл истории)
+
+    Args:
+        results: Результаты бенчмарков
+        path: Путь к файлу
+        merge: Обновить только переданные бенчмарки, сохранив остальные
+    """
+    data = load_baseline(path) if merge else {"results": {}}
+    data["created"] = datetime.now().isoformat(timespec="seconds")
+    data["environment"] = environment()
+    for result in results:
+        data["results"][result.name] = {
+            "metrics": {key: round(value, 6) for key, value in result.metrics.items()},
+            "higher_is_better": result.higher_is_better,
+        }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    results: List[BenchResult], baseline: Dict[str, Any], threshold: float = 0.25
+) -> List[Dict[str, Any]]:
+    """
+    Сравнить результаты с базовой линией
+
+    Args:
+        results: Текущие результаты
+        baseline: Базовая линия (load_baseline)
+        threshold: Допустимое ухудшение (0.25 = на 25%)
+
+    Returns:
+        Строки сравнения: benchmark, metric, baseline, current, change, regression
+    """
+    rows = []
+    for result in results:
+        stored = baseline.get("results", {}).get(result.name)
+        if not stored:
+            continue
+        for metric, current in result.metrics.items():
+            base = stored["metrics"].get(metric)
+            if base is None or base == 0:
+                continue
+            change = (current - base) / abs(base)
+            worse = -change if metric in result.higher_is_better else change
+            rows.append(
+                {
+                    "benchmark": result.name,
+                    "metric": metric,
+                    "baseline": base,
+                    "current": current,
+                    "change": change,
+                    "regression": worse > threshold,
+                }
+            )
+    return rows
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Запуск бенчмарков и сравнение с базовой линией
+
+Примеры:
+    python -m benchmarks.run
+    python -m benchmarks.run -k orchestration --repeat 5
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --output logs/bench/$(date +%F).json --threshold 0.3
+
+Код возврата 1, если хотя бы одна метрика ухудшилась относительно базовой
+линии больше чем на порог.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.harness import (  # noqa: E402
+    BASELINE_FILE,
+    REGISTRY,
+    BenchResult,
+    compare,
+    load_baseline,
+    run_benchmark,
+    save_results,
+)
+
+BENCH_MODULES = ("bench_orchestration", "bench_todo", "bench_checkpoint")
+
+
+def _quiet_logging(verbose: bool) -> None:
+    """Логи сервера форматируются как обычно, но пишутся в /dev/null"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if verbose:
+        logging.basicConfig(level=logging.INFO)
+        return
+    root.addHandler(logging.FileHandler(os.devnull, encoding="utf-8"))
+    root.setLevel(logging.INFO)
+
+
+def _format(value: float) -> str:
+    if value == int(value) and abs(value) < 1e9:
+        return str(int(value))
+    return f"{value:.4g}"
+
+
+def main() -> int:
+    """Основная функция."""
+    parser = argparse.ArgumentParser(description="Бенчмарки Code Agent")
+    parser.add_argument("-k", "--filter", help="Подстрока имени бенчмарка")
+    parser.add_argument("--repeat", type=int, help="Количество повторов (по умолчанию свое)")
+    parser.add_argument("--list", action="store_true", help="Показать бенчмарки и выйти")
+    parser.add_argument(
+        "--baseline", default=str(BASELINE_FILE), help="Файл базовой линии для сравнения"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Записать результаты в базовую линию"
+    )
+    parser.add_argument("--output", help="Записать результаты запуска в JSON файл")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Порог регрессии (0.25 = на 25%%)"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Выводить логи сервера")
+    args = parser.parse_args()
+
+    # LLMManager и TodoManager открывают config/ относительно рабочей директории
+    os.chdir(PROJECT_ROOT)
+    for module in BENCH_MODULES:
+        importlib.import_module(f"benchmarks.{module}")
+    selected = [
+        bench for name, bench in REGISTRY.items() if not args.filter or args.filter in name
+    ]
+    if args.list:
+        for bench in selected:
+            print(f"{bench.name:<40} {bench.description}")
+        return 0
+    if not selected:
+        print(f"Нет бенчмарков по фильтру '{args.filter}'", file=sys.stderr)
+        return 1
+
+    _quiet_logging(args.verbose)
+    results: List[BenchResult] = []
+    for bench in selected:
+        print(f"{bench.name} ...", flush=True)
+        # TaskLogger печатает ход задачи в stdout - в таблице результатов он не нужен
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                devnull = stack.enter_context(open(os.devnull, "w", encoding="utf-8"))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+            result = run_benchmark(bench, args.repeat)
+        results.append(result)
+        for metric, value in result.metrics.items():
+            print(f"  {metric:<34} {_format(value)}")
+
+    baseline_path = Path(args.baseline)
+    rows = compare(results, load_baseline(baseline_path), args.threshold)
+    regressions = [row for row in rows if row["regression"]]
+    if rows:
+        print(f"\nСравнение с {baseline_path} (порог {args.threshold:.0%}):")
+        for row in rows:
+            flag = "РЕГРЕССИЯ" if row["regression"] else ""
+            print(
+                f"  {row['benchmark'] + '.' + row['metric']:<60} "
+                f"{_format(row['baseline']):>10} -> {_format(row['current']):>10} "
+                f"({row['change']:+.1%}) {flag}"
+            )
+
+    if args.output:
+        save_results(results, Path(args.output), merge=False)
+    if args.save_baseline:
+        save_results(results, baseline_path)
+        print(f"\nБазовая линия обновлена: {baseline_path}")
+    elif regressions:
+        print(f"\nРегрессий: {len(regressions)}", file=sys.stderr)
+        print(json.dumps(regressions, ensure_ascii=False, indent=2), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Временное окружение сервера для бенчмарков
+
+Создает проект с TODO, конфигурацию на основе config/config.yaml (HTTP,
+автоперезагрузка и задержки отключены, checkpoint и события пишутся во
+временную директорию) и сервер с поддельным агентом CLI. Рабочая директория
+процесса на время бенчмарка переключается во временную, чтобы логи задач не
+попадали в logs/ репозитория; config/ доступна через символическую ссылку
+(LLMManager читает config/llm_settings.yaml относительно рабочей директории).
+"""
+
+import os
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import yaml
+
+from .fakes import FakeAgentCLI
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_todo(path: Path, tasks: List[str], sections: int = 1) -> None:
+    """Записать TODO в формате markdown с чекбоксами"""
+    lines = ["# Задачи проекта", ""]
+    per_section = max(1, len(tasks) // sections)
+    for index, task in enumerate(tasks):
+        if index % per_section == 0:
+            lines.extend(["", f"## Раздел {index // per_section + 1}", ""])
+        lines.append(f"- [ ] {task}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def make_config(workspace: Path, project_dir: Path, overrides: Optional[Dict[str, Any]]) -> Path:
+    """Конфигурация сервера для бенчмарка на основе config/config.yaml"""
+    with open(PROJECT_ROOT / "config" / "config.yaml", "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    config["project"]["base_dir"] = str(project_dir)
+    config["project"]["todo_format"] = "md"
+    config["llm"]["cli_interface"] = "cursor"
+    config["server"].update(
+        http_enabled=False,
+        auto_reload=False,
+        task_delay=0,
+        checkpoint_file=str(workspace / "data" / "checkpoint.json"),
+    )
+    config["server"]["auto_todo_generation"].update(
+        enabled=False, session_tracker_file=str(workspace / "data" / "sessions.json")
+    )
+    config["test_impact"]["index_file"] = str(workspace / "data" / "test_impact.json")
+    config["usefulness_triage"]["store_file"] = str(workspace / "data" / "usefulness.json")
+    config["event_store"] = {"enabled": False}
+    config["tracing"] = {"enabled": False}
+    for dotted, value in (overrides or {}).items():
+        section = config
+        *parents, key = dotted.split(".")
+        for name in parents:
+            section = section.setdefault(name, {})
+        section[key] = value
+
+    path = workspace / "config.yaml"
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    return path
+
+
+@contextmanager
+def server_workspace(
+    tasks: List[str],
+    execute_delay: float = 0.0,
+    result_delay: float = 0.0,
+    git_repo: bool = True,
+    overrides: Optional[Dict[str, Any]] = None,
+) -> Iterator[Any]:
+    """
+    Сервер с поддельным агентом CLI во временном проекте
+
+    Args:
+        tasks: Задачи TODO
+        execute_delay: Длительность вызова агента (секунды)
+        result_delay: Задержка появления отчета после вызова (секунды)
+        git_repo: Инициализировать git в проекте (снимки ChangeTracker)
+        overrides: Переопределения конфигурации вида {"server.task_delay": 0}
+
+    Yields:
+        Экземпляр CodeAgentServer (поддельный агент в атрибуте cursor_cli)
+    """
+    previous_cwd = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="codeagent-bench-") as tmp:
+        workspace = Path(tmp)
+        project_dir = workspace / "project"
+        (project_dir / "docs").mkdir(parents=True)
+        (project_dir / "docs" / "README.md").write_text("# Проект\n", encoding="utf-8")
+        write_todo(project_dir / "todo.md", tasks)
+        if git_repo:
+            for args in (
+                ["init", "-q"],
+                ["config", "user.name", "bench"],
+                ["config", "user.email", "bench@localhost"],
+                ["add", "-A"],
+                ["commit", "-q", "-m", "init"],
+            ):
+                subprocess.run(
+                    ["git", *args],
+                    cwd=project_dir,
+                    check=True,
+                    capture_output=True,
+                )
+        (workspace / "data").mkdir()
+        (workspace / "config").symlink_to(PROJECT_ROOT / "config", target_is_directory=True)
+        config_path = make_config(workspace, project_dir, overrides)
+
+        os.chdir(workspace)
+        server = None
+        try:
+            from src.server import CodeAgentServer
+
+            server = CodeAgentServer(str(config_path))
+            server.cursor_cli = FakeAgentCLI(project_dir, execute_delay, result_delay)
+            server.use_cursor_cli = True
+            server.use_gemini_cli = False
+            server.cli_interface_type = "cursor"
+            yield server
+        finally:
+            if server is not None:
+                server.cursor_cli.close()
+            os.chdir(previous_cwd)
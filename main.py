@@ -24,6 +24,7 @@ import logging
 import warnings
 from pathlib import Path
 from src.server import CodeAgentServer, _setup_logging, ServerReloadException
+from src.hot_reload import reload_changed_files
 
 
 def is_our_server_process(pid: int) -> bool:
@@ -464,11 +465,14 @@ def main():
 
     # Запускаем сервер с поддержкой автоперезапуска
     restart_count = 0
+    server_class = CodeAgentServer
+    handoff = None  # Теплые ресурсы предыдущего экземпляра (горячая перезагрузка)
 
     while restart_count < max_restarts:
         server = None
         try:
-            server = CodeAgentServer()
+            server = server_class(handoff=handoff)
+            handoff = None
             asyncio.run(server.start())
 
             # Если дошли сюда, значит сервер завершился нормально
@@ -478,11 +482,29 @@ def main():
         except ServerReloadException:
             # Перезапуск сервера
             restart_count += 1
+            handoff = server.reload_handoff if server else None
             if restart_count < max_restarts:
                 print(f"\n{'='*80}")
                 print(f"Перезапуск сервера ({restart_count}/{max_restarts})...")
                 print(f"{'='*80}\n")
 
+                if handoff is not None:
+                    # Горячая перезагрузка: обновляем измененные модули в процессе
+                    try:
+                        src_dir = Path(__file__).parent / "src"
+                        handoff.reloaded_modules = set(
+                            reload_changed_files(handoff.changed_files, src_dir)
+                        )
+                        server_class = sys.modules["src.server"].CodeAgentServer
+                    except Exception as e:
+                        logger.error(
+                            "Горячая перезагрузка не удалась, модули восстановлены - "
+                            f"сервер перезапускается на прежнем коде: {e}",
+                            exc_info=True,
+                        )
+                        handoff.close()
+                        handoff = None
+
                 # Очищаем event loop перед перезапуском для предотвращения конфликтов
                 try:
                     loop = asyncio.get_event_loop()
@@ -500,10 +522,13 @@ def main():
                     # Event loop уже закрыт или не существует
                     pass
 
-                time.sleep(2)
+                if handoff is None:
+                    time.sleep(2)
                 continue
             else:
                 print(f"Достигнуто максимальное количество перезапусков ({max_restarts})")
+                if handoff is not None:
+                    handoff.close()
                 break
         except KeyboardInterrupt:
             print("\nОстановка сервера...")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк очистки секретов в логах
+
+Сравнивает пропускную способность (МБ/с) прежней реализации (пять регулярных
+выражений последовательно, новая функция замены на каждый паттерн и вызов) и
+текущей redact_secrets_in_text (одна объединенная альтернатива, префильтр по
+подстрокам, кеш коротких сообщений) на:
+- большом выводе агента без секретов (типичный stdout Cursor)
+- большом выводе с редкими секретами
+- потоке коротких повторяющихся сообщений лога
+
+Пример:
+    python scripts/benchmark_redaction.py --size-mb 8 --repeat 5
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.security_utils import redact_secrets_in_text  # noqa: E402
+
+_LEGACY_PATTERNS = [
+    re.compile(
+        r"(?i)\b(api[_-]?key|token|secret|password|passwd|pwd|authorization|bearer)\b"
+        r"([\s:=]+)([^\s,;]+)"
+    ),
+    re.compile(r"(?i)\b(bearer)\s+([A-Za-z0-9._-]{8,})"),
+    re.compile(r"sk-[A-Za-z0-9]{20,}"),
+    re.compile(r"sk-or-v1-[A-Za-z0-9]{20,}"),
+    re.compile(r"sk-ant-[A-Za-z0-9]{20,}"),
+]
+
+
+def legacy_redact(text: str) -> str:
+    """Прежняя реализация redact_secrets_in_text (для сравнения)"""
+    if not isinstance(text, str) or not text:
+        return text
+    redacted = text
+    for pattern in _LEGACY_PATTERNS:
+
+        def _repl(match: re.Match) -> str:
+            if match.lastindex and match.lastindex >= 3:
+                return f"{match.group(1)}{match.group(2)}***REDACTED***"
+            if match.lastindex and match.lastindex >= 2:
+                return f"{match.group(1)} ***REDACTED***"
+            return "***REDACTED***"
+
+        redacted = pattern.sub(_repl, redacted)
+    return redacted
+
+
+_OUTPUT_LINES = [
+    "Reading file src/server.py (6712 lines)",
+    "Applying edit to src/todo_manager.py: replaced 14 lines",
+    "def _process_changes(self, paths: List[str]) -> None:",
+    "    return {'task_id': task_id, 'success': True, 'duration': 12.5}",
+    "Running: python -m pytest -q test/unit/test_event_store.py",
+    "============================== 7 passed in 0.72s ===============================",
+    "Изменения сохранены в docs/results/result_42.md",
+]
+
+
+def make_output(size_bytes: int, with_secrets: bool) -> str:
+    """Сгенерировать вывод агента заданного размера"""
+    lines: List[str] = []
+    size = 0
+    index = 0
+    while size < size_bytes:
+        line = _OUTPUT_LINES[index % len(_OUTPUT_LINES)]
+        if with_secrets and index % 500 == 0:
+            line = f"export OPENAI_API_KEY=sk-{'A1b2C3' * 6} token: abc{index}"
+        lines.append(line)
+        size += len(line) + 1
+        index += 1
+    return "\n".join(lines)
+
+
+def measure(func: Callable[[str], str], texts: List[str], repeat: int) -> float:
+    """Лучшее время (секунды) обработки всех текстов из repeat попыток"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    """Основная функция."""
+    parser = argparse.ArgumentParser(description="Бенчмарк очистки секретов в логах")
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Размер большого вывода (МБ)")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов")
+    args = parser.parse_args()
+
+    size_bytes = int(args.size_mb * 1024 * 1024)
+    log_messages = [f"Инструкция {i % 10}: ожидание результата {i % 30}s" for i in range(20000)]
+    scenarios = [
+        ("вывод без секретов", [make_output(size_bytes, with_secrets=False)]),
+        ("вывод с секретами", [make_output(size_bytes, with_secrets=True)]),
+        ("короткие сообщения", log_messages),
+    ]
+
+    print(f"{'сценарий':<22} {'МБ':>7} {'прежняя, МБ/с':>15} {'текущая, МБ/с':>15} {'ускорение':>10}")
+    for name, texts in scenarios:
+        megabytes = sum(len(text.encode("utf-8")) for text in texts) / (1024 * 1024)
+        for text in texts[:50]:
+            if legacy_redact(text) != redact_secrets_in_text(text) and "sk-" not in text:
+                print(f"Расхождение результатов в сценарии '{name}'", file=sys.stderr)
+                return 1
+        legacy = measure(legacy_redact, texts, args.repeat)
+        current = measure(redact_secrets_in_text, texts, args.repeat)
+        print(
+            f"{name:<22} {megabytes:>7.2f} {megabytes / legacy:>15.1f} "
+            f"{megabytes / current:>15.1f} {legacy / current:>9.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Офлайн аналитика хранилища событий (logs/events)
+
+Считает за один потоковый проход:
+- throughput: задачи в час и по дням
+- latency: p50/p95 задержки инструкций, ожидания результата и LLM
+- failures: доли неудач по моделям и контейнерам, счетчики ошибок
+- regressions: сравнение двух запусков сервера (по умолчанию - двух последних)
+
+Примеры:
+    python scripts/event_analytics.py
+    python scripts/event_analytics.py latency --since 30d
+    python scripts/event_analytics.py regressions --baseline RUN_A --candidate RUN_B --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.event_analytics import EventAnalytics  # noqa: E402
+from src.event_store import DEFAULT_DIRECTORY, iter_events  # noqa: E402
+
+SECTIONS = ("summary", "throughput", "latency", "failures", "regressions")
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """
+    Разобрать границу интервала
+
+    Args:
+        value: Относительное время (30d, 12h) или дата (2026-01-31, 2026-01-31T12:00)
+
+    Returns:
+        Timestamp или None
+    """
+    if not value:
+        return None
+    units = {"h": 3600, "d": 86400, "w": 7 * 86400}
+    if value[-1] in units and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_summary(summary: Dict[str, Any]) -> str:
+    if "p95" in summary:
+        if not summary["count"]:
+            return "n=0"
+        return (
+            f"n={summary['count']:<6} p50={summary['p50']}s p95={summary['p95']}s "
+            f"mean={summary['mean']}s"
+        )
+    return (
+        f"n={summary['total']:<6} failed={summary['failed']:<5} "
+        f"rate={summary['failure_rate']:.1%}"
+    )
+
+
+def print_section(name: str, data: Dict[str, Any]) -> None:
+    """Вывести раздел отчета в текстовом виде"""
+    print(f"\n=== {name} ===")
+    for key, value in data.items():
+        if isinstance(value, dict) and value and all(isinstance(v, dict) for v in value.values()):
+            print(f"{key}:")
+            for item, summary in value.items():
+                print(f"  {item:<45} {_format_summary(summary)}")
+        elif isinstance(value, dict) and ("p95" in value or "failure_rate" in value):
+            print(f"{key:<47} {_format_summary(value)}")
+        elif isinstance(value, list):
+            print(f"{key}:")
+            if not value:
+                print("  -")
+            for item in value:
+                print(
+                    f"  {item['instruction']:<45} {item['metric']}: "
+                    f"{item['baseline']} -> {item['candidate']} ({item['change']:+})"
+                )
+        elif isinstance(value, dict):
+            print(f"{key}:")
+            for item, count in value.items():
+                print(f"  {item:<45} {count}")
+        else:
+            print(f"{key:<47} {value}")
+
+
+def main() -> int:
+    """Основная функция."""
+    parser = argparse.ArgumentParser(description="Аналитика хранилища событий Code Agent")
+    parser.add_argument("section", nargs="?", default="summary", choices=SECTIONS)
+    parser.add_argument(
+        "--dir", default=str(PROJECT_ROOT / DEFAULT_DIRECTORY), help="Директория хранилища"
+    )
+    parser.add_argument("--since", help="Начало периода: 30d, 12h, 2w или дата ISO")
+    parser.add_argument("--until", help="Конец периода: 30d, 12h, 2w или дата ISO")
+    parser.add_argument("--baseline", help="Запуск для сравнения (базовый)")
+    parser.add_argument("--candidate", help="Запуск для сравнения (проверяемый)")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Порог регрессии (0.2 = рост на 20%%)"
+    )
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    args = parser.parse_args()
+
+    if bool(args.baseline) != bool(args.candidate):
+        parser.error("--baseline и --candidate указываются вместе")
+    runs = [args.baseline, args.candidate] if args.baseline else None
+
+    analytics = EventAnalytics(runs=runs).consume(
+        iter_events(Path(args.dir), since=parse_time(args.since), until=parse_time(args.until))
+    )
+    if not analytics.events:
+        print(f"Нет событий в {args.dir}", file=sys.stderr)
+        return 1
+
+    if args.section == "summary":
+        report = analytics.report(args.threshold)
+    elif args.section == "regressions":
+        report = {"regressions": analytics.regressions(args.threshold)}
+    else:
+        report = {args.section: getattr(analytics, args.section)()}
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"Событий: {analytics.events}, запусков: {analytics.run_count}")
+    for name, data in report.items():
+        if isinstance(data, dict):
+            print_section(name, data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@
 import json
 import subprocess
 import sys
+import urllib.request
 from pathlib import Path
 
 # Настройка UTF-8 для Windows консоли
@@ -190,8 +191,63 @@ def tail_log(log_file, lines=10):
         print(f"[X] Error reading log: {e}")
 
 
+def format_event(event):
+    """Сформировать строку для события из потока /events"""
+    data = event.get("data", {})
+    event_type = event.get("type", "unknown")
+    task_id = data.get("task_id", "-")
+
+    if event_type == "task_phase":
+        details = f"{data.get('phase_text')} (инструкция {data.get('instruction_num') or '-'})"
+    elif event_type == "instruction_started":
+        details = (
+            f"старт {data.get('instruction_num')}/{data.get('total_instructions')}: "
+            f"{data.get('instruction_name')}"
+        )
+    elif event_type == "instruction_finished":
+        status = "OK" if data.get("success") else "FAIL"
+        details = (
+            f"[{status}] {data.get('instruction_name')} за {data.get('duration', 0):.1f}s"
+        )
+    elif event_type == "wait_progress":
+        details = f"ожидание {data.get('file')}: {data.get('elapsed')}s/{data.get('timeout')}s"
+    elif event_type == "llm_decision":
+        details = f"{data.get('action')} - {data.get('reason', '')[:80]}"
+    else:
+        details = json.dumps(data, ensure_ascii=False)[:120]
+
+    return f"[{event_type}] {task_id}: {details}"
+
+
+def follow_events(port=3456):
+    """Следить за событиями сервера через поток /events (Server-Sent Events)"""
+    url = f"http://127.0.0.1:{port}/events"
+    print(f"Подключение к {url} (Ctrl+C для выхода)")
+    try:
+        with urllib.request.urlopen(url) as response:
+            data_lines = []
+            for raw_line in response:
+                line = raw_line.decode("utf-8", errors="replace").rstrip("\n").rstrip("\r")
+                if line.startswith("data:"):
+                    data_lines.append(line[5:].strip())
+                elif not line and data_lines:
+                    try:
+                        print(format_event(json.loads("\n".join(data_lines))))
+                    except json.JSONDecodeError:
+                        pass
+                    data_lines = []
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[X] Поток событий недоступен: {e}")
+
+
 def main():
     """Основная функция"""
+    if "--follow" in sys.argv:
+        follow_events()
+        return
+
     # Определяем пути
     # Checkpoint файлы теперь хранятся в каталоге codeAgent
     codeagent_dir = Path(__file__).parent.parent  # d:\Space\codeAgent
@@ -212,6 +268,7 @@ def main():
         tail_log(log_file, lines=15)
 
     print("\n[TIP] For continuous monitoring run:")
+    print("   python scripts/monitor_server.py --follow")
     print("   watch -n 5 python scripts/monitor_server.py")
     print("   or: while true; do python scripts/monitor_server.py; sleep 5; done")
 
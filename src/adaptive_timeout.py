@@ -0,0 +1,408 @@
+"""
+Адаптивные таймауты инструкций
+
+Шаблоны инструкций задают фиксированный timeout, поэтому зависший агент
+тратит весь бюджет, а медленный, но рабочий прогон обрывается. Здесь:
+
+- TimeoutModel хранит в checkpoint распределение времени выполнения по ключу
+  (instruction_id, task_type, backend, model) и выдает дедлайн как
+  перцентиль истории с запасом. Пока истории мало, используется timeout шаблона.
+- Дедлайн мягкий: по его истечении процесс агента продолжает работать, пока
+  есть активность (вывод процесса или изменения файлов проекта) за последние
+  idle_grace секунд, но не дольше max_factor * дедлайн. Без активности процесс
+  завершается сразу - зависший прогон не ждет жесткого предела.
+"""
+
+import logging
+import math
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Каталоги, изменения в которых не считаются работой агента над проектом
+DEFAULT_IGNORE_DIRS = (
+    ".git",
+    "node_modules",
+    "__pycache__",
+    ".venv",
+    "venv",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+)
+MAX_SCAN_ENTRIES = 20000
+
+
+@dataclass
+class ExtensionPolicy:
+    """Продление мягкого дедлайна при активности агента"""
+
+    enabled: bool = True
+    idle_grace: float = 180.0  # Активность за последние N секунд продлевает дедлайн
+    max_factor: float = 3.0  # Жесткий предел: дедлайн * max_factor
+    check_interval: float = 15.0  # Период проверки активности после дедлайна
+
+    def hard_limit(self, deadline: float) -> float:
+        return deadline * max(1.0, self.max_factor) if self.enabled else deadline
+
+
+_extension_policy = ExtensionPolicy()
+
+
+def configure_extension_policy(config: Dict[str, Any]) -> ExtensionPolicy:
+    """
+    Настроить продление дедлайнов из секции timeouts.extension конфигурации
+
+    Args:
+        config: Секция конфигурации
+
+    Returns:
+        Установленная политика
+    """
+    global _extension_policy
+    _extension_policy = ExtensionPolicy(
+        enabled=config.get("enabled", True),
+        idle_grace=float(config.get("idle_grace", 180)),
+        max_factor=float(config.get("max_factor", 3.0)),
+        check_interval=float(config.get("check_interval", 15)),
+    )
+    return _extension_policy
+
+
+def get_extension_policy() -> ExtensionPolicy:
+    return _extension_policy
+
+
+class ActivityMonitor:
+    """Последняя активность агента: строки вывода процесса и mtime файлов проекта"""
+
+    def __init__(
+        self,
+        watch_dir: Optional[Path] = None,
+        ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS,
+        max_entries: int = MAX_SCAN_ENTRIES,
+    ):
+        """
+        Инициализация
+
+        Args:
+            watch_dir: Директория проекта (None - только вывод процесса)
+            ignore_dirs: Имена каталогов, которые не сканируются
+            max_entries: Предел просматриваемых записей за одну проверку
+        """
+        self.watch_dir = Path(watch_dir) if watch_dir else None
+        self.ignore_dirs = frozenset(ignore_dirs)
+        self.max_entries = max_entries
+        # Создание монитора не активность: до первой строки вывода - только mtime файлов
+        self._last_output = -math.inf
+
+    def mark_output(self) -> None:
+        """Отметить вывод процесса (вызывается из потоков чтения pipe)"""
+        self._last_output = time.monotonic()
+
+    def _latest_mtime(self) -> float:
+        if self.watch_dir is None:
+            return 0.0
+        latest = 0.0
+        seen = 0
+        stack = [self.watch_dir]
+        while stack and seen < self.max_entries:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        seen += 1
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.ignore_dirs:
+                                stack.append(Path(entry.path))
+                        elif entry.is_file(follow_symlinks=False):
+                            latest = max(latest, entry.stat(follow_symlinks=False).st_mtime)
+            except OSError:
+                continue
+        return latest
+
+    def idle_seconds(self) -> float:
+        """Секунды с последней активности (вывод или изменение файла)"""
+        output_idle = time.monotonic() - self._last_output
+        latest_mtime = self._latest_mtime()
+        file_idle = time.time() - latest_mtime if latest_mtime else math.inf
+        return max(0.0, min(output_idle, file_idle))
+
+
+class ProgressDeadline:
+    """Мягкий дедлайн для циклов ожидания (процесс агента, файл результата)"""
+
+    def __init__(
+        self,
+        deadline: float,
+        monitor: Optional[ActivityMonitor] = None,
+        policy: Optional[ExtensionPolicy] = None,
+    ):
+        """
+        Инициализация
+
+        Args:
+            deadline: Мягкий дедлайн (секунды от создания)
+            monitor: Источник активности (None - дедлайн жесткий)
+            policy: Политика продления (по умолчанию из конфигурации)
+        """
+        self.deadline = deadline
+        self.monitor = monitor
+        self.policy = policy or get_extension_policy()
+        self.hard_limit = self.policy.hard_limit(deadline) if monitor is not None else deadline
+        self.extended = False
+        self._started = time.monotonic()
+        self._idle = 0.0
+        self._last_check: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def expired(self) -> bool:
+        """Истек ли дедлайн с учетом продления по активности"""
+        elapsed = self.elapsed
+        if elapsed < self.deadline:
+            return False
+        if self.monitor is None or elapsed >= self.hard_limit:
+            return True
+        now = time.monotonic()
+        if self._last_check is None or now - self._last_check >= self.policy.check_interval:
+            self._idle = self.monitor.idle_seconds()
+            self._last_check = now
+            if self._idle < self.policy.idle_grace and not self.extended:
+                self.extended = True
+                logger.info(
+                    f"Дедлайн {self.deadline:.0f}с истек, но агент активен "
+                    f"({self._idle:.0f}с назад) - продлеваем до {self.hard_limit:.0f}с"
+                )
+        return self._idle >= self.policy.idle_grace
+
+    def poll_interval(self) -> float:
+        """Сколько ждать до следующей проверки expired()"""
+        elapsed = self.elapsed
+        if elapsed < self.deadline:
+            return self.deadline - elapsed
+        return max(0.01, min(self.policy.check_interval, self.hard_limit - elapsed))
+
+
+def wait_with_progress(
+    process: subprocess.Popen,
+    deadline: float,
+    monitor: Optional[ActivityMonitor] = None,
+    policy: Optional[ExtensionPolicy] = None,
+) -> int:
+    """
+    Дождаться процесса с мягким дедлайном
+
+    Args:
+        process: Запущенный процесс
+        deadline: Мягкий дедлайн (секунды)
+        monitor: Источник активности (None - продление отключено)
+        policy: Политика продления (по умолчанию из конфигурации)
+
+    Returns:
+        Код возврата процесса
+
+    Raises:
+        subprocess.TimeoutExpired: Дедлайн истек без активности или достигнут жесткий предел
+            (процесс не завершается - это делает вызывающий код)
+    """
+    progress = ProgressDeadline(deadline, monitor, policy)
+    while not progress.expired():
+        try:
+            return process.wait(timeout=progress.poll_interval())
+        except subprocess.TimeoutExpired:
+            continue
+    if progress.extended:
+        logger.warning(f"Продленный дедлайн истек: {progress.elapsed:.0f}с без активности агента")
+    raise subprocess.TimeoutExpired(process.args, progress.elapsed)
+
+
+def run_with_progress(
+    cmd: List[str],
+    deadline: float,
+    watch_dir: Optional[Path] = None,
+    policy: Optional[ExtensionPolicy] = None,
+    input: Optional[str] = None,
+    **popen_kwargs: Any,
+) -> subprocess.CompletedProcess:
+    """
+    Аналог subprocess.run(capture_output=True, text=True) с мягким дедлайном
+
+    Вывод читается потоками, каждая строка считается активностью агента.
+
+    Args:
+        cmd: Команда
+        deadline: Мягкий дедлайн (секунды)
+        watch_dir: Директория проекта для отслеживания изменений файлов
+        policy: Политика продления (по умолчанию из конфигурации)
+        input: Данные для stdin
+        **popen_kwargs: Аргументы Popen (cwd, env, encoding, errors)
+
+    Returns:
+        CompletedProcess с накопленным stdout/stderr
+
+    Raises:
+        subprocess.TimeoutExpired: Процесс завершен по дедлайну (output/stderr - накопленный вывод)
+    """
+    monitor = ActivityMonitor(watch_dir)
+    popen_kwargs.setdefault("encoding", "utf-8")
+    popen_kwargs.setdefault("errors", "replace")
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        **popen_kwargs,
+    )
+    stdout: List[str] = []
+    stderr: List[str] = []
+
+    def drain(pipe, lines: List[str]) -> None:
+        for line in iter(pipe.readline, ""):
+            lines.append(line)
+            monitor.mark_output()
+        pipe.close()
+
+    readers = [
+        threading.Thread(target=drain, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=drain, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    if input is not None:
+        try:
+            process.stdin.write(input)
+            process.stdin.close()
+        except OSError:
+            pass
+
+    try:
+        return_code = wait_with_progress(process, deadline, monitor, policy)
+    except subprocess.TimeoutExpired as e:
+        process.kill()
+        process.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+        raise subprocess.TimeoutExpired(
+            cmd, e.timeout, output="".join(stdout), stderr="".join(stderr)
+        ) from None
+    for reader in readers:
+        reader.join()
+    return subprocess.CompletedProcess(cmd, return_code, "".join(stdout), "".join(stderr))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль с линейной интерполяцией (q от 0 до 1)"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class TimeoutModel:
+    """
+    Дедлайны инструкций по истории времени выполнения
+
+    История хранится в checkpoint (секция instruction_timings): последние window
+    длительностей по ключу. Прогоны, завершенные по таймауту, записываются своей
+    длительностью (нижняя граница реального времени), поэтому серия таймаутов
+    поднимает дедлайн, а не закрепляет его.
+    """
+
+    def __init__(
+        self,
+        checkpoint_manager,
+        enabled: bool = True,
+        percentile: float = 0.95,
+        margin: float = 1.3,
+        min_samples: int = 5,
+        min_timeout: int = 120,
+        max_timeout: int = 3600,
+        window: int = 50,
+    ):
+        """
+        Инициализация
+
+        Args:
+            checkpoint_manager: CheckpointManager для хранения истории
+            enabled: Использовать историю (False - всегда timeout шаблона)
+            percentile: Перцентиль истории (0.95 - p95)
+            margin: Множитель запаса к перцентилю
+            min_samples: Минимум наблюдений для адаптивного дедлайна
+            min_timeout: Нижняя граница дедлайна (секунды)
+            max_timeout: Верхняя граница дедлайна (секунды)
+            window: Сколько последних наблюдений хранить по ключу
+        """
+        self.checkpoint_manager = checkpoint_manager
+        self.enabled = enabled
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.window = window
+
+    @classmethod
+    def from_config(cls, checkpoint_manager, config: Dict[str, Any]) -> "TimeoutModel":
+        """Создать модель из секции timeouts конфигурации"""
+        return cls(
+            checkpoint_manager,
+            enabled=config.get("adaptive", True),
+            percentile=float(config.get("percentile", 0.95)),
+            margin=float(config.get("margin", 1.3)),
+            min_samples=int(config.get("min_samples", 5)),
+            min_timeout=int(config.get("min_seconds", 120)),
+            max_timeout=int(config.get("max_seconds", 3600)),
+            window=int(config.get("window", 50)),
+        )
+
+    @staticmethod
+    def key(instruction_id: Any, task_type: str, backend: str, model: Optional[str]) -> str:
+        return f"{instruction_id}|{task_type or 'default'}|{backend}|{model or 'default'}"
+
+    def deadline(self, key: str, configured: int) -> int:
+        """
+        Дедлайн инструкции
+
+        Args:
+            key: Ключ (TimeoutModel.key)
+            configured: Таймаут из шаблона инструкции
+
+        Returns:
+            Дедлайн в секундах
+        """
+        if not self.enabled:
+            return configured
+        durations = self.checkpoint_manager.get_instruction_timings(key)["durations"]
+        if len(durations) < self.min_samples:
+            return configured
+        value = percentile(durations, self.percentile) * self.margin
+        deadline = int(min(max(value, self.min_timeout), self.max_timeout))
+        if deadline != configured:
+            logger.debug(
+                f"Адаптивный дедлайн {key}: {deadline}с (шаблон {configured}с, "
+                f"p{self.percentile * 100:.0f} по {len(durations)} прогонам)"
+            )
+        return deadline
+
+    def record(self, key: str, seconds: float, timed_out: bool = False) -> None:
+        """
+        Записать длительность завершенной инструкции
+
+        Args:
+            key: Ключ (TimeoutModel.key)
+            seconds: Время от запуска агента до получения результата
+            timed_out: Прогон завершен по дедлайну
+        """
+        self.checkpoint_manager.record_instruction_timing(
+            key, round(seconds, 1), timed_out=timed_out, window=self.window
+        )
@@ -1,5 +1,12 @@
 """Агенты CrewAI для Code Agent"""
 
-from .executor_agent import create_executor_agent
-
 __all__ = ['create_executor_agent']
+
+
+def __getattr__(name):
+    # executor_agent импортирует crewai - загружаем его только при обращении,
+    # чтобы импорт подпакетов (например, gemini_agent) не тянул CrewAI
+    if name == 'create_executor_agent':
+        from .executor_agent import create_executor_agent
+        return create_executor_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
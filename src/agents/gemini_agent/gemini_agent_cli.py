@@ -2,14 +2,19 @@
 
 import argparse
 import concurrent.futures
+import contextlib
 import datetime
+import json
 import logging
 import os
 import pickle
+import secrets
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Union
+from typing import List, Optional, Union
 
 from dotenv import load_dotenv
 from google import genai
@@ -33,8 +38,90 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
+class AgentTrace:
+    """
+    Продолжение трассы сервера внутри агента.
+
+    Сервер передает контекст через TRACEPARENT (W3C Trace Context). Если задан
+    CODEAGENT_TRACE_FILE, спаны агента дописываются в тот же JSONL файл (OTLP/JSON),
+    иначе в вывод печатается только trace_id для корреляции с логами сервера.
+    Модуль копируется в контейнер отдельно, поэтому не зависит от src.tracing.
+    """
+
+    def __init__(self):
+        self.trace_id = None
+        self.root_span_id = None
+        parts = os.getenv("TRACEPARENT", "").strip().split("-")
+        if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+            self.trace_id = parts[1]
+            self.root_span_id = parts[2]
+        self.trace_file = os.getenv("CODEAGENT_TRACE_FILE")
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.trace_id and self.trace_file)
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent_span_id: str = None, **attributes):
+        """Записать спан для блока кода; возвращает span_id для дочерних спанов"""
+        span_id = secrets.token_hex(8)
+        start_ns = time.time_ns()
+        status = {"code": 1}
+        try:
+            yield span_id
+        except BaseException as e:
+            status = {"code": 2, "message": f"{type(e).__name__}: {e}"[:500]}
+            raise
+        finally:
+            if self.enabled:
+                self._write(name, span_id, parent_span_id or self.root_span_id, start_ns, status, attributes)
+
+    def _write(self, name, span_id, parent_span_id, start_ns, status, attributes):
+        record = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": "gemini-agent"}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "gemini_agent_cli"},
+                            "spans": [
+                                {
+                                    "traceId": self.trace_id,
+                                    "spanId": span_id,
+                                    "parentSpanId": parent_span_id,
+                                    "name": name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(start_ns),
+                                    "endTimeUnixNano": str(time.time_ns()),
+                                    "attributes": [
+                                        {"key": key, "value": {"stringValue": str(value)}}
+                                        for key, value in attributes.items()
+                                    ],
+                                    "status": status,
+                                }
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+        try:
+            with self._lock:
+                with open(self.trace_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.debug(f"Failed to write trace span {name}: {e}")
+
+
 class GeminiDeveloperAgent:
     def __init__(self, api_key: str, project_path: Path, model_name: str = "gemini-2.5-flash"):
+        self.trace = AgentTrace()
+        self._trace_span_id = None
         self.project_path = project_path.resolve()
         self.api_key = api_key
         self.model_name = os.getenv("GEMINI_MODEL_NAME", model_name)
@@ -373,6 +460,11 @@ class GeminiDeveloperAgent:
                                     type=types.Type.STRING,
                                     description="Optional path to specific test file or directory",
                                 ),
+                                "tests": types.Schema(
+                                    type=types.Type.ARRAY,
+                                    items=types.Schema(type=types.Type.STRING),
+                                    description="Optional pytest node IDs to run (e.g. the affected tests listed in the instruction: 'tests/test_a.py::test_x')",
+                                ),
                                 "only_failures": types.Schema(
                                     type=types.Type.BOOLEAN,
                                     description="If true, only runs and reports tests that failed in the last run.",
@@ -1052,8 +1144,10 @@ You must operate in a loop: THOUGHT -> ACTION (Tool Call) -> OBSERVATION (Tool R
         except Exception as e:
             return f"Error checking diff: {e}"
 
-    def run_tests(self, path: str = None, only_failures: bool = False) -> str:
-        """Runs project tests using pytest."""
+    def run_tests(
+        self, path: str = None, only_failures: bool = False, tests: Optional[List[str]] = None
+    ) -> str:
+        """Runs project tests using pytest (optionally only the given node IDs)."""
         try:
             command = ["pytest"]
             if only_failures:
@@ -1064,6 +1158,10 @@ You must operate in a loop: THOUGHT -> ACTION (Tool Call) -> OBSERVATION (Tool R
                 target_path = self._validate_path(path)
                 command.append(str(target_path))
 
+            for node_id in tests or []:
+                test_file, separator, name = node_id.partition("::")
+                command.append(f"{self._validate_path(test_file)}{separator}{name}")
+
             logger.info(f"🧪 Running tests: {' '.join(command)}")
             result = subprocess.run(
                 command,
@@ -1619,6 +1717,26 @@ You must operate in a loop: THOUGHT -> ACTION (Tool Call) -> OBSERVATION (Tool R
 
     def execute(
         self, instruction: str, output_file_path: Path, control_phrase: str, session_id: str = None
+    ):
+        """
+        Executes the instruction inside a trace span continuing the server's trace.
+        """
+        self.trace = AgentTrace()
+        if self.trace.trace_id:
+            print(f"🔗 Trace ID: {self.trace.trace_id}")
+        with self.trace.span(
+            "gemini.agent.execute", model=self.model_name, session_id=session_id or ""
+        ) as span_id:
+            self._trace_span_id = span_id
+            self._execute(instruction, output_file_path, control_phrase, session_id)
+
+    def _traced_function_call(self, func_name: str, args: dict) -> dict:
+        """Executes a tool call inside its own trace span."""
+        with self.trace.span(f"tool.{func_name}", self._trace_span_id):
+            return self._execute_function_call(func_name, args)
+
+    def _execute(
+        self, instruction: str, output_file_path: Path, control_phrase: str, session_id: str = None
     ):
         """
         Executes the instruction using the chat loop and tools.
@@ -1698,9 +1816,15 @@ You must operate in a loop: THOUGHT -> ACTION (Tool Call) -> OBSERVATION (Tool R
                         logger.debug(f"Applied delay between requests: {base_delay:.2f}s")
                         time.sleep(base_delay)
 
-                        response = self.client.models.generate_content(
-                            model=self.model_name, contents=history, config=config
-                        )
+                        with self.trace.span(
+                            "gemini.generate_content",
+                            self._trace_span_id,
+                            step=step,
+                            attempt=attempt + 1,
+                        ):
+                            response = self.client.models.generate_content(
+                                model=self.model_name, contents=history, config=config
+                            )
                         break
                     except Exception as e:
                         last_error = e
@@ -1786,7 +1910,7 @@ You must operate in a loop: THOUGHT -> ACTION (Tool Call) -> OBSERVATION (Tool R
                     ) as executor:
                         # Запускаем задачи
                         future_to_fc = {
-                            executor.submit(self._execute_function_call, fc.name, fc.args): fc
+                            executor.submit(self._traced_function_call, fc.name, fc.args): fc
                             for fc in function_calls
                         }
 
@@ -7,6 +7,8 @@
 
 import logging
 import os
+import re
+import shlex
 import subprocess
 import sys
 from dataclasses import dataclass
@@ -15,8 +17,31 @@ from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 
+from ...adaptive_timeout import ActivityMonitor, wait_with_progress
+from ...circuit_breaker import get_circuit_breakers
+from ...tracing import (
+    TRACE_FILE_ENV,
+    TRACEPARENT_ENV,
+    collect_trace_spool,
+    container_trace_spool,
+    inject_env,
+)
+
 logger = logging.getLogger(__name__)
 
+GEMINI_BREAKER = "gemini:cli"  # Выключатель Gemini CLI (см. src/circuit_breaker.py)
+
+
+def _run_pattern(output_file: str) -> str:
+    """
+    Шаблон pkill -f для процесса одного запуска агента
+
+    Запуски различаются файлом результата: на таймауте останавливается только
+    свой процесс, а не процессы других инструкций в том же контейнере.
+    """
+    escaped = re.sub(r"([.^$*+?()\[\]{}|\\])", r"\\\1", output_file)
+    return f"gemini_agent_cli.* {escaped} "
+
 
 @dataclass
 class GeminiCLIResult:
@@ -347,9 +372,12 @@ class GeminiCLIInterface:
         logger.debug(f"Все ожидаемые файлы найдены: {len(expected_files)}")
         return True
 
-    def stop_active_chats(self) -> bool:
+    def stop_active_chats(self, pattern: str = "gemini_agent_cli") -> bool:
         """
-        Остановить все активные процессы gemini_agent_cli
+        Остановить активные процессы gemini_agent_cli
+
+        Args:
+            pattern: Шаблон командной строки для pkill -f (по умолчанию - все процессы)
 
         Returns:
             True если остановка выполнена успешно
@@ -367,7 +395,7 @@ class GeminiCLIInterface:
                     self.container_name,
                     "bash",
                     "-c",
-                    "pkill -f 'gemini_agent_cli' || true",
+                    f"pkill -f {shlex.quote(pattern)} || true",
                 ]
                 subprocess.run(kill_cmd, capture_output=True, text=True, timeout=15)
                 return True
@@ -387,7 +415,7 @@ class GeminiCLIInterface:
                     # Проще пропустить для локального режима или использовать psutil если он есть
                     pass
                 else:
-                    kill_cmd = ["pkill", "-f", "gemini_agent_cli"]
+                    kill_cmd = ["pkill", "-f", pattern]
                     subprocess.run(kill_cmd, capture_output=True, text=True, timeout=5)
                 return True
         except Exception as e:
@@ -423,10 +451,61 @@ class GeminiCLIInterface:
     ) -> Dict[str, Any]:
         """
         Выполнить инструкцию через Gemini CLI
+
+        Пока выключатель Gemini разомкнут (серия таймаутов или ошибок CLI),
+        инструкция сразу завершается ошибкой без запуска процесса.
         """
         if not self.cli_available:
             return {"task_id": task_id, "success": False, "error_message": "Gemini CLI недоступен"}
 
+        breakers = get_circuit_breakers()
+        if not breakers.allow(GEMINI_BREAKER):
+            retry_after = breakers.get(GEMINI_BREAKER).retry_after()
+            return {
+                "task_id": task_id,
+                "success": False,
+                "return_code": -1,
+                "cli_available": True,
+                "error_message": (
+                    f"Gemini CLI отключен (circuit open), проба через {retry_after:.0f}с"
+                ),
+            }
+
+        try:
+            result = self._run_instruction(
+                instruction,
+                task_id,
+                working_dir=working_dir,
+                timeout=timeout,
+                wait_for_file=wait_for_file,
+                control_phrase=control_phrase,
+                session_id=session_id,
+                expected_files=expected_files,
+            )
+        except BaseException:
+            # Результата нет - разрешение (пробный вызов) не должно зависнуть
+            breakers.release(GEMINI_BREAKER)
+            raise
+        # Неподтвержденные side-effects - ошибка задачи, а не бэкенда
+        breakers.record(
+            GEMINI_BREAKER,
+            success=result.get("return_code") == 0,
+            reason=str(result.get("error_message") or "")[:100],
+        )
+        return result
+
+    def _run_instruction(
+        self,
+        instruction: str,
+        task_id: str,
+        working_dir: Optional[str] = None,
+        timeout: Optional[int] = None,
+        wait_for_file: Optional[str] = None,
+        control_phrase: Optional[str] = None,
+        session_id: Optional[str] = None,
+        expected_files: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Запуск gemini_agent_cli.py (локально или в Docker) и сбор результата"""
         exec_timeout = timeout if timeout is not None else self.timeout
 
         # Используем переданный session_id или текущий в интерфейсе
@@ -438,13 +517,31 @@ class GeminiCLIInterface:
         # Если control_phrase передана, используем ее, иначе дефолтную
         # ВАЖНО: Если control_phrase не передана, используем "Задача выполнена успешно!" как дефолт
         target_control_phrase = control_phrase if control_phrase else "Задача выполнена успешно!"
+        trace_spool = None
 
         if self.use_docker:
             # --- Логика для Docker ---
             compose_file = (
                 Path(__file__).parent.parent.parent.parent / "docker" / "docker-compose.gemini.yml"
             )
+            container_breaker = f"docker:{self.container_name}"
+            breakers = get_circuit_breakers()
+            if not breakers.allow(container_breaker):
+                retry_after = breakers.get(container_breaker).retry_after()
+                return {
+                    "task_id": task_id,
+                    "success": False,
+                    "error_message": (
+                        f"Docker контейнер {self.container_name} недоступен (circuit open), "
+                        f"проба через {retry_after:.0f}с"
+                    ),
+                }
             container_status = self._ensure_docker_container_running(compose_file)
+            breakers.record(
+                container_breaker,
+                success=bool(container_status.get("running")),
+                reason=str(container_status.get("error"))[:100],
+            )
             if not container_status.get("running"):
                 return {
                     "task_id": task_id,
@@ -452,8 +549,6 @@ class GeminiCLIInterface:
                     "error_message": f"Не удалось запустить Docker контейнер: {container_status.get('error')}",
                 }
 
-            import shlex
-
             api_key = os.getenv("GOOGLE_API_KEY")
 
             # Путь к скрипту внутри контейнера
@@ -480,6 +575,16 @@ class GeminiCLIInterface:
             if api_key:
                 cmd.extend(["-e", f"GOOGLE_API_KEY={api_key}"])
 
+            # Контекст трассировки: агент в контейнере продолжает трассу задачи
+            traceparent = inject_env().get(TRACEPARENT_ENV)
+            if traceparent:
+                cmd.extend(["-e", f"{TRACEPARENT_ENV}={traceparent}"])
+                # Файл трассы сервера контейнеру недоступен - спаны пишутся в проект
+                trace_spool = container_trace_spool(self.project_dir)
+                if trace_spool is not None:
+                    spool_in_container = trace_spool.relative_to(self.project_dir).as_posix()
+                    cmd.extend(["-e", f"{TRACE_FILE_ENV}=/workspace/{spool_in_container}"])
+
             cmd.extend([self.container_name, "bash", "-c", inner_cmd])
 
             logger.info(f"Выполнение команды через Gemini CLI (Docker): {' '.join(cmd)}")
@@ -518,6 +623,7 @@ class GeminiCLIInterface:
             process = subprocess.Popen(
                 cmd,
                 cwd=project_path if not self.use_docker and Path(project_path).exists() else None,
+                env=inject_env(dict(os.environ)),
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
@@ -528,11 +634,14 @@ class GeminiCLIInterface:
 
             stdout_lines = []
             stderr_lines = []
+            # Вывод агента и изменения файлов проекта продлевают мягкий дедлайн
+            activity = ActivityMonitor(self.project_dir)
 
             def read_pipe(pipe, lines_list, is_stderr=False):
                 for line in iter(pipe.readline, ""):
                     if line:
                         lines_list.append(line)
+                        activity.mark_output()
                         try:
                             if is_stderr:
                                 sys.stderr.write(line)
@@ -565,7 +674,7 @@ class GeminiCLIInterface:
 
             # Ждем завершения процесса с таймаутом
             try:
-                return_code = process.wait(timeout=exec_timeout)
+                return_code = wait_with_progress(process, exec_timeout, activity)
             except subprocess.TimeoutExpired:
                 process.kill()
                 # Читаем то, что успело прийти
@@ -620,8 +729,9 @@ class GeminiCLIInterface:
         except subprocess.TimeoutExpired:
             logger.error(f"Таймаут выполнения команды Gemini CLI ({exec_timeout} сек)")
             if self.use_docker:
-                logger.warning("Попытка остановить зависшие процессы в Docker контейнере...")
-                self.stop_active_chats()
+                # process.kill() останавливает только docker exec, а не процесс в контейнере
+                logger.warning("Попытка остановить зависший процесс в Docker контейнере...")
+                self.stop_active_chats(_run_pattern(output_file))
             return {
                 "task_id": task_id,
                 "success": False,
@@ -630,6 +740,7 @@ class GeminiCLIInterface:
                 "return_code": -1,
                 "cli_available": True,
                 "error_message": f"Таймаут выполнения ({exec_timeout} секунд)",
+                "timed_out": True,
             }
 
         except Exception as e:
@@ -643,6 +754,8 @@ class GeminiCLIInterface:
                 "cli_available": True,
                 "error_message": f"Исключение: {str(e)}",
             }
+        finally:
+            collect_trace_spool(trace_spool)
 
 
 def create_gemini_cli_interface(
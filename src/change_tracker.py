@@ -0,0 +1,244 @@
+"""
+Отслеживание изменений рабочего дерева по инструкциям
+
+Раньше проверка реальной работы искала в отчете слова вроде "создан файл" и
+смотрела на любой вывод git status, включая изменения других задач. Трекер
+снимает состояние рабочего дерева до и после инструкции и считает точный diff:
+какие файлы затронуты и сколько строк добавлено и удалено.
+
+Снимок - это хеш дерева (git write-tree) всего рабочего дерева, включая
+неотслеживаемые, но не игнорируемые файлы. Он строится через отдельный индекс
+трекера в директории .git (GIT_INDEX_FILE), поэтому индекс пользователя и
+агента не меняется. Индекс трекера сохраняется между снимками, и благодаря кешу
+stat-информации git add -A перечитывает только файлы, изменившиеся с прошлого
+снимка. Сравнение двух деревьев (git diff-tree) не читает рабочие файлы, поэтому
+стоимость снимка и diff пропорциональна количеству измененных файлов.
+"""
+
+import logging
+import os
+import shutil
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .git_utils import GitRepo, execute_git_command
+
+logger = logging.getLogger(__name__)
+
+TRACKER_INDEX = "codeagent-tracker.index"
+
+STATUS_NAMES = {"A": "создан", "D": "удален", "M": "изменен", "T": "изменен тип"}
+
+
+@dataclass
+class FileChange:
+    """Изменение одного файла"""
+
+    path: str
+    status: str  # Буква статуса git: A, D, M, T
+    added: Optional[int] = None  # None для бинарных файлов
+    removed: Optional[int] = None
+
+
+@dataclass
+class ChangeSummary:
+    """Изменения рабочего дерева между двумя снимками"""
+
+    before: str
+    after: str
+    files: List[FileChange] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.files)
+
+    @property
+    def lines_added(self) -> int:
+        return sum(change.added or 0 for change in self.files)
+
+    @property
+    def lines_removed(self) -> int:
+        return sum(change.removed or 0 for change in self.files)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь для checkpoint"""
+        return {
+            "before": self.before,
+            "after": self.after,
+            "files_changed": len(self.files),
+            "lines_added": self.lines_added,
+            "lines_removed": self.lines_removed,
+            "files": [asdict(change) for change in self.files],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChangeSummary":
+        """Восстановить изменения из словаря checkpoint"""
+        return cls(
+            before=data.get("before", ""),
+            after=data.get("after", ""),
+            files=[FileChange(**change) for change in data.get("files", [])],
+        )
+
+    def format(self, max_files: int = 30) -> str:
+        """
+        Компактное текстовое описание изменений (для промптов и логов)
+
+        Args:
+            max_files: Максимальное количество перечисляемых файлов
+
+        Returns:
+            Текст вида "Файлов: 2, строк: +10/-3" со списком файлов
+        """
+        if not self.files:
+            return "Изменений в рабочем дереве нет"
+        lines = [f"Файлов: {len(self.files)}, строк: +{self.lines_added}/-{self.lines_removed}"]
+        for change in self.files[:max_files]:
+            status = STATUS_NAMES.get(change.status, change.status)
+            if change.added is None:
+                lines.append(f"  {change.path} ({status}, бинарный)")
+            else:
+                lines.append(f"  {change.path} ({status}, +{change.added}/-{change.removed})")
+        if len(self.files) > max_files:
+            lines.append(f"  ... и еще {len(self.files) - max_files}")
+        return "\n".join(lines)
+
+
+def parse_diff_tree(output: str) -> List[FileChange]:
+    """
+    Разобрать вывод git diff-tree -r -z --raw --numstat
+
+    Args:
+        output: Вывод команды (записи разделены нулевым байтом)
+
+    Returns:
+        Изменения файлов в порядке вывода git
+    """
+    changes: Dict[str, FileChange] = {}
+    tokens = output.split("\0")
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.startswith(":") and index + 1 < len(tokens):
+            path = tokens[index + 1]
+            changes[path] = FileChange(path=path, status=token.split()[-1][:1])
+            index += 2
+            continue
+        parts = token.split("\t", 2)
+        if len(parts) == 3 and parts[2] in changes:
+            change = changes[parts[2]]
+            if parts[0] != "-":
+                change.added, change.removed = int(parts[0]), int(parts[1])
+        index += 1
+    return list(changes.values())
+
+
+class ChangeTracker:
+    """Снимки рабочего дерева и diff между ними"""
+
+    def __init__(self, project_dir: Path, ignore: Iterable[str] = ()):
+        """
+        Инициализация
+
+        Args:
+            project_dir: Директория проекта (рабочее дерево git)
+            ignore: Префиксы путей, которые не считаются работой (отчеты, статусы)
+        """
+        self.project_dir = Path(project_dir)
+        self.ignore = tuple(prefix.replace("\\", "/") for prefix in ignore if prefix)
+        self._lock = threading.Lock()
+
+    def _index_path(self) -> Optional[Path]:
+        git_dir = GitRepo.for_path(self.project_dir).git_dir
+        return git_dir / TRACKER_INDEX if git_dir is not None else None
+
+    def _write_tree(self, index: Path) -> Optional[str]:
+        env = dict(os.environ, GIT_INDEX_FILE=str(index))
+        success, _, stderr = execute_git_command(
+            ["git", "add", "-A"], self.project_dir, timeout=120, env=env
+        )
+        if not success:
+            logger.debug(f"Не удалось обновить индекс трекера изменений: {stderr}")
+            return None
+        success, stdout, stderr = execute_git_command(
+            ["git", "write-tree"], self.project_dir, env=env
+        )
+        if not success or not stdout:
+            logger.debug(f"Не удалось записать дерево трекера изменений: {stderr}")
+            return None
+        return stdout
+
+    def snapshot(self) -> Optional[str]:
+        """
+        Снять состояние рабочего дерева
+
+        Returns:
+            Хеш дерева или None (проект не в git, ошибка git)
+        """
+        index = self._index_path()
+        if index is None:
+            return None
+        with self._lock:
+            if not index.exists():
+                # Первый снимок: стартуем с индекса репозитория, чтобы не хешировать все файлы
+                real_index = index.parent / "index"
+                if real_index.exists():
+                    try:
+                        shutil.copy2(real_index, index)
+                    except OSError as e:
+                        logger.debug(f"Не удалось скопировать индекс репозитория: {e}")
+            tree = self._write_tree(index)
+            if tree is None and index.exists():
+                # Индекс трекера мог быть поврежден (например, при аварийном завершении)
+                index.unlink()
+                tree = self._write_tree(index)
+            return tree
+
+    def diff(self, before: Optional[str], after: Optional[str]) -> Optional[ChangeSummary]:
+        """
+        Изменения между двумя снимками
+
+        Args:
+            before: Снимок до инструкции
+            after: Снимок после инструкции
+
+        Returns:
+            Изменения или None если один из снимков отсутствует
+        """
+        if not before or not after:
+            return None
+        summary = ChangeSummary(before=before, after=after)
+        if before == after:
+            return summary
+        success, stdout, stderr = execute_git_command(
+            ["git", "diff-tree", "-r", "-z", "--no-renames", "--raw", "--numstat", before, after],
+            self.project_dir,
+        )
+        if not success:
+            logger.warning(f"Не удалось получить diff трекера изменений: {stderr}")
+            return None
+        summary.files = [
+            change
+            for change in parse_diff_tree(stdout)
+            if not any(change.path.startswith(prefix) for prefix in self.ignore)
+        ]
+        return summary
+
+    def since_head(self, snapshot: Optional[str] = None) -> Optional[ChangeSummary]:
+        """
+        Незакоммиченные изменения рабочего дерева (относительно HEAD)
+
+        Задача коммитит свою работу в конце, поэтому это изменения текущей
+        задачи (и, возможно, чужие незакоммиченные правки).
+
+        Args:
+            snapshot: Актуальный снимок рабочего дерева (None - снять новый)
+
+        Returns:
+            Изменения или None (нет коммитов, проект не в git)
+        """
+        if not GitRepo.for_path(self.project_dir).object_exists("HEAD"):
+            return None
+        return self.diff("HEAD", snapshot or self.snapshot())
@@ -7,7 +7,7 @@ import logging
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +44,7 @@ class CheckpointManager:
         self.project_dir = Path(project_dir)
         self.checkpoint_file = self.project_dir / checkpoint_file
         self.backup_file = self.project_dir / f"{checkpoint_file}.backup"
+        self._change_listeners: List[Callable[[], None]] = []
 
         # Загружаем или создаем checkpoint
         self.checkpoint_data = self._load_checkpoint()
@@ -137,6 +138,28 @@ class CheckpointManager:
         except Exception as e:
             logger.error(f"Ошибка сохранения checkpoint: {e}")
 
+        self._notify_change_listeners()
+
+    def add_change_listener(self, callback: Callable[[], None]):
+        """
+        Подписаться на изменения состояния checkpoint
+
+        Обработчик вызывается синхронно в потоке, изменившем состояние,
+        сразу после сохранения.
+
+        Args:
+            callback: Функция без аргументов
+        """
+        self._change_listeners.append(callback)
+
+    def _notify_change_listeners(self):
+        """Уведомить подписчиков об изменении состояния"""
+        for callback in self._change_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Ошибка в обработчике изменений checkpoint: {e}")
+
     def mark_server_start(self, session_id: str):
         """
         Отметить запуск сервера
@@ -288,7 +311,11 @@ class CheckpointManager:
         logger.info(f"Задача завершена: {task_id}")
 
     def update_instruction_progress(
-        self, task_id: str, instruction_num: int, total_instructions: int
+        self,
+        task_id: str,
+        instruction_num: int,
+        total_instructions: int,
+        instruction_key: Optional[str] = None,
     ):
         """
         Обновить прогресс выполнения инструкций для задачи
@@ -297,6 +324,8 @@ class CheckpointManager:
             task_id: ID задачи
             instruction_num: Номер выполненной инструкции (1-based)
             total_instructions: Общее количество инструкций
+            instruction_key: Ключ узла графа инструкций (instruction_id), для
+                восстановления по выполненным узлам, а не только по последней инструкции
         """
         task = self._find_task(task_id)
         if not task:
@@ -320,6 +349,11 @@ class CheckpointManager:
             progress["completed_instructions"].append(instruction_num)
             progress["completed_instructions"].sort()
 
+        if instruction_key is not None:
+            completed_nodes = progress.setdefault("completed_nodes", [])
+            if instruction_key not in completed_nodes:
+                completed_nodes.append(instruction_key)
+
         self._save_checkpoint(create_backup=False)
         logger.debug(
             f"Прогресс инструкций обновлен для задачи {task_id}: {instruction_num}/{total_instructions}"
@@ -348,6 +382,93 @@ class CheckpointManager:
             },
         )
 
+    def record_instruction_decision(
+        self, task_id: str, instruction_key: str, decision: Dict[str, Any]
+    ):
+        """
+        Сохранить решение политики инструкций (пропуск, объединение, смена модели)
+
+        Args:
+            task_id: ID задачи
+            instruction_key: Ключ инструкции (instruction_id)
+            decision: Решение (PolicyDecision.to_dict())
+        """
+        task = self._find_task(task_id)
+        if not task:
+            logger.warning(f"Задача {task_id} не найдена в checkpoint")
+            return
+
+        task.setdefault("instruction_decisions", {})[instruction_key] = decision
+        self._save_checkpoint(create_backup=False)
+
+    def record_instruction_changes(
+        self, task_id: str, instruction_num: int, changes: Dict[str, Any]
+    ):
+        """
+        Сохранить изменения рабочего дерева, сделанные инструкцией
+
+        Args:
+            task_id: ID задачи
+            instruction_num: Номер инструкции (1-based)
+            changes: Изменения (ChangeSummary.to_dict())
+        """
+        task = self._find_task(task_id)
+        if not task:
+            logger.warning(f"Задача {task_id} не найдена в checkpoint")
+            return
+
+        task.setdefault("instruction_changes", {})[str(instruction_num)] = changes
+        self._save_checkpoint(create_backup=False)
+
+    def get_instruction_changes(self, task_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Получить изменения рабочего дерева по инструкциям задачи
+
+        Args:
+            task_id: ID задачи
+
+        Returns:
+            Словарь {номер инструкции: изменения} (пустой если изменения не отслеживались)
+        """
+        task = self._find_task(task_id)
+        if not task:
+            return {}
+        return task.get("instruction_changes", {})
+
+    def record_instruction_timing(
+        self, key: str, seconds: float, timed_out: bool = False, window: int = 50
+    ):
+        """
+        Записать длительность инструкции в историю (для адаптивных таймаутов)
+
+        Args:
+            key: Ключ instruction_id|task_type|backend|model
+            seconds: Длительность (секунды)
+            timed_out: Прогон завершен по таймауту
+            window: Сколько последних длительностей хранить
+        """
+        timings = self.checkpoint_data.setdefault("instruction_timings", {})
+        entry = timings.setdefault(key, {"durations": [], "timeouts": 0, "runs": 0})
+        entry["durations"] = (entry["durations"] + [seconds])[-window:]
+        entry["runs"] += 1
+        if timed_out:
+            entry["timeouts"] += 1
+        self._save_checkpoint(create_backup=False)
+
+    def get_instruction_timings(self, key: str) -> Dict[str, Any]:
+        """
+        Получить историю длительностей инструкции
+
+        Args:
+            key: Ключ instruction_id|task_type|backend|model
+
+        Returns:
+            Словарь durations/timeouts/runs (пустой, если истории нет)
+        """
+        return self.checkpoint_data.get("instruction_timings", {}).get(
+            key, {"durations": [], "timeouts": 0, "runs": 0}
+        )
+
     def mark_task_failed(self, task_id: str, error_message: str):
         """
         Отметить неудачное выполнение задачи
@@ -617,12 +738,18 @@ class CheckpointManager:
         """
         tasks = self.checkpoint_data.get("tasks", [])
 
+        # Один проход по задачам вместо отдельного прохода на каждое состояние
+        state_counts: Dict[Optional[str], int] = {}
+        for task in tasks:
+            state = task.get("state")
+            state_counts[state] = state_counts.get(state, 0) + 1
+
         stats = {
             "total_tasks": len(tasks),
-            "completed": len([t for t in tasks if t.get("state") == TaskState.COMPLETED.value]),
-            "failed": len([t for t in tasks if t.get("state") == TaskState.FAILED.value]),
-            "in_progress": len([t for t in tasks if t.get("state") == TaskState.IN_PROGRESS.value]),
-            "pending": len([t for t in tasks if t.get("state") == TaskState.PENDING.value]),
+            "completed": state_counts.get(TaskState.COMPLETED.value, 0),
+            "failed": state_counts.get(TaskState.FAILED.value, 0),
+            "in_progress": state_counts.get(TaskState.IN_PROGRESS.value, 0),
+            "pending": state_counts.get(TaskState.PENDING.value, 0),
             "iteration_count": self.get_iteration_count(),
             "session_id": self.checkpoint_data.get("session_id"),
         }
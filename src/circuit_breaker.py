@@ -0,0 +1,428 @@
+"""
+Автоматические выключатели (circuit breakers) для внешних бэкендов
+
+Заменяют FallbackStateManager, у которого была одна фиксированная схема
+(после billing-ошибки час или 25 обращений на резервной модели, затем
+5 минут проверки основной) и который переписывал файл состояния на каждом
+обращении.
+
+Выключатель отдельный для каждого бэкенда: модели Cursor (`cursor:<модель>`),
+модели OpenRouter/Google в LLMManager (`<провайдер>:<модель>`), Gemini CLI
+(`gemini:cli`) и Docker-контейнеры агентов (`docker:<контейнер>`).
+
+Состояния:
+- closed - вызовы разрешены, результаты попадают в скользящее окно; при доле
+  ошибок не ниже failure_rate (и хотя бы min_calls вызовах в окне) выключатель
+  размыкается;
+- open - вызовы отклоняются сразу, без обращения к бэкенду; момент пробного
+  вызова выбирается со случайным разбросом (jitter), чтобы выключатели разных
+  процессов не проверяли бэкенд одновременно; каждое повторное размыкание
+  удваивает паузу до max_open_seconds;
+- half_open - разрешены пробные вызовы (не больше half_open_calls); успех
+  замыкает выключатель, ошибка снова размыкает. Отмененный пробный вызов
+  освобождается (release), а пробный вызов без результата дольше
+  probe_timeout считается потерянным, и выключатель разрешает новую пробу.
+
+Состояние хранится в памяти; в файл записываются только смены состояний, чтобы
+разомкнутый выключатель (например, после billing-ошибки) пережил перезапуск.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .event_bus import EventType, publish_event
+from .metrics import CIRCUIT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VERSION = 1
+
+
+class CircuitOpenError(RuntimeError):
+    """Вызов отклонен разомкнутым выключателем"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} отключен (circuit open), проба через {retry_after:.0f}с")
+        self.name = name
+        self.retry_after = retry_after
+
+
+@dataclass
+class BreakerSettings:
+    """Параметры выключателя"""
+
+    window_seconds: float = 300.0
+    min_calls: int = 3
+    failure_rate: float = 0.5
+    open_seconds: float = 30.0
+    max_open_seconds: float = 1800.0
+    jitter: float = 0.2
+    half_open_calls: int = 1
+    probe_timeout: float = 1200.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base: Optional["BreakerSettings"] = None):
+        """Параметры из словаря конфигурации поверх base (неизвестные ключи игнорируются)"""
+        values = dict((base or cls()).__dict__)
+        values.update({key: value for key, value in data.items() if key in values})
+        return cls(**values)
+
+
+class CircuitBreaker:
+    """Выключатель одного бэкенда"""
+
+    def __init__(
+        self,
+        name: str,
+        settings: Optional[BreakerSettings] = None,
+        on_transition: Optional[Callable[["CircuitBreaker", str, str], None]] = None,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            name: Имя бэкенда (например, "cursor:auto")
+            settings: Параметры выключателя
+            on_transition: Вызывается при смене состояния (выключатель, было, стало)
+            rng: Генератор случайных чисел для разброса пробных вызовов
+            clock: Источник времени (для тестов)
+        """
+        self.name = name
+        self.settings = settings or BreakerSettings()
+        self.state = CLOSED
+        self.reason = ""
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self.open_count = 0  # Размыкания подряд: пауза растет экспоненциально
+        self._on_transition = on_transition
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._window: Deque[Tuple[float, bool]] = deque()
+        self._probes = 0
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str, reason: str = "") -> None:
+        previous, self.state = self.state, state
+        self.reason = reason
+        if state == CLOSED:
+            self.open_count = 0
+            self._window.clear()
+        self._probes = 0
+        if previous != state and self._on_transition:
+            self._on_transition(self, previous, state)
+
+    def _open(self, reason: str, seconds: Optional[float] = None) -> None:
+        now = self._clock()
+        self.open_count += 1
+        if seconds is None:
+            settings = self.settings
+            seconds = min(
+                settings.open_seconds * 2 ** (self.open_count - 1), settings.max_open_seconds
+            )
+            seconds *= 1 + self._rng.uniform(-settings.jitter, settings.jitter)
+        self.opened_at = now
+        self.probe_at = now + seconds
+        self._transition(OPEN, reason)
+
+    def allow(self) -> bool:
+        """
+        Можно ли обратиться к бэкенду
+
+        Разомкнутый выключатель отвечает False без обращения к бэкенду, а после
+        наступления момента пробы переходит в half_open и пропускает пробный вызов.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self._clock()
+            if self.state == OPEN:
+                if now < self.probe_at:
+                    return False
+                self._transition(HALF_OPEN, self.reason)
+            if self._probes >= self.settings.half_open_calls:
+                if not self._probe_expired(now):
+                    return False
+                logger.warning(f"Пробный вызов {self.name} не завершился - разрешаем новый")
+                self._probes = 0
+            self._probes += 1
+            self._probe_started_at = now
+            return True
+
+    def _probe_expired(self, now: float) -> bool:
+        """Пробный вызов без результата дольше probe_timeout (процесс завис или потерян)"""
+        return now - self._probe_started_at >= self.settings.probe_timeout
+
+    def available(self) -> bool:
+        """Можно ли обратиться к бэкенду (без изменения состояния, для выбора кандидатов)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self._clock()
+            if self.state == OPEN:
+                return now >= self.probe_at
+            return self._probes < self.settings.half_open_calls or self._probe_expired(now)
+
+    def retry_after(self) -> float:
+        """Секунд до пробного вызова (0 - вызовы разрешены)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.probe_at - self._clock())
+
+    def release(self) -> None:
+        """Освободить пробный вызов без результата (вызов отменен, состояние бэкенда неизвестно)"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        """Учесть успешный вызов"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                logger.info(f"✅ Бэкенд {self.name} восстановлен")
+                self._transition(CLOSED)
+                return
+            self._record(True)
+
+    def record_failure(self, reason: str = "") -> None:
+        """Учесть ошибку вызова"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open(reason or "ошибка пробного вызова")
+                self._log_open()
+                return
+            if self.state == OPEN:
+                return
+            self._record(False)
+            calls = len(self._window)
+            failures = sum(1 for _, ok in self._window if not ok)
+            settings = self.settings
+            if calls >= settings.min_calls and failures / calls >= settings.failure_rate:
+                self._open(reason or f"{failures}/{calls} ошибок")
+                self._log_open()
+
+    def trip(self, reason: str, seconds: Optional[float] = None) -> None:
+        """
+        Разомкнуть выключатель без учета окна (например, после billing-ошибки)
+
+        Args:
+            reason: Причина
+            seconds: Пауза до пробного вызова (None - по правилам экспоненциальной паузы)
+        """
+        with self._lock:
+            if self.state == OPEN:
+                return
+            self._open(reason, seconds)
+            self._log_open()
+
+    def _record(self, ok: bool) -> None:
+        now = self._clock()
+        self._window.append((now, ok))
+        horizon = now - self.settings.window_seconds
+        while self._window and self._window[0][0] < horizon:
+            self._window.popleft()
+
+    def _log_open(self) -> None:
+        logger.warning(
+            f"🔌 Бэкенд {self.name} отключен ({self.reason}), "
+            f"проба через {self.probe_at - self.opened_at:.0f}с"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "reason": self.reason,
+            "opened_at": self.opened_at,
+            "probe_at": self.probe_at,
+            "open_count": self.open_count,
+        }
+
+    def restore(self, data: Dict[str, Any]) -> None:
+        """Восстановить сохраненное состояние (half_open восстанавливается как open)"""
+        state = data.get("state", CLOSED)
+        if state not in (OPEN, HALF_OPEN):
+            return
+        self.state = OPEN
+        self.reason = data.get("reason", "")
+        self.opened_at = data.get("opened_at", 0.0)
+        self.probe_at = data.get("probe_at", 0.0)
+        self.open_count = data.get("open_count", 1)
+
+    def status(self) -> Dict[str, Any]:
+        """Состояние для /status и логов"""
+        return {**self.to_dict(), "retry_after": round(self.retry_after(), 1)}
+
+
+class CircuitBreakerRegistry:
+    """Выключатели всех бэкендов с параметрами по видам и сохранением смен состояний"""
+
+    def __init__(
+        self,
+        state_file: Optional[Path] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+        kinds: Optional[Dict[str, Dict[str, Any]]] = None,
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            state_file: JSON-файл с разомкнутыми выключателями (None - только в памяти)
+            defaults: Параметры BreakerSettings для всех выключателей
+            kinds: Параметры по виду бэкенда (префикс имени до ":", например "docker")
+            enabled: False - все вызовы разрешены, ошибки не учитываются
+        """
+        self.state_file = Path(state_file) if state_file else None
+        self.enabled = enabled
+        self.defaults = BreakerSettings.from_dict(defaults or {})
+        self.kinds = kinds or {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._saved: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base_dir: Path) -> "CircuitBreakerRegistry":
+        """
+        Создать реестр из секции circuit_breakers
+
+        Args:
+            config: Словарь enabled, state_file, defaults, kinds
+            base_dir: Директория, относительно которой задан state_file
+        """
+        state_file = Path(config.get("state_file", "data/.codeagent_circuit_breakers.json"))
+        return cls(
+            state_file=state_file if state_file.is_absolute() else base_dir / state_file,
+            defaults=config.get("defaults"),
+            kinds=config.get("kinds"),
+            enabled=config.get("enabled", True),
+        )
+
+    def _load(self) -> None:
+        if self.state_file is None or not self.state_file.exists():
+            return
+        try:
+            data = json.loads(self.state_file.read_text(encoding="utf-8"))
+            if data.get("version") == STATE_VERSION:
+                self._saved = dict(data.get("breakers", {}))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить состояние выключателей {self.state_file}: {e}")
+
+    def _save(self) -> None:
+        if self.state_file is None:
+            return
+        with self._lock:
+            # Восстановленные из файла, но еще не запрошенные выключатели тоже сохраняются
+            breakers = dict(self._saved)
+            breakers.update(
+                (name, breaker.to_dict())
+                for name, breaker in self._breakers.items()
+                if breaker.state != CLOSED
+            )
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix(".tmp")
+            tmp_file.write_text(
+                json.dumps({"version": STATE_VERSION, "breakers": breakers}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            tmp_file.replace(self.state_file)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить состояние выключателей {self.state_file}: {e}")
+
+    def _on_transition(self, breaker: CircuitBreaker, previous: str, state: str) -> None:
+        CIRCUIT_TRANSITIONS.inc(kind=breaker.name.split(":", 1)[0], state=state)
+        publish_event(
+            EventType.CIRCUIT_BREAKER,
+            breaker=breaker.name,
+            previous=previous,
+            state=state,
+            reason=breaker.reason,
+            retry_after=round(breaker.retry_after(), 1),
+        )
+        # Пробный вызов (open -> half_open) не сохраняется: после перезапуска
+        # выключатель все равно восстанавливается разомкнутым
+        if state != HALF_OPEN:
+            self._save()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Выключатель бэкенда (создается при первом обращении)"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                kind = name.split(":", 1)[0]
+                settings = BreakerSettings.from_dict(self.kinds.get(kind) or {}, self.defaults)
+                breaker = CircuitBreaker(name, settings, on_transition=self._on_transition)
+                saved = self._saved.pop(name, None)
+                if saved:
+                    breaker.restore(saved)
+                self._breakers[name] = breaker
+            return breaker
+
+    def allow(self, name: str) -> bool:
+        """Разрешен ли вызов бэкенда"""
+        return not self.enabled or self.get(name).allow()
+
+    def available(self, name: str) -> bool:
+        """Доступен ли бэкенд для выбора (без пробного вызова)"""
+        return not self.enabled or self.get(name).available()
+
+    def record(self, name: str, success: bool, reason: str = "") -> None:
+        """Учесть результат вызова бэкенда"""
+        if not self.enabled:
+            return
+        if success:
+            self.get(name).record_success()
+        else:
+            self.get(name).record_failure(reason)
+
+    def release(self, name: str) -> None:
+        """Освободить разрешенный вызов, результат которого не получен (отмена)"""
+        if self.enabled:
+            self.get(name).release()
+
+    def trip(self, name: str, reason: str, seconds: Optional[float] = None) -> None:
+        """Разомкнуть выключатель бэкенда"""
+        if self.enabled:
+            self.get(name).trip(reason, seconds)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние всех выключателей"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.status() for breaker in breakers}
+
+
+_registry = CircuitBreakerRegistry()
+
+
+def configure_circuit_breakers(
+    config: Optional[Dict[str, Any]], base_dir: Path
+) -> CircuitBreakerRegistry:
+    """
+    Настроить глобальный реестр выключателей по секции circuit_breakers
+
+    Args:
+        config: Секция конфигурации (enabled, state_file, defaults, kinds)
+        base_dir: Базовая директория для относительного пути state_file
+
+    Returns:
+        Реестр выключателей
+    """
+    global _registry
+    _registry = CircuitBreakerRegistry.from_config(config or {}, Path(base_dir))
+    return _registry
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """Глобальный реестр выключателей (по умолчанию - в памяти, без сохранения)"""
+    return _registry
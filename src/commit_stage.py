@@ -0,0 +1,239 @@
+"""
+Встроенная стадия коммита
+
+Инструкция "Коммит и отправка" раньше отдавалась агенту: полноценная сессия
+(до 300 секунд, плюс подготовка чата и ожидание файла результата) тратилась на
+несколько детерминированных git команд. Шаблоны с ключом `native: commit`
+сервер выполняет сам: очищает отчеты, выполняет git clean/add/commit и
+синтезирует файл отчета с контрольной фразой. Дальше работает обычный поток
+инструкции - ожидание файла, учет изменений и автоматический push.
+
+Стадия разбита на шаги (prepare, commit, write_report), чтобы сообщение коммита
+можно было получить асинхронно от LLM между подготовкой и коммитом.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .git_utils import GitError, GitRepo, execute_git_command
+
+logger = logging.getLogger(__name__)
+
+NATIVE_COMMIT = "commit"
+
+# Отчеты предыдущих инструкций, которые не должны попадать в коммит
+DEFAULT_CLEAN_GLOBS = ("docs/results/*.md", "docs/reviews/*.md")
+
+# Ограничение diff в промпте для генерации сообщения коммита
+MAX_DIFF_CHARS = 12000
+MAX_SUBJECT_LENGTH = 72
+
+
+@dataclass
+class StagedChanges:
+    """Проиндексированные изменения перед коммитом"""
+
+    stat: str
+    diff: str
+
+    @property
+    def empty(self) -> bool:
+        """Нечего коммитить"""
+        return not self.stat.strip()
+
+    def prompt_text(self, limit: int = MAX_DIFF_CHARS) -> str:
+        """Статистика и усеченный diff для промпта"""
+        diff = self.diff
+        if len(diff) > limit:
+            diff = diff[:limit] + "\n... (diff усечен)"
+        return f"{self.stat}\n\n{diff}"
+
+
+class CommitStage:
+    """Коммит выполненных изменений без сессии агента"""
+
+    def __init__(
+        self,
+        project_dir: Path,
+        clean_globs: Iterable[str] = DEFAULT_CLEAN_GLOBS,
+        clean_ignored: bool = True,
+        timeout: int = 60,
+    ):
+        """
+        Args:
+            project_dir: Директория проекта (git репозиторий)
+            clean_globs: Шаблоны файлов, удаляемых перед коммитом
+            clean_ignored: Выполнять git clean -fdX (игнорируемые файлы)
+            timeout: Таймаут каждой git команды (секунды)
+        """
+        self.project_dir = Path(project_dir)
+        self.clean_globs = list(clean_globs)
+        self.clean_ignored = clean_ignored
+        self.timeout = timeout
+
+    def _git(self, *args: str) -> str:
+        """Выполнить git команду, при ошибке - GitError"""
+        success, stdout, stderr = execute_git_command(
+            ["git", *args], self.project_dir, self.timeout
+        )
+        if not success:
+            raise GitError(f"git {args[0]}: {(stderr or stdout).strip()}")
+        return stdout
+
+    def clean_reports(self) -> List[str]:
+        """
+        Удалить отчеты предыдущих инструкций
+
+        Returns:
+            Список удаленных путей (относительно project_dir)
+        """
+        removed = []
+        for pattern in self.clean_globs:
+            for path in sorted(self.project_dir.glob(pattern)):
+                if path.is_file():
+                    path.unlink()
+                    removed.append(path.relative_to(self.project_dir).as_posix())
+        return removed
+
+    def prepare(self) -> StagedChanges:
+        """
+        Очистить рабочее дерево и проиндексировать все изменения
+
+        Returns:
+            Проиндексированные изменения (empty - если коммитить нечего)
+
+        Raises:
+            GitError: git команда завершилась с ошибкой
+        """
+        removed = self.clean_reports()
+        if removed:
+            logger.info(f"Удалено отчетов перед коммитом: {len(removed)}")
+        if self.clean_ignored:
+            self._git("clean", "-fdX")
+        self._git("add", "-A")
+        return StagedChanges(
+            stat=self._git("diff", "--cached", "--stat"),
+            diff=self._git("diff", "--cached"),
+        )
+
+    def commit(self, message: str) -> Dict[str, str]:
+        """
+        Создать коммит из проиндексированных изменений
+
+        Args:
+            message: Сообщение коммита
+
+        Returns:
+            Словарь hash_full, hash_short, message
+
+        Raises:
+            GitError: коммит не создан
+        """
+        self._git("commit", "-m", message)
+        info = GitRepo.for_path(self.project_dir).commit_info("HEAD")
+        if info is None:
+            raise GitError("Коммит создан, но HEAD не читается")
+        return info
+
+    def write_report(
+        self,
+        report_file: str,
+        commit_info: Optional[Dict[str, str]],
+        control_phrase: str,
+    ) -> Path:
+        """
+        Записать отчет инструкции
+
+        Args:
+            report_file: Путь к отчету (относительно project_dir)
+            commit_info: Информация о коммите или None, если коммитить было нечего
+            control_phrase: Контрольная фраза в конце отчета
+
+        Returns:
+            Путь к файлу отчета
+        """
+        if commit_info:
+            status = "успешно"
+            commit_lines = [
+                f"- ID коммита: `{commit_info['hash_full']}`",
+                f"- Сообщение коммита: {commit_info['message']}",
+            ]
+        else:
+            status = "нет изменений для коммита"
+            commit_lines = []
+        lines = [
+            "# Коммит и отправка",
+            "",
+            f"- Статус создания коммита: {status}",
+            *commit_lines,
+            f"- Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "- Выполнено сервером без сессии агента",
+            "",
+            control_phrase,
+            "",
+        ]
+        path = self.project_dir / report_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(lines), encoding="utf-8")
+        return path
+
+
+def normalize_commit_message(text: Optional[str]) -> Optional[str]:
+    """
+    Привести ответ LLM к заголовку коммита
+
+    Берется первая непустая строка без markdown-обрамления и кавычек,
+    длина ограничивается MAX_SUBJECT_LENGTH.
+
+    Args:
+        text: Ответ модели
+
+    Returns:
+        Заголовок коммита или None, если ответ пустой
+    """
+    for line in (text or "").splitlines():
+        line = line.strip().strip("`").strip().strip("\"'").strip()
+        if not line:
+            continue
+        if len(line) > MAX_SUBJECT_LENGTH:
+            line = line[: MAX_SUBJECT_LENGTH - 3].rstrip() + "..."
+        return line
+    return None
+
+
+def commit_message_prompt(task_text: str, changes: StagedChanges) -> str:
+    """Промпт для генерации сообщения коммита по diff"""
+    return (
+        "Напиши заголовок git коммита (одна строка, до 72 символов) в формате "
+        "Conventional Commits (feat:, fix:, refactor:, docs:, test:, chore:) "
+        "для изменений ниже. Ответь только заголовком, без пояснений.\n\n"
+        f"Задача: {task_text}\n\n"
+        f"Изменения:\n{changes.prompt_text()}"
+    )
+
+
+def fallback_commit_message(template: str, task_name: str, task_id: str) -> str:
+    """
+    Сообщение коммита из шаблона конфигурации (git.commit_message_template)
+
+    Args:
+        template: Шаблон с подстановками {task_name}, {task_id}, {task_description}
+        task_name: Текст задачи
+        task_id: Идентификатор задачи
+
+    Returns:
+        Сообщение коммита
+    """
+    subject = task_name.strip().splitlines()[0] if task_name.strip() else task_id
+    replacements = {
+        "task_name": normalize_commit_message(subject) or task_id,
+        "task_id": task_id,
+        "task_description": task_name.strip(),
+    }
+    message = template or "feat: {task_name}"
+    for key, value in replacements.items():
+        message = message.replace(f"{{{key}}}", value)
+    return message.strip()
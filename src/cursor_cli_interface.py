@@ -18,7 +18,9 @@ from dataclasses import dataclass
 from dotenv import load_dotenv
 
 try:
-    from .fallback_state_manager import FallbackStateManager
+    from .adaptive_timeout import run_with_progress
+    from .circuit_breaker import get_circuit_breakers
+    from .metrics import FALLBACKS
     from .task_logger import Colors
 except ImportError:
     # Fallback если модуль еще не создан
@@ -52,6 +54,7 @@ class CursorCLIResult:
     fallback_used: bool = False  # Флаг использования fallback модели
     primary_model_failed: bool = False  # Флаг неудачи основной модели
     billing_fallback_used: bool = False  # Флаг использования автоматического billing fallback
+    timed_out: bool = False  # Команда прервана по дедлайну выполнения
 
 
 class CursorCLIInterface:
@@ -104,7 +107,6 @@ class CursorCLIInterface:
         self.project_dir = Path(project_dir) if project_dir else None
         self.agent_role = agent_role
         self.current_chat_id: Optional[str] = None  # Текущий активный chat_id для продолжения диалога
-        self.fallback_state = FallbackStateManager()  # Менеджер состояния fallback
         
         logger.debug(f"Инициализация CursorCLIInterface: default_timeout={default_timeout} секунд")
         
@@ -678,6 +680,55 @@ This agent role is used for automated project tasks execution.
             logger.error(f"Ошибка в list_chats: {e}")
             return []
     
+    def create_chat(self) -> Optional[str]:
+        """
+        Создать пустой чат через 'agent create-chat' (для продолжения через --resume)
+        
+        Returns:
+            chat_id нового чата или None при ошибке
+        """
+        if not self.cli_available:
+            return None
+        
+        try:
+            use_docker = self.cli_command == "docker-compose-agent"
+            
+            if use_docker:
+                cmd = [
+                    "docker", "exec", "-i",
+                    self.container_name,
+                    "bash", "-c",
+                    "cd /workspace && /root/.local/bin/agent create-chat"
+                ]
+            else:
+                cmd = [self.cli_command, "create-chat"]
+            
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            
+            import re
+            ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+            output = ansi_escape.sub('', result.stdout or '').strip()
+            chat_id = output.split()[-1] if output else None
+            if result.returncode != 0 or not chat_id or not re.match(r'^[a-zA-Z0-9\-_]+$', chat_id):
+                logger.warning(f"Не удалось создать чат: {(result.stderr or output)[:200]}")
+                return None
+            
+            self.current_chat_id = chat_id
+            logger.debug(f"Создан чат {chat_id}")
+            return chat_id
+            
+        except subprocess.TimeoutExpired:
+            logger.warning("Таймаут выполнения команды create-chat (30 секунд)")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка в create_chat: {e}")
+            return None
+    
     def resume_chat(self, chat_id: Optional[str] = None) -> bool:
         """
         Возобновить чат (установить текущий chat_id для продолжения диалога)
@@ -1082,11 +1133,29 @@ This agent role is used for automated project tasks execution.
             else:
                 logger.warning(f".env файл не найден: {env_file}")
             
+            # Контейнер, который не удалось запустить недавно, не запускаем снова до пробы
+            container_breaker = f"docker:{self.container_name}"
+            breakers = get_circuit_breakers()
+            if not breakers.allow(container_breaker):
+                retry_after = breakers.get(container_breaker).retry_after()
+                return CursorCLIResult(
+                    success=False,
+                    stdout="",
+                    stderr="",
+                    return_code=-1,
+                    cli_available=False,
+                    error_message=(
+                        f"Docker контейнер {self.container_name} недоступен (circuit open), "
+                        f"проба через {retry_after:.0f}с"
+                    )
+                )
+
             # Проверяем и запускаем контейнер если нужно (с повторными попытками)
             max_retries = 3
             for attempt in range(max_retries):
                 container_status = self._ensure_docker_container_running(compose_file)
                 if container_status["running"]:
+                    breakers.record(container_breaker, success=True)
                     break
                 
                 if attempt < max_retries - 1:
@@ -1095,6 +1164,11 @@ This agent role is used for automated project tasks execution.
                     time.sleep(2)
                 else:
                     logger.error(f"Не удалось запустить Docker контейнер после {max_retries} попыток")
+                    breakers.record(
+                        container_breaker,
+                        success=False,
+                        reason=str(container_status.get('error'))[:100]
+                    )
                     return CursorCLIResult(
                         success=False,
                         stdout="",
@@ -1268,10 +1342,8 @@ This agent role is used for automated project tasks execution.
             agent_idx = cmd.index("agent")
             cmd[agent_idx + 1:agent_idx + 1] = additional_args
         
-        # Определяем таймаут (увеличиваем для Docker, так как agent может работать долго)
+        # Таймаут шаблона или адаптивный дедлайн сервера (без минимума для Docker)
         exec_timeout = timeout if timeout is not None else self.default_timeout
-        if use_docker:
-            exec_timeout = max(exec_timeout, 600)  # Минимум 10 минут для Docker
         
         logger.info(f"Выполнение команды через Cursor CLI: {' '.join(cmd)}")
         logger.debug(f"Рабочая директория: {exec_cwd or (working_dir or os.getcwd())}")
@@ -1287,92 +1359,48 @@ This agent role is used for automated project tasks execution.
             exec_cmd = cmd
             stdin_input = None
             
-            # Умная обработка таймаута с проверкой активности контейнера
-            max_timeout_retries = 5  # Максимум 5 продлений таймаута
-            current_timeout = exec_timeout
+            # Мягкий дедлайн: после его истечения агент продолжает работу, пока есть вывод
+            # или изменения файлов проекта (см. adaptive_timeout), без повторного запуска
+            watch_dir = self.project_dir or (Path(working_dir) if working_dir else None)
+            try:
+                result = run_with_progress(
+                    exec_cmd,
+                    exec_timeout,
+                    watch_dir=watch_dir,
+                    input=stdin_input,
+                    cwd=exec_cwd if exec_cwd else None,
+                    env=env
+                )
+            except subprocess.TimeoutExpired:
+                if use_docker and not self._check_docker_container_activity(self.container_name):
+                    logger.error("Контейнер не активен или завис. Перезапуск...")
+                    subprocess.run(["docker", "restart", self.container_name], timeout=15, capture_output=True)
+                raise
             
-            for retry in range(max_timeout_retries):
-                try:
-                    # Выполняем команду
-                    if use_docker:
-                        # Для Docker захватываем stderr для диагностики, но не stdout (может быть большим)
-                        result = subprocess.run(
-                            exec_cmd,
-                            input=stdin_input,
-                            stdout=subprocess.PIPE,  # Захватываем stdout
-                            stderr=subprocess.PIPE,  # Захватываем stderr для диагностики
-                            timeout=current_timeout,
-                            cwd=exec_cwd if exec_cwd else None,
-                            env=env,
-                            text=True,
-                            encoding='utf-8',
-                            errors='replace'
-                        )
-                        # Коды возврата для Docker:
-                        # 0 - успех
-                        # 137 - SIGKILL (процесс убит, но может быть фоновым)
-                        # 143 - SIGTERM (процесс завершен по сигналу, может быть нормальным завершением)
-                        # Сначала устанавливаем success только для кода 0, остальные обрабатываем ниже
-                        success = result.returncode == 0
-                        result_stdout = result.stdout if result.stdout else "(нет вывода)"
-                        result_stderr = result.stderr if result.stderr else ""
-                        
-                        # Логируем вывод для диагностики
-                        if result.returncode not in [0, 137, 143]:
-                            logger.warning(f"Agent вернул код {result.returncode}")
-                            if result_stderr:
-                                logger.warning(f"Stderr: {result_stderr[:500]}")
-                            if result_stdout:
-                                logger.debug(f"Stdout: {result_stdout[:500]}")
-                        elif result.returncode == 143:
-                            # Код 143 (SIGTERM) - логируем как информационное сообщение
-                            logger.debug("Agent вернул код 143 (SIGTERM) - процесс был прерван, но может быть успешным")
-                    else:
-                        result = subprocess.run(
-                            exec_cmd,
-                            input=stdin_input,
-                            capture_output=True,
-                            text=True,
-                            timeout=current_timeout,
-                            cwd=exec_cwd if exec_cwd else None,
-                            encoding='utf-8',
-                            errors='replace',
-                            env=env
-                        )
-                        success = result.returncode == 0
-                        result_stdout = result.stdout
-                        result_stderr = result.stderr
-                    
-                    # Команда завершилась - выходим из цикла
-                    break
-                    
-                except subprocess.TimeoutExpired:
-                    # Таймаут! Проверяем, идет ли генерация
-                    if use_docker and retry < max_timeout_retries - 1:
-                        logger.warning(f"Таймаут {current_timeout}с (попытка {retry + 1}/{max_timeout_retries})")
-                        logger.info("Проверка активности Docker контейнера...")
-                        
-                        # Проверяем статус контейнера
-                        container_active = self._check_docker_container_activity(self.container_name)
-                        
-                        if container_active:
-                            # Контейнер активен - продлеваем таймаут
-                            current_timeout = exec_timeout * 2
-                            logger.info(f"Контейнер активен, генерация продолжается. Продление таймаута до {current_timeout}с")
-                            continue  # Повторяем попытку с увеличенным таймаутом
-                        else:
-                            # Контейнер не активен - что-то пошло не так
-                            logger.error("Контейнер не активен или завис. Перезапуск...")
-                            subprocess.run(["docker", "restart", self.container_name], timeout=15, capture_output=True)
-                            import time
-                            time.sleep(5)
-                            logger.info("Контейнер перезапущен, повторная попытка...")
-                            current_timeout = exec_timeout  # Сбрасываем таймаут
-                            continue
-                    else:
-                        # Исчерпаны попытки или не Docker
-                        logger.error(f"Таймаут выполнения команды после {retry + 1} попыток ({current_timeout}с)")
-                        raise
+            if use_docker:
+                # Коды возврата для Docker:
+                # 0 - успех
+                # 137 - SIGKILL (процесс убит, но может быть фоновым)
+                # 143 - SIGTERM (процесс завершен по сигналу, может быть нормальным завершением)
+                # Сначала устанавливаем success только для кода 0, остальные обрабатываем ниже
+                success = result.returncode == 0
+                result_stdout = result.stdout if result.stdout else "(нет вывода)"
+                result_stderr = result.stderr if result.stderr else ""
+                
+                # Логируем вывод для диагностики
+                if result.returncode not in [0, 137, 143]:
+                    logger.warning(f"Agent вернул код {result.returncode}")
+                    if result_stderr:
+                        logger.warning(f"Stderr: {result_stderr[:500]}")
+                    if result_stdout:
+                        logger.debug(f"Stdout: {result_stdout[:500]}")
+                elif result.returncode == 143:
+                    # Код 143 (SIGTERM) - логируем как информационное сообщение
+                    logger.debug("Agent вернул код 143 (SIGTERM) - процесс был прерван, но может быть успешным")
+            else:
+                success = result.returncode == 0
+                result_stdout = result.stdout
+                result_stderr = result.stderr
             
             if success:
                 logger.info("Команда Cursor CLI выполнена успешно")
@@ -1461,7 +1489,8 @@ This agent role is used for automated project tasks execution.
                 stderr="",
                 return_code=-1,
                 cli_available=True,
-                error_message=f"Таймаут выполнения ({exec_timeout} секунд)"
+                error_message=f"Таймаут выполнения ({exec_timeout} секунд)",
+                timed_out=True
             )
             
         except FileNotFoundError:
@@ -1538,19 +1567,10 @@ This agent role is used for automated project tasks execution.
         if not result.success:
             fallback_on = resilience_config.get('fallback_on_errors', [])
             
-            # Проверяем billing error
-            if 'billing_error' in fallback_on:
-                stderr_lower = (result.stderr or '').lower()
-                if ('unpaid invoice' in stderr_lower or
-                    'pay your invoice' in stderr_lower or
-                    'usage limit' in stderr_lower or
-                    'spend limit' in stderr_lower or
-                    'hit your usage limit' in stderr_lower or
-                    'monthly cycle ends' in stderr_lower):
-                    logger.warning("Обнаружена billing error - активируем автоматический fallback режим")
-                    # Активируем автоматический fallback режим для следующих 25 обращений
-                    self.fallback_state.activate_fallback()
-                    return True
+            # Проверяем billing error (выключатель модели размыкает execute_with_fallback)
+            if 'billing_error' in fallback_on and self._is_billing_error(result):
+                logger.warning("Обнаружена billing error - переключаемся на резервную модель")
+                return True
             
             # Проверяем timeout
             if 'timeout' in fallback_on:
@@ -1719,7 +1739,8 @@ This agent role is used for automated project tasks execution.
                         stderr="",
                         return_code=-1,
                         cli_available=True,
-                        error_message=f"Таймаут выполнения ({current_timeout} секунд)"
+                        error_message=f"Таймаут выполнения ({current_timeout} секунд)",
+                        timed_out=True
                     )
         
         # Обрабатываем результат выполнения команды
@@ -1809,6 +1830,20 @@ This agent role is used for automated project tasks execution.
                 }
             }
     
+    BILLING_ERROR_MARKERS = (
+        'unpaid invoice',
+        'pay your invoice',
+        'usage limit',
+        'spend limit',
+        'monthly cycle ends',
+    )
+
+    @classmethod
+    def _is_billing_error(cls, result: CursorCLIResult) -> bool:
+        """Ошибка оплаты или лимита аккаунта (модель недоступна надолго)"""
+        stderr_lower = (result.stderr or '').lower()
+        return any(marker in stderr_lower for marker in cls.BILLING_ERROR_MARKERS)
+
     def _should_trigger_fallback(self, result: CursorCLIResult, resilience_config: Dict) -> bool:
         """
         Определить, нужно ли активировать fallback на основе результата
@@ -1823,19 +1858,10 @@ This agent role is used for automated project tasks execution.
         if not result.success:
             fallback_on = resilience_config.get('fallback_on_errors', [])
             
-            # Проверяем billing error
-            if 'billing_error' in fallback_on:
-                stderr_lower = (result.stderr or '').lower()
-                if ('unpaid invoice' in stderr_lower or
-                    'pay your invoice' in stderr_lower or
-                    'usage limit' in stderr_lower or
-                    'spend limit' in stderr_lower or
-                    'hit your usage limit' in stderr_lower or
-                    'monthly cycle ends' in stderr_lower):
-                    logger.warning("Обнаружена billing error - активируем автоматический fallback режим")
-                    # Активируем автоматический fallback режим для следующих 25 обращений
-                    self.fallback_state.activate_fallback()
-                    return True
+            # Проверяем billing error (выключатель модели размыкает execute_with_fallback)
+            if 'billing_error' in fallback_on and self._is_billing_error(result):
+                logger.warning("Обнаружена billing error - переключаемся на резервную модель")
+                return True
             
             # Проверяем timeout
             if 'timeout' in fallback_on:
@@ -1938,18 +1964,10 @@ This agent role is used for automated project tasks execution.
         ])
         
         exec_timeout = timeout if timeout is not None else self.default_timeout
-        exec_timeout = max(exec_timeout, 600)  # Минимум 10 минут для Docker
         
         try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=exec_timeout,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
+            # Мягкий дедлайн с продлением по выводу агента и изменениям файлов проекта
+            result = run_with_progress(cmd, exec_timeout, watch_dir=self.project_dir)
             
             success = result.returncode == 0
             result_stdout = result.stdout if result.stdout else ""
@@ -1990,14 +2008,19 @@ This agent role is used for automated project tasks execution.
                 error_message=error_msg
             )
             
-        except subprocess.TimeoutExpired:
+        except subprocess.TimeoutExpired as e:
+            logger.error(f"Таймаут выполнения команды Cursor CLI ({e.timeout:.0f} сек, дедлайн {exec_timeout} сек)")
+            if not self._check_docker_container_activity(self.container_name):
+                logger.error("Контейнер не активен или завис. Перезапуск...")
+                subprocess.run(["docker", "restart", self.container_name], timeout=15, capture_output=True)
             return CursorCLIResult(
                 success=False,
-                stdout="",
-                stderr="",
+                stdout=e.output or "",
+                stderr=e.stderr or "",
                 return_code=-1,
                 cli_available=True,
-                error_message=f"Таймаут выполнения ({exec_timeout} секунд)"
+                error_message=f"Таймаут выполнения ({exec_timeout} секунд)",
+                timed_out=True
             )
         except Exception as e:
             logger.error(f"Ошибка при выполнении команды: {e}", exc_info=True)
@@ -2017,7 +2040,8 @@ This agent role is used for automated project tasks execution.
         timeout: Optional[int] = None,
         additional_args: Optional[list[str]] = None,
         new_chat: bool = True,
-        chat_id: Optional[str] = None
+        chat_id: Optional[str] = None,
+        model: Optional[str] = None
     ) -> CursorCLIResult:
         """
         Выполнить команду с автоматическим fallback на резервные модели
@@ -2032,13 +2056,14 @@ This agent role is used for automated project tasks execution.
             additional_args: Дополнительные аргументы
             new_chat: Создать новый чат
             chat_id: ID чата для продолжения
+            model: Основная модель вместо модели из конфигурации (например, более быстрая)
 
         Returns:
             CursorCLIResult с результатом выполнения (последняя попытка)
         """
         # Получаем конфигурацию
         model_config = self._get_model_config()
-        primary_model = model_config['model']
+        primary_model = model or model_config['model']
         fallback_models = model_config.get('fallback_models', [])
         resilience = model_config.get('resilience', {})
 
@@ -2046,27 +2071,35 @@ This agent role is used for automated project tasks execution.
         max_attempts = resilience.get('max_fallback_attempts', 3)
         retry_delay = resilience.get('fallback_retry_delay', 2)
 
-        # Проверяем, нужно ли автоматически использовать fallback
-        if self.fallback_state.should_use_fallback() and fallback_models:
-            # Используем резервную модель
-            models_to_try = [fallback_models[0]]  # Первая резервная модель
+        # Модели с разомкнутым выключателем (billing, серия ошибок) пропускаются сразу
+        breakers = get_circuit_breakers()
+        candidates = [primary_model]
+        if enable_fallback and fallback_models:
+            candidates.extend(m for m in fallback_models[:max_attempts - 1] if m != primary_model)
+        models_to_try = [m for m in candidates if breakers.available(f"cursor:{m}")]
+        if not models_to_try:
+            retry_after = min(breakers.get(f"cursor:{m}").retry_after() for m in candidates)
+            logger.error(
+                f"❌ Все модели отключены выключателями ({candidates}), "
+                f"проба через {retry_after:.0f}с"
+            )
+            return CursorCLIResult(
+                success=False,
+                stdout="",
+                stderr="",
+                return_code=-1,
+                cli_available=True,
+                error_message=f"Все модели отключены (circuit open), проба через {retry_after:.0f}с"
+            )
+        primary_skipped = models_to_try[0] != primary_model
+        if primary_skipped:
             logger.info(Colors.colorize(
-                f"🔄 Автоматический fallback активен - используем резервную модель '{models_to_try[0]}'",
+                f"🔌 Основная модель '{primary_model}' отключена "
+                f"({breakers.get(f'cursor:{primary_model}').reason}) - "
+                f"используем '{models_to_try[0]}'",
                 Colors.BRIGHT_CYAN
             ))
-        elif self.fallback_state.is_testing_primary_model():
-            # Режим тестирования основной модели - используем только auto
-            models_to_try = [primary_model]
-            logger.info(Colors.colorize(
-                f"🔄 Тестируем основную модель '{primary_model}' после завершения fallback периода",
-                Colors.BRIGHT_YELLOW
-            ))
-        else:
-            # Стандартная логика
-            models_to_try = [primary_model]
-            if enable_fallback and fallback_models:
-                models_to_try.extend(fallback_models[:max_attempts - 1])
-        
+
         # Компактный лог fallback моделей
         fallback_info = f"'{primary_model}'"
         if fallback_models:
@@ -2080,46 +2113,53 @@ This agent role is used for automated project tasks execution.
         
         # Пробуем каждую модель по очереди
         for attempt, model in enumerate(models_to_try, 1):
+            breaker_name = f"cursor:{model}"
+            if not breakers.allow(breaker_name):
+                # Пробный вызов уже выполняется в другом потоке
+                continue
             logger.debug(f"Попытка {attempt}/{len(models_to_try)} с моделью '{model}'")
             
             # Выполняем команду с текущей моделью
-            result = self._execute_with_specific_model(
-                prompt=prompt,
-                model=model,
-                working_dir=working_dir,
-                timeout=timeout,
-                additional_args=additional_args,
-                new_chat=new_chat,
-                chat_id=chat_id
-            )
+            try:
+                result = self._execute_with_specific_model(
+                    prompt=prompt,
+                    model=model,
+                    working_dir=working_dir,
+                    timeout=timeout,
+                    additional_args=additional_args,
+                    new_chat=new_chat,
+                    chat_id=chat_id
+                )
+            except BaseException:
+                # Результата нет - разрешение (пробный вызов) не должно зависнуть
+                breakers.release(breaker_name)
+                raise
             
             last_result = result
             
             # Если успешно - возвращаем результат
             if result.success:
-                if attempt > 1:
-                    # Fallback помог - но это все равно признак проблемы с основной моделью
+                breakers.record(breaker_name, success=True)
+                if model != primary_model:
+                    # Основная модель упала в этом вызове или отключена выключателем
                     logger.info(f"✅ Успешно выполнено с резервной моделью '{model}' (попытка {attempt})")
-                    logger.warning(f"⚠️ Основная модель '{primary_model}' не смогла выполнить команду, использован fallback на '{model}'")
-                    # Устанавливаем флаги для отслеживания использования fallback
                     result.fallback_used = True
                     result.primary_model_failed = True
-
-                    # Активируем автоматический fallback режим после неудачи основной модели
-                    # Это обеспечит, что следующие запросы будут автоматически использовать резервную модель
-                    if not self.fallback_state.is_testing_primary_model():
-                        logger.warning("🚨 Активируем автоматический fallback режим после неудачи основной модели")
-                        self.fallback_state.activate_fallback()
-                elif self.fallback_state.should_use_fallback():
-                    # Успешное выполнение в автоматическом fallback режиме
-                    logger.info(f"✅ Успешно выполнено в автоматическом fallback режиме с моделью '{model}'")
-                    result.fallback_used = True
-                    result.billing_fallback_used = True  # Устанавливаем флаг автоматического billing fallback
-                    # Записываем обращение в fallback режиме
-                    self.fallback_state.record_request()
+                    result.billing_fallback_used = primary_skipped
+                    FALLBACKS.inc(kind="cursor_model")
                 else:
                     logger.info(f"✅ Успешно выполнено с основной моделью '{model}'")
                 return result
+
+            if self._is_billing_error(result):
+                # Лимит аккаунта не исчезнет за секунды - отключаем модель надолго
+                breakers.trip(
+                    breaker_name, "billing error", resilience.get('billing_open_seconds', 3600)
+                )
+            else:
+                breakers.record(
+                    breaker_name, success=False, reason=(result.error_message or "")[:100]
+                )
             
             # Проверяем, нужно ли продолжать fallback
             if not enable_fallback or attempt >= len(models_to_try):
@@ -2156,7 +2196,9 @@ This agent role is used for automated project tasks execution.
         instruction: str,
         task_id: str,
         working_dir: Optional[str] = None,
-        timeout: Optional[int] = None
+        timeout: Optional[int] = None,
+        model: Optional[str] = None,
+        chat_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Выполнить инструкцию для задачи через Cursor CLI с fallback
@@ -2168,6 +2210,8 @@ This agent role is used for automated project tasks execution.
             task_id: Идентификатор задачи
             working_dir: Рабочая директория
             timeout: Таймаут выполнения
+            model: Основная модель вместо модели из конфигурации
+            chat_id: Продолжить этот чат (сессия задачи) вместо создания нового
             
         Returns:
             Словарь с результатом выполнения
@@ -2183,7 +2227,9 @@ This agent role is used for automated project tasks execution.
             prompt=instruction,
             working_dir=working_dir,
             timeout=timeout,
-            new_chat=True  # Всегда создаем новый чат для новой задачи
+            new_chat=chat_id is None,  # Новый чат, если сессия задачи не передана
+            chat_id=chat_id,
+            model=model
         )
         
         return {
@@ -2195,7 +2241,8 @@ This agent role is used for automated project tasks execution.
             "cli_available": result.cli_available,
             "error_message": result.error_message,
             "fallback_used": getattr(result, 'fallback_used', False),
-            "primary_model_failed": getattr(result, 'primary_model_failed', False)
+            "primary_model_failed": getattr(result, 'primary_model_failed', False),
+            "timed_out": result.timed_out
         }
 
 
@@ -0,0 +1,380 @@
+"""
+Потоковая аналитика хранилища событий
+
+Агрегаты считаются за один проход по событиям (см. event_store.iter_events) с
+ограниченной памятью: задержки хранятся в логарифмических гистограммах
+(квантили с относительной погрешностью ~2%), а статистика для сравнения
+запусков держится только для отслеживаемых запусков.
+"""
+
+import math
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .event_bus import EventType
+
+# Шаг логарифмических корзин гистограммы (относительная ширина корзины)
+HISTOGRAM_GROWTH = 1.04
+# Значения меньше этого порога (секунды) попадают в нулевую корзину
+HISTOGRAM_MIN_VALUE = 0.001
+
+
+class LatencyHistogram:
+    """Гистограмма с логарифмическими корзинами для приближенных квантилей"""
+
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        if value < HISTOGRAM_MIN_VALUE:
+            index = -1
+        else:
+            index = int(math.log(value / HISTOGRAM_MIN_VALUE, HISTOGRAM_GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Приближенный квантиль
+
+        Args:
+            q: Уровень квантиля (0..1)
+
+        Returns:
+            Значение (середина корзины) или None для пустой гистограммы
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                if index < 0:
+                    return 0.0
+                lower = HISTOGRAM_MIN_VALUE * HISTOGRAM_GROWTH**index
+                return lower * (1 + HISTOGRAM_GROWTH) / 2
+        return None
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": _round(self.mean),
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+        }
+
+
+class RateCounter:
+    """Счетчик попыток и неудач"""
+
+    __slots__ = ("total", "failed")
+
+    def __init__(self):
+        self.total = 0
+        self.failed = 0
+
+    def add(self, success: bool) -> None:
+        self.total += 1
+        if not success:
+            self.failed += 1
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failed / self.total if self.total else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "failed": self.failed,
+            "failure_rate": round(self.failure_rate, 4),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def instruction_key(data: Dict[str, Any]) -> str:
+    """Ключ инструкции для группировки: id шаблона и название"""
+    name = data.get("instruction_name") or ""
+    instruction_id = data.get("instruction_id")
+    if instruction_id is None:
+        instruction_id = data.get("instruction_num")
+    return f"{instruction_id} {name}".strip()
+
+
+class RunStats:
+    """Статистика одного запуска сервера (для поиска регрессий)"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.instructions: Dict[str, LatencyHistogram] = {}
+        self.instruction_failures: Dict[str, RateCounter] = {}
+        self.tasks = RateCounter()
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        ts = event.get("ts") or 0.0
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        data = event.get("data") or {}
+        event_type = event.get("type")
+        if event_type == EventType.INSTRUCTION_FINISHED:
+            key = instruction_key(data)
+            self.instructions.setdefault(key, LatencyHistogram()).add(
+                float(data.get("duration") or 0.0)
+            )
+            self.instruction_failures.setdefault(key, RateCounter()).add(bool(data.get("success")))
+        elif event_type == EventType.TASK_FINISHED:
+            self.tasks.add(bool(data.get("success")))
+
+
+class EventAnalytics:
+    """Однопроходная агрегация событий хранилища"""
+
+    def __init__(self, runs: Optional[Iterable[str]] = None, keep_runs: int = 2):
+        """
+        Инициализация
+
+        Args:
+            runs: Запуски для сравнения (None - последние keep_runs запусков)
+            keep_runs: Сколько последних запусков отслеживать, если runs не указаны
+        """
+        self.tracked_runs = list(runs) if runs else None
+        self.keep_runs = keep_runs
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.events = 0
+        self._run_ids: Set[str] = set()
+
+        self.tasks = RateCounter()
+        self.tasks_per_day: Dict[str, int] = {}
+        self.task_duration = LatencyHistogram()
+        self.instructions: Dict[str, LatencyHistogram] = {}
+        self.result_wait = LatencyHistogram()
+        self.instruction_failures_by_model: Dict[str, RateCounter] = {}
+        self.instruction_failures_by_container: Dict[str, RateCounter] = {}
+        self.llm_latency: Dict[str, LatencyHistogram] = {}
+        self.llm_failures_by_model: Dict[str, RateCounter] = {}
+        self.errors: Dict[str, int] = {}
+        self.container_restarts = RateCounter()
+        self.runs: "OrderedDict[str, RunStats]" = OrderedDict()
+
+    @property
+    def run_count(self) -> int:
+        """Количество различных запусков сервера"""
+        return len(self._run_ids)
+
+    def _run_stats(self, run_id: str) -> Optional[RunStats]:
+        if self.tracked_runs is not None:
+            if run_id not in self.tracked_runs:
+                return None
+        elif run_id not in self.runs:
+            self.runs[run_id] = RunStats(run_id)
+            while len(self.runs) > self.keep_runs:
+                self.runs.popitem(last=False)
+        return self.runs.setdefault(run_id, RunStats(run_id))
+
+    def consume(self, events: Iterable[Dict[str, Any]]) -> "EventAnalytics":
+        """
+        Обработать поток событий
+
+        Args:
+            events: События хранилища (в порядке записи)
+
+        Returns:
+            self
+        """
+        for event in events:
+            self.add(event)
+        return self
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """Учесть одно событие"""
+        ts = float(event.get("ts") or 0.0)
+        self.events += 1
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+        run_id = event.get("run") or "unknown"
+        self._run_ids.add(run_id)
+        run_stats = self._run_stats(run_id)
+        if run_stats is not None:
+            run_stats.observe(event)
+
+        data = event.get("data") or {}
+        event_type = event.get("type")
+        success = bool(data.get("success"))
+        if event_type == EventType.TASK_FINISHED:
+            self.tasks.add(success)
+            self.task_duration.add(float(data.get("duration") or 0.0))
+            day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+            self.tasks_per_day[day] = self.tasks_per_day.get(day, 0) + 1
+        elif event_type == EventType.INSTRUCTION_FINISHED:
+            self.instructions.setdefault(instruction_key(data), LatencyHistogram()).add(
+                float(data.get("duration") or 0.0)
+            )
+            model = str(data.get("model") or "unknown")
+            container = str(data.get("container") or "unknown")
+            self.instruction_failures_by_model.setdefault(model, RateCounter()).add(success)
+            self.instruction_failures_by_container.setdefault(container, RateCounter()).add(
+                success
+            )
+        elif event_type == EventType.RESULT_WAIT:
+            self.result_wait.add(float(data.get("wait_time") or 0.0))
+        elif event_type == EventType.LLM_CALL:
+            model = str(data.get("model") or "unknown")
+            self.llm_latency.setdefault(model, LatencyHistogram()).add(
+                float(data.get("duration") or 0.0)
+            )
+            self.llm_failures_by_model.setdefault(model, RateCounter()).add(success)
+        elif event_type == EventType.ERROR:
+            key = f"{data.get('source') or 'unknown'}:{data.get('error_class') or 'error'}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+        elif event_type == EventType.CONTAINER_RESTART:
+            self.container_restarts.add(success)
+
+    def throughput(self) -> Dict[str, Any]:
+        """Пропускная способность: задачи в час за весь период и по дням"""
+        hours = ((self.last_ts or 0.0) - (self.first_ts or 0.0)) / 3600
+        return {
+            "period_start": _format_ts(self.first_ts),
+            "period_end": _format_ts(self.last_ts),
+            "tasks": self.tasks.summary(),
+            "tasks_per_hour": round(self.tasks.total / hours, 3) if hours > 0 else None,
+            "task_duration": self.task_duration.summary(),
+            "tasks_per_day": dict(sorted(self.tasks_per_day.items())),
+        }
+
+    def latency(self) -> Dict[str, Any]:
+        """Задержки инструкций, ожидания результата и LLM (p50/p95)"""
+        return {
+            "instructions": {
+                key: histogram.summary() for key, histogram in sorted(self.instructions.items())
+            },
+            "result_wait": self.result_wait.summary(),
+            "llm": {
+                model: histogram.summary() for model, histogram in sorted(self.llm_latency.items())
+            },
+        }
+
+    def failures(self) -> Dict[str, Any]:
+        """Доли неудач по моделям и контейнерам, счетчики ошибок"""
+        return {
+            "instructions_by_model": _summaries(self.instruction_failures_by_model),
+            "instructions_by_container": _summaries(self.instruction_failures_by_container),
+            "llm_by_model": _summaries(self.llm_failures_by_model),
+            "container_restarts": self.container_restarts.summary(),
+            "errors": dict(sorted(self.errors.items(), key=lambda item: -item[1])),
+        }
+
+    def regressions(self, threshold: float = 0.2, min_samples: int = 3) -> Dict[str, Any]:
+        """
+        Сравнить два запуска: базовый (первый) и проверяемый (второй)
+
+        Args:
+            threshold: Относительный рост p95 задержки, считающийся регрессией
+            min_samples: Минимум выполнений инструкции в каждом запуске для сравнения
+
+        Returns:
+            Запуски и список регрессий (пустой, если запусков меньше двух)
+        """
+        if self.tracked_runs is not None:
+            runs = [self.runs[run_id] for run_id in self.tracked_runs if run_id in self.runs]
+        else:
+            runs = list(self.runs.values())
+        if len(runs) < 2:
+            return {"baseline": None, "candidate": None, "regressions": []}
+        baseline, candidate = runs[-2], runs[-1]
+        return {
+            "baseline": baseline.run_id,
+            "candidate": candidate.run_id,
+            "regressions": compare_runs(baseline, candidate, threshold, min_samples),
+        }
+
+    def report(self, threshold: float = 0.2) -> Dict[str, Any]:
+        """Полный отчет"""
+        return {
+            "events": self.events,
+            "runs": self.run_count,
+            "throughput": self.throughput(),
+            "latency": self.latency(),
+            "failures": self.failures(),
+            "regressions": self.regressions(threshold),
+        }
+
+
+def compare_runs(
+    baseline: RunStats, candidate: RunStats, threshold: float = 0.2, min_samples: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Найти инструкции, ставшие медленнее или чаще завершающиеся неудачей
+
+    Args:
+        baseline: Статистика базового запуска
+        candidate: Статистика проверяемого запуска
+        threshold: Относительный рост p95 (и абсолютный рост доли неудач), считающийся регрессией
+        min_samples: Минимум выполнений инструкции в каждом запуске
+
+    Returns:
+        Список регрессий, отсортированный по величине изменения
+    """
+    found: List[Tuple[float, Dict[str, Any]]] = []
+    for key, candidate_histogram in candidate.instructions.items():
+        baseline_histogram = baseline.instructions.get(key)
+        if baseline_histogram is None:
+            continue
+        if min(baseline_histogram.count, candidate_histogram.count) < min_samples:
+            continue
+        before = baseline_histogram.quantile(0.95) or 0.0
+        after = candidate_histogram.quantile(0.95) or 0.0
+        if before > 0 and (after - before) / before > threshold:
+            change = (after - before) / before
+            found.append(
+                (
+                    change,
+                    {
+                        "instruction": key,
+                        "metric": "p95",
+                        "baseline": _round(before),
+                        "candidate": _round(after),
+                        "change": round(change, 3),
+                    },
+                )
+            )
+        before_rate = baseline.instruction_failures[key].failure_rate
+        after_rate = candidate.instruction_failures[key].failure_rate
+        if after_rate - before_rate > threshold:
+            found.append(
+                (
+                    after_rate - before_rate,
+                    {
+                        "instruction": key,
+                        "metric": "failure_rate",
+                        "baseline": round(before_rate, 4),
+                        "candidate": round(after_rate, 4),
+                        "change": round(after_rate - before_rate, 3),
+                    },
+                )
+            )
+    return [item for _, item in sorted(found, key=lambda pair: -pair[0])]
+
+
+def _summaries(counters: Dict[str, RateCounter]) -> Dict[str, Dict[str, Any]]:
+    return {key: counter.summary() for key, counter in sorted(counters.items())}
+
+
+def _format_ts(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else None
@@ -0,0 +1,254 @@
+"""
+Шина событий сервера для live-мониторинга
+
+Модуль публикует события выполнения (смена фаз задачи, старт/завершение инструкций,
+прогресс ожидания результата, решения LLM) подписчикам в рамках процесса.
+HTTP слой отдает их клиентам потоком Server-Sent Events (/events), поэтому
+мониторингу не нужно постоянно опрашивать /status.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventType:
+    """Типы событий, публикуемых сервером"""
+
+    TASK_PHASE = "task_phase"
+    TASK_STARTED = "task_started"
+    TASK_FINISHED = "task_finished"
+    INSTRUCTION_STARTED = "instruction_started"
+    INSTRUCTION_FINISHED = "instruction_finished"
+    INSTRUCTION_POLICY = "instruction_policy"
+    WAIT_PROGRESS = "wait_progress"
+    LLM_DECISION = "llm_decision"
+    SERVER_STATE = "server_state"
+    RESULT_WAIT = "result_wait"
+    LLM_CALL = "llm_call"
+    CONTAINER_RESTART = "container_restart"
+    CIRCUIT_BREAKER = "circuit_breaker"
+    ERROR = "error"
+
+
+class EventSubscription:
+    """Подписка на события шины с ограниченной очередью"""
+
+    def __init__(self, bus: "EventBus", max_queue_size: int):
+        self._bus = bus
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.closed = False
+
+    def _put(self, event: Dict[str, Any]) -> None:
+        """Положить событие в очередь подписчика (медленный клиент теряет старые события)"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Получить следующее событие
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Событие или None если событий не было за timeout
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        """Отписаться от шины"""
+        if not self.closed:
+            self.closed = True
+            self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    Потокобезопасная шина событий
+
+    Публикация не блокирует вызывающий код: каждое событие получает
+    последовательный id, хранится в кольцевом буфере (для переподключения по
+    Last-Event-ID) и раскладывается по ограниченным очередям подписчиков.
+    Выключенная шина (enabled = False) не публикует события: история и очереди
+    не заполняются.
+    """
+
+    def __init__(self, history_size: int = 500, subscriber_queue_size: int = 1000):
+        """
+        Инициализация шины
+
+        Args:
+            history_size: Количество последних событий для повторной отправки
+            subscriber_queue_size: Размер очереди каждого подписчика
+        """
+        self._lock = threading.Lock()
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._subscribers: List[EventSubscription] = []
+        self._subscriber_queue_size = subscriber_queue_size
+        self._next_id = 1
+        # Выключается сервером, если событий никто не читает (/events и event_store)
+        self.enabled = True
+
+    def publish(self, event_type: str, **data: Any) -> Optional[Dict[str, Any]]:
+        """
+        Опубликовать событие
+
+        Args:
+            event_type: Тип события (см. EventType)
+            **data: Данные события (должны сериализоваться в JSON)
+
+        Returns:
+            Опубликованное событие или None, если шина выключена
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            event = {
+                "id": self._next_id,
+                "type": event_type,
+                "timestamp": time.time(),
+                "data": data,
+            }
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            subscription._put(event)
+        return event
+
+    def subscribe(
+        self, last_event_id: Optional[int] = None, max_queue_size: Optional[int] = None
+    ) -> EventSubscription:
+        """
+        Подписаться на события
+
+        Args:
+            last_event_id: Id последнего полученного события; более новые события
+                из истории будут доставлены сразу
+            max_queue_size: Размер очереди подписки (по умолчанию размер шины)
+
+        Returns:
+            Объект подписки
+        """
+        subscription = EventSubscription(self, max_queue_size or self._subscriber_queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event["id"] > last_event_id:
+                        subscription._put(event)
+            self._subscribers.append(subscription)
+        logger.debug(f"Новый подписчик шины событий (всего: {len(self._subscribers)})")
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription) -> None:
+        """Удалить подписку"""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+        subscription.closed = True
+
+    def get_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Получить последние события из истории"""
+        with self._lock:
+            return list(self._history)[-limit:]
+
+    @property
+    def subscriber_count(self) -> int:
+        """Количество активных подписчиков"""
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """
+    Сформировать SSE сообщение для события
+
+    Args:
+        event: Событие шины
+
+    Returns:
+        Текст сообщения в формате text/event-stream
+    """
+    payload = json.dumps(event, ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+def stream_sse(
+    bus: "EventBus",
+    last_event_id: Optional[int] = None,
+    heartbeat_interval: float = 15.0,
+    should_stop: Optional[Any] = None,
+) -> Iterator[str]:
+    """
+    Генератор SSE потока для HTTP ответа
+
+    Args:
+        bus: Шина событий
+        last_event_id: Id последнего полученного клиентом события
+        heartbeat_interval: Интервал комментариев-heartbeat для поддержания соединения
+        should_stop: Callable без аргументов; True завершает поток
+
+    Yields:
+        Фрагменты text/event-stream
+    """
+    subscription = bus.subscribe(last_event_id=last_event_id)
+    try:
+        yield "retry: 2000\n\n"
+        while not (should_stop and should_stop()):
+            event = subscription.get(timeout=heartbeat_interval)
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        subscription.close()
+
+
+_event_bus: Optional[EventBus] = None
+_event_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Получить глобальную шину событий процесса"""
+    global _event_bus
+    if _event_bus is None:
+        with _event_bus_lock:
+            if _event_bus is None:
+                _event_bus = EventBus()
+    return _event_bus
+
+
+def publish_event(event_type: str, **data: Any) -> None:
+    """
+    Опубликовать событие в глобальную шину, не прерывая вызывающий код при ошибке
+
+    Args:
+        event_type: Тип события
+        **data: Данные события
+    """
+    try:
+        get_event_bus().publish(event_type, **data)
+    except Exception as e:
+        logger.debug(f"Не удалось опубликовать событие {event_type}: {e}")
@@ -0,0 +1,359 @@
+"""
+Хранилище событий выполнения (JSONL с ротацией и сжатием)
+
+История задач раньше была разбросана по текстовым логам задач (хранятся только
+последние 20), codeAgentProjectStatus.md и checkpoint. Хранилище подписывается
+на шину событий и записывает каждое типизированное событие (задача, инструкция,
+ожидание результата, вызов LLM, ошибка) строкой JSON:
+
+    {"v": 1, "ts": 1767000000.123, "run": "<id запуска>", "type": "...", "data": {...}}
+
+Активный сегмент events.jsonl при достижении лимита размера сжимается в
+events-<время>.jsonl.gz; старые сегменты удаляются сверх max_segments.
+Чтение (iter_events) идет потоком по сегментам, поэтому анализ месяцев истории
+(scripts/event_analytics.py) не требует памяти, пропорциональной объему событий.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .event_bus import EventBus, EventType, get_event_bus
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+ACTIVE_SEGMENT = "events.jsonl"
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+SEGMENT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+DEFAULT_DIRECTORY = "logs/events"
+DEFAULT_MAX_SEGMENT_BYTES = 20 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 500
+# Частые события прогресса не нужны для аналитики (итог ожидания пишется в result_wait)
+DEFAULT_EXCLUDE_TYPES = (EventType.WAIT_PROGRESS,)
+
+
+def _segment_key(path: Path) -> Optional[Tuple[float, int]]:
+    """Время ротации и порядковый номер сегмента (из имени файла) или None"""
+    name = path.name
+    if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+        return None
+    stamp, _, counter = name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)].partition(".")
+    try:
+        return datetime.strptime(stamp, SEGMENT_TIME_FORMAT).timestamp(), int(counter or 0)
+    except ValueError:
+        return None
+
+
+def list_segments(directory: Path) -> List[Path]:
+    """
+    Сегменты хранилища в хронологическом порядке (активный сегмент последним)
+
+    Args:
+        directory: Директория хранилища
+
+    Returns:
+        Пути к файлам сегментов
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    keyed = [
+        (key, path)
+        for path in directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+        for key in [_segment_key(path)]
+        if key is not None
+    ]
+    segments = [path for _, path in sorted(keyed)]
+    active = directory / ACTIVE_SEGMENT
+    if active.exists():
+        segments.append(active)
+    return segments
+
+
+def iter_events(
+    directory: Path,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    types: Optional[Iterable[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковое чтение событий хранилища
+
+    Сегменты, ротированные раньше since, пропускаются без чтения. Поврежденные
+    строки (например, недописанная строка после аварийного завершения) пропускаются.
+
+    Args:
+        directory: Директория хранилища
+        since: Начало интервала (timestamp), включительно
+        until: Конец интервала (timestamp), не включительно
+        types: Типы событий для выборки (None - все)
+
+    Yields:
+        События в порядке записи
+    """
+    wanted = set(types) if types else None
+    for path in list_segments(directory):
+        key = _segment_key(path)
+        if since is not None and key is not None and key[0] + 1 < since:
+            continue
+        opener = gzip.open if path.suffix == ".gz" else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(event, dict):
+                        continue
+                    if wanted is not None and event.get("type") not in wanted:
+                        continue
+                    ts = event.get("ts") or 0
+                    if since is not None and ts < since:
+                        continue
+                    if until is not None and ts >= until:
+                        continue
+                    yield event
+        except (OSError, EOFError) as e:
+            logger.warning(f"Не удалось прочитать сегмент событий {path}: {e}")
+
+
+class EventStore:
+    """Запись событий шины в JSONL сегменты с ротацией"""
+
+    def __init__(
+        self,
+        directory: Path,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+        exclude_types: Iterable[str] = DEFAULT_EXCLUDE_TYPES,
+        run_id: Optional[str] = None,
+    ):
+        """
+        Инициализация хранилища
+
+        Args:
+            directory: Директория хранилища
+            max_segment_bytes: Размер активного сегмента, после которого он сжимается
+            max_segments: Максимальное количество сжатых сегментов
+            exclude_types: Типы событий, которые не записываются
+            run_id: Идентификатор запуска сервера (по умолчанию генерируется)
+        """
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.exclude_types = set(exclude_types)
+        self.run_id = run_id or (
+            f"{datetime.now().strftime(SEGMENT_TIME_FORMAT)}-{uuid.uuid4().hex[:6]}"
+        )
+        self._file = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self._subscription = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def active_path(self) -> Path:
+        return self.directory / ACTIVE_SEGMENT
+
+    def _open(self) -> None:
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.active_path, "a", encoding="utf-8")
+            self._size = self._file.tell()
+
+    def write(self, events: Iterable[Dict[str, Any]]) -> int:
+        """
+        Записать события шины (один flush на вызов)
+
+        Args:
+            events: События в формате EventBus.publish
+
+        Returns:
+            Количество записанных событий
+        """
+        written = 0
+        with self._lock:
+            for event in events:
+                if event.get("type") in self.exclude_types:
+                    continue
+                record = {
+                    "v": SCHEMA_VERSION,
+                    "ts": event.get("timestamp", time.time()),
+                    "run": self.run_id,
+                    "type": event.get("type"),
+                    "data": event.get("data", {}),
+                }
+                line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                self._open()
+                self._file.write(line)
+                self._size += len(line.encode("utf-8"))
+                written += 1
+                if self._size >= self.max_segment_bytes:
+                    self._rotate()
+            if self._file is not None:
+                self._file.flush()
+        return written
+
+    def _rotate(self) -> None:
+        """Сжать активный сегмент и удалить лишние старые сегменты"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._size = 0
+        if not self.active_path.exists() or self.active_path.stat().st_size == 0:
+            return
+
+        stamp = datetime.now().strftime(SEGMENT_TIME_FORMAT)
+        # Несколько ротаций в одну секунду нумеруются по возрастанию
+        counters = [
+            key[1]
+            for path in self.directory.glob(f"{SEGMENT_PREFIX}{stamp}*{SEGMENT_SUFFIX}")
+            for key in [_segment_key(path)]
+            if key is not None
+        ]
+        suffix = f".{max(counters) + 1}" if counters else ""
+        target = self.directory / f"{SEGMENT_PREFIX}{stamp}{suffix}{SEGMENT_SUFFIX}"
+        # Сжимаем во временный файл: при сбое не остается обрезанного .gz сегмента
+        tmp_path = target.with_name(target.name + ".tmp")
+        with open(self.active_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, target)
+        self.active_path.unlink()
+
+        segments = [path for path in list_segments(self.directory) if path != self.active_path]
+        for old in segments[: max(0, len(segments) - self.max_segments)]:
+            try:
+                old.unlink()
+            except OSError as e:
+                logger.warning(f"Не удалось удалить старый сегмент событий {old}: {e}")
+
+    def rotate(self) -> None:
+        """Принудительно завершить активный сегмент"""
+        with self._lock:
+            self._rotate()
+
+    def attach(self, bus: Optional[EventBus] = None) -> "EventStore":
+        """
+        Подписаться на шину и запустить фоновую запись
+
+        Args:
+            bus: Шина событий (по умолчанию глобальная)
+
+        Returns:
+            Хранилище
+        """
+        if self._thread is not None:
+            return self
+        bus = bus or get_event_bus()
+        self._subscription = bus.subscribe(max_queue_size=10000)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-store", daemon=True)
+        self._thread.start()
+        return self
+
+    def _drain(self, first: Optional[Dict[str, Any]]) -> None:
+        batch = [first] if first is not None else []
+        while len(batch) < 1000:
+            event = self._subscription.get(timeout=0)
+            if event is None:
+                break
+            batch.append(event)
+        if batch:
+            try:
+                self.write(batch)
+            except OSError as e:
+                logger.warning(f"Ошибка записи событий в хранилище: {e}")
+
+    def _run(self) -> None:
+        dropped = 0
+        while not self._stop.is_set():
+            self._drain(self._subscription.get(timeout=0.5))
+            if self._subscription.dropped != dropped:
+                logger.warning(
+                    f"Хранилище событий не успевает за шиной: пропущено "
+                    f"{self._subscription.dropped - dropped} событий"
+                )
+                dropped = self._subscription.dropped
+        self._drain(None)
+
+    def close(self) -> None:
+        """Дописать очередь, отписаться от шины и закрыть активный сегмент"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_event_store: Optional[EventStore] = None
+
+
+def configure_event_store(
+    store_config: Optional[Dict[str, Any]], base_dir: Path
+) -> Optional[EventStore]:
+    """
+    Настроить глобальное хранилище событий по секции event_store конфигурации
+
+    Повторный вызов (перезапуск сервера в том же процессе) с той же директорией
+    оставляет работающее хранилище.
+
+    Args:
+        store_config: Секция конфигурации (enabled, directory, max_segment_mb, max_segments,
+            exclude_types)
+        base_dir: Базовая директория для относительного пути
+
+    Returns:
+        Хранилище или None если оно отключено
+    """
+    global _event_store
+    config = store_config or {}
+    if not config.get("enabled", True):
+        stop_event_store()
+        return None
+
+    directory = Path(config.get("directory", DEFAULT_DIRECTORY))
+    if not directory.is_absolute():
+        directory = Path(base_dir) / directory
+    if _event_store is not None and _event_store.directory == directory:
+        return _event_store
+    stop_event_store()
+
+    _event_store = EventStore(
+        directory,
+        max_segment_bytes=int(float(config.get("max_segment_mb", 20)) * 1024 * 1024),
+        max_segments=int(config.get("max_segments", DEFAULT_MAX_SEGMENTS)),
+        exclude_types=config.get("exclude_types", DEFAULT_EXCLUDE_TYPES),
+    ).attach()
+    logger.info(f"Хранилище событий: {directory} (запуск {_event_store.run_id})")
+    return _event_store
+
+
+def stop_event_store() -> None:
+    """Остановить глобальное хранилище событий"""
+    global _event_store
+    if _event_store is not None:
+        _event_store.close()
+        _event_store = None
+
+
+atexit.register(lambda: stop_event_store())
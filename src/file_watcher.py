@@ -0,0 +1,384 @@
+"""
+Отслеживание изменений исходников для автоперезапуска
+
+При старте снимается только компактная сигнатура (inode, size, mtime_ns)
+каждого отслеживаемого файла, поэтому сканирование больших репозиториев не
+читает файлы. Базовые хеши содержимого считаются в фоновом потоке после старта
+(start_hashing); повторные события без реальных изменений отбрасываются по
+stat(), а перезапись тем же содержимым - по хешу. Изменение сигнатуры файла,
+для которого базовый хеш еще не посчитан, считается реальным изменением.
+
+Игнорируемые пути задаются паттернами в стиле .gitignore, которые
+компилируются в регулярные выражения один раз. События файловой системы
+объединяются Debouncer'ом: серия изменений обрабатывается одним вызовом.
+"""
+
+import fnmatch
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (inode, size, mtime_ns)
+FileSignature = Tuple[int, int, int]
+
+# Паттерны в стиле .gitignore:
+# - "name/" - директория с таким именем на любом уровне
+# - "a/b" (со слешем) - путь относительно корня отслеживания
+# - "*.ext", "test_*" - имя файла или директории на любом уровне
+DEFAULT_IGNORE_PATTERNS = (
+    "__pycache__/",
+    ".git/",
+    ".venv/",
+    "venv/",
+    "env/",
+    "node_modules/",
+    "test/",
+    "tests/",
+    "examples/",
+    "docs/",
+    "logs/",
+    ".vscode/",
+    ".idea/",
+    ".cursor/",
+    "test_*",
+    "*.pyc",
+    "*.pyo",
+    "*.tmp",
+    "*.swp",
+    "*.swo",
+    "*.bak",
+    "*.orig",
+    "*.rej",
+    "~$*",
+)
+
+
+def _compile(globs: List[str], flags: int) -> Optional["re.Pattern[str]"]:
+    """Объединить glob паттерны в одно регулярное выражение"""
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(glob)})" for glob in globs), flags)
+
+
+class PathMatcher:
+    """Предкомпилированный набор паттернов игнорирования (стиль .gitignore)"""
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS):
+        """
+        Инициализация матчера
+
+        Args:
+            patterns: Паттерны игнорирования
+        """
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        name_globs: List[str] = []
+        dir_globs: List[str] = []
+        path_globs: List[str] = []
+        for pattern in patterns:
+            pattern = pattern.strip().replace("\\", "/")
+            if not pattern or pattern.startswith("#"):
+                continue
+            if pattern.endswith("/"):
+                dir_globs.append(pattern.rstrip("/"))
+            elif "/" in pattern:
+                path_globs.append(pattern.lstrip("/"))
+            else:
+                name_globs.append(pattern)
+        self._name_re = _compile(name_globs, flags)
+        self._dir_re = _compile(dir_globs, flags)
+        self._path_re = _compile(path_globs, flags)
+
+    def matches_dir(self, rel_path: str) -> bool:
+        """
+        Проверить, игнорируется ли директория (для отсечения обхода)
+
+        Args:
+            rel_path: Путь директории относительно корня (через "/")
+        """
+        name = rel_path.rsplit("/", 1)[-1]
+        if self._dir_re is not None and self._dir_re.match(name):
+            return True
+        if self._name_re is not None and self._name_re.match(name):
+            return True
+        return self._path_re is not None and bool(self._path_re.match(rel_path))
+
+    def matches(self, rel_path: str) -> bool:
+        """
+        Проверить, игнорируется ли файл
+
+        Args:
+            rel_path: Путь файла относительно корня (через "/")
+
+        Returns:
+            True если файл или одна из его директорий попадает под паттерн
+        """
+        parts = rel_path.split("/")
+        for index in range(len(parts) - 1):
+            if self.matches_dir("/".join(parts[: index + 1])):
+                return True
+        if self._name_re is not None and self._name_re.match(parts[-1]):
+            return True
+        return self._path_re is not None and bool(self._path_re.match(rel_path))
+
+
+def _signature(path: str) -> Optional[FileSignature]:
+    """Получить сигнатуру файла (None если файла нет)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _content_hash(path: str) -> Optional[str]:
+    """Хеш содержимого файла"""
+    md5 = hashlib.md5()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                md5.update(chunk)
+    except OSError:
+        return None
+    return md5.hexdigest()
+
+
+class ChangeDetector:
+    """
+    Определение реальных изменений файлов по сигнатурам
+
+    Сканирование снимает только сигнатуры. Базовые хеши содержимого считаются
+    отдельно (hash_baseline / start_hashing) и пересчитываются при изменении
+    сигнатуры: перезапись файла тем же содержимым отбрасывается.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[str],
+        matcher: Optional[PathMatcher] = None,
+        suffixes: Tuple[str, ...] = (".py",),
+    ):
+        """
+        Инициализация детектора
+
+        Args:
+            roots: Корневые директории отслеживания
+            matcher: Паттерны игнорирования
+            suffixes: Расширения отслеживаемых файлов
+        """
+        self.roots = [os.path.abspath(str(root)) for root in roots]
+        self.matcher = matcher or PathMatcher()
+        self.suffixes = suffixes
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, FileSignature] = {}
+        self._hashes: Dict[str, str] = {}
+        self._hashing: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def relative_path(self, path: str) -> Optional[str]:
+        """
+        Путь относительно корня отслеживания
+
+        Returns:
+            Относительный путь через "/" или None если файл вне корней
+        """
+        path = os.path.abspath(path)
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return os.path.relpath(path, root).replace(os.sep, "/")
+        return None
+
+    def is_tracked(self, path: str) -> bool:
+        """Проверить, отслеживается ли файл (расширение, корень, игнорирование)"""
+        if not path.endswith(self.suffixes):
+            return False
+        rel_path = self.relative_path(path)
+        return rel_path is not None and not self.matcher.matches(rel_path)
+
+    def scan(self) -> int:
+        """
+        Построить карту сигнатур (без чтения файлов)
+
+        Хеши файлов с прежней сигнатурой сохраняются при повторном сканировании.
+
+        Returns:
+            Количество отслеживаемых файлов
+        """
+        signatures: Dict[str, FileSignature] = {}
+        hashes: Dict[str, str] = {}
+        with self._lock:
+            previous_signatures, previous_hashes = dict(self._signatures), dict(self._hashes)
+        for root in self.roots:
+            stack = [(root, "")]
+            while stack:
+                directory, rel_dir = stack.pop()
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError as e:
+                    logger.debug(f"Не удалось прочитать директорию {directory}: {e}")
+                    continue
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.matcher.matches_dir(rel_path):
+                                stack.append((entry.path, rel_path))
+                            continue
+                        if not entry.name.endswith(self.suffixes):
+                            continue
+                        if self.matcher.matches(rel_path):
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                    signatures[entry.path] = signature
+                    if previous_signatures.get(entry.path) == signature:
+                        if entry.path in previous_hashes:
+                            hashes[entry.path] = previous_hashes[entry.path]
+        with self._lock:
+            self._signatures = signatures
+            self._hashes = hashes
+        return len(signatures)
+
+    def hash_baseline(self) -> int:
+        """
+        Посчитать базовые хеши файлов, для которых их еще нет
+
+        Хеш сохраняется, только если сигнатура файла не менялась с момента
+        сканирования: иначе изменение уже обработано check() или еще придет.
+
+        Returns:
+            Количество посчитанных хешей
+        """
+        with self._lock:
+            pending = [
+                (path, signature)
+                for path, signature in self._signatures.items()
+                if path not in self._hashes
+            ]
+        hashed = 0
+        for path, signature in pending:
+            content_hash = _content_hash(path)
+            if content_hash is None or _signature(path) != signature:
+                continue
+            with self._lock:
+                if self._signatures.get(path) == signature and path not in self._hashes:
+                    self._hashes[path] = content_hash
+                    hashed += 1
+        return hashed
+
+    def start_hashing(self) -> None:
+        """Посчитать базовые хеши в фоновом потоке (не задерживает старт)"""
+        if self._hashing is not None and self._hashing.is_alive():
+            return
+
+        def run() -> None:
+            start = time.monotonic()
+            hashed = self.hash_baseline()
+            logger.debug(
+                f"Базовые хеши отслеживаемых файлов: {hashed} за {time.monotonic() - start:.3f}с"
+            )
+
+        self._hashing = threading.Thread(target=run, name="codeagent-file-hashes", daemon=True)
+        self._hashing.start()
+
+    def check(self, path: str) -> bool:
+        """
+        Проверить, изменилось ли содержимое файла
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            True если файл новый, его содержимое изменилось или базовый хеш
+            еще не посчитан
+        """
+        path = os.path.abspath(path)
+        signature = _signature(path)
+        with self._lock:
+            previous = self._signatures.get(path)
+            if signature is None:
+                # Удаленный или временный файл - перезапуск не нужен
+                self._signatures.pop(path, None)
+                self._hashes.pop(path, None)
+                return False
+            if signature == previous:
+                return False
+            self._signatures[path] = signature
+
+        content_hash = _content_hash(path)
+        if content_hash is None:
+            return False
+        with self._lock:
+            previous_hash = self._hashes.get(path)
+            self._hashes[path] = content_hash
+        # Без базового хеша сравнить не с чем - изменение считается реальным
+        return previous_hash != content_hash
+
+
+class Debouncer:
+    """
+    Объединение серии событий в один вызов
+
+    Каждое событие сдвигает срок срабатывания; после паузы длиной delay
+    обработчик получает множество всех накопленных элементов. На всю серию
+    используется один поток.
+    """
+
+    def __init__(self, delay: float, callback: Callable[[Set[str]], None]):
+        """
+        Инициализация
+
+        Args:
+            delay: Пауза без событий перед вызовом обработчика (секунды)
+            callback: Обработчик накопленных элементов
+        """
+        self.delay = delay
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._deadline = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, item: str) -> None:
+        """Добавить элемент и отложить срабатывание"""
+        with self._lock:
+            self._pending.add(item)
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="FileWatcher-Debounce"
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    items, self._pending = self._pending, set()
+                    self._thread = None
+                    break
+            time.sleep(remaining)
+        if not items:
+            return
+        try:
+            self.callback(items)
+        except Exception as e:
+            logger.warning(f"Ошибка обработки изменений файлов: {e}", exc_info=True)
+
+    def flush(self) -> None:
+        """Немедленно обработать накопленные элементы"""
+        with self._lock:
+            items, self._pending = self._pending, set()
+            self._deadline = 0.0
+        if items:
+            self.callback(items)
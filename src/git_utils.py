@@ -5,11 +5,16 @@
 без использования Cursor CLI.
 """
 
+import atexit
 import subprocess
 import logging
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple, List
 
+from .tracing import get_tracer
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,7 +26,8 @@ class GitError(Exception):
 def execute_git_command(
     command: List[str],
     working_dir: Optional[Path] = None,
-    timeout: int = 30
+    timeout: int = 30,
+    env: Optional[Dict[str, str]] = None
 ) -> Tuple[bool, str, str]:
     """
     Выполнить git команду
@@ -30,10 +36,24 @@ def execute_git_command(
         command: Список аргументов команды (первый элемент - 'git')
         working_dir: Рабочая директория (если None - текущая)
         timeout: Таймаут выполнения (секунды)
+        env: Окружение процесса (если None - окружение сервера)
     
     Returns:
         Кортеж (success, stdout, stderr)
     """
+    with get_tracer().start_as_current_span("git", {"git.command": " ".join(command[:2])}) as span:
+        success, stdout, stderr = _run_git_command(command, working_dir, timeout, env)
+        span.set_status(success, stderr if not success else "")
+        return success, stdout, stderr
+
+
+def _run_git_command(
+    command: List[str],
+    working_dir: Optional[Path],
+    timeout: int,
+    env: Optional[Dict[str, str]] = None
+) -> Tuple[bool, str, str]:
+    """Запустить git процесс (см. execute_git_command)"""
     try:
         result = subprocess.run(
             command,
@@ -41,6 +61,7 @@ def execute_git_command(
             capture_output=True,
             text=True,
             timeout=timeout,
+            env=env,
             encoding='utf-8',
             errors='replace'
         )
@@ -59,6 +80,298 @@ def execute_git_command(
         return False, "", str(e)
 
 
+@dataclass
+class GitStatus:
+    """Снимок состояния репозитория (git status --porcelain=v2 --branch)"""
+
+    branch: Optional[str]  # None для detached HEAD
+    head: Optional[str]  # None до первого коммита
+    upstream: Optional[str] = None
+    ahead: int = 0
+    behind: int = 0
+    changes: List[str] = field(default_factory=list)  # Строки изменений porcelain v2
+
+    @property
+    def dirty(self) -> bool:
+        """Есть ли незакоммиченные изменения (включая неотслеживаемые файлы)"""
+        return bool(self.changes)
+
+
+def parse_porcelain_v2(output: str) -> GitStatus:
+    """
+    Разобрать вывод git status --porcelain=v2 --branch
+
+    Args:
+        output: Вывод команды
+
+    Returns:
+        Снимок состояния
+    """
+    status = GitStatus(branch=None, head=None)
+    for line in output.splitlines():
+        if line.startswith("# branch.oid "):
+            oid = line[len("# branch.oid "):].strip()
+            status.head = None if oid == "(initial)" else oid
+        elif line.startswith("# branch.head "):
+            head = line[len("# branch.head "):].strip()
+            status.branch = None if head == "(detached)" else head
+        elif line.startswith("# branch.upstream "):
+            status.upstream = line[len("# branch.upstream "):].strip()
+        elif line.startswith("# branch.ab "):
+            for part in line[len("# branch.ab "):].split():
+                if part.startswith("+"):
+                    status.ahead = int(part[1:])
+                elif part.startswith("-"):
+                    status.behind = int(part[1:])
+        elif line and line[0] in "12u?":
+            status.changes.append(line)
+    return status
+
+
+class GitRepo:
+    """
+    Долгоживущий помощник для одного репозитория
+
+    Ветка, HEAD, ahead/behind относительно upstream и список изменений
+    получаются одним вызовом git status --porcelain=v2 --branch. Снимок
+    кешируется, пока не меняются HEAD, индекс и ссылки ветки/upstream
+    (сравниваются mtime и размер файлов в .git), поэтому повторные запросы в
+    рамках задачи не порождают процессов. Изменения рабочих файлов без
+    изменения индекса кеш не замечает: для проверки "грязного" состояния
+    используйте status(refresh=True).
+
+    Объекты (информация о коммите, проверка существования) читаются через
+    один постоянный процесс git cat-file --batch.
+    """
+
+    _instances: Dict[str, "GitRepo"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, working_dir: Optional[Path] = None):
+        """
+        Инициализация
+
+        Args:
+            working_dir: Рабочая директория (если None - текущая)
+        """
+        self.working_dir = Path(working_dir) if working_dir else Path.cwd()
+        self._git_dir: Optional[Path] = None
+        self._common_dir: Optional[Path] = None
+        self._status: Optional[GitStatus] = None
+        self._status_signature: Optional[Tuple[Any, ...]] = None
+        self._lock = threading.Lock()
+        self._cat_file: Optional[subprocess.Popen] = None
+        self._cat_file_lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, working_dir: Optional[Path] = None) -> "GitRepo":
+        """
+        Общий экземпляр для директории (кеш и процесс cat-file переиспользуются)
+
+        Args:
+            working_dir: Рабочая директория (если None - текущая)
+
+        Returns:
+            Экземпляр GitRepo
+        """
+        key = str(Path(working_dir).resolve() if working_dir else Path.cwd().resolve())
+        with cls._instances_lock:
+            repo = cls._instances.get(key)
+            if repo is None:
+                repo = cls._instances[key] = cls(Path(key))
+            return repo
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Закрыть процессы всех экземпляров"""
+        with cls._instances_lock:
+            repos = list(cls._instances.values())
+            cls._instances.clear()
+        for repo in repos:
+            repo.close()
+
+    def _find_git_dir(self) -> Optional[Path]:
+        """Найти директорию .git (поддерживаются worktree с файлом .git)"""
+        if self._git_dir is not None:
+            return self._git_dir
+        for directory in (self.working_dir, *self.working_dir.parents):
+            candidate = directory / ".git"
+            if candidate.is_dir():
+                self._git_dir = candidate
+            elif candidate.is_file():
+                try:
+                    content = candidate.read_text(encoding="utf-8").strip()
+                except OSError:
+                    return None
+                if content.startswith("gitdir:"):
+                    git_dir = Path(content[len("gitdir:"):].strip())
+                    self._git_dir = git_dir if git_dir.is_absolute() else directory / git_dir
+            if self._git_dir is not None:
+                commondir = self._git_dir / "commondir"
+                self._common_dir = self._git_dir
+                if commondir.is_file():
+                    common = Path(commondir.read_text(encoding="utf-8").strip())
+                    self._common_dir = common if common.is_absolute() else self._git_dir / common
+                return self._git_dir
+        return None
+
+    @property
+    def git_dir(self) -> Optional[Path]:
+        """Директория .git рабочего дерева (None вне репозитория)"""
+        return self._find_git_dir()
+
+    def _signature(self) -> Optional[Tuple[Any, ...]]:
+        """Сигнатура HEAD, индекса и ссылок ветки/upstream для проверки кеша"""
+        git_dir = self._find_git_dir()
+        if git_dir is None:
+            return None
+        common_dir = self._common_dir or git_dir
+        paths = [git_dir / "HEAD", git_dir / "index", common_dir / "packed-refs"]
+        try:
+            head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if head.startswith("ref:"):
+            paths.append(common_dir / head[len("ref:"):].strip())
+        upstream = self._status.upstream if self._status else None
+        if upstream:
+            paths.append(common_dir / "refs" / "remotes" / upstream)
+
+        signature: List[Any] = [head]
+        for path in paths:
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def status(self, refresh: bool = False) -> Optional[GitStatus]:
+        """
+        Состояние репозитория
+
+        Args:
+            refresh: Всегда выполнить git status (нужно для актуального dirty)
+
+        Returns:
+            Снимок состояния или None при ошибке (например, не git репозиторий)
+        """
+        with self._lock:
+            signature = self._signature()
+            if (
+                not refresh
+                and self._status is not None
+                and signature is not None
+                and signature == self._status_signature
+            ):
+                return self._status
+
+            success, stdout, stderr = execute_git_command(
+                ["git", "status", "--porcelain=v2", "--branch"],
+                working_dir=self.working_dir,
+            )
+            if not success:
+                logger.warning(f"Не удалось получить статус git: {stderr}")
+                return None
+            self._status = parse_porcelain_v2(stdout)
+            # git status может обновить индекс: сигнатура берется после вызова
+            self._status_signature = self._signature()
+            return self._status
+
+    def has_remote(self, remote: str) -> bool:
+        """Проверить наличие remote в конфигурации репозитория (без запуска git)"""
+        self._find_git_dir()
+        config = (self._common_dir or self.working_dir / ".git") / "config"
+        try:
+            content = config.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return False
+        return f'[remote "{remote}"]' in content
+
+    def _read_object(self, rev: str) -> Optional[Tuple[str, str, bytes]]:
+        """
+        Прочитать объект через постоянный git cat-file --batch
+
+        Args:
+            rev: Ревизия или hash объекта
+
+        Returns:
+            Кортеж (oid, тип, содержимое) или None если объект не найден
+        """
+        if not rev or any(char.isspace() for char in rev):
+            return None
+        with self._cat_file_lock:
+            for attempt in range(2):
+                process = self._cat_file
+                if process is None or process.poll() is not None:
+                    process = self._cat_file = subprocess.Popen(
+                        ["git", "cat-file", "--batch"],
+                        cwd=str(self.working_dir),
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL,
+                    )
+                try:
+                    process.stdin.write(rev.encode("utf-8") + b"\n")
+                    process.stdin.flush()
+                    header = process.stdout.readline().decode("utf-8", errors="replace").split()
+                    if len(header) == 2 and header[1] in ("missing", "ambiguous"):
+                        return None
+                    if len(header) != 3:
+                        raise OSError(f"Неожиданный ответ git cat-file: {header}")
+                    content = process.stdout.read(int(header[2]) + 1)[:-1]
+                    return header[0], header[1], content
+                except (OSError, ValueError) as e:
+                    # Процесс завершился (например, репозиторий удален) - перезапускаем один раз
+                    self._stop_cat_file()
+                    if attempt:
+                        logger.warning(f"Ошибка чтения объекта git {rev}: {e}")
+        return None
+
+    def commit_info(self, rev: str = "HEAD") -> Optional[Dict[str, str]]:
+        """
+        Информация о коммите
+
+        Args:
+            rev: Ревизия (по умолчанию HEAD)
+
+        Returns:
+            Словарь hash_full, hash_short, message или None
+        """
+        obj = self._read_object(rev)
+        if obj is None or obj[1] != "commit":
+            return None
+        oid, _, content = obj
+        _, _, body = content.decode("utf-8", errors="replace").partition("\n\n")
+        return {
+            "hash_full": oid,
+            "hash_short": oid[:7],
+            "message": body.split("\n", 1)[0].strip(),
+        }
+
+    def object_exists(self, rev: str) -> bool:
+        """Проверить существование объекта (коммита)"""
+        return self._read_object(rev) is not None
+
+    def _stop_cat_file(self) -> None:
+        process, self._cat_file = self._cat_file, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=2)
+        except Exception:
+            process.kill()
+
+    def close(self) -> None:
+        """Завершить процесс git cat-file"""
+        with self._cat_file_lock:
+            self._stop_cat_file()
+
+
+atexit.register(GitRepo.close_all)
+
+
 def get_current_branch(working_dir: Optional[Path] = None) -> Optional[str]:
     """
     Получить текущую ветку
@@ -69,15 +382,12 @@ def get_current_branch(working_dir: Optional[Path] = None) -> Optional[str]:
     Returns:
         Название текущей ветки или None при ошибке
     """
-    success, stdout, stderr = execute_git_command(
-        ["git", "branch", "--show-current"],
-        working_dir=working_dir
-    )
+    status = GitRepo.for_path(working_dir).status()
     
-    if success and stdout:
-        return stdout.strip()
+    if status and status.branch:
+        return status.branch
     else:
-        logger.warning(f"Не удалось получить текущую ветку: {stderr}")
+        logger.warning("Не удалось получить текущую ветку (detached HEAD или ошибка git)")
         return None
 
 
@@ -91,30 +401,10 @@ def get_last_commit_info(working_dir: Optional[Path] = None) -> Optional[Dict[st
     Returns:
         Словарь с информацией о коммите или None при ошибке
     """
-    # Получаем полный hash
-    success_full, hash_full, _ = execute_git_command(
-        ["git", "log", "-1", "--format=%H"],
-        working_dir=working_dir
-    )
-    
-    # Получаем короткий hash
-    success_short, hash_short, _ = execute_git_command(
-        ["git", "log", "-1", "--format=%h"],
-        working_dir=working_dir
-    )
-    
-    # Получаем сообщение коммита
-    success_msg, commit_msg, _ = execute_git_command(
-        ["git", "log", "-1", "--format=%s"],
-        working_dir=working_dir
-    )
+    commit_info = GitRepo.for_path(working_dir).commit_info("HEAD")
     
-    if success_full and success_short and success_msg:
-        return {
-            "hash_full": hash_full.strip(),
-            "hash_short": hash_short.strip(),
-            "message": commit_msg.strip()
-        }
+    if commit_info:
+        return commit_info
     else:
         logger.warning("Не удалось получить информацию о последнем коммите")
         return None
@@ -131,12 +421,7 @@ def check_commit_exists(commit_hash: str, working_dir: Optional[Path] = None) ->
     Returns:
         True если коммит существует
     """
-    success, stdout, _ = execute_git_command(
-        ["git", "cat-file", "-e", commit_hash],
-        working_dir=working_dir
-    )
-    
-    return success
+    return GitRepo.for_path(working_dir).object_exists(commit_hash)
 
 
 def check_uncommitted_changes(working_dir: Optional[Path] = None) -> bool:
@@ -149,13 +434,10 @@ def check_uncommitted_changes(working_dir: Optional[Path] = None) -> bool:
     Returns:
         True если есть незакоммиченные изменения
     """
-    success, stdout, _ = execute_git_command(
-        ["git", "status", "--short"],
-        working_dir=working_dir
-    )
+    status = GitRepo.for_path(working_dir).status(refresh=True)
     
-    if success:
-        return bool(stdout.strip())
+    if status:
+        return status.dirty
     else:
         logger.warning("Не удалось проверить статус git")
         return False
@@ -172,12 +454,22 @@ def check_unpushed_commits(working_dir: Optional[Path] = None, branch: Optional[
     Returns:
         True если есть неотправленные коммиты
     """
+    repo = GitRepo.for_path(working_dir)
+    status = repo.status()
     if not branch:
-        branch = get_current_branch(working_dir)
+        branch = status.branch if status else None
         if not branch:
             logger.warning("Не удалось определить текущую ветку для проверки неотправленных коммитов")
             return False
     
+    if status and status.branch == branch:
+        # Текущая ветка: ahead/behind уже известны из git status
+        if status.upstream:
+            return status.ahead > 0
+        if not repo.has_remote("origin"):
+            # Отправлять некуда
+            return False
+    
     # Проверяем разницу между локальной и удаленной веткой
     success, stdout, _ = execute_git_command(
         ["git", "log", f"origin/{branch}..{branch}", "--oneline"],
@@ -244,6 +536,9 @@ def auto_push_after_commit(
     2. Наличие неотправленных коммитов
     3. Выполняет push
     
+    Ветка, HEAD и ahead/behind берутся из одного git status (GitRepo),
+    информация о коммите - из постоянного процесса git cat-file.
+    
     Args:
         working_dir: Рабочая директория
         remote: Название remote
@@ -279,11 +574,6 @@ def auto_push_after_commit(
         
         result["commit_info"] = commit_info
         
-        # Проверяем существование коммита
-        if not check_commit_exists(commit_info["hash_full"], working_dir):
-            result["error"] = f"Коммит {commit_info['hash_full']} не существует"
-            return result
-        
         # Проверяем наличие неотправленных коммитов
         has_unpushed = check_unpushed_commits(working_dir, branch)
         if not has_unpushed:
@@ -0,0 +1,307 @@
+"""
+Горячая перезагрузка сервера без перезапуска процесса
+
+При изменении .py файлов перезагружаются только измененные модули и модули,
+которые на них ссылаются (importlib.reload в порядке зависимостей). Новый
+экземпляр сервера перенимает у старого "теплые" ресурсы через ServerHandoff:
+запущенный HTTP сервер (сокет не переоткрывается), file watcher с картой
+сигнатур и интерфейсы агентов (контейнеры не перезапускаются). Состояние
+задач передается через checkpoint, как и при полном перезапуске.
+
+Если новый код падает при импорте, уже перезагруженные модули возвращаются
+к прежнему состоянию: процесс не остается со смесью старых и новых модулей.
+
+Модуль не перезагружается сам (см. NO_RELOAD), поэтому класс
+ServerReloadException сохраняет идентичность между перезагрузками.
+"""
+
+import ast
+import importlib
+import importlib.util
+import logging
+import sys
+import types
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Модули, которые никогда не перезагружаются
+NO_RELOAD = {__name__}
+
+
+class ServerReloadException(Exception):
+    """Исключение для инициации перезапуска сервера"""
+
+    pass
+
+
+class ServerHandoff:
+    """Теплые ресурсы, передаваемые новому экземпляру сервера"""
+
+    def __init__(
+        self,
+        http_server: Any = None,
+        http_thread: Any = None,
+        file_observer: Any = None,
+        file_handler: Any = None,
+        interfaces: Optional[Dict[str, Any]] = None,
+        changed_files: Optional[Iterable[str]] = None,
+    ):
+        """
+        Инициализация
+
+        Args:
+            http_server: Запущенный werkzeug сервер
+            http_thread: Поток HTTP сервера
+            file_observer: Запущенный watchdog observer
+            file_handler: Обработчик событий observer (с картой сигнатур)
+            interfaces: Интерфейсы агентов по имени атрибута сервера
+            changed_files: Измененные файлы, вызвавшие перезагрузку
+        """
+        self.http_server = http_server
+        self.http_thread = http_thread
+        self.file_observer = file_observer
+        self.file_handler = file_handler
+        self.interfaces: Dict[str, Any] = dict(interfaces or {})
+        self.changed_files: Set[str] = set(changed_files or ())
+        # Заполняется после перезагрузки модулей
+        self.reloaded_modules: Set[str] = set()
+
+    def is_stale(self, obj: Any) -> bool:
+        """Проверить, определен ли класс объекта в перезагруженном модуле"""
+        return type(obj).__module__ in self.reloaded_modules
+
+    def take_interface(self, name: str) -> Any:
+        """
+        Забрать интерфейс агента, если его код не менялся
+
+        Args:
+            name: Имя атрибута сервера (например, cursor_cli)
+
+        Returns:
+            Интерфейс или None (нет интерфейса или модуль перезагружен)
+        """
+        interface = self.interfaces.pop(name, None)
+        if interface is None or self.is_stale(interface):
+            return None
+        logger.info(f"Горячая перезагрузка: интерфейс {name} перенят без повторной инициализации")
+        return interface
+
+    def stop_file_watcher(self) -> None:
+        """Остановить непринятый file watcher"""
+        if self.file_observer is not None:
+            try:
+                self.file_observer.stop()
+                self.file_observer.join(timeout=2)
+            except Exception as e:
+                logger.warning(f"Ошибка при остановке file watcher: {e}")
+        self.file_observer = None
+        self.file_handler = None
+
+    def close(self) -> None:
+        """Освободить ресурсы, которые не были переняты"""
+        self.stop_file_watcher()
+        if self.http_server is not None:
+            try:
+                self.http_server.shutdown()
+                self.http_server.server_close()
+            except Exception as e:
+                logger.warning(f"Ошибка при остановке HTTP сервера: {e}")
+            self.http_server = None
+
+
+def module_name_for_path(path: str, package_dir: Path) -> Optional[str]:
+    """
+    Имя модуля для файла пакета
+
+    Args:
+        path: Путь к .py файлу
+        package_dir: Директория пакета (src)
+
+    Returns:
+        Имя модуля (src.llm.llm_manager) или None если файл вне пакета
+    """
+    file_path = Path(path).resolve()
+    package_dir = package_dir.resolve()
+    try:
+        relative = file_path.relative_to(package_dir.parent)
+    except ValueError:
+        return None
+    if file_path.suffix != ".py":
+        return None
+    parts = list(relative.with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts) or None
+
+
+def _top_level_imports(tree: ast.Module) -> Iterator[ast.stmt]:
+    """Операторы импорта уровня модуля (включая try/if, без тел функций и классов)"""
+    stack = list(tree.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+        elif isinstance(node, (ast.If, ast.Try, ast.With)):
+            for field in ("body", "orelse", "finalbody", "handlers"):
+                stack.extend(getattr(node, field, []))
+        elif isinstance(node, ast.ExceptHandler):
+            stack.extend(node.body)
+
+
+def _module_dependencies(module: types.ModuleType, candidates: Set[str]) -> Set[str]:
+    """
+    Модули из candidates, которые импортируются на уровне модуля
+
+    Импорты внутри функций не учитываются: они выполняются при вызове и
+    получают уже перезагруженный модуль из sys.modules.
+    """
+    origin = getattr(getattr(module, "__spec__", None), "origin", None)
+    if not origin or not origin.endswith(".py"):
+        return set()
+    try:
+        with open(origin, "rb") as f:
+            tree = ast.parse(f.read(), origin)
+    except (OSError, SyntaxError):
+        return set()
+
+    package = module.__spec__.parent if module.__spec__ else ""
+    dependencies = set()
+    for node in _top_level_imports(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            base = "." * node.level + (node.module or "")
+            try:
+                base = importlib.util.resolve_name(base, package) if node.level else base
+            except ImportError:
+                continue
+            # from pkg import name: name может быть подмодулем
+            names = [base] + [f"{base}.{alias.name}" for alias in node.names]
+        for name in names:
+            if name in candidates and name != module.__name__:
+                dependencies.add(name)
+    return dependencies
+
+
+def plan_reload(changed: Iterable[str], package: str = "src") -> List[str]:
+    """
+    Определить модули для перезагрузки и порядок
+
+    Измененные модули дополняются загруженными модулями пакета, которые
+    импортируют их на уровне модуля (сам модуль или имена из него), транзитивно.
+
+    Args:
+        changed: Имена измененных модулей
+        package: Имя корневого пакета
+
+    Returns:
+        Имена модулей в порядке перезагрузки (зависимости раньше зависимых)
+    """
+    loaded = {
+        name: module
+        for name, module in list(sys.modules.items())
+        if module is not None
+        and (name == package or name.startswith(package + "."))
+        and name not in NO_RELOAD
+    }
+    candidates = set(loaded)
+    graph = {name: _module_dependencies(module, candidates) for name, module in loaded.items()}
+
+    targets = {name for name in changed if name in loaded}
+    frontier = set(targets)
+    while frontier:
+        dependents = {
+            name for name, deps in graph.items() if name not in targets and deps & frontier
+        }
+        targets |= dependents
+        frontier = dependents
+
+    order: List[str] = []
+    visited: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        visited.add(name)
+        for dependency in sorted(graph[name] & targets):
+            visit(dependency)
+        order.append(name)
+
+    for name in sorted(targets):
+        visit(name)
+    return order
+
+
+def _restore_modules(
+    modules: Dict[str, types.ModuleType],
+    namespaces: Dict[str, Dict[str, Any]],
+    imported_before: Set[str],
+    package: str,
+) -> None:
+    """
+    Вернуть модули к состоянию до неудачной перезагрузки
+
+    Args:
+        modules: Перезагружаемые модули
+        namespaces: Копии их __dict__ до перезагрузки
+        imported_before: Имена из sys.modules до перезагрузки
+        package: Имя пакета
+    """
+    for name, module in modules.items():
+        module.__dict__.clear()
+        module.__dict__.update(namespaces[name])
+        sys.modules[name] = module
+    # Модули пакета, впервые импортированные новым кодом, ссылаются на него
+    for name in set(sys.modules) - imported_before:
+        if name == package or name.startswith(package + "."):
+            del sys.modules[name]
+    logger.warning(f"Горячая перезагрузка отменена, модули восстановлены: {', '.join(modules)}")
+
+
+def reload_changed_files(changed_files: Iterable[str], package_dir: Path) -> List[str]:
+    """
+    Перезагрузить модули измененных файлов и зависимые от них
+
+    Args:
+        changed_files: Пути измененных файлов
+        package_dir: Директория пакета (src)
+
+    Returns:
+        Имена перезагруженных модулей
+
+    Raises:
+        Exception: Ошибка импорта нового кода (например, SyntaxError); модули
+            остаются в состоянии до вызова
+    """
+    package = package_dir.name
+    changed = {
+        name
+        for name in (module_name_for_path(path, package_dir) for path in changed_files)
+        if name is not None
+    }
+    order = plan_reload(changed, package)
+
+    # Сначала компилируем все файлы: синтаксическая ошибка не должна оставить
+    # часть модулей перезагруженной, а часть - старой
+    for name in order:
+        origin = getattr(sys.modules[name].__spec__, "origin", None)
+        if origin and origin.endswith(".py"):
+            with open(origin, "rb") as f:
+                compile(f.read(), origin, "exec")
+
+    # Пространства имен модулей до перезагрузки: reload выполняет новый код в том же
+    # объекте модуля, поэтому при ошибке восстанавливается его __dict__
+    modules = {name: sys.modules[name] for name in order}
+    namespaces = {name: dict(module.__dict__) for name, module in modules.items()}
+    imported_before = set(sys.modules)
+    try:
+        for name in order:
+            importlib.reload(modules[name])
+    except BaseException:
+        _restore_modules(modules, namespaces, imported_before, package)
+        raise
+    if order:
+        logger.info(f"Горячая перезагрузка: перезагружено модулей {len(order)}: {', '.join(order)}")
+    return order
@@ -0,0 +1,429 @@
+"""
+Граф инструкций задачи
+
+Раньше инструкции шаблона выполнялись строго по списку, хотя часть из них
+(ревью, обновление документации) не зависит от соседних и могла бы идти
+параллельно с тестами. Шаблон может объявить:
+
+- depends_on: список instruction_id, после которых инструкцию можно запускать
+  (без ключа - зависимость от предыдущей инструкции, как раньше);
+- reads / writes: шаблоны путей, которые инструкция читает и меняет
+  (wait_for_file всегда считается записью);
+- parallel_safe: инструкция может выполняться одновременно с другими, даже если
+  они меняют читаемые ею файлы (анализ, ревью).
+
+Зависимости разрешены только на предыдущие инструкции списка, поэтому порядок
+списка остается топологическим: основной поток сервера обрабатывает отчеты
+в прежнем порядке, а ParallelInstructionRunner заранее запускает готовые
+parallel_safe инструкции в отдельных сессиях агента.
+
+Одновременные инструкции меняют одно рабочее дерево, поэтому изменения
+делятся по объявленным writes: опережающей инструкции достаются файлы ее
+writes, инструкции основного потока - остальные (см. matches_any). Отчет
+(wait_for_file) принадлежит своей инструкции: широкие writes вроде docs/**
+не конфликтуют с чужими отчетами и не забирают их изменения.
+"""
+
+import contextlib
+import fnmatch
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as futures_wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _pattern(path: str) -> str:
+    """Путь шаблона с плейсхолдерами ({task_id}, {date}) в виде glob"""
+    result = []
+    depth = 0
+    for char in path.replace("\\", "/"):
+        if char == "{":
+            depth += 1
+            if depth == 1:
+                result.append("*")
+        elif char == "}":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            result.append(char)
+    return "".join(result).lstrip("./")
+
+
+def patterns_overlap(first: str, second: str) -> bool:
+    """
+    Пересекаются ли два шаблона путей (консервативно)
+
+    Шаблоны пересекаются, если один из них подходит под другой или один
+    является директорией другого ("docs" и "docs/results/x.md").
+    """
+    a, b = first.rstrip("/"), second.rstrip("/")
+    if fnmatch.fnmatchcase(a, b) or fnmatch.fnmatchcase(b, a):
+        return True
+    a_dir = a[:-3] if a.endswith("/**") else a
+    b_dir = b[:-3] if b.endswith("/**") else b
+    return b.startswith(a_dir + "/") or a.startswith(b_dir + "/")
+
+
+def matches_any(path: str, patterns: Iterable[str]) -> bool:
+    """Подходит ли путь файла под один из шаблонов writes/reads"""
+    return any(patterns_overlap(path, pattern) for pattern in patterns)
+
+
+@dataclass
+class InstructionNode:
+    """Инструкция в графе"""
+
+    key: str
+    index: int  # Позиция в списке шаблонов (0-based)
+    template: Dict[str, Any]
+    depends_on: Set[str] = field(default_factory=set)
+    reads: Tuple[str, ...] = ()
+    writes: Tuple[str, ...] = ()  # Включая report
+    parallel_safe: bool = False
+    report: Optional[str] = None  # Шаблон wait_for_file
+
+    @property
+    def name(self) -> str:
+        return self.template.get("name", self.key)
+
+    @property
+    def declared_writes(self) -> Tuple[str, ...]:
+        """writes шаблона без отчета инструкции"""
+        return tuple(pattern for pattern in self.writes if pattern != self.report)
+
+    def owns(self, path: str, others: Iterable["InstructionNode"]) -> bool:
+        """
+        Относится ли изменение файла к этой инструкции
+
+        Args:
+            path: Путь измененного файла
+            others: Инструкции, выполнявшиеся одновременно с этой
+
+        Returns:
+            True для собственного отчета и для writes, кроме чужих отчетов
+        """
+        if self.report and patterns_overlap(path, self.report):
+            return True
+        if any(
+            other.report and patterns_overlap(path, other.report)
+            for other in others
+            if other is not self
+        ):
+            return False
+        return matches_any(path, self.writes)
+
+    def conflicts_with(self, other: "InstructionNode") -> bool:
+        """
+        Нельзя выполнять одновременно с other
+
+        Запись-запись конфликтует всегда (кроме writes шаблона и чужого
+        отчета: отчет пишет только его инструкция), запись-чтение - если
+        читающая инструкция не parallel_safe.
+        """
+        if any(
+            patterns_overlap(a, b)
+            for a in self.declared_writes
+            for b in other.declared_writes
+        ):
+            return True
+        if self.report and other.report and patterns_overlap(self.report, other.report):
+            return True
+        if not self.parallel_safe and any(
+            patterns_overlap(a, b) for a in self.reads for b in other.writes
+        ):
+            return True
+        if not other.parallel_safe and any(
+            patterns_overlap(a, b) for a in other.reads for b in self.writes
+        ):
+            return True
+        return False
+
+
+def node_key(template: Dict[str, Any], index: int) -> str:
+    """Ключ узла: instruction_id шаблона (или номер позиции)"""
+    return str(template.get("instruction_id", index + 1))
+
+
+class InstructionGraph:
+    """DAG инструкций, построенный из шаблонов"""
+
+    def __init__(self, nodes: List[InstructionNode]):
+        self.nodes = nodes
+        self.by_key = {node.key: node for node in nodes}
+
+    @classmethod
+    def from_templates(cls, templates: List[Dict[str, Any]]) -> "InstructionGraph":
+        """
+        Построить граф из шаблонов инструкций
+
+        Args:
+            templates: Шаблоны в порядке списка
+
+        Returns:
+            Граф инструкций
+
+        Raises:
+            ValueError: неизвестная зависимость или зависимость от последующей инструкции
+        """
+        nodes: List[InstructionNode] = []
+        seen: Dict[str, int] = {}
+        for index, template in enumerate(templates):
+            key = node_key(template, index)
+            if key in seen:
+                key = f"{key}#{index + 1}"
+            if "depends_on" in template:
+                raw = template.get("depends_on") or []
+                depends_on = {str(dep) for dep in (raw if isinstance(raw, list) else [raw])}
+                unknown = depends_on - set(seen)
+                if unknown:
+                    raise ValueError(
+                        f"Инструкция {key}: зависимости {sorted(unknown)} не найдены среди "
+                        f"предыдущих инструкций"
+                    )
+            else:
+                depends_on = {nodes[-1].key} if nodes else set()
+            writes = [_pattern(path) for path in template.get("writes") or []]
+            report = _pattern(template["wait_for_file"]) if template.get("wait_for_file") else None
+            if report:
+                writes.append(report)
+            nodes.append(
+                InstructionNode(
+                    key=key,
+                    index=index,
+                    template=template,
+                    depends_on=depends_on,
+                    reads=tuple(_pattern(path) for path in template.get("reads") or []),
+                    writes=tuple(writes),
+                    parallel_safe=bool(template.get("parallel_safe", False)),
+                    report=report,
+                )
+            )
+            seen[key] = index
+        return cls(nodes)
+
+    @classmethod
+    def linear(cls, templates: List[Dict[str, Any]]) -> "InstructionGraph":
+        """Граф без параллелизма (каждая инструкция зависит от предыдущей)"""
+        stripped = [
+            {k: v for k, v in template.items() if k not in ("depends_on", "parallel_safe")}
+            for template in templates
+        ]
+        graph = cls.from_templates(stripped)
+        for node, template in zip(graph.nodes, templates, strict=True):
+            node.template = template
+        return graph
+
+    def node_at(self, index: int) -> InstructionNode:
+        return self.nodes[index]
+
+    def ready(
+        self, finished: Set[str], running: Iterable[InstructionNode]
+    ) -> List[InstructionNode]:
+        """
+        Инструкции, которые можно запустить сейчас
+
+        Args:
+            finished: Ключи завершенных инструкций
+            running: Выполняющиеся инструкции
+
+        Returns:
+            Узлы в порядке списка: зависимости завершены, нет конфликтов с running
+        """
+        running = list(running)
+        busy = {node.key for node in running}
+        return [
+            node
+            for node in self.nodes
+            if node.key not in finished
+            and node.key not in busy
+            and node.depends_on <= finished
+            and not any(node.conflicts_with(other) for other in running)
+        ]
+
+
+class ParallelInstructionRunner:
+    """
+    Опережающий запуск parallel_safe инструкций
+
+    Основной поток обрабатывает инструкции по порядку и сообщает о каждой
+    через main_started(). Runner запускает в пуле потоков готовые
+    parallel_safe инструкции, не конфликтующие с текущей инструкцией основного
+    потока и друг с другом. Когда основной поток доходит до такой инструкции,
+    он забирает результат через take() вместо повторного запуска агента.
+    """
+
+    def __init__(
+        self,
+        graph: InstructionGraph,
+        run_node: Callable[[InstructionNode], Dict[str, Any]],
+        max_workers: int,
+        skip: Optional[Set[str]] = None,
+    ):
+        """
+        Args:
+            graph: Граф инструкций
+            run_node: Выполнение инструкции (вызывается в рабочем потоке)
+            max_workers: Максимум одновременных опережающих инструкций
+            skip: Ключи инструкций, которые не запускаются заранее
+        """
+        self.graph = graph
+        self.run_node = run_node
+        self.max_workers = max(1, max_workers)
+        self.skip = set(skip or ())
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="codeagent-instruction"
+        )
+        # RLock: done-callback уже завершенного future вызывается сразу, под блокировкой
+        self._lock = threading.RLock()
+        self._main: Optional[InstructionNode] = None
+        self._futures: Dict[str, Future] = {}
+        self._done: Set[str] = set()
+        self._closed = False
+        # Число активных exclusive(): новые опережающие инструкции не запускаются
+        self._paused = 0
+        # Меняется при каждом запуске и завершении опережающей инструкции
+        self._epoch = 0
+        # Время запуска и завершения (None - выполняется) опережающих инструкций
+        self._spans: Dict[str, Tuple[float, Optional[float]]] = {}
+
+    def _finished(self) -> Set[str]:
+        main_index = self._main.index if self._main else 0
+        processed = {node.key for node in self.graph.nodes[:main_index]}
+        return processed | self._done
+
+    def _running(self) -> List[InstructionNode]:
+        running = [
+            self.graph.by_key[key] for key, future in self._futures.items() if not future.done()
+        ]
+        if self._main is not None:
+            running.append(self._main)
+        return running
+
+    def _schedule(self) -> None:
+        """Запустить готовые инструкции (вызывается под блокировкой)"""
+        if self._closed or self._paused or self._main is None:
+            return
+        for node in self.graph.ready(self._finished(), self._running()):
+            active = sum(1 for future in self._futures.values() if not future.done())
+            if active >= self.max_workers:
+                return
+            if (
+                node.index <= self._main.index
+                or not node.parallel_safe
+                or node.key in self._futures
+                or node.key in self.skip
+                or any(node.conflicts_with(other) for other in self._running())
+            ):
+                continue
+            logger.info(f"⏩ Опережающий запуск инструкции {node.key}: {node.name}")
+            future = self._executor.submit(self.run_node, node)
+            self._futures[node.key] = future
+            self._spans[node.key] = (time.time(), None)
+            self._epoch += 1
+            future.add_done_callback(lambda f, key=node.key: self._on_done(key, f))
+
+    def _on_done(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._spans[key] = (self._spans[key][0], time.time())
+            if not future.cancelled() and future.exception() is None:
+                if (future.result() or {}).get("success"):
+                    self._done.add(key)
+            self._schedule()
+
+    def main_started(self, node: InstructionNode) -> None:
+        """Основной поток начинает обработку инструкции node"""
+        with self._lock:
+            self._main = node
+            self._schedule()
+
+    def idle_epoch(self) -> Optional[int]:
+        """
+        Состояние опережающих запусков (для повторного использования снимков дерева)
+
+        Returns:
+            Номер, который меняется при каждом запуске и завершении опережающей
+            инструкции, или None, если опережающая инструкция выполняется сейчас
+        """
+        with self._lock:
+            if any(not future.done() for future in self._futures.values()):
+                return None
+            return self._epoch
+
+    def ran_since(self, started_at: float) -> List[InstructionNode]:
+        """
+        Опережающие инструкции, выполнявшиеся после started_at
+
+        Args:
+            started_at: Время (time.time()) начала инструкции основного потока
+
+        Returns:
+            Узлы, которые выполняются сейчас или завершились после started_at
+        """
+        with self._lock:
+            return [
+                self.graph.by_key[key]
+                for key, (_, finished) in self._spans.items()
+                if finished is None or finished >= started_at
+            ]
+
+    def active(self) -> int:
+        """Число выполняющихся сейчас опережающих инструкций"""
+        with self._lock:
+            return sum(1 for _, finished in self._spans.values() if finished is None)
+
+    @contextlib.contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Монопольный доступ к окружению агента (перезапуск контейнера, очистка чатов)
+
+        Новые опережающие инструкции не запускаются, выполняющиеся дожидаются
+        завершения. После выхода запуск готовых инструкций возобновляется.
+        """
+        with self._lock:
+            self._paused += 1
+            running = [future for future in self._futures.values() if not future.done()]
+        try:
+            if running:
+                logger.info(
+                    f"Ожидание завершения опережающих инструкций ({len(running)}) "
+                    "перед монопольным действием с окружением агента"
+                )
+                futures_wait(running)
+            yield
+        finally:
+            with self._lock:
+                self._paused -= 1
+                self._schedule()
+
+    def take(self, node: InstructionNode) -> Optional[Future]:
+        """Future опережающего запуска node (None - инструкция не запускалась)"""
+        with self._lock:
+            return self._futures.pop(node.key, None)
+
+    def conflicting(self, node: InstructionNode) -> List[Future]:
+        """Опережающие запуски, которые нужно дождаться перед запуском node"""
+        with self._lock:
+            return [
+                future
+                for key, future in self._futures.items()
+                if not future.done() and node.conflicts_with(self.graph.by_key[key])
+            ]
+
+    def close(self) -> None:
+        """
+        Отменить ожидающие запуски и дождаться выполняющихся
+
+        Опережающая инструкция меняет рабочее дерево, поэтому следующая задача
+        не должна начинаться, пока она не завершится (таймаут инструкции
+        ограничивает ожидание).
+        """
+        with self._lock:
+            self._closed = True
+            for future in self._futures.values():
+                future.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,187 @@
+"""
+Политика пропуска инструкций
+
+Каждая задача проходила все инструкции шаблона, даже если план не изменил ни
+одной строки кода или задача касается только документации и тестирование ей
+ничего не добавит. Перед каждой инструкцией сервер оценивает дешевые предикаты
+и решает: выполнить, пропустить, объединить со следующей инструкцией (одна
+сессия агента) или выполнить более быстрой моделью.
+
+Правила задаются в шаблоне инструкции (ключ policy) и применяются по порядку,
+срабатывает первое подходящее:
+
+    policy:
+      - when: {no_changes: true}
+        action: skip
+      - when: {only_extensions: [".md", ".txt"]}
+        action: skip
+      - when: {max_lines: 40}
+        action: downgrade
+        model: "gpt-5-mini"
+
+Предикаты (все условия when должны выполниться):
+- no_changes: нет изменений вне отчетов агента относительно HEAD (задача
+  коммитится в конце, поэтому это изменения текущей задачи);
+- min_lines / max_lines: границы числа измененных строк;
+- only_extensions: все измененные файлы имеют указанные расширения;
+- task_types: тип задачи входит в список;
+- previous_failed / previous_changed: предыдущая инструкция завершилась
+  ошибкой / изменила файлы;
+- previous_action: решение проверки репорта предыдущей инструкции
+  (continue, stop_and_check, execute_free_instruction).
+"""
+
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RUN = "run"
+SKIP = "skip"
+MERGE = "merge"
+DOWNGRADE = "downgrade"
+ACTIONS = (RUN, SKIP, MERGE, DOWNGRADE)
+
+
+@dataclass
+class PolicyContext:
+    """Состояние задачи перед инструкцией"""
+
+    task_type: str
+    changed_files: Optional[List[str]] = None  # None - изменения неизвестны (нет git)
+    lines_changed: int = 0
+    previous_failed: bool = False
+    previous_changed: Optional[bool] = None  # None - изменения предыдущей инструкции неизвестны
+    previous_action: Optional[str] = None
+    snapshot: Optional[str] = None  # Снимок рабочего дерева, по которому посчитаны изменения
+
+    def extensions(self) -> List[str]:
+        """Расширения измененных файлов (в нижнем регистре)"""
+        return [PurePosixPath(path).suffix.lower() for path in self.changed_files or []]
+
+
+@dataclass
+class PolicyDecision:
+    """Решение политики для инструкции"""
+
+    action: str = RUN
+    rule: Optional[int] = None  # Номер сработавшего правила в шаблоне
+    reason: str = ""
+    model: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _matches(name: str, expected: Any, context: PolicyContext) -> bool:
+    """Проверить один предикат (предикаты изменений не срабатывают, если они неизвестны)"""
+    if name in ("no_changes", "min_lines", "max_lines", "only_extensions") and (
+        context.changed_files is None
+    ):
+        return False
+    if name == "no_changes":
+        return (not context.changed_files) == bool(expected)
+    if name == "min_lines":
+        return context.lines_changed >= int(expected)
+    if name == "max_lines":
+        return context.lines_changed <= int(expected)
+    if name == "only_extensions":
+        allowed = {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in expected}
+        extensions = context.extensions()
+        return bool(extensions) and all(ext in allowed for ext in extensions)
+    if name == "task_types":
+        return context.task_type in expected
+    if name == "previous_failed":
+        return context.previous_failed == bool(expected)
+    if name == "previous_changed":
+        return context.previous_changed is not None and context.previous_changed == bool(expected)
+    if name == "previous_action":
+        actions = expected if isinstance(expected, list) else [expected]
+        return context.previous_action in actions
+    raise ValueError(f"Неизвестный предикат политики инструкций: {name}")
+
+
+def _describe(when: Dict[str, Any]) -> str:
+    return ", ".join(f"{name}={value}" for name, value in when.items()) or "всегда"
+
+
+class InstructionPolicy:
+    """Оценка правил policy шаблонов инструкций"""
+
+    def __init__(self, enabled: bool = True, downgrade_model: Optional[str] = None):
+        """
+        Args:
+            enabled: Применять правила (False - все инструкции выполняются)
+            downgrade_model: Модель для action: downgrade без явного model
+        """
+        self.enabled = enabled
+        self.downgrade_model = downgrade_model
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "InstructionPolicy":
+        """
+        Создать политику из секции instruction_policy
+
+        Args:
+            config: Словарь enabled, downgrade_model
+        """
+        return cls(
+            enabled=config.get("enabled", True),
+            downgrade_model=config.get("downgrade_model"),
+        )
+
+    def evaluate(self, template: Dict[str, Any], context: PolicyContext) -> PolicyDecision:
+        """
+        Решение для инструкции
+
+        Args:
+            template: Шаблон инструкции (правила в ключе policy)
+            context: Состояние задачи
+
+        Returns:
+            Решение первого сработавшего правила или RUN
+        """
+        if not self.enabled:
+            return PolicyDecision()
+        for number, rule in enumerate(template.get("policy") or [], start=1):
+            action = rule.get("action", RUN)
+            when = rule.get("when") or {}
+            try:
+                if action not in ACTIONS:
+                    raise ValueError(f"неизвестное действие {action}")
+                if not all(_matches(name, value, context) for name, value in when.items()):
+                    continue
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Правило {number} политики инструкции пропущено: {e}")
+                continue
+            model = rule.get("model") or self.downgrade_model
+            if action == DOWNGRADE and not model:
+                logger.warning(f"Правило {number}: downgrade без модели (downgrade_model)")
+                continue
+            return PolicyDecision(
+                action=action,
+                rule=number,
+                reason=rule.get("reason") or _describe(when),
+                model=model if action == DOWNGRADE else None,
+            )
+        return PolicyDecision()
+
+
+def merge_instructions(merged: List[str], instruction: str) -> str:
+    """
+    Текст инструкции, к которой присоединены объединенные предыдущие
+
+    Args:
+        merged: Тексты инструкций, выполняемых в этой же сессии агента
+        instruction: Текст текущей инструкции
+
+    Returns:
+        Общий текст для одной сессии агента
+    """
+    if not merged:
+        return instruction
+    parts = [f"Шаг {number}:\n{text.strip()}" for number, text in enumerate(merged, start=1)]
+    parts.append(f"Шаг {len(merged) + 1}:\n{instruction.strip()}")
+    return "Выполни последовательно все шаги ниже.\n\n" + "\n\n".join(parts)
@@ -2,7 +2,7 @@
 Менеджер управления несколькими LLM моделями
 
 Реализует:
-- Выбор самой быстрой модели
+- Выбор модели по затухающей статистике задержек и ошибок (ModelRouter)
 - Fallback на резервные модели при ошибках
 - Синхронное использование двух моделей с выбором лучшего ответа
 - Оценку ответов моделями
@@ -10,8 +10,13 @@
 """
 
 import asyncio
+import dataclasses
+import hashlib
+import importlib
+import json
 import logging
 import os
+import sys
 import time
 from dataclasses import dataclass
 from enum import Enum
@@ -20,19 +25,43 @@ from typing import Any, Dict, List, Optional, Set
 
 import yaml
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
 
-# Загружаем переменные окружения (с перезаписью для обновления ключа)
-load_dotenv(override=True)
+from ..circuit_breaker import CircuitOpenError, get_circuit_breakers
+from ..event_bus import EventType, publish_event
+from ..metrics import FALLBACKS, LLM_COALESCED, LLM_LATENCY, LLM_TOKENS
+from ..tracing import get_tracer
+from .model_router import ModelRouter, get_model_router
+from .single_flight import get_single_flight
+
+# SDK провайдеров (openai, google.genai) импортируются при первом обращении к
+# атрибутам модуля AsyncOpenAI/genai, а переменные окружения загружаются при
+# создании клиентов (_init_openai_client/_init_google_client)
+_LAZY_SDK = {
+    "AsyncOpenAI": ("openai", "AsyncOpenAI"),
+    "genai": ("google.genai", None),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_SDK:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_SDK[name]
+    module = importlib.import_module(module_name)
+    value = getattr(module, attr) if attr else module
+    globals()[name] = value
+    return value
+
+
+def _sdk(name: str) -> Any:
+    """Получить SDK провайдера через атрибут модуля (учитывает подмену в тестах)"""
+    return getattr(sys.modules[__name__], name)
 
-# Поддержка Google Generative AI
-try:
-    import google.genai as genai
-except ImportError:
-    pass
 
 logger = logging.getLogger(__name__)
 
+# Сколько символов отчета передается в проверку, если есть фактический diff инструкции
+REPORT_EXCERPT_CHARS = 4000
+
 # Импортируем Colors для цветового выделения
 try:
     from ..task_logger import Colors
@@ -107,12 +136,15 @@ class LLMManager:
         self._last_health_check: Optional[float] = None
         self._health_check_interval: float = 300.0
 
-        self._fastest_model_cache: Optional[ModelConfig] = None
-        self._cache_timestamp: float = 0.0
-        self._cache_ttl: float = 60.0
         self._model_name_cache: Dict[str, ModelConfig] = {}
 
         self._load_config()
+        router_config = self.config.get("llm", {}).get("router", {}) or {}
+        self._router: Optional[ModelRouter] = (
+            get_model_router(router_config) if router_config.get("enabled", True) else None
+        )
+        # Одинаковые одновременные запросы выполняются одним вызовом (общим для всех менеджеров)
+        self._coalesce_requests = self.config.get("llm", {}).get("coalesce_requests", True)
         self._init_models()
         self._init_clients()
 
@@ -120,7 +152,6 @@ class LLMManager:
 
     def _clear_caches(self):
         """Очистка кэшей"""
-        self._invalidate_fastest_cache()
         self._model_name_cache.clear()
 
     def _validate_config_path(self, path: Path) -> None:
@@ -210,7 +241,7 @@ class LLMManager:
             logger.warning(f"API key not found for {provider_name}. Client not initialized.")
             return
 
-        client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=60.0)
+        client = _sdk("AsyncOpenAI")(base_url=base_url, api_key=api_key, timeout=60.0)
         self.clients[provider_name] = client
         logger.info(f"Initialized client for provider: {provider_name}")
 
@@ -222,21 +253,40 @@ class LLMManager:
             logger.warning(f"API key not found for {provider_name}. Client not initialized.")
             return
 
+        try:
+            genai = _sdk("genai")
+        except ImportError:
+            logger.warning(f"google-genai is not installed. Client for {provider_name} not initialized.")
+            return
+
         self.clients[provider_name] = genai.Client(api_key=api_key)
         logger.info(f"Initialized client for provider: {provider_name}")
 
     async def close(self):
         """Корректное закрытие"""
         for name, client in self.clients.items():
-            if isinstance(client, AsyncOpenAI):
-                await client.close()
+            # Асинхронное закрытие есть только у AsyncOpenAI (SDK не импортируем ради isinstance)
+            close = getattr(client, "close", None)
+            if asyncio.iscoroutinefunction(close):
+                await close()
         self.clients.clear()
+        if getattr(self, "_router", None) is not None:
+            self._router.save()
 
     # ... (get_primary_models, get_fallback_models, get_fastest_model, etc. - без изменений)
 
     def get_primary_models(self) -> List[ModelConfig]:
         return [m for m in self.models.values() if m.role == ModelRole.PRIMARY and m.enabled]
 
+    @staticmethod
+    def _breaker_name(model_config: ModelConfig) -> str:
+        return f"{model_config.provider}:{model_config.name}"
+
+    def _available(self, models: List[ModelConfig]) -> List[ModelConfig]:
+        """Модели, выключатели которых не разомкнуты"""
+        breakers = get_circuit_breakers()
+        return [m for m in models if breakers.available(self._breaker_name(m))]
+
     def get_fallback_models(self) -> List[ModelConfig]:
         reserve = [m for m in self.models.values() if m.role == ModelRole.RESERVE and m.enabled]
         duplicate = [m for m in self.models.values() if m.role == ModelRole.DUPLICATE and m.enabled]
@@ -244,27 +294,25 @@ class LLMManager:
         return reserve + duplicate + fallback
 
     def get_fastest_model(self) -> Optional[ModelConfig]:
-        current_time = time.time()
-        if (
-            self._fastest_model_cache is not None
-            and current_time - self._cache_timestamp < self._cache_ttl
-        ):
-            return self._fastest_model_cache
-
-        primary = self.get_primary_models()
+        """Primary-модель с наименьшей ожидаемой задержкой с учетом ошибок"""
+        primary = self._available(self.get_primary_models())
         if not primary:
             return None
 
-        sorted_models = sorted(
-            primary, key=lambda m: m.last_response_time if m.last_response_time > 0 else 0.0
+        router = getattr(self, "_router", None)
+        if router is not None:
+            return self.models[router.select([m.name for m in primary])]
+
+        # Без роутера - по последнему времени ответа, модели без ответов в конце
+        return min(
+            primary,
+            key=lambda m: m.last_response_time if m.last_response_time > 0 else float("inf"),
         )
-        self._fastest_model_cache = sorted_models[0]
-        self._cache_timestamp = current_time
-        return sorted_models[0]
 
-    def _invalidate_fastest_cache(self):
-        self._fastest_model_cache = None
-        self._cache_timestamp = 0.0
+    def _observe_call(self, model_config: ModelConfig, latency: float, success: bool) -> None:
+        router = getattr(self, "_router", None)
+        if router is not None:
+            router.observe(model_config.name, model_config.provider, latency, success)
 
     async def generate_response(
         self,
@@ -275,18 +323,51 @@ class LLMManager:
         response_format: Optional[Dict[str, Any]] = None,
     ) -> ModelResponse:
         """Генерация ответа через модель"""
+        if not getattr(self, "_coalesce_requests", False):
+            return await self._generate(prompt, model_name, use_fastest, response_format)
+
+        # Ключ - запрошенная модель или роль до выбора модели роутером: одинаковые запросы
+        # объединяются, даже если роутер (исследование) выбрал бы для них разные модели
+        if model_name and model_name in self.models:
+            target = model_name
+        else:
+            target = "fastest" if use_fastest else "primary"
+        key = (
+            str(getattr(self, "config_path", "")),
+            target,
+            hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            json.dumps(response_format, sort_keys=True) if response_format else "",
+        )
+        response, shared = await get_single_flight().do(
+            key, lambda: self._generate(prompt, model_name, use_fastest, response_format)
+        )
+        if not shared:
+            return response
+        LLM_COALESCED.inc(model=response.model_name)
+        logger.debug(f"Запрос к {response.model_name} объединен с выполняющимся")
+        # Копия, чтобы изменения ответа одним участником не видели остальные
+        return dataclasses.replace(response)
+
+    async def _generate(
+        self,
+        prompt: str,
+        model_name: Optional[str],
+        use_fastest: bool,
+        response_format: Optional[Dict[str, Any]],
+    ) -> ModelResponse:
+        """Выбор модели и вызов с переходом на резервные модели"""
         # Логика выбора модели (упрощенная)
         if model_name and model_name in self.models:
             model_config = self.models[model_name]
         elif use_fastest:
             model_config = self.get_fastest_model()
             if not model_config:
-                # Fallback если нет primary моделей
-                fallbacks = self.get_fallback_models()
+                # Fallback если нет доступных primary моделей
+                fallbacks = self._available(self.get_fallback_models())
                 model_config = fallbacks[0] if fallbacks else None
         else:
             # Берем любую доступную primary
-            primary = self.get_primary_models()
+            primary = self._available(self.get_primary_models())
             model_config = primary[0] if primary else None
 
         if not model_config:
@@ -298,7 +379,15 @@ class LLMManager:
                 error="No available models found",
             )
 
-        # Вызов модели
+        return await self._generate_with_fallback(prompt, model_config, response_format)
+
+    async def _generate_with_fallback(
+        self,
+        prompt: str,
+        model_config: ModelConfig,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> ModelResponse:
+        """Вызов модели с переходом на резервные модели при ошибке"""
         try:
             return await self._call_model(prompt, model_config, response_format)
         except Exception as e:
@@ -307,6 +396,7 @@ class LLMManager:
             for fallback_model in self.get_fallback_models():
                 if fallback_model.name != model_config.name:
                     logger.info(f"Fallback to {fallback_model.name}")
+                    FALLBACKS.inc(kind="llm_model")
                     try:
                         return await self._call_model(prompt, fallback_model, response_format)
                     except Exception:
@@ -332,8 +422,19 @@ class LLMManager:
         if provider not in self.clients:
             raise ValueError(f"Client for provider {provider} not initialized")
 
+        # Разомкнутый выключатель отклоняет вызов сразу, без ожидания таймаута провайдера
+        breakers = get_circuit_breakers()
+        breaker_name = self._breaker_name(model_config)
+        if not breakers.allow(breaker_name):
+            raise CircuitOpenError(breaker_name, breakers.get(breaker_name).retry_after())
+
         client = self.clients[provider]
         content = ""
+        prompt_tokens: Optional[int] = None
+        completion_tokens: Optional[int] = None
+        span = get_tracer().start_span(
+            "llm.call", {"llm.model": model_config.name, "llm.provider": provider}
+        )
 
         try:
             if provider == "openrouter":
@@ -352,6 +453,10 @@ class LLMManager:
                 if not response.choices:
                     raise ValueError("Empty choices")
                 content = response.choices[0].message.content or ""
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    prompt_tokens = getattr(usage, "prompt_tokens", None)
+                    completion_tokens = getattr(usage, "completion_tokens", None)
 
             elif provider == "google":
                 # Вызов через Google GenAI
@@ -360,7 +465,7 @@ class LLMManager:
                 await asyncio.sleep(2)
 
                 # Настройка generation_config
-                gen_config = genai.GenerationConfig(
+                gen_config = _sdk("genai").GenerationConfig(
                     max_output_tokens=model_config.max_tokens,
                     temperature=model_config.temperature,
                     top_p=model_config.top_p,
@@ -378,11 +483,37 @@ class LLMManager:
                     None, lambda: model.generate_content(prompt, generation_config=gen_config)
                 )
                 content = response.text
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    prompt_tokens = getattr(usage, "prompt_token_count", None)
+                    completion_tokens = getattr(usage, "candidates_token_count", None)
 
             response_time = time.time() - start_time
             model_config.last_response_time = response_time
             model_config.success_count += 1
-            self._invalidate_fastest_cache()
+            self._observe_call(model_config, response_time, success=True)
+            breakers.record(breaker_name, success=True)
+
+            LLM_LATENCY.observe(
+                response_time, model=model_config.name, provider=provider, success="true"
+            )
+            for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+                if tokens:
+                    LLM_TOKENS.observe(
+                        tokens, model=model_config.name, provider=provider, kind=kind
+                    )
+                    span.set_attribute(f"llm.tokens.{kind}", tokens)
+            span.set_status(True)
+            span.end()
+            publish_event(
+                EventType.LLM_CALL,
+                model=model_config.name,
+                provider=provider,
+                success=True,
+                duration=round(response_time, 3),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
 
             return ModelResponse(
                 model_name=model_config.name,
@@ -393,7 +524,31 @@ class LLMManager:
 
         except Exception as e:
             model_config.error_count += 1
+            self._observe_call(model_config, time.time() - start_time, success=False)
+            breakers.record(breaker_name, success=False, reason=str(e)[:100])
+            LLM_LATENCY.observe(
+                time.time() - start_time,
+                model=model_config.name,
+                provider=provider,
+                success="false",
+            )
+            span.set_status(False, str(e))
+            span.end()
+            publish_event(
+                EventType.LLM_CALL,
+                model=model_config.name,
+                provider=provider,
+                success=False,
+                duration=round(time.time() - start_time, 3),
+                error=str(e)[:300],
+            )
             raise e
+        except BaseException:
+            # Отмена (wait_for, SingleFlight) ничего не говорит о бэкенде - освобождаем пробу
+            breakers.release(breaker_name)
+            span.set_status(False, "cancelled")
+            span.end()
+            raise
 
     # ... (Остальные методы analyze_*, _validate_json_response и т.д. остаются без изменений, но нужно их добавить)
     # Для краткости я копирую только измененные части логики вызова.
@@ -402,9 +557,19 @@ class LLMManager:
     # ВАЖНО: Восстанавливаем методы analyze_report_and_decide и другие, так как это полная перезапись файла
 
     async def analyze_report_and_decide(
-        self, report_content: str, report_file: str, next_instruction_name: str, task_id: str
+        self,
+        report_content: str,
+        report_file: str,
+        next_instruction_name: str,
+        task_id: str,
+        changes_summary: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Анализирует репорт и принимает решение"""
+        """
+        Анализирует репорт и принимает решение
+
+        Если передан changes_summary (фактический diff инструкции), в промпт идет он
+        и начало отчета вместо всего отчета.
+        """
         if self.skip_llm_checks:
             return {
                 "decision": "continue",
@@ -413,9 +578,16 @@ class LLMManager:
                 "free_instruction_text": "",
             }
 
+        changes_section = ""
+        if changes_summary:
+            if len(report_content) > REPORT_EXCERPT_CHARS:
+                report_content = report_content[:REPORT_EXCERPT_CHARS] + "\n... (report truncated)"
+            changes_section = f"ACTUAL FILE CHANGES (git diff):\n{changes_summary}\n"
+
         prompt = f"""
         ANALYZE REPORT: {report_file}
         CONTENT: {report_content}
+        {changes_section}
         NEXT INSTRUCTION: {next_instruction_name}
 
         DECIDE:
@@ -438,8 +610,6 @@ class LLMManager:
             }
 
         try:
-            import json
-
             return json.loads(response.content)
         except Exception:
             return {
@@ -0,0 +1,304 @@
+"""
+Выбор модели по задержке и доле успешных ответов
+
+Раньше get_fastest_model сортировал primary-модели по времени последнего
+ответа: модель без вызовов (0 секунд) считалась самой быстрой, один медленный
+ответ надолго отправлял модель в конец списка, а ошибки на выбор не влияли.
+
+Роутер ведет для каждой модели и каждого провайдера:
+- EWMA задержки успешных ответов и оценку p95 (стохастический квантиль);
+- EWMA доли успешных вызовов;
+- вес наблюдений, который затухает с периодом полураспада half_life.
+
+Оценка модели - ожидаемая задержка (среднее EWMA и p95), деленная на долю
+успехов модели и ее провайдера. Модели упорядочены в куче с ленивым удалением
+устаревших записей, поэтому выбор лучшей модели - O(1) в обычном случае.
+Модели без наблюдений (или с затухшей статистикой) выбираются для
+исследования с вероятностью не больше explore_probability, а если
+статистики нет ни у одной модели - в порядке конфигурации.
+
+Статистика сохраняется в JSON-файл и переживает перезапуск сервера. Сервер
+создает LLMManager на каждую проверку, поэтому роутер один на процесс и файл
+статистики (get_model_router): иначе короткоживущие менеджеры загружали бы
+каждый свою копию и перезаписывали статистику друг друга при сохранении.
+"""
+
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+DEFAULT_STATE_FILE = "data/.codeagent_llm_router.json"
+P95_QUANTILE = 0.95
+MIN_SUCCESS_RATE = 0.05  # Оценка модели, которая только ошибается, конечна
+
+
+@dataclass
+class RouteStats:
+    """Затухающая статистика вызовов модели или провайдера"""
+
+    ewma_latency: float = 0.0
+    p95_latency: float = 0.0
+    success_rate: float = 1.0
+    weight: float = 0.0
+    updated_at: float = 0.0
+
+    def current_weight(self, now: float, half_life: float) -> float:
+        """Вес наблюдений с учетом затухания"""
+        if not self.updated_at or half_life <= 0:
+            return self.weight
+        return self.weight * 0.5 ** (max(0.0, now - self.updated_at) / half_life)
+
+    def observe(
+        self, latency: float, success: bool, now: float, alpha: float, half_life: float
+    ) -> None:
+        """
+        Учесть вызов
+
+        Args:
+            latency: Длительность вызова (секунды)
+            success: Вызов завершился успешно
+            now: Время наблюдения
+            alpha: Коэффициент EWMA
+            half_life: Период полураспада веса наблюдений (секунды)
+        """
+        self.weight = self.current_weight(now, half_life) + 1.0
+        # Первое (или первое после затухания) наблюдение заменяет устаревшие значения
+        rate = max(alpha, 1.0 / self.weight)
+        self.success_rate += rate * ((1.0 if success else 0.0) - self.success_rate)
+        if success:
+            if self.ewma_latency <= 0:
+                self.ewma_latency = self.p95_latency = latency
+            else:
+                self.ewma_latency += rate * (latency - self.ewma_latency)
+                step = rate * self.ewma_latency
+                if latency > self.p95_latency:
+                    self.p95_latency += step * P95_QUANTILE
+                else:
+                    self.p95_latency = max(0.0, self.p95_latency - step * (1 - P95_QUANTILE))
+        self.updated_at = now
+
+    @property
+    def expected_latency(self) -> float:
+        return (self.ewma_latency + self.p95_latency) / 2
+
+
+class ModelRouter:
+    """Статистика моделей и провайдеров и выбор модели по ожидаемой задержке"""
+
+    def __init__(
+        self,
+        state_file: Optional[Path] = None,
+        alpha: float = 0.2,
+        half_life: float = 3600.0,
+        explore_probability: float = 0.1,
+        min_weight: float = 0.5,
+        save_interval: float = 30.0,
+        rng: Optional[random.Random] = None,
+    ):
+        """
+        Args:
+            state_file: JSON-файл статистики (None - без сохранения)
+            alpha: Коэффициент EWMA задержки и доли успехов
+            half_life: Период полураспада веса наблюдений (секунды)
+            explore_probability: Максимальная вероятность выбора модели без статистики
+            min_weight: Вес наблюдений, ниже которого статистика модели считается затухшей
+            save_interval: Минимальный интервал между сохранениями (секунды)
+            rng: Генератор случайных чисел (для тестов)
+        """
+        self.state_file = Path(state_file) if state_file else None
+        self.alpha = alpha
+        self.half_life = half_life
+        self.explore_probability = explore_probability
+        self.min_weight = min_weight
+        self.save_interval = save_interval
+        self._rng = rng or random.Random()
+        self._models: Dict[str, RouteStats] = {}
+        self._providers: Dict[str, RouteStats] = {}
+        self._model_provider: Dict[str, str] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._versions: Dict[str, int] = {}
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ModelRouter":
+        """
+        Создать роутер из секции llm.router
+
+        Args:
+            config: Словарь state_file, alpha, half_life, explore_probability,
+                min_weight, save_interval
+        """
+        return cls(
+            state_file=config.get("state_file", DEFAULT_STATE_FILE),
+            alpha=config.get("alpha", 0.2),
+            half_life=config.get("half_life", 3600.0),
+            explore_probability=config.get("explore_probability", 0.1),
+            min_weight=config.get("min_weight", 0.5),
+            save_interval=config.get("save_interval", 30.0),
+        )
+
+    def _load(self) -> None:
+        if self.state_file is None or not self.state_file.exists():
+            return
+        try:
+            data = json.loads(self.state_file.read_text(encoding="utf-8"))
+            if data.get("version") != STATE_VERSION:
+                return
+            for name, entry in data.get("models", {}).items():
+                entry = dict(entry)
+                self._model_provider[name] = entry.pop("provider", "")
+                self._models[name] = RouteStats(**entry)
+            self._providers = {
+                name: RouteStats(**entry) for name, entry in data.get("providers", {}).items()
+            }
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Не удалось загрузить статистику моделей {self.state_file}: {e}")
+            return
+        for name in self._models:
+            self._push(name)
+
+    def save(self) -> None:
+        """Сохранить статистику в state_file"""
+        if self.state_file is None:
+            return
+        with self._lock:
+            data = {
+                "version": STATE_VERSION,
+                "models": {
+                    name: {**asdict(stats), "provider": self._model_provider.get(name, "")}
+                    for name, stats in self._models.items()
+                },
+                "providers": {name: asdict(stats) for name, stats in self._providers.items()},
+            }
+            self._saved_at = time.time()
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data), encoding="utf-8")
+            tmp_file.replace(self.state_file)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить статистику моделей {self.state_file}: {e}")
+
+    def _score(self, name: str) -> float:
+        stats = self._models[name]
+        provider = self._providers.get(self._model_provider.get(name, ""))
+        success = stats.success_rate * (provider.success_rate if provider else 1.0)
+        return stats.expected_latency / max(success, MIN_SUCCESS_RATE)
+
+    def _push(self, name: str) -> None:
+        """Добавить актуальную запись модели в кучу (старые записи станут устаревшими)"""
+        version = self._versions.get(name, 0) + 1
+        self._versions[name] = version
+        heapq.heappush(self._heap, (self._score(name), version, name))
+
+    def stats(self, name: str) -> Optional[RouteStats]:
+        """Статистика модели"""
+        with self._lock:
+            return self._models.get(name)
+
+    def provider_stats(self, provider: str) -> Optional[RouteStats]:
+        """Статистика провайдера"""
+        with self._lock:
+            return self._providers.get(provider)
+
+    def observe(self, name: str, provider: str, latency: float, success: bool) -> None:
+        """
+        Учесть вызов модели
+
+        Args:
+            name: Имя модели
+            provider: Провайдер модели
+            latency: Длительность вызова (секунды)
+            success: Вызов завершился успешно
+        """
+        now = time.time()
+        with self._lock:
+            self._model_provider[name] = provider
+            for stats in (
+                self._models.setdefault(name, RouteStats()),
+                self._providers.setdefault(provider, RouteStats()),
+            ):
+                stats.observe(latency, success, now, self.alpha, self.half_life)
+            # Доля успехов провайдера входит в оценку всех его моделей
+            for model, model_provider in self._model_provider.items():
+                if model_provider == provider and model in self._models:
+                    self._push(model)
+            if len(self._heap) > 4 * len(self._models) + 16:
+                # Куча разрослась устаревшими записями - пересобираем
+                self._heap = [
+                    (self._score(model), self._versions[model], model) for model in self._models
+                ]
+                heapq.heapify(self._heap)
+            save_due = now - self._saved_at >= self.save_interval
+        if save_due:
+            self.save()
+
+    def _is_known(self, name: str, now: float) -> bool:
+        stats = self._models.get(name)
+        return (
+            stats is not None
+            and stats.ewma_latency > 0
+            and stats.current_weight(now, self.half_life) >= self.min_weight
+        )
+
+    def select(self, candidates: List[str]) -> Optional[str]:
+        """
+        Выбрать модель среди кандидатов
+
+        Args:
+            candidates: Имена моделей в порядке конфигурации
+
+        Returns:
+            Модель с наименьшей ожидаемой задержкой, модель без статистики
+            (исследование) или None, если кандидатов нет
+        """
+        if not candidates:
+            return None
+        now = time.time()
+        with self._lock:
+            unknown = [name for name in candidates if not self._is_known(name, now)]
+            if len(unknown) == len(candidates):
+                return candidates[0]
+            if unknown and self._rng.random() < self.explore_probability:
+                return self._rng.choice(unknown)
+
+            while self._heap and self._heap[0][1] != self._versions.get(self._heap[0][2]):
+                heapq.heappop(self._heap)
+            eligible = set(candidates).difference(unknown)
+            if self._heap and self._heap[0][2] in eligible:
+                return self._heap[0][2]
+            # Лучшая модель сейчас не среди кандидатов (выключена или в черном списке)
+            return min(eligible, key=lambda name: (self._score(name), candidates.index(name)))
+
+
+_routers: Dict[str, ModelRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_model_router(config: Dict[str, Any]) -> ModelRouter:
+    """
+    Общий для процесса роутер с файлом статистики из секции llm.router
+
+    Args:
+        config: Секция llm.router (параметры берутся из первого вызова для файла)
+
+    Returns:
+        Роутер, общий для всех менеджеров с тем же state_file
+    """
+    key = str(Path(config.get("state_file", DEFAULT_STATE_FILE)).resolve())
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = _routers[key] = ModelRouter.from_config(config)
+        return router
@@ -0,0 +1,99 @@
+"""
+Объединение одинаковых одновременных запросов к LLM (single-flight)
+
+Проверки дубликатов, сопоставления с планом и анализы, запущенные через HTTP,
+часто задают одной модели один и тот же вопрос одновременно, и каждый такой
+вызов оплачивается отдельно. SingleFlight выполняет первый запрос (лидер)
+в отдельной задаче, а одинаковые запросы, пришедшие до его завершения
+(ведомые), ждут ту же задачу.
+
+Сервер создает LLMManager на каждую проверку, поэтому SingleFlight один на
+процесс (get_single_flight), а не на менеджер. Запросы объединяются только в
+пределах одного event loop: задачу нельзя ждать из чужого loop, поэтому
+одинаковые запросы из разных потоков (loop) выполняются независимо.
+
+Отмена безопасна: каждый участник ждет задачу через asyncio.shield, поэтому
+отмена лидера не отменяет запрос для ведомых. Задача отменяется только
+когда ее перестали ждать все участники.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Выполняющийся запрос и число ожидающих его участников"""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Выполняет одновременные вызовы с одинаковым ключом один раз (в одном event loop)"""
+
+    def __init__(self):
+        # Ключ - (event loop, ключ запроса); словарь общий для потоков разных loop
+        self._flights: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _Flight] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def _forget(self, key: Tuple[asyncio.AbstractEventLoop, Hashable], flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    async def do(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Выполнить вызов или присоединиться к уже выполняющемуся
+
+        Args:
+            key: Ключ запроса (одинаковые ключи объединяются)
+            factory: Функция, создающая корутину вызова (вызывается только лидером)
+
+        Returns:
+            Кортеж (результат, shared): shared=True, если результат получен
+            от чужого вызова. Исключение вызова получают все участники.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            shared = flight is not None
+            if flight is None:
+                # Запросы, оставшиеся от закрытых event loop, уже не завершатся
+                for stale in [k for k in self._flights if k[0].is_closed()]:
+                    del self._flights[stale]
+                flight = _Flight(loop.create_task(factory()))
+                self._flights[flight_key] = flight
+        if not shared:
+            flight.task.add_done_callback(
+                lambda _, key=flight_key, flight=flight: self._forget(key, flight)
+            )
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Результат больше никому не нужен; новые запросы начнут свой вызов
+                self._forget(flight_key, flight)
+                flight.task.cancel()
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Общий для процесса SingleFlight запросов к LLM (менеджеры создаются на каждую проверку)"""
+    return _single_flight
@@ -0,0 +1,356 @@
+"""
+Асинхронный конвейер логирования
+
+Логгеры получают один QueueHandler: в вызывающем потоке запись форматируется
+и очищается от секретов ровно один раз, после чего кладется в ограниченную
+очередь без ожидания. Фоновый QueueListener забирает записи пачками, передает
+их файловым и консольным обработчикам и сбрасывает буферы один раз на пачку.
+При переполнении очереди записи отбрасываются (со счетчиком), поэтому
+медленный диск не останавливает цикл выполнения инструкций.
+
+Большие блоки текста (stdout/stderr агента) передаются в extra={"payload": ...}:
+в лог попадает начало текста и ссылка на смещение в отдельном файле payloads,
+размер которого ограничен.
+
+Записи, сделанные внутри plain_output(), выводятся без префиксов (время, логгер,
+уровень): обработчики конвейера форматирует PlainAwareFormatter, а признак
+записи ставится в потоке/задаче, которая ее создала.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .security_utils import redact_secrets_in_text
+
+# Атрибут записи с большим блоком текста
+PAYLOAD_ATTR = "payload"
+# Атрибут записи без префиксов форматтера
+PLAIN_ATTR = "plain"
+
+_plain_output: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "codeagent_plain_output", default=False
+)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+# Сколько символов payload остается в основном логе
+DEFAULT_INLINE_LIMIT = 2000
+DEFAULT_PAYLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """FileHandler без flush на каждую запись (сбрасывается слушателем после пачки)"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.stream is None:
+            if getattr(self, "_closed", False):
+                return
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+@contextlib.contextmanager
+def plain_output() -> Iterator[None]:
+    """Записи текущего потока или задачи asyncio выводятся без префиксов"""
+    token = _plain_output.set(True)
+    try:
+        yield
+    finally:
+        _plain_output.reset(token)
+
+
+class PlainAwareFormatter(logging.Formatter):
+    """Форматтер, который выводит записи из plain_output() одним сообщением"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, PLAIN_ATTR, False):
+            return record.getMessage()
+        return super().format(record)
+
+
+class PayloadStore:
+    """Файл с полными блоками текста, ограниченный по размеру"""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_PAYLOAD_MAX_BYTES):
+        """
+        Инициализация
+
+        Args:
+            path: Путь к файлу payloads
+            max_bytes: Максимальный размер файла (после достижения блоки не сохраняются)
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._file = None
+        self._size = 0
+
+    def store(self, text: str, label: str = "") -> Optional[str]:
+        """
+        Сохранить блок текста
+
+        Args:
+            text: Текст блока
+            label: Краткое описание блока (для заголовка в файле)
+
+        Returns:
+            Ссылка вида "file:offset+length" или None если лимит файла исчерпан
+        """
+        data = text.encode("utf-8", errors="replace")
+        header = (
+            f"=== {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {label} ({len(data)} байт) ===\n"
+        ).encode("utf-8")
+        if self._size + len(header) + len(data) + 1 > self.max_bytes:
+            return None
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._size = self._file.tell()
+        self._file.write(header)
+        offset = self._size + len(header)
+        self._file.write(data + b"\n")
+        self._size = offset + len(data) + 1
+        return f"{self.path.name}:{offset}+{len(data)}"
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RedactingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler с однократной очисткой секретов и неблокирующей постановкой в очередь"""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.msg = record.message = redact_secrets_in_text(record.msg)
+        if _plain_output.get():
+            setattr(record, PLAIN_ATTR, True)
+        payload = getattr(record, PAYLOAD_ATTR, None)
+        if isinstance(payload, str):
+            setattr(record, PAYLOAD_ATTR, redact_secrets_in_text(payload))
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def take_dropped(self) -> int:
+        """Получить и сбросить количество отброшенных записей"""
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener, обрабатывающий записи пачками с одним flush на пачку"""
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[logging.LogRecord]",
+        handlers: List[logging.Handler],
+        source: RedactingQueueHandler,
+        payload_store: Optional[PayloadStore] = None,
+        inline_limit: int = DEFAULT_INLINE_LIMIT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.source = source
+        self.payload_store = payload_store
+        self.inline_limit = inline_limit
+        self.batch_size = batch_size
+
+    def _attach_payload(self, record: logging.LogRecord) -> None:
+        """Встроить payload в сообщение (или его начало со ссылкой на файл payloads)"""
+        payload = getattr(record, PAYLOAD_ATTR)
+        message = record.msg
+        if len(payload) <= self.inline_limit or self.payload_store is None:
+            message = f"{message}\n{payload}"
+        else:
+            reference = self.payload_store.store(payload, message.strip())
+            if reference:
+                note = f"полный текст: {reference}"
+            else:
+                note = "полный текст не сохранен: достигнут лимит файла payloads"
+            message = (
+                f"{message}\n{payload[: self.inline_limit]}\n"
+                f"... [{len(payload)} символов, {note}]"
+            )
+        record.msg = record.message = message
+        delattr(record, PAYLOAD_ATTR)
+
+    def handle(self, record: logging.LogRecord) -> None:
+        if isinstance(getattr(record, PAYLOAD_ATTR, None), str):
+            self._attach_payload(record)
+        super().handle(record)
+
+    def _flush(self) -> None:
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+        if self.payload_store is not None:
+            self.payload_store.flush()
+
+    def _report_dropped(self) -> None:
+        dropped = self.source.take_dropped()
+        if dropped:
+            record = logging.LogRecord(
+                __name__,
+                logging.WARNING,
+                __file__,
+                0,
+                f"Пропущено записей лога из-за переполнения очереди: {dropped}",
+                None,
+                None,
+            )
+            super().handle(record)
+
+    def enqueue_sentinel(self) -> None:
+        # При остановке ждем места в очереди, чтобы не потерять сигнал завершения
+        self.queue.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        log_queue = self.queue
+        has_task_done = hasattr(log_queue, "task_done")
+        while True:
+            batch = [log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                    continue
+                try:
+                    self.handle(record)
+                except Exception:
+                    pass
+            self._report_dropped()
+            self._flush()
+            if has_task_done:
+                for _ in batch:
+                    log_queue.task_done()
+            if stop:
+                break
+
+
+class LogPipeline:
+    """Очередь + фоновый писатель для набора обработчиков"""
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        payload_file: Optional[Path] = None,
+        payload_max_bytes: int = DEFAULT_PAYLOAD_MAX_BYTES,
+        inline_limit: int = DEFAULT_INLINE_LIMIT,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        """
+        Инициализация конвейера
+
+        Args:
+            handlers: Конечные обработчики (файл, консоль)
+            payload_file: Файл для больших блоков текста (None - блоки пишутся в лог целиком)
+            payload_max_bytes: Максимальный размер файла payloads
+            inline_limit: Сколько символов payload оставлять в основном логе
+            queue_size: Размер очереди записей
+        """
+        self.handlers = handlers
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self.handler = RedactingQueueHandler(self._queue)
+        self.payload_store = PayloadStore(payload_file, payload_max_bytes) if payload_file else None
+        self.listener = BatchingQueueListener(
+            self._queue, handlers, self.handler, self.payload_store, inline_limit
+        )
+        self._started = False
+
+    def start(self) -> "LogPipeline":
+        """Запустить фоновый писатель"""
+        if not self._started:
+            self.listener.start()
+            self._started = True
+        return self
+
+    def stop(self) -> None:
+        """Дописать очередь, остановить писатель и закрыть обработчики"""
+        if self._started:
+            self.listener.stop()
+            self._started = False
+        for handler in self.handlers:
+            handler.close()
+        if self.payload_store is not None:
+            self.payload_store.close()
+
+
+_root_pipeline: Optional[LogPipeline] = None
+
+
+def install_root_pipeline(handlers: List[logging.Handler], level: int = logging.INFO) -> LogPipeline:
+    """
+    Настроить корневой логгер на работу через конвейер
+
+    Args:
+        handlers: Конечные обработчики корневого логгера
+        level: Уровень корневого логгера
+
+    Returns:
+        Запущенный конвейер
+    """
+    global _root_pipeline
+    root_logger = logging.getLogger()
+    if _root_pipeline is not None:
+        root_logger.removeHandler(_root_pipeline.handler)
+        _root_pipeline.stop()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+
+    _root_pipeline = LogPipeline(handlers).start()
+    root_logger.addHandler(_root_pipeline.handler)
+    root_logger.setLevel(level)
+    return _root_pipeline
+
+
+# Дописываем очередь при завершении процесса (до logging.shutdown)
+atexit.register(lambda: stop_root_pipeline())
+
+
+def root_pipeline_handlers() -> List[logging.Handler]:
+    """Конечные обработчики конвейера корневого логгера (файл, консоль)"""
+    return list(_root_pipeline.handlers) if _root_pipeline is not None else []
+
+
+def stop_root_pipeline() -> None:
+    """Дописать и остановить конвейер корневого логгера (при завершении процесса)"""
+    global _root_pipeline
+    if _root_pipeline is not None:
+        logging.getLogger().removeHandler(_root_pipeline.handler)
+        _root_pipeline.stop()
+        _root_pipeline = None
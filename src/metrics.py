@@ -0,0 +1,305 @@
+"""
+Метрики Code Agent в формате Prometheus
+
+Минимальный реестр счетчиков и гистограмм с метками и текстовым форматом
+экспозиции Prometheus (text/plain; version=0.0.4), который отдается через
+GET /metrics. Метрики собираются в памяти процесса и не требуют внешних
+зависимостей.
+"""
+
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Бакеты по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape_label_value(value: str) -> str:
+    """Экранировать значение метки для текстового формата"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Сформировать блок меток {a="1",b="2"}"""
+    parts = [
+        f'{name}="{_escape_label_value(value)}"'
+        for name, value in zip(names, values, strict=True)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """Сформировать числовое значение"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Базовый класс метрики с метками"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        """Получить значения меток в порядке объявления"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Метрика {self.name}: ожидаются метки {self.labelnames}, получены {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Сформировать строки текстового формата"""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        """
+        Увеличить счетчик
+
+        Args:
+            amount: Величина приращения (неотрицательная)
+            **labels: Значения меток
+        """
+        if amount < 0:
+            raise ValueError("Счетчик может только увеличиваться")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: object) -> float:
+        """Получить текущее значение счетчика"""
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Гистограмма распределения значений"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Для каждого набора меток: (счетчики по бакетам, сумма, количество)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        """
+        Зарегистрировать наблюдение
+
+        Args:
+            value: Наблюдаемое значение
+            **labels: Значения меток
+        """
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def get_count(self, **labels: object) -> int:
+        """Получить количество наблюдений"""
+        with self._lock:
+            state = self._values.get(self._label_values(labels))
+            return int(state[-1]) if state else 0
+
+    def get_sum(self, **labels: object) -> float:
+        """Получить сумму наблюдений"""
+        with self._lock:
+            state = self._values.get(self._label_values(labels))
+            return state[-2] if state else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_bucket{inf_labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        """Зарегистрировать метрику или вернуть уже существующую с тем же именем"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Метрика {metric.name} уже зарегистрирована с другим типом")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Получить или создать счетчик"""
+        return self._register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Получить или создать гистограмму"""
+        return self._register(  # type: ignore[return-value]
+            Histogram(name, documentation, labelnames, buckets)
+        )
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Получить метрику по имени"""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Сформировать текст всех метрик в формате Prometheus
+
+        Returns:
+            Текст экспозиции
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Инструкции и ожидание результатов
+INSTRUCTION_DURATION = REGISTRY.histogram(
+    "codeagent_instruction_duration_seconds",
+    "Длительность выполнения инструкции (включая ожидание результата)",
+    ["instruction_id", "task_type", "success"],
+    buckets=(10, 30, 60, 120, 300, 600, 900, 1200, 1800, 2700, 3600),
+)
+RESULT_WAIT = REGISTRY.histogram(
+    "codeagent_result_wait_seconds",
+    "Время ожидания файла результата",
+    ["found"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 900, 1800),
+)
+INSTRUCTION_RETRIES = REGISTRY.counter(
+    "codeagent_instruction_retries_total",
+    "Повторные попытки выполнения инструкции",
+    ["reason"],
+)
+CURSOR_ERRORS = REGISTRY.counter(
+    "codeagent_cursor_errors_total",
+    "Ошибки Agent CLI по классам",
+    ["error_class"],
+)
+CONTAINER_RESTARTS = REGISTRY.counter(
+    "codeagent_container_restarts_total",
+    "Перезапуски Docker окружения агента",
+    ["success"],
+)
+
+# LLM
+LLM_LATENCY = REGISTRY.histogram(
+    "codeagent_llm_request_duration_seconds",
+    "Длительность запроса к LLM",
+    ["model", "provider", "success"],
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "codeagent_llm_tokens",
+    "Количество токенов в запросе к LLM",
+    ["model", "provider", "kind"],
+    buckets=(64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072),
+)
+FALLBACKS = REGISTRY.counter(
+    "codeagent_fallbacks_total",
+    "Переключения на резервные модели",
+    ["kind"],
+)
+LLM_COALESCED = REGISTRY.counter(
+    "codeagent_llm_coalesced_total",
+    "Запросы к LLM, объединенные с одинаковым выполняющимся запросом",
+    ["model"],
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "codeagent_circuit_transitions_total",
+    "Смены состояний выключателей бэкендов (cursor, openrouter, gemini, docker)",
+    ["kind", "state"],
+)
+
+# Кэши
+CACHE_HITS = REGISTRY.counter(
+    "codeagent_cache_hits_total",
+    "Попадания в кэши",
+    ["cache"],
+)
+CACHE_MISSES = REGISTRY.counter(
+    "codeagent_cache_misses_total",
+    "Промахи кэшей",
+    ["cache"],
+)
@@ -0,0 +1,295 @@
+"""
+Статистический профилировщик и дамп стеков для отладки зависаний
+
+Сэмплер запускается только на время запроса (GET /debug/profile?seconds=N):
+отдельный поток с заданным интервалом снимает sys._current_frames() всех
+потоков и агрегирует стеки. В простое профилировщик ничего не стоит - нет ни
+sys.setprofile, ни фонового потока. Результат сохраняется в logs/profiles/ в
+формате collapsed stacks (flamegraph.pl, inferno, speedscope) или speedscope JSON.
+
+format_stacks() (GET /debug/stacks) выводит текущие стеки всех потоков и
+задачи asyncio цикла сервера: корутину, стек и future, которую задача ожидает.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_MAX_SECONDS = 60.0
+MAX_STACK_DEPTH = 128
+PROFILE_FORMATS = ("collapsed", "speedscope")
+
+# Кадр стека: (функция, файл, строка определения функции)
+Frame = Tuple[str, str, int]
+
+
+class ProfilerBusyError(RuntimeError):
+    """Профилирование уже выполняется"""
+
+
+@dataclass
+class ProfileResult:
+    """Агрегированные сэмплы: (поток, стек от корня к листу) -> количество"""
+
+    started: datetime
+    duration: float
+    interval: float
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def to_collapsed(self) -> str:
+        """Формат collapsed stacks: "поток;внешняя;...;внутренняя количество" """
+        lines = []
+        for (thread, frames), count in sorted(self.stacks.items()):
+            names = [thread] + [_frame_label(frame) for frame in frames]
+            lines.append(f"{';'.join(name.replace(';', ':') for name in names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> Dict:
+        """Формат speedscope (https://www.speedscope.app/file-format-schema.json)"""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict] = []
+        profiles: Dict[str, Dict] = {}
+        for (thread, stack), count in sorted(self.stacks.items()):
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(frame_index[frame])
+            profile = profiles.setdefault(
+                thread,
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(self.duration, 6),
+                    "samples": [],
+                    "weights": [],
+                },
+            )
+            profile["samples"].append(indices)
+            profile["weights"].append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"codeagent {self.started.isoformat(timespec='seconds')}",
+            "exporter": "codeagent",
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+    def top_functions(self, limit: int = 15) -> List[Dict]:
+        """Функции с наибольшим собственным временем (лист стека)"""
+        own: Counter = Counter()
+        for (_, frames), count in self.stacks.items():
+            if frames:
+                own[_frame_label(frames[-1])] += count
+        total = max(1, self.samples)
+        return [
+            {"function": name, "samples": count, "percent": round(count * 100 / total, 1)}
+            for name, count in own.most_common(limit)
+        ]
+
+
+def _frame_label(frame: Frame) -> str:
+    return f"{frame[0]} ({Path(frame[1]).name}:{frame[2]})"
+
+
+def _walk(frame: Optional[FrameType]) -> Tuple[Frame, ...]:
+    """Стек от корня к листу; кадры помечены строкой определения функции"""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        name = getattr(code, "co_qualname", code.co_name)
+        stack.append((name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик всех потоков процесса"""
+
+    def __init__(
+        self, interval: float = DEFAULT_INTERVAL, max_seconds: float = DEFAULT_MAX_SECONDS
+    ):
+        """
+        Инициализация
+
+        Args:
+            interval: Интервал между сэмплами (секунды)
+            max_seconds: Максимальная длительность одного профилирования
+        """
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float) -> ProfileResult:
+        """
+        Снимать сэмплы seconds секунд (блокирует вызывающий поток)
+
+        Args:
+            seconds: Длительность (ограничивается max_seconds)
+
+        Returns:
+            Агрегированный профиль
+
+        Raises:
+            ProfilerBusyError: Если профилирование уже выполняется
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Профилирование уже выполняется")
+        try:
+            seconds = max(0.0, min(float(seconds), self.max_seconds))
+            result = ProfileResult(started=datetime.now(), duration=0.0, interval=self.interval)
+            # Вызывающий поток только ждет сэмплер - его стек в профиле не нужен
+            sampler = threading.Thread(
+                target=self._sample,
+                args=(seconds, result, threading.get_ident()),
+                name="codeagent-profiler",
+                daemon=True,
+            )
+            sampler.start()
+            sampler.join()
+            return result
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, result: ProfileResult, caller: int) -> None:
+        skip = {threading.get_ident(), caller}
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident in skip:
+                    continue
+                thread = names.get(ident, f"thread-{ident}")
+                result.stacks[(thread, _walk(frame))] += 1
+            result.samples += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            time.sleep(min(self.interval, deadline - now))
+        result.duration = time.perf_counter() - started
+
+
+def save_profile(result: ProfileResult, directory: Path, fmt: str = "collapsed") -> Path:
+    """
+    Сохранить профиль для офлайн анализа (flame graph)
+
+    Args:
+        result: Профиль
+        directory: Директория (logs/profiles)
+        fmt: collapsed или speedscope
+
+    Returns:
+        Путь к файлу
+    """
+    if fmt not in PROFILE_FORMATS:
+        raise ValueError(f"Неизвестный формат профиля: {fmt}")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = ".speedscope.json" if fmt == "speedscope" else ".collapsed"
+    stem = f"profile-{result.started.strftime('%Y%m%d-%H%M%S')}"
+    path = directory / f"{stem}{suffix}"
+    counter = 1
+    while path.exists():
+        path = directory / f"{stem}.{counter}{suffix}"
+        counter += 1
+    if fmt == "speedscope":
+        path.write_text(json.dumps(result.to_speedscope(), ensure_ascii=False), encoding="utf-8")
+    else:
+        path.write_text(result.to_collapsed(), encoding="utf-8")
+    logger.info(f"Профиль сохранен: {path} ({result.samples} сэмплов, {result.duration:.1f}с)")
+    return path
+
+
+def _describe_waiter(task: asyncio.Task) -> str:
+    waiter = getattr(task, "_fut_waiter", None)
+    if waiter is None:
+        return "-"
+    if isinstance(waiter, asyncio.Task):
+        return f"задача {waiter.get_name()}"
+    return repr(waiter)[:200]
+
+
+def _await_chain(coro) -> List[str]:
+    """Строки стека приостановленной корутины по цепочке cr_await (от внешней к внутренней)"""
+    lines = []
+    while coro is not None and len(lines) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        code = frame.f_code
+        lines.append(f'  File "{code.co_filename}", line {frame.f_lineno}, in {code.co_name}')
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return lines
+
+
+def format_asyncio_tasks(loop: asyncio.AbstractEventLoop) -> str:
+    """
+    Задачи asyncio цикла: имя, корутина, ожидаемый future и стек корутины
+
+    Args:
+        loop: Цикл событий (может работать в другом потоке)
+
+    Returns:
+        Текстовый дамп
+    """
+    try:
+        tasks = sorted(asyncio.all_tasks(loop), key=lambda task: task.get_name())
+    except RuntimeError as e:
+        return f"Не удалось получить задачи asyncio: {e}\n"
+    lines = [f"=== asyncio: {len(tasks)} задач ==="]
+    for task in tasks:
+        coro = task.get_coro()
+        coro_name = getattr(coro, "__qualname__", repr(coro))
+        state = "done" if task.done() else ("cancelling" if task.cancelling() else "pending")
+        waiter = _describe_waiter(task)
+        lines.append(f"\n--- {task.get_name()} [{state}] {coro_name} ждет: {waiter}")
+        lines.extend(_await_chain(coro))
+    return "\n".join(lines) + "\n"
+
+
+def format_stacks(loop: Optional[asyncio.AbstractEventLoop] = None) -> str:
+    """
+    Текущие стеки всех потоков и (если передан цикл) задачи asyncio
+
+    Args:
+        loop: Цикл событий основного цикла сервера
+
+    Returns:
+        Текстовый дамп
+    """
+    names = {thread.ident: thread for thread in threading.enumerate()}
+    frames = sys._current_frames()
+    lines = [f"=== Потоки: {len(frames)} ({datetime.now().isoformat(timespec='seconds')}) ==="]
+    for ident, frame in frames.items():
+        thread = names.get(ident)
+        name = thread.name if thread else f"thread-{ident}"
+        daemon = " daemon" if thread is not None and thread.daemon else ""
+        lines.append(f"\n--- {name} (ident={ident}{daemon})")
+        lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+    text = "\n".join(lines) + "\n"
+    if loop is not None and not loop.is_closed():
+        text += "\n" + format_asyncio_tasks(loop)
+    return text
@@ -0,0 +1,362 @@
+"""
+Дайджест отчетов и планов для промптов LLM
+
+Анализ отчета после инструкции (analyze_report_and_decide) и проверка пункта
+TODO по плану (_check_todo_matches_plan) передавали в промпт файл целиком.
+Отчеты о тестировании бывают огромными (полные логи pytest, трейсбеки, списки
+файлов), а план читается заново для каждого пункта TODO.
+
+Дайджест разбирает markdown по разделам и оставляет в каждом разделе
+(в порядке важности):
+- итоги тестов и ошибки (строки с ошибками, хвосты трейсбеков и блоков кода с ошибками);
+- невыполненные пункты чеклистов;
+- выполненные пункты и элементы списков;
+- список упомянутых файлов одной строкой;
+- остальной текст, пока хватает бюджета раздела.
+
+Бюджет символов делится между разделами: каждый получает место под заголовок
+и важнейшую строку, остаток делится поровну (раздел, которому нужно меньше своей
+доли, отдает лишнее остальным). Разделы, на которые места не хватило, сводятся
+в одну строку. Короткие тексты передаются без изменений.
+Дайджесты кэшируются по хешу текста.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import CACHE_HITS, CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+CHECKBOX_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\[([ xX])\]\s+")
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\S")
+TEST_COUNT_RE = re.compile(
+    r"\b(\d+)\s+(passed|failed|errors?|skipped|xfailed|xpassed)\b", re.IGNORECASE
+)
+TEST_SUMMARY_RE = re.compile(
+    r"\b\d+\s+(?:passed|failed|errors?|skipped)\b|\bRan \d+ tests?\b|\bTests?:\s+\d+"
+    r"|\b(?:пройдено|провалено|упало)\b\D{0,20}\d",
+    re.IGNORECASE,
+)
+ERROR_RE = re.compile(
+    r"Traceback \(most recent call last\)|(?:Error|Exception)\b|\bFAIL(?:ED)?\b|❌|ошибк",
+    re.IGNORECASE,
+)
+FILE_RE = re.compile(
+    r"(?<![\w/.:-])((?:[\w.-]+/)*[\w-][\w.-]*\."
+    r"(?:py|md|txt|json|ya?ml|toml|ini|cfg|js|jsx|ts|tsx|sh|html|css|sql))\b"
+)
+
+MAX_LINE_CHARS = 300  # Длинные строки (логи, JSON) обрезаются
+ERROR_TAIL_LINES = 6  # Сколько последних строк блока кода с ошибкой сохраняется
+MAX_FILES = 15  # Файлов в строке списка файлов раздела
+
+# Важность строк: меньше - важнее
+_ERROR, _OPEN_ITEM, _ITEM, _FILES, _TEXT = range(5)
+
+
+@dataclass
+class _Section:
+    """Раздел markdown: заголовок и строки с оценкой важности"""
+
+    heading: str = ""
+    lines: List[Tuple[int, str]] = field(default_factory=list)
+    files: Dict[str, None] = field(default_factory=dict)  # Упорядоченное множество
+
+    def add_files(self, line: str) -> None:
+        self.files.update(dict.fromkeys(FILE_RE.findall(line)))
+
+    def candidates(self) -> List[Tuple[int, int, str]]:
+        """Строки раздела (важность, позиция, текст), включая строку списка файлов"""
+        result = [
+            (priority, index, _clip(text)) for index, (priority, text) in enumerate(self.lines)
+        ]
+        if self.files:
+            shown = ", ".join(list(self.files)[:MAX_FILES])
+            more = len(self.files) - MAX_FILES
+            files_line = f"Файлы: {shown}" + (f" (+{more})" if more > 0 else "")
+            result.append((_FILES, len(self.lines), _clip(files_line)))
+        return result
+
+    def size(self) -> int:
+        heading = len(self.heading) + 1 if self.heading else 0
+        return heading + sum(len(text) + 1 for _, _, text in self.candidates())
+
+
+def _clip(text: str) -> str:
+    text = text.rstrip()
+    return text if len(text) <= MAX_LINE_CHARS else text[: MAX_LINE_CHARS - 3] + "..."
+
+
+def _classify(line: str) -> int:
+    if ERROR_RE.search(line) or TEST_SUMMARY_RE.search(line):
+        return _ERROR
+    checkbox = CHECKBOX_RE.match(line)
+    if checkbox:
+        return _OPEN_ITEM if checkbox.group(1) == " " else _ITEM
+    if LIST_ITEM_RE.match(line):
+        return _ITEM
+    return _TEXT
+
+
+def _add_code_block(section: _Section, block: List[str]) -> None:
+    """Блок кода: сохраняются только строки ошибок и хвост блока, если в нем есть ошибка"""
+    for line in block:
+        section.add_files(line)
+    if not any(ERROR_RE.search(line) for line in block[1:]):
+        return
+    tail_start = max(1, len(block) - ERROR_TAIL_LINES)
+    for index, line in enumerate(block):
+        if not line.strip():
+            continue
+        if index == 0 or index >= tail_start or ERROR_RE.search(line):
+            section.lines.append((_ERROR, line))
+
+
+def parse_sections(text: str) -> List[_Section]:
+    """
+    Разобрать markdown на разделы по заголовкам
+
+    Args:
+        text: Текст отчета или плана
+
+    Returns:
+        Разделы в порядке следования (текст до первого заголовка - раздел без заголовка)
+    """
+    sections = [_Section()]
+    block: Optional[List[str]] = None
+    for line in text.splitlines():
+        section = sections[-1]
+        if block is not None:
+            block.append(line)
+            if FENCE_RE.match(line):
+                _add_code_block(section, block)
+                block = None
+            continue
+        if FENCE_RE.match(line):
+            block = [line]
+            continue
+        heading = HEADING_RE.match(line)
+        if heading:
+            sections.append(_Section(heading=line.strip()))
+            continue
+        if line.strip():
+            section.lines.append((_classify(line), line))
+            section.add_files(line)
+    if block is not None:
+        _add_code_block(sections[-1], block)
+    return [s for s in sections if s.heading or s.lines or s.files]
+
+
+def count_tests(text: str) -> Dict[str, int]:
+    """
+    Итоги тестов в тексте (для каждого вида берется последнее упоминание)
+
+    Args:
+        text: Текст отчета
+
+    Returns:
+        Словарь вида {"passed": 120, "failed": 3}
+    """
+    counts: Dict[str, int] = {}
+    for number, kind in TEST_COUNT_RE.findall(text):
+        kind = kind.lower()
+        counts["errors" if kind == "error" else kind] = int(number)
+    return counts
+
+
+def _heading_cost(section: _Section) -> int:
+    return len(section.heading) + 1 if section.heading else 0
+
+
+def _omitted_line(count: int) -> str:
+    return f"... (опущено строк: {count})"
+
+
+def _minimum(section: _Section) -> int:
+    """Наименьший бюджет, при котором раздел выводится: заголовок, важнейшая строка, пометка"""
+    size = section.size()
+    candidates = section.candidates()
+    if not candidates:
+        return size
+    best = min(candidates)[2]
+    minimum = _heading_cost(section) + len(best) + 1 + len(_omitted_line(len(candidates))) + 1
+    return min(size, minimum)
+
+
+def _allocate(sizes: List[int], minimums: List[int], budget: int) -> List[int]:
+    """
+    Разделить бюджет между разделами
+
+    Каждый раздел получает свой минимум (заголовок и важнейшую строку), остаток
+    делится поровну: раздел, которому нужно меньше своей доли, отдает лишнее остальным.
+    """
+    budgets = list(minimums)
+    remaining = budget - sum(minimums)
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i] - minimums[i])
+    for position, index in enumerate(order):
+        share = remaining // (len(order) - position)
+        extra = min(sizes[index] - minimums[index], share)
+        budgets[index] += extra
+        remaining -= extra
+    return budgets
+
+
+def _select(sections: List[_Section], budget: int) -> List[int]:
+    """
+    Разделы, которые помещаются в бюджет хотя бы минимумом
+
+    Если места на все разделы нет, сначала выбираются разделы с более важными
+    строками (ошибки, открытые пункты), при равной важности - идущие раньше;
+    место под строку об опущенных разделах резервируется.
+    """
+    minimums = [_minimum(section) for section in sections]
+    if sum(minimums) <= budget:
+        return list(range(len(sections)))
+    budget -= len(f"... (опущено разделов: {len(sections)})") + 1
+
+    def importance(index: int) -> Tuple[int, int]:
+        candidates = sections[index].candidates()
+        return (min(candidates)[0] if candidates else _TEXT + 1, index)
+
+    kept = []
+    for index in sorted(range(len(sections)), key=importance):
+        if minimums[index] <= budget:
+            kept.append(index)
+            budget -= minimums[index]
+    return sorted(kept)
+
+
+def _render(section: _Section, budget: int) -> List[str]:
+    """Строки раздела, отобранные по важности в пределах бюджета, в исходном порядке"""
+    lines = [section.heading] if section.heading else []
+    used = _heading_cost(section)
+    candidates = section.candidates()
+    if used + sum(len(text) + 1 for _, _, text in candidates) > budget:
+        # Место под строку о пропущенных строках
+        used += len(_omitted_line(len(candidates))) + 1
+    chosen = []
+    for _priority, index, text in sorted(candidates):
+        if used + len(text) + 1 > budget:
+            continue
+        chosen.append((index, text))
+        used += len(text) + 1
+    lines.extend(text for _, text in sorted(chosen))
+    omitted = len(candidates) - len(chosen)
+    if omitted:
+        lines.append(_omitted_line(omitted))
+    return lines
+
+
+def digest_report(text: str, budget_chars: int) -> str:
+    """
+    Сократить отчет или план до бюджета символов
+
+    Args:
+        text: Текст в формате markdown
+        budget_chars: Размер дайджеста
+
+    Returns:
+        Исходный текст, если он не длиннее бюджета, иначе дайджест
+    """
+    if len(text) <= budget_chars:
+        return text
+    sections = parse_sections(text)
+    counts = count_tests(text)
+    header = [f"(дайджест: исходный текст {len(text)} символов, разделов {len(sections)})"]
+    if counts:
+        header.append("Итоги тестов: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+    budget = max(0, budget_chars - sum(len(line) + 1 for line in header))
+    kept = _select(sections, budget)
+    if len(kept) < len(sections):
+        budget -= len(f"... (опущено разделов: {len(sections)})") + 1
+    budgets = _allocate(
+        [sections[i].size() for i in kept], [_minimum(sections[i]) for i in kept], budget
+    )
+    lines = header
+    for index, section_budget in zip(kept, budgets, strict=True):
+        lines.extend(_render(sections[index], section_budget))
+    if len(kept) < len(sections):
+        lines.append(f"... (опущено разделов: {len(sections) - len(kept)})")
+    return "\n".join(lines)
+
+
+class ReportDigester:
+    """Дайджесты отчетов и планов с кэшем по хешу текста"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        budget_chars: int = 3000,
+        plan_budget_chars: int = 6000,
+        cache_size: int = 64,
+    ):
+        """
+        Args:
+            enabled: Сокращать тексты (False - передавать целиком)
+            budget_chars: Размер дайджеста отчета
+            plan_budget_chars: Размер дайджеста плана
+            cache_size: Количество дайджестов в кэше
+        """
+        self.enabled = enabled
+        self.budget_chars = budget_chars
+        self.plan_budget_chars = plan_budget_chars
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ReportDigester":
+        """
+        Создать из секции report_digest
+
+        Args:
+            config: Словарь enabled, budget_chars, plan_budget_chars, cache_size
+        """
+        return cls(
+            enabled=config.get("enabled", True),
+            budget_chars=config.get("budget_chars", 3000),
+            plan_budget_chars=config.get("plan_budget_chars", 6000),
+            cache_size=config.get("cache_size", 64),
+        )
+
+    def digest(self, text: str, budget_chars: Optional[int] = None) -> str:
+        """
+        Дайджест текста (из кэша, если текст уже сокращался)
+
+        Args:
+            text: Текст отчета или плана
+            budget_chars: Размер дайджеста (по умолчанию budget_chars)
+
+        Returns:
+            Дайджест или исходный текст, если он короткий или дайджест выключен
+        """
+        budget = budget_chars or self.budget_chars
+        if not self.enabled or len(text) <= budget:
+            return text
+        key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), budget)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                CACHE_HITS.inc(cache="report_digest")
+                return cached
+        CACHE_MISSES.inc(cache="report_digest")
+        result = digest_report(text, budget)
+        logger.debug(f"Дайджест: {len(text)} -> {len(result)} символов")
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def digest_plan(self, text: str) -> str:
+        """Дайджест плана (бюджет plan_budget_chars)"""
+        return self.digest(text, self.plan_budget_chars)
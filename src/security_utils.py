@@ -4,9 +4,32 @@
 
 import re
 import logging
+from functools import lru_cache
 from typing import Any, Dict, List, Union
 
 
+# Ключевые слова, которые указывают на чувствительные данные в ключах словарей
+_SENSITIVE_KEYWORDS = (
+    'api_key', 'apikey', 'api-key',
+    'password', 'passwd', 'pwd',
+    'token', 'secret', 'secret_key',
+    'access_token', 'refresh_token',
+    'auth', 'authorization',
+    'credential', 'credentials',
+    'private_key', 'privatekey',
+    'session_id', 'sessionid',
+    'bearer'
+)
+_SENSITIVE_KEY_RE = re.compile("|".join(re.escape(keyword) for keyword in _SENSITIVE_KEYWORDS))
+
+# Строка, похожая на API ключ. Длинная буквенно-цифровая последовательность ищется
+# только с начала последовательности (lookbehind), а не с каждой позиции внутри нее
+_API_KEY_LIKE_RE = re.compile(
+    r"sk-(?:or-v1-|ant-)?[a-zA-Z0-9]{20,}"  # OpenAI/OpenRouter/Anthropic ключи
+    r"|(?<![a-zA-Z0-9])[a-zA-Z0-9]{32}"  # Общий паттерн для длинных ключей
+)
+
+
 def sanitize_for_logging(data: Union[str, Dict[str, Any], List[Any], Any]) -> Union[str, Dict[str, Any], List[Any], Any]:
     """
     Удаляет чувствительные данные из данных для безопасного логирования
@@ -19,27 +42,11 @@ def sanitize_for_logging(data: Union[str, Dict[str, Any], List[Any], Any]) -> Un
     Returns:
         Санитизированные данные
     """
-    # Список ключевых слов, которые указывают на чувствительные данные
-    sensitive_keywords = [
-        'api_key', 'apikey', 'api-key',
-        'password', 'passwd', 'pwd',
-        'token', 'secret', 'secret_key',
-        'access_token', 'refresh_token',
-        'auth', 'authorization',
-        'credential', 'credentials',
-        'private_key', 'privatekey',
-        'session_id', 'sessionid',
-        'bearer'
-    ]
-    
     if isinstance(data, dict):
         sanitized: Dict[str, Any] = {}
         for key, value in data.items():
             # Проверяем, содержит ли ключ чувствительное слово
-            key_lower = str(key).lower()
-            is_sensitive = any(keyword in key_lower for keyword in sensitive_keywords)
-            
-            if is_sensitive:
+            if _SENSITIVE_KEY_RE.search(str(key).lower()):
                 # Если значение - строка, показываем только длину
                 if isinstance(value, str):
                     sanitized[key] = f"***REDACTED*** (length: {len(value)})"
@@ -56,17 +63,8 @@ def sanitize_for_logging(data: Union[str, Dict[str, Any], List[Any], Any]) -> Un
     
     elif isinstance(data, str):
         # Проверяем, не содержит ли строка похожий на API ключ паттерн
-        # Паттерны для различных типов ключей
-        api_key_patterns = [
-            r'sk-[a-zA-Z0-9]{20,}',  # OpenAI/Anthropic ключи
-            r'sk-or-v1-[a-zA-Z0-9]{20,}',  # OpenRouter ключи
-            r'sk-ant-[a-zA-Z0-9]{20,}',  # Anthropic ключи
-            r'[a-zA-Z0-9]{32,}',  # Общий паттерн для длинных ключей
-        ]
-        
-        for pattern in api_key_patterns:
-            if re.search(pattern, data):
-                return f"***REDACTED*** (matches API key pattern, length: {len(data)})"
+        if len(data) >= 23 and _API_KEY_LIKE_RE.search(data):
+            return f"***REDACTED*** (matches API key pattern, length: {len(data)})"
         
         return data
     
@@ -74,35 +72,94 @@ def sanitize_for_logging(data: Union[str, Dict[str, Any], List[Any], Any]) -> Un
         # Для других типов возвращаем как есть
         return data
 
-_SECRET_VALUE_PATTERNS = [
-    # Key=value or Key: value patterns
-    re.compile(r"(?i)\b(api[_-]?key|token|secret|password|passwd|pwd|authorization|bearer)\b([\s:=]+)([^\s,;]+)"),
-    # Bearer tokens
-    re.compile(r"(?i)\b(bearer)\s+([A-Za-z0-9._-]{8,})"),
-    # Common API key formats
-    re.compile(r"sk-[A-Za-z0-9]{20,}"),
-    re.compile(r"sk-or-v1-[A-Za-z0-9]{20,}"),
-    re.compile(r"sk-ant-[A-Za-z0-9]{20,}"),
-]
+
+# Все паттерны секретов объединены в одну альтернативу. Каждая альтернатива
+# начинается с одной из подстрок _SECRET_TRIGGERS, поэтому кандидаты находятся
+# быстрым str.find по тексту в нижнем регистре, а регулярное выражение
+# проверяется только в этих позициях (Python re не ускоряет поиск
+# альтернативы литералов без учета регистра и пробует каждую позицию текста).
+_SECRET_RE = re.compile(
+    # key=value / key: value
+    r"(?i:\b(?P<key>api[_-]?key|token|secret|password|passwd|pwd|authorization|bearer)\b"
+    r"(?P<sep>[\s:=]+)[^\s,;]+)"
+    # Bearer токены
+    r"|(?i:\b(?P<bearer>bearer)\s+[A-Za-z0-9._-]{8,})"
+    # Форматы API ключей (OpenAI, OpenRouter, Anthropic); хвост с "-" и "_" тоже скрывается,
+    # чтобы склеенные ключи не оставляли видимых остатков
+    r"|sk-(?:or-v1-|ant-)?[A-Za-z0-9]{20,}[A-Za-z0-9_-]*"
+)
+
+# Начала всех альтернатив _SECRET_RE (в нижнем регистре)
+_SECRET_TRIGGERS = ("api", "token", "secret", "pass", "pwd", "authorization", "bearer", "sk-")
+
+# Самое короткое возможное совпадение: "pwd=x"
+_MIN_SECRET_LENGTH = 5
+
+# Короткие сообщения (повторяющиеся строки лога) кешируются
+_CACHE_MAX_LENGTH = 4096
+_CACHE_SIZE = 2048
+
+
+def _redact_match(match: re.Match) -> str:
+    key = match.group("key")
+    if key is not None:
+        return f"{key}{match.group('sep')}***REDACTED***"
+    bearer = match.group("bearer")
+    if bearer is not None:
+        return f"{bearer} ***REDACTED***"
+    return "***REDACTED***"
+
+
+def _redact(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Редкие символы меняют длину при lower(): позиции не совпадают
+        return _SECRET_RE.sub(_redact_match, text)
+
+    candidates = []
+    for trigger in _SECRET_TRIGGERS:
+        position = lowered.find(trigger)
+        while position != -1:
+            candidates.append(position)
+            position = lowered.find(trigger, position + 1)
+    if not candidates:
+        return text
+
+    parts = []
+    last_end = 0
+    for position in sorted(candidates):
+        if position < last_end:
+            continue
+        match = _SECRET_RE.match(text, position)
+        if match is None:
+            continue
+        parts.append(text[last_end:position])
+        parts.append(_redact_match(match))
+        last_end = match.end()
+    if not parts:
+        return text
+    parts.append(text[last_end:])
+    return "".join(parts)
+
+
+_redact_cached = lru_cache(maxsize=_CACHE_SIZE)(_redact)
 
 
 def redact_secrets_in_text(text: str) -> str:
-    # Redact secrets in a log message string.
-    if not isinstance(text, str) or not text:
+    """
+    Скрыть секреты (ключи API, токены, пароли) в тексте сообщения лога
+
+    Args:
+        text: Текст сообщения
+
+    Returns:
+        Текст, в котором значения секретов заменены на ***REDACTED***
+    """
+    if not isinstance(text, str) or len(text) < _MIN_SECRET_LENGTH:
         return text
-    redacted = text
-    for pattern in _SECRET_VALUE_PATTERNS:
-        def _repl(match: re.Match) -> str:
-            if match.lastindex and match.lastindex >= 3:
-                key = match.group(1)
-                sep = match.group(2)
-                return f"{key}{sep}***REDACTED***"
-            if match.lastindex and match.lastindex >= 2:
-                key = match.group(1)
-                return f"{key} ***REDACTED***"
-            return "***REDACTED***"
-        redacted = pattern.sub(_repl, redacted)
-    return redacted
+    if len(text) <= _CACHE_MAX_LENGTH:
+        return _redact_cached(text)
+    return _redact(text)
 
 
 class SensitiveDataFilter(logging.Filter):
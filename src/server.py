@@ -3,6 +3,11 @@
 """
 
 import asyncio
+import contextlib
+import fnmatch
+import functools
+import importlib.util
+import inspect
 import logging
 import os
 import socket
@@ -10,38 +15,95 @@ import subprocess
 import sys
 import threading
 import time
+from concurrent.futures import wait as futures_wait
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
-
-from crewai import Crew, Task  # type: ignore[import-untyped]
-
-try:
-    from flask import Flask, jsonify  # type: ignore[import-untyped]
-
-    FLASK_AVAILABLE = True
-except ImportError:
-    FLASK_AVAILABLE = False
-
-try:
-    from watchdog.events import FileSystemEventHandler  # type: ignore[import-untyped]
-    from watchdog.observers import Observer  # type: ignore[import-untyped]
-
-    WATCHDOG_AVAILABLE = True
-except ImportError:
-    WATCHDOG_AVAILABLE = False
-
-from .agents.executor_agent import create_executor_agent
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
+
+# CrewAI, Flask и watchdog импортируются при первом использовании: при каждом
+# автоперезапуске сервер стартует заново, и их импорт заметно замедляет старт.
+# Здесь проверяется только наличие пакетов (без импорта).
+FLASK_AVAILABLE = importlib.util.find_spec("flask") is not None
+WATCHDOG_AVAILABLE = importlib.util.find_spec("watchdog") is not None
+
+if TYPE_CHECKING:
+    from crewai import Task  # type: ignore[import-untyped]
+
+from .adaptive_timeout import (
+    ActivityMonitor,
+    ProgressDeadline,
+    TimeoutModel,
+    configure_extension_policy,
+)
+from .change_tracker import ChangeSummary, ChangeTracker
+from .circuit_breaker import configure_circuit_breakers
+from .commit_stage import (
+    DEFAULT_CLEAN_GLOBS,
+    NATIVE_COMMIT,
+    CommitStage,
+    StagedChanges,
+    commit_message_prompt,
+    fallback_commit_message,
+    normalize_commit_message,
+)
 from .checkpoint_manager import CheckpointManager
 from .config_loader import ConfigLoader
 from .cursor_cli_interface import CursorCLIInterface, create_cursor_cli_interface
 from .cursor_file_interface import CursorFileInterface
-from .git_utils import auto_push_after_commit
-from .security_utils import SensitiveDataFilter
+from .event_bus import EventType, get_event_bus, publish_event, stream_sse
+from .event_store import configure_event_store
+from .file_watcher import DEFAULT_IGNORE_PATTERNS, ChangeDetector, Debouncer, PathMatcher
+from .git_utils import GitRepo, auto_push_after_commit
+from .hot_reload import ServerHandoff, ServerReloadException
+from .instruction_graph import (
+    InstructionGraph,
+    InstructionNode,
+    ParallelInstructionRunner,
+    matches_any,
+)
+from .instruction_policy import (
+    DOWNGRADE,
+    MERGE,
+    RUN,
+    SKIP,
+    InstructionPolicy,
+    PolicyContext,
+    PolicyDecision,
+    merge_instructions,
+)
+from .log_pipeline import (
+    BufferedFileHandler,
+    PlainAwareFormatter,
+    install_root_pipeline,
+    plain_output,
+    stop_root_pipeline,
+)
+from .metrics import (
+    CONTAINER_RESTARTS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    CURSOR_ERRORS,
+    INSTRUCTION_DURATION,
+    INSTRUCTION_RETRIES,
+    REGISTRY as METRICS_REGISTRY,
+    RESULT_WAIT,
+)
+from .profiler import (
+    PROFILE_FORMATS,
+    ProfilerBusyError,
+    SamplingProfiler,
+    format_stacks,
+    save_profile,
+)
+from .report_digest import ReportDigester
+from .session_affinity import SessionAffinity
 from .session_tracker import SessionTracker
+from .status_snapshot import SnapshotRefresher, StatusSnapshot
 from .status_manager import StatusManager
 from .task_logger import Colors, ServerLogger, TaskLogger, TaskPhase
+from .test_impact import DEFAULT_FULL_SUITE_FILES, TestImpactIndex
 from .todo_manager import TodoItem, TodoManager
+from .tracing import configure_tracing, get_tracer
+from .usefulness_triage import UsefulnessTriage
 
 logger = logging.getLogger(__name__)
 
@@ -172,14 +234,11 @@ if sys.platform == "win32":
 Path("logs").mkdir(exist_ok=True)
 
 
-class ServerReloadException(Exception):
-    """Исключение для инициации перезапуска сервера"""
-
-    pass
-
-
 def _setup_logging():
     """Настройка логирования (вызывается после очистки логов)"""
+    # Останавливаем предыдущий конвейер (он дописывает очередь и закрывает файл)
+    stop_root_pipeline()
+
     # Удаляем существующий FileHandler для code_agent.log если есть
     root_logger = logging.getLogger()
     for handler in root_logger.handlers[:]:
@@ -198,35 +257,14 @@ def _setup_logging():
         except Exception:
             pass
 
-    # Настраиваем логирование (force=True доступен с Python 3.8+)
-    try:
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.FileHandler("logs/code_agent.log", encoding="utf-8"),
-                logging.StreamHandler(sys.stdout),
-            ],
-            force=True,  # Переопределяем существующую конфигурацию (Python 3.8+)
-        )
-    except TypeError:
-        # Для старых версий Python без force=True
-        # Очищаем handlers и настраиваем заново
-        root_logger = logging.getLogger()
-        root_logger.handlers.clear()
-        root_logger.addHandler(logging.FileHandler("logs/code_agent.log", encoding="utf-8"))
-        root_logger.addHandler(logging.StreamHandler(sys.stdout))
-        root_logger.setLevel(logging.INFO)
-
-    # Apply sensitive data redaction filter
-    try:
-        sensitive_filter = SensitiveDataFilter()
-        root_logger = logging.getLogger()
-        root_logger.addFilter(sensitive_filter)
-        for handler in root_logger.handlers:
-            handler.addFilter(sensitive_filter)
-    except Exception:
-        pass
+    # Корневой логгер пишет через асинхронный конвейер: очистка секретов выполняется
+    # один раз при постановке записи в очередь, файл и консоль - в фоновом потоке
+    formatter = PlainAwareFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    file_handler = BufferedFileHandler("logs/code_agent.log", encoding="utf-8")
+    console_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    install_root_pipeline([file_handler, console_handler], level=logging.INFO)
 
 
 class CodeAgentServer:
@@ -247,13 +285,19 @@ class CodeAgentServer:
     # Константы для работы с файлами
     DEFAULT_MAX_FILE_SIZE = 1_000_000  # Максимальный размер файла по умолчанию (1 MB)
 
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(
+        self, config_path: Optional[str] = None, handoff: Optional[ServerHandoff] = None
+    ):
         """
         Инициализация сервера агента
 
         Args:
             config_path: Путь к файлу конфигурации
+            handoff: Ресурсы предыдущего экземпляра при горячей перезагрузке
         """
+        self._handoff = handoff
+        self.reload_handoff: Optional[ServerHandoff] = None
+
         # Загрузка конфигурации
         self.config = ConfigLoader(config_path or "config/config.yaml")
 
@@ -273,23 +317,20 @@ class CodeAgentServer:
         # Отложенные задачи (задачи, которые LLM Manager решил отложить до конца списка TODO)
         self.postponed_tasks: List[TodoItem] = []
 
-        # Создание агента
-        agent_config = self.config.get("agent", {})
-        self.agent = create_executor_agent(
-            project_dir=self.project_dir,
-            docs_dir=self.docs_dir,
-            role=agent_config.get("role"),
-            goal=agent_config.get("goal"),
-            backstory=agent_config.get("backstory"),
-            allow_code_execution=agent_config.get("allow_code_execution", True),
-            verbose=agent_config.get("verbose", True),
-        )
+        # Агент CrewAI создается при первом обращении (см. свойство agent)
+        self._agent = None
 
         # Настройки сервера
         server_config = self.config.get("server", {})
         self.check_interval = server_config.get("check_interval", self.DEFAULT_CHECK_INTERVAL)
         self.task_delay = server_config.get("task_delay", self.DEFAULT_TASK_DELAY)
         self.max_iterations = server_config.get("max_iterations")
+        # Одновременных сессий агента на задачу (1 - инструкции строго по очереди)
+        self.parallel_instructions = server_config.get("parallel_instructions", 1)
+        self._instruction_runner: Optional[ParallelInstructionRunner] = None
+        # Снимок дерева после последней инструкции основного потока и состояние
+        # опережающих запусков в этот момент (см. _worktree_snapshot)
+        self._settled_snapshot: Optional[Tuple[str, Optional[int]]] = None
 
         # Настройки HTTP сервера
         self.http_port = server_config.get("http_port", 3456)
@@ -297,10 +338,34 @@ class CodeAgentServer:
         self.flask_app = None
         self.http_thread = None
         self.http_server = None  # Ссылка на werkzeug сервер для управления
+        events_config = server_config.get("events", {})
+        self.events_enabled = events_config.get("enabled", True)
+        self.events_heartbeat_interval = events_config.get("heartbeat_interval", 15)
+        self.metrics_enabled = server_config.get("metrics", {}).get("enabled", True)
+        # Отладочные endpoints /debug/profile и /debug/stacks (сэмплер работает только по запросу)
+        debug_config = server_config.get("debug", {}) or {}
+        self.debug_enabled = debug_config.get("enabled", True)
+        self.profiler = SamplingProfiler(
+            interval=debug_config.get("sample_interval_ms", 5) / 1000,
+            max_seconds=debug_config.get("max_profile_seconds", 60),
+        )
+        self.profiles_dir = Path(__file__).parent.parent / debug_config.get(
+            "profiles_dir", "logs/profiles"
+        )
+        self._main_loop: Optional[asyncio.AbstractEventLoop] = None
 
         # Настройки автоперезапуска
         self.auto_reload = server_config.get("auto_reload", True)
         self.reload_on_py_changes = server_config.get("reload_on_py_changes", True)
+        self.reload_debounce = server_config.get("reload_debounce", 0.5)
+        self.reload_ignore_patterns = server_config.get(
+            "reload_ignore_patterns", list(DEFAULT_IGNORE_PATTERNS)
+        )
+        # hot - перезагрузка измененных модулей в процессе без перезапуска контейнеров,
+        # restart - полный перезапуск сервера и Docker окружения
+        self.reload_mode = server_config.get("reload_mode", "hot")
+        self._changed_files: Set[str] = set()
+        self._file_handler = None
         self.file_observer = None
         self._should_reload = False
         self._reload_after_instruction = False  # Флаг для перезапуска после текущей инструкции
@@ -325,6 +390,8 @@ class CodeAgentServer:
 
         # Флаг отслеживания активной задачи (для отложенного перезапуска)
         self._task_in_progress = False
+        # Число ожиданий файла результата (основной поток и опережающие инструкции)
+        self._result_waits = 0
         self._task_in_progress_lock = threading.Lock()
 
         # Отслеживание повторяющихся ошибок Cursor
@@ -363,7 +430,8 @@ class CodeAgentServer:
 
         # Инициализация Cursor CLI интерфейса (если доступен и выбран)
         if self.cli_interface_type == "cursor":
-            self.cursor_cli = self._init_cursor_cli()
+            adopted_cli = handoff.take_interface("cursor_cli") if handoff else None
+            self.cursor_cli = adopted_cli or self._init_cursor_cli()
         else:
             self.cursor_cli = None
             logger.info("Cursor CLI инициализация пропущена (выбран другой интерфейс)")
@@ -377,7 +445,11 @@ class CodeAgentServer:
         )
 
         # Инициализация Gemini CLI интерфейса
-        if GEMINI_AVAILABLE:
+        adopted_gemini = handoff.take_interface("gemini_cli") if handoff else None
+        if adopted_gemini is not None:
+            self.gemini_cli = adopted_gemini
+            self.use_gemini_cli = self.gemini_cli.is_available()
+        elif GEMINI_AVAILABLE:
             gemini_config = self.config.get("gemini", {})
             cli_config = gemini_config.get("cli", {})
             logger.info(f"Gemini config: {gemini_config}")
@@ -420,11 +492,87 @@ class CodeAgentServer:
         codeagent_dir = Path(__file__).parent.parent  # Директория codeAgent
         self.checkpoint_manager = CheckpointManager(codeagent_dir, checkpoint_file)
 
+        # Адаптивные таймауты: дедлайн инструкции по истории ее длительности в checkpoint,
+        # продление после дедлайна, пока агент активен (вывод или изменения файлов)
+        timeouts_config = self.config.get("timeouts", {}) or {}
+        configure_extension_policy(timeouts_config.get("extension", {}) or {})
+        self.timeout_model = TimeoutModel.from_config(self.checkpoint_manager, timeouts_config)
+        self.min_result_wait = timeouts_config.get("min_wait_seconds", 120)
+
+        # Встроенная стадия коммита: шаблоны с `native: commit` выполняются сервером
+        git_config = self.config.get("git", {}) or {}
+        self.native_commit_enabled = git_config.get("native_commit", True)
+        self.commit_message_llm = git_config.get("commit_message_llm", True)
+        self.commit_message_template = git_config.get("commit_message_template", "")
+
+        # Политика инструкций: пропуск, объединение и более быстрая модель по правилам шаблонов
+        self.instruction_policy = InstructionPolicy.from_config(
+            self.config.get("instruction_policy", {}) or {}
+        )
+
+        # Трассировка задач (спаны задача -> инструкция -> subprocess/ожидание/LLM/git)
+        configure_tracing(self.config.get("tracing", {}), codeagent_dir)
+
+        # Хранилище событий для офлайн аналитики (scripts/event_analytics.py)
+        event_store = configure_event_store(self.config.get("event_store", {}), codeagent_dir)
+        # События публикуются, только если их читает /events или хранилище событий
+        get_event_bus().enabled = self.events_enabled or event_store is not None
+
+        # Выключатели бэкендов: модели Cursor и LLM, Gemini CLI, Docker-контейнеры
+        configure_circuit_breakers(self.config.get("circuit_breakers", {}), codeagent_dir)
+
+        # Снимки рабочего дерева до и после инструкций (точная проверка реальной работы)
+        tracker_config = self.config.get("change_tracker", {}) or {}
+        self.change_tracker = (
+            ChangeTracker(self.project_dir, ignore=tracker_config.get("ignore", []))
+            if tracker_config.get("enabled", True)
+            else None
+        )
+        self._instruction_span = None
+        self._instruction_span_token = None
+
+        # Выбор затронутых изменениями тестов для подстановки {affected_tests} в инструкции
+        impact_config = self.config.get("test_impact", {}) or {}
+        self.test_impact = (
+            TestImpactIndex(
+                self.project_dir,
+                codeagent_dir / impact_config.get("index_file", ".codeagent_test_impact.json"),
+                coverage_file=impact_config.get("coverage_file", ".coverage"),
+                full_suite_files=impact_config.get("full_suite_files") or DEFAULT_FULL_SUITE_FILES,
+            )
+            if impact_config.get("enabled", True)
+            else None
+        )
+        self.test_impact_max_tests = impact_config.get("max_tests", 100)
+
+        # Одна сессия агента на задачу (--resume для Cursor, файл сессии для Gemini)
+        self.session_affinity = SessionAffinity.from_config(
+            self.config.get("session_affinity", {}) or {}
+        )
+
+        # Оценки полезности пунктов TODO: пакетно при старте итерации, хранятся между итерациями
+        self.usefulness_triage = UsefulnessTriage.from_config(
+            self.config.get("usefulness_triage", {}) or {}, codeagent_dir
+        )
+
+        # Дайджесты отчетов и планов для промптов LLM (вместо файлов целиком)
+        self.report_digester = ReportDigester.from_config(
+            self.config.get("report_digest", {}) or {}
+        )
+
+        # Снимок статуса для /status: обновляется при изменениях checkpoint, а не на каждый запрос.
+        # Сохранение checkpoint только запрашивает фоновую пересборку (частые сохранения
+        # объединяются), смена состояния сервера пересобирает снимок сразу
+        self.status_snapshot = StatusSnapshot()
+        self._status_refresher = SnapshotRefresher(self.status_snapshot, self._build_status)
+        self.checkpoint_manager.add_change_listener(self._status_refresher.request)
+
         # Проверяем, нужно ли восстановление после сбоя
         self._check_recovery_needed()
 
         # Синхронизируем TODO задачи с checkpoint (помечаем выполненные задачи)
         self._sync_todos_with_checkpoint()
+        self._refresh_status_snapshot()
 
     def _validate_path_within_project(
         self, path: Union[str, Path], operation: str = "access"
@@ -1093,7 +1241,12 @@ class CodeAgentServer:
             return None
 
     def execute_cursor_instruction(
-        self, instruction: str, task_id: str, timeout: Optional[int] = None
+        self,
+        instruction: str,
+        task_id: str,
+        timeout: Optional[int] = None,
+        model: Optional[str] = None,
+        chat_id: Optional[str] = None,
     ) -> dict:
         """
         Выполнить инструкцию через Cursor CLI (если доступен)
@@ -1102,6 +1255,8 @@ class CodeAgentServer:
             instruction: Текст инструкции для выполнения
             task_id: Идентификатор задачи
             timeout: Таймаут выполнения (если None - используется из конфига)
+            model: Модель вместо модели из конфигурации (политика инструкций, только Cursor)
+            chat_id: Чат задачи для продолжения (привязка сессии)
 
         Returns:
             Словарь с результатом выполнения
@@ -1175,11 +1330,22 @@ class CodeAgentServer:
         start_time = time.time()
         logger.info("🚀 Запускаем выполнение инструкции в Cursor CLI...")
 
+        # model и chat_id передаются только если заданы: не все интерфейсы агента их принимают
+        parameters = inspect.signature(self.cursor_cli.execute_instruction).parameters
+        optional_kwargs = {}
+        for name, value in (("model", model), ("chat_id", chat_id)):
+            if not value:
+                continue
+            if name in parameters:
+                optional_kwargs[name] = value
+            else:
+                logger.info(f"Интерфейс агента не поддерживает {name}, {value} не применяется")
         result = self.cursor_cli.execute_instruction(
             instruction=instruction,
             task_id=task_id,
             working_dir=str(self.project_dir),
             timeout=timeout,
+            **optional_kwargs,
         )
 
         execution_time = time.time() - start_time
@@ -1203,6 +1369,20 @@ class CodeAgentServer:
 
         return result
 
+    def _task_session(self, task_id: str) -> Optional[str]:
+        """
+        Сессия агента задачи для очередной инструкции (привязка сессии)
+
+        Returns:
+            session_id Gemini / chat_id Cursor или None (новый чат на инструкцию)
+        """
+        if self.use_gemini_cli and self.cli_interface_type == "gemini":
+            # Gemini хранит историю в файле сессии, ID выбирает сервер
+            return self.session_affinity.acquire(task_id, lambda: f"{task_id}-{time.time_ns()}")
+        if self.cursor_cli is None or not hasattr(self.cursor_cli, "create_chat"):
+            return None
+        return self.session_affinity.acquire(task_id, self.cursor_cli.create_chat)
+
     def _execute_cursor_instruction_with_retry(
         self,
         instruction: str,
@@ -1212,6 +1392,8 @@ class CodeAgentServer:
         instruction_num: int,
         wait_for_file: Optional[str] = None,
         control_phrase: Optional[str] = None,
+        model: Optional[str] = None,
+        session: bool = True,
     ) -> dict:
         """
         Выполнить инструкцию через Cursor с обработкой повторяющихся ошибок
@@ -1224,6 +1406,9 @@ class CodeAgentServer:
             instruction_num: Номер инструкции
             wait_for_file: Ожидаемый файл (для передачи в CLI)
             control_phrase: Контрольная фраза (для передачи в CLI)
+            model: Модель вместо модели из конфигурации (политика инструкций)
+            session: Продолжать сессию агента задачи (False - отдельная сессия,
+                например для опережающего запуска)
 
         Returns:
             Словарь с результатом выполнения
@@ -1237,19 +1422,38 @@ class CodeAgentServer:
                     f"🔄 Попытка {attempt + 1}/{max_retries + 1} выполнения инструкции {instruction_num} для задачи {task_id}"
                 )
 
-                # Если используется Gemini CLI интерфейс, передаем wait_for_file и control_phrase
-                if self.use_gemini_cli and self.cli_interface_type == "gemini":
-                    result = self.gemini_cli.execute_instruction(
-                        instruction=instruction,
-                        task_id=task_id,
-                        timeout=timeout,
-                        wait_for_file=wait_for_file,
-                        control_phrase=control_phrase,
+                with get_tracer().start_as_current_span(
+                    "agent.exec",
+                    {"agent.backend": self.cli_interface_type, "agent.attempt": attempt + 1},
+                ) as exec_span:
+                    session_id = self._task_session(task_id) if session else None
+                    # Если используется Gemini CLI интерфейс, передаем wait_for_file и control_phrase
+                    if self.use_gemini_cli and self.cli_interface_type == "gemini":
+                        result = self.gemini_cli.execute_instruction(
+                            instruction=instruction,
+                            task_id=task_id,
+                            timeout=timeout,
+                            wait_for_file=wait_for_file,
+                            control_phrase=control_phrase,
+                            session_id=session_id,
+                        )
+                    else:
+                        # Для Cursor CLI пока не передаем (не поддерживается в интерфейсе)
+                        result = self.execute_cursor_instruction(
+                            instruction=instruction,
+                            task_id=task_id,
+                            timeout=timeout,
+                            model=model,
+                            chat_id=session_id,
+                        )
+                    exec_span.set_status(
+                        bool(result.get("success")), result.get("error_message") or ""
                     )
-                else:
-                    # Для Cursor CLI пока не передаем (не поддерживается в интерфейсе)
-                    result = self.execute_cursor_instruction(
-                        instruction=instruction, task_id=task_id, timeout=timeout
+                if session_id:
+                    self.session_affinity.record(
+                        task_id,
+                        len(instruction) + len(result.get("stdout") or ""),
+                        bool(result.get("success")),
                     )
 
                 if result.get("success"):
@@ -1281,6 +1485,7 @@ class CodeAgentServer:
                     should_retry = True
 
                 if should_retry and attempt < max_retries:
+                    INSTRUCTION_RETRIES.inc(reason="cli_error")
                     logger.info(f"⏳ Ждем {retry_delay} сек перед повторной попыткой...")
                     time.sleep(retry_delay)
                     continue
@@ -1296,6 +1501,7 @@ class CodeAgentServer:
                     f"💥 Неожиданная ошибка при выполнении инструкции {instruction_num} на попытке {attempt + 1}: {e}"
                 )
                 if attempt < max_retries:
+                    INSTRUCTION_RETRIES.inc(reason="exception")
                     logger.info(f"⏳ Ждем {retry_delay} сек перед повторной попыткой...")
                     time.sleep(retry_delay)
                     continue
@@ -1315,6 +1521,107 @@ class CodeAgentServer:
             "cli_available": False,
         }
 
+    def _on_instruction_finished(
+        self,
+        task_id: str,
+        task_type: str,
+        instruction_num: int,
+        instruction_id: Any,
+        instruction_name: str,
+        success: bool,
+        started_at: float,
+    ) -> None:
+        """
+        Зафиксировать завершение инструкции (метрики и событие для live-мониторинга)
+
+        Args:
+            task_id: ID задачи
+            task_type: Тип задачи
+            instruction_num: Порядковый номер инструкции
+            instruction_id: ID шаблона инструкции
+            instruction_name: Название инструкции
+            success: Успешно ли выполнена инструкция
+            started_at: Время начала выполнения инструкции (timestamp)
+        """
+        self._end_instruction_span(success)
+        duration = time.time() - started_at
+        INSTRUCTION_DURATION.observe(
+            duration,
+            instruction_id=instruction_id,
+            task_type=task_type,
+            success=str(bool(success)).lower(),
+        )
+        publish_event(
+            EventType.INSTRUCTION_FINISHED,
+            task_id=task_id,
+            task_type=task_type,
+            instruction_num=instruction_num,
+            instruction_id=instruction_id,
+            instruction_name=instruction_name,
+            success=success,
+            duration=round(duration, 3),
+            **self._agent_labels(),
+        )
+
+    def _agent_labels(self) -> Dict[str, str]:
+        """
+        Модель и контейнер агента, выполняющего инструкции (для событий аналитики)
+
+        Returns:
+            Словарь с ключами model и container
+        """
+        if self.use_gemini_cli and self.cli_interface_type == "gemini":
+            cli_config = self.config.get("gemini", {}).get("cli", {})
+        else:
+            cli_config = self.config.get("cursor", {}).get("cli", {})
+        return {
+            "model": str(cli_config.get("model") or "auto"),
+            "container": str(cli_config.get("container_name") or ""),
+        }
+
+    def _start_instruction_span(
+        self, task_type: str, instruction_num: int, instruction_id: Any, instruction_name: str
+    ) -> None:
+        """
+        Открыть спан инструкции и сделать его текущим
+
+        Args:
+            task_type: Тип задачи
+            instruction_num: Порядковый номер инструкции
+            instruction_id: ID шаблона инструкции
+            instruction_name: Название инструкции
+        """
+        self._end_instruction_span(False, "Инструкция не завершена")
+        tracer = get_tracer()
+        self._instruction_span = tracer.start_span(
+            "instruction",
+            {
+                "instruction.num": instruction_num,
+                "instruction.id": str(instruction_id),
+                "instruction.name": instruction_name,
+                "task.type": task_type,
+            },
+        )
+        self._instruction_span_token = tracer.activate(self._instruction_span)
+
+    def _end_instruction_span(self, success: bool, message: str = "") -> None:
+        """
+        Завершить текущий спан инструкции (если открыт)
+
+        Args:
+            success: Успешно ли выполнена инструкция
+            message: Описание ошибки
+        """
+        span, token = self._instruction_span, self._instruction_span_token
+        if span is None:
+            return
+        self._instruction_span = None
+        self._instruction_span_token = None
+        span.set_status(success, message)
+        span.end()
+        if token is not None:
+            get_tracer().deactivate(token)
+
     async def _safe_close_llm_manager(self, llm_manager):
         """
         Безопасно закрывает LLM manager, обрабатывая все исключения
@@ -1554,6 +1861,16 @@ class CodeAgentServer:
         logger.info(
             f"Обработка ошибки Agent CLI: error_message='{error_message}', is_critical={is_critical}, is_unexpected={is_unexpected}"
         )
+        error_class = "critical" if is_critical else "unexpected" if is_unexpected else "other"
+        CURSOR_ERRORS.inc(error_class=error_class)
+        publish_event(
+            EventType.ERROR,
+            task_id=getattr(task_logger, "task_id", None),
+            source="agent_cli",
+            error_class=error_class,
+            message=(error_message or "")[:300],
+            **self._agent_labels(),
+        )
 
         with self._cursor_error_lock:
             # Проверяем, та же ли ошибка (сравниваем по первым 100 символам для группировки похожих ошибок)
@@ -1768,6 +2085,20 @@ class CodeAgentServer:
         Returns:
             True если Перезапуск успешен, False иначе
         """
+        # Перезапуск и очистка чатов прервали бы сессии опережающих инструкций
+        runner = self._instruction_runner
+        with runner.exclusive() if runner is not None else contextlib.nullcontext():
+            success = self._restart_cursor_environment_impl()
+        CONTAINER_RESTARTS.inc(success=str(bool(success)).lower())
+        publish_event(
+            EventType.CONTAINER_RESTART,
+            success=bool(success),
+            container=self._agent_labels()["container"],
+        )
+        return success
+
+    def _restart_cursor_environment_impl(self) -> bool:
+        """Выполнить перезапуск Cursor environment (см. _restart_cursor_environment)"""
         logger.info("---")
         logger.info("Перезапуск Cursor environment")
         logger.info("---")
@@ -2129,12 +2460,451 @@ class CodeAgentServer:
             "plan_item_number": str(instruction_num),  # Номер инструкции
             "plan_item_text": todo_item.text,
         }
+        if "{affected_tests}" in instruction_text:
+            replacements["affected_tests"] = self._affected_tests(task_id)
 
         for key, value in replacements.items():
             instruction_text = instruction_text.replace(f"{{{key}}}", str(value))
 
         return instruction_text
 
+    def _affected_tests(self, task_id: str) -> str:
+        """
+        Тесты, затронутые незакоммиченными изменениями задачи ({affected_tests})
+
+        Args:
+            task_id: Идентификатор задачи
+
+        Returns:
+            Команда pytest с node ID затронутых тестов или указание агенту
+            выбрать тесты самостоятельно, если анализ недоступен
+        """
+        fallback = "не определены - запусти тесты, связанные с текущей задачей"
+        if self.test_impact is None or self.change_tracker is None:
+            return fallback
+        changes = self.change_tracker.since_head(self._worktree_snapshot())
+        if changes is None:
+            return fallback
+        try:
+            selection = self.test_impact.select(change.path for change in changes.files)
+        except Exception as e:
+            logger.warning(f"Не удалось выбрать затронутые тесты: {e}", exc_info=True)
+            return fallback
+        logger.info(
+            f"🧪 Затронутые тесты задачи {task_id}: "
+            f"{'все' if selection.full_suite else len(selection.tests)} ({selection.reason})"
+        )
+        return selection.format(self.test_impact_max_tests)
+
+    def _build_instruction_graph(self, templates: List[Dict[str, Any]]) -> InstructionGraph:
+        """
+        Граф инструкций задачи (depends_on, reads/writes, parallel_safe из шаблонов)
+
+        Args:
+            templates: Шаблоны инструкций в порядке выполнения
+
+        Returns:
+            Граф; при ошибке в зависимостях - линейный граф (строго по очереди)
+        """
+        try:
+            graph = InstructionGraph.from_templates(templates)
+        except ValueError as e:
+            logger.warning(f"Некорректные зависимости инструкций, выполняем по очереди: {e}")
+            return InstructionGraph.linear(templates)
+        parallel = [node.key for node in graph.nodes if node.parallel_safe]
+        if parallel and self.parallel_instructions > 1:
+            logger.info(
+                f"Граф инструкций: {len(graph.nodes)} узлов, опережающий запуск для {parallel} "
+                f"(сессий агента: до {self.parallel_instructions})"
+            )
+        return graph
+
+    @staticmethod
+    def _instruction_node_done(
+        node: InstructionNode, start_from_instruction: int, completed_nodes: Set[str]
+    ) -> bool:
+        """
+        Выполнена ли инструкция в предыдущей попытке задачи
+
+        Инструкции до точки восстановления пропускаются, если они есть в списке
+        выполненных узлов checkpoint. Старые checkpoint без этого списка
+        восстанавливаются по last_completed_instruction.
+        """
+        if node.index + 1 >= start_from_instruction:
+            return False
+        return not completed_nodes or node.key in completed_nodes
+
+    def _instruction_policy_context(
+        self,
+        task_id: str,
+        task_type: str,
+        previous: Optional[InstructionNode],
+        report_actions: Dict[str, str],
+        snapshot: Optional[str] = None,
+    ) -> PolicyContext:
+        """
+        Состояние задачи для политики инструкций
+
+        Изменения считаются относительно HEAD без отчетов агента (DEFAULT_CLEAN_GLOBS):
+        задача коммитит свою работу последней инструкцией.
+
+        Args:
+            task_id: Идентификатор задачи
+            task_type: Тип задачи
+            previous: Предыдущая инструкция списка (None для первой)
+            report_actions: Решения проверки репорта по ключам инструкций
+            snapshot: Актуальный снимок рабочего дерева (None - снять новый)
+        """
+        changes = self.change_tracker.since_head(snapshot) if self.change_tracker else None
+        changed_files = None
+        lines_changed = 0
+        if changes is not None:
+            files = [
+                change
+                for change in changes.files
+                if not any(fnmatch.fnmatchcase(change.path, glob) for glob in DEFAULT_CLEAN_GLOBS)
+            ]
+            changed_files = [change.path for change in files]
+            lines_changed = sum((change.added or 0) + (change.removed or 0) for change in files)
+
+        context = PolicyContext(
+            task_type=task_type,
+            changed_files=changed_files,
+            lines_changed=lines_changed,
+            snapshot=changes.after if changes is not None else None,
+        )
+        if previous is not None:
+            progress = self.checkpoint_manager.get_instruction_progress(task_id) or {}
+            context.previous_failed = previous.key not in progress.get("completed_nodes", [])
+            previous_changes = self.checkpoint_manager.get_instruction_changes(task_id).get(
+                str(previous.index + 1)
+            )
+            if previous_changes is not None:
+                context.previous_changed = previous_changes.get("files_changed", 0) > 0
+            context.previous_action = report_actions.get(previous.key)
+        return context
+
+    def _decide_instruction(
+        self,
+        node: InstructionNode,
+        graph: InstructionGraph,
+        task_id: str,
+        task_type: str,
+        report_actions: Dict[str, str],
+        carries_merged: bool = False,
+    ) -> Tuple[PolicyDecision, Optional[str]]:
+        """
+        Решение политики перед инструкцией основного потока
+
+        Объединение допускается только со следующей инструкцией, которую основной
+        поток выполняет сам (не встроенной и не опережающей); иначе инструкция
+        выполняется как обычно. Инструкция, к которой присоединены предыдущие,
+        не пропускается.
+
+        Args:
+            node: Инструкция
+            graph: Граф инструкций задачи
+            task_id: Идентификатор задачи
+            task_type: Тип задачи
+            report_actions: Решения проверки репорта по ключам инструкций
+            carries_merged: К инструкции присоединены предыдущие (merge)
+
+        Returns:
+            Решение политики (RUN, если правил нет) и снимок рабочего дерева, снятый
+            для оценки (используется как снимок до инструкции)
+        """
+        if not self.instruction_policy.enabled or not node.template.get("policy"):
+            return PolicyDecision(), None
+        previous = graph.nodes[node.index - 1] if node.index > 0 else None
+        context = self._instruction_policy_context(
+            task_id, task_type, previous, report_actions, self._worktree_snapshot()
+        )
+        decision = self._resolve_decision(node, graph, context, carries_merged)
+        if decision.action != RUN:
+            logger.info(
+                f"📐 Политика инструкции {node.key} ({node.name}): {decision.action}"
+                f"{f' ({decision.model})' if decision.model else ''} - {decision.reason}"
+            )
+            self.checkpoint_manager.record_instruction_decision(
+                task_id, node.key, decision.to_dict()
+            )
+            publish_event(
+                EventType.INSTRUCTION_POLICY,
+                task_id=task_id,
+                task_type=task_type,
+                instruction_id=node.key,
+                instruction_name=node.name,
+                **decision.to_dict(),
+            )
+        return decision, context.snapshot
+
+    def _resolve_decision(
+        self,
+        node: InstructionNode,
+        graph: InstructionGraph,
+        context: PolicyContext,
+        carries_merged: bool,
+    ) -> PolicyDecision:
+        """Решение политики с учетом ограничений основного потока (merge, пропуск)"""
+        decision = self.instruction_policy.evaluate(node.template, context)
+        if decision.action == MERGE:
+            following = graph.nodes[node.index + 1] if node.index + 1 < len(graph.nodes) else None
+            if (
+                following is None
+                or node.parallel_safe
+                or following.parallel_safe
+                or following.template.get("native")
+            ):
+                logger.info(f"Инструкцию {node.key} не с чем объединить, выполняем отдельно")
+                return PolicyDecision()
+        if decision.action == SKIP and carries_merged:
+            logger.info(f"Инструкция {node.key} не пропускается: к ней присоединены предыдущие")
+            return PolicyDecision()
+        return decision
+
+    def _run_instruction_ahead(
+        self,
+        node: InstructionNode,
+        todo_item: TodoItem,
+        task_id: str,
+        task_type: str,
+        task_logger: TaskLogger,
+    ) -> Dict[str, Any]:
+        """
+        Опережающий запуск инструкции (в потоке ParallelInstructionRunner)
+
+        Выполняет инструкцию в отдельной сессии агента и ждет ее отчет. Проверку
+        отчета, учет изменений и прогресс делает основной поток, когда доходит
+        до этой инструкции.
+
+        Args:
+            node: Узел графа инструкций
+            todo_item: Текущая задача
+            task_id: Идентификатор задачи
+            task_type: Тип задачи
+            task_logger: Логгер задачи
+
+        Returns:
+            Словарь success, result (ответ агента), snapshot, started_at
+        """
+        # Спан и сессия агента - локальные для потока: состояние инструкции основного
+        # потока (_instruction_span, чат задачи) опережающий запуск не трогает
+        with get_tracer().start_as_current_span(
+            "instruction",
+            {
+                "instruction.num": node.index + 1,
+                "instruction.id": str(node.template.get("instruction_id", node.key)),
+                "instruction.name": node.name,
+                "instruction.ahead": True,
+                "task.type": task_type,
+            },
+        ) as span:
+            ahead = self._execute_instruction_ahead(
+                node, todo_item, task_id, task_type, task_logger
+            )
+            span.set_status(bool(ahead.get("success")))
+        return ahead
+
+    def _execute_instruction_ahead(
+        self,
+        node: InstructionNode,
+        todo_item: TodoItem,
+        task_id: str,
+        task_type: str,
+        task_logger: TaskLogger,
+    ) -> Dict[str, Any]:
+        """Выполнить опережающую инструкцию (см. _run_instruction_ahead)"""
+        template = node.template
+        instruction_num = node.index + 1
+        model = None
+        snapshot = None
+        if self.instruction_policy.enabled and template.get("policy"):
+            context = self._instruction_policy_context(task_id, task_type, None, {})
+            snapshot = context.snapshot
+            decision = self.instruction_policy.evaluate(template, context)
+            if decision.action == SKIP:
+                # Основной поток примет решение сам, когда дойдет до инструкции
+                return {"success": False, "result": None, "snapshot": None, "started_at": 0.0}
+            if decision.action == DOWNGRADE:
+                model = decision.model
+        instruction_text = self._format_instruction(template, todo_item, task_id, instruction_num)
+        wait_for_file = template.get("wait_for_file", "")
+        if wait_for_file:
+            wait_for_file = (
+                wait_for_file.replace("{task_id}", task_id)
+                .replace("{date}", datetime.now().strftime("%Y%m%d"))
+                .replace("{plan_item_number}", str(instruction_num))
+            )
+        control_phrase = template.get("control_phrase", "")
+        timing_key = TimeoutModel.key(
+            template.get("instruction_id", instruction_num),
+            task_type,
+            self.cli_interface_type,
+            model or self._agent_labels()["model"],
+        )
+        timeout = self.timeout_model.deadline(timing_key, template.get("timeout", 600))
+
+        if snapshot is None and self.change_tracker:
+            snapshot = self.change_tracker.snapshot()
+        started_at = time.time()
+        result = self._execute_cursor_instruction_with_retry(
+            instruction=instruction_text,
+            task_id=task_id,
+            timeout=timeout,
+            task_logger=task_logger,
+            instruction_num=instruction_num,
+            wait_for_file=wait_for_file,
+            control_phrase=control_phrase,
+            model=model,
+            session=False,  # Сессия задачи занята основным потоком
+        )
+        success = bool(result.get("success"))
+        if success and wait_for_file:
+            wait_result = self._wait_for_result_file(
+                task_id=task_id,
+                wait_for_file=wait_for_file,
+                control_phrase=control_phrase,
+                timeout=int(max(timeout - (time.time() - started_at), self.min_result_wait)),
+            )
+            success = bool(wait_result.get("success"))
+        logger.info(
+            f"{'✅' if success else '⚠️'} Опережающий запуск инструкции {node.key} завершен "
+            f"за {time.time() - started_at:.1f} сек"
+        )
+        return {"success": success, "result": result, "snapshot": snapshot, "started_at": started_at}
+
+    async def _await_instruction_ahead(self, node: InstructionNode) -> Optional[Dict[str, Any]]:
+        """
+        Результат опережающего запуска инструкции для основного потока
+
+        Сообщает runner о начале инструкции, дожидается конфликтующих с ней
+        опережающих запусков и забирает ее собственный результат.
+
+        Args:
+            node: Инструкция, которую начинает основной поток
+
+        Returns:
+            Результат _run_instruction_ahead или None, если инструкцию нужно
+            выполнить в основном потоке (не запускалась заранее или не удалась)
+        """
+        runner = self._instruction_runner
+        if runner is None:
+            return None
+        runner.main_started(node)
+        future = runner.take(node)
+        pending = runner.conflicting(node) + ([future] if future is not None else [])
+        if pending:
+            await asyncio.to_thread(futures_wait, pending)
+        if future is None or future.cancelled():
+            return None
+        if future.exception() is not None:
+            logger.warning(
+                f"Опережающий запуск инструкции {node.key} завершился ошибкой: {future.exception()}"
+            )
+            return None
+        ahead = future.result()
+        if not ahead.get("success"):
+            logger.info(f"Опережающий запуск инструкции {node.key} не удался, повторяем по очереди")
+            return None
+        return ahead
+
+    async def _execute_native_commit(
+        self,
+        template: Dict[str, Any],
+        todo_item: TodoItem,
+        task_id: str,
+        wait_for_file: str,
+        control_phrase: str,
+        task_logger: TaskLogger,
+    ) -> Dict[str, Any]:
+        """
+        Выполнить инструкцию коммита внутри сервера (без сессии агента)
+
+        Очищает отчеты, индексирует изменения, коммитит с сообщением от быстрой
+        LLM модели (или из git.commit_message_template) и пишет отчет с
+        контрольной фразой. Push выполняет общий поток после инструкции.
+
+        Args:
+            template: Шаблон инструкции
+            todo_item: Текущая задача
+            task_id: Идентификатор задачи
+            wait_for_file: Файл отчета (относительно project_dir)
+            control_phrase: Контрольная фраза отчета
+            task_logger: Логгер задачи
+
+        Returns:
+            Результат в формате _execute_cursor_instruction_with_retry
+        """
+        stage = CommitStage(
+            self.project_dir,
+            clean_globs=template.get("clean_globs", DEFAULT_CLEAN_GLOBS),
+            clean_ignored=template.get("git_clean", True),
+        )
+        try:
+            changes = stage.prepare()
+            commit_info = None
+            if changes.empty:
+                logger.info("Встроенный коммит: нет изменений для коммита")
+            else:
+                message = await self._native_commit_message(changes, todo_item, task_id)
+                commit_info = stage.commit(message)
+                logger.info(
+                    f"✅ Встроенный коммит: {commit_info['hash_short']} - {commit_info['message']}"
+                )
+            report_file = wait_for_file or f"docs/results/result_{task_id}.md"
+            stage.write_report(report_file, commit_info, control_phrase)
+        except Exception as e:
+            logger.warning(f"Встроенный коммит не выполнен, передаем инструкцию агенту: {e}")
+            task_logger.log_warning(f"Встроенный коммит не выполнен: {e}")
+            return {"success": False, "native": True, "error_message": str(e)}
+
+        summary = (
+            f"Коммит {commit_info['hash_short']}: {commit_info['message']}"
+            if commit_info
+            else "Нет изменений для коммита"
+        )
+        task_logger.log_info(f"Встроенный коммит: {summary}")
+        return {"success": True, "native": True, "stdout": summary, "stderr": "", "return_code": 0}
+
+    async def _native_commit_message(
+        self, changes: StagedChanges, todo_item: TodoItem, task_id: str
+    ) -> str:
+        """
+        Сообщение для встроенного коммита
+
+        Args:
+            changes: Проиндексированные изменения
+            todo_item: Текущая задача
+            task_id: Идентификатор задачи
+
+        Returns:
+            Сообщение коммита (от LLM или из шаблона конфигурации)
+        """
+        if self.commit_message_llm:
+            llm_manager = None
+            try:
+                from src.llm.llm_manager import LLMManager
+
+                llm_manager = LLMManager()
+                response = await asyncio.wait_for(
+                    llm_manager.generate_response(
+                        prompt=commit_message_prompt(todo_item.text, changes), use_fastest=True
+                    ),
+                    timeout=60,
+                )
+                message = normalize_commit_message(response.content)
+                if response.success and message:
+                    return message
+            except Exception as e:
+                logger.warning(f"Не удалось сгенерировать сообщение коммита через LLM: {e}")
+            finally:
+                if llm_manager is not None:
+                    try:
+                        await llm_manager.close()
+                    except Exception:
+                        pass
+        return fallback_commit_message(self.commit_message_template, todo_item.text, task_id)
+
     def _wait_for_result_file(
         self,
         task_id: str,
@@ -2154,6 +2924,33 @@ class CodeAgentServer:
         Returns:
             Словарь с результатом ожидания
         """
+        with get_tracer().start_as_current_span(
+            "result_wait", {"wait.file": str(wait_for_file), "wait.timeout": timeout}
+        ) as span:
+            wait_result = self._poll_for_result_file(task_id, wait_for_file, control_phrase, timeout)
+            span.set_status(bool(wait_result.get("success")), wait_result.get("error") or "")
+        RESULT_WAIT.observe(
+            wait_result.get("wait_time") or 0.0,
+            found=str(bool(wait_result.get("success"))).lower(),
+        )
+        publish_event(
+            EventType.RESULT_WAIT,
+            task_id=task_id,
+            file=wait_for_file,
+            success=bool(wait_result.get("success")),
+            wait_time=round(wait_result.get("wait_time") or 0.0, 3),
+            timeout=timeout,
+        )
+        return wait_result
+
+    def _poll_for_result_file(
+        self,
+        task_id: str,
+        wait_for_file: Optional[str],
+        control_phrase: Optional[str],
+        timeout: int,
+    ) -> Dict[str, Any]:
+        """Опрос файла результата (см. _wait_for_result_file)"""
         if not wait_for_file:
             # Формируем путь по умолчанию
             wait_for_file = f"docs/results/result_{task_id}.md"
@@ -2203,8 +3000,7 @@ class CodeAgentServer:
         # Во время ожидания результата считаем, что "инструкция выполняется",
         # чтобы автоперезапуск не обрывал ожидание (перезапуск будет отложен).
         with self._task_in_progress_lock:
-            prev_task_in_progress = self._task_in_progress
-            self._task_in_progress = True
+            self._result_waits += 1
         # Сбрасываем счетчик изменений в ожидании при начале выполнения задачи
         with self._waiting_change_count_lock:
             self._waiting_change_count = 0
@@ -2213,6 +3009,8 @@ class CodeAgentServer:
         check_interval = 2
         last_log_time = 0
         log_interval = 100  # Логируем каждые 100 секунд
+        # После таймаута ожидание продлевается, пока агент меняет файлы проекта
+        progress = ProgressDeadline(timeout, ActivityMonitor(self.project_dir))
 
         try:
             logger.info(
@@ -2221,9 +3019,17 @@ class CodeAgentServer:
                 )
             )
 
-            while time.time() - start_time < timeout:
+            while not progress.expired():
                 elapsed = time.time() - start_time
-                remaining = timeout - elapsed
+                remaining = max(0.0, timeout - elapsed)
+
+                publish_event(
+                    EventType.WAIT_PROGRESS,
+                    task_id=task_id,
+                    file=wait_for_file,
+                    elapsed=round(elapsed, 1),
+                    timeout=timeout,
+                )
 
                 # Периодическое логирование для диагностики
                 if elapsed - last_log_time >= log_interval:
@@ -2432,9 +3238,10 @@ class CodeAgentServer:
                 time.sleep(check_interval)
 
             # Таймаут
+            wait_time = time.time() - start_time
             logger.warning(
                 Colors.colorize(
-                    f"⏰ Таймаут ожидания файла результата: {file_path.name} ({timeout}s истекло)",
+                    f"⏰ Таймаут ожидания файла результата: {file_path.name} ({wait_time:.0f}s истекло)",
                     Colors.BRIGHT_RED,
                 )
             )
@@ -2448,12 +3255,13 @@ class CodeAgentServer:
                 "success": False,
                 "file_path": str(file_path),
                 "content": None,
-                "wait_time": timeout,
+                "wait_time": wait_time,
+                "timed_out": True,
                 "error": f"Таймаут ожидания файла ({timeout} секунд)",
             }
         finally:
             with self._task_in_progress_lock:
-                self._task_in_progress = prev_task_in_progress
+                self._result_waits -= 1
 
     async def _check_task_usefulness(self, todo_item: TodoItem) -> Tuple[float, Optional[str]]:
         """
@@ -2505,28 +3313,16 @@ class CodeAgentServer:
             original_level = llm_logger.level
             llm_logger.setLevel(logging.WARNING)  # Подавляем INFO логи инициализации
 
-            # Временно убираем префиксы (asctime, name, levelname) для блока LLM Manager
-            # Применяем простой форматтер ко всем handlers root logger
-            # Все дочерние логгеры (src.server, src.llm.llm_manager) используют propagate=True
-            # и передают записи в root logger, поэтому изменение root logger достаточно
-            root_logger = logging.getLogger()
-            original_formatters = []
-            simple_format = logging.Formatter("%(message)s")
-
-            # Сохраняем и изменяем форматеры для всех handlers root logger
-            # Важно: обрабатываем handlers даже если у них нет форматера (устанавливаем новый)
-            for handler in root_logger.handlers[:]:  # Копируем список
-                original_formatter = handler.formatter
-                original_formatters.append((handler, original_formatter))
-                # Устанавливаем простой форматтер (даже если был None)
-                handler.setFormatter(simple_format)
-
-            # Функция для восстановления форматеров (вызывается перед return)
+            # Блок LLM Manager выводится без префиксов (asctime, name, levelname).
+            # Обработчики общие для всех потоков и форматируют записи в фоновом потоке
+            # конвейера, поэтому помечаются только записи этой задачи (plain_output)
+            plain_block = contextlib.ExitStack()
+            plain_block.enter_context(plain_output())
+
+            # Функция для восстановления вывода (вызывается перед return, повторно - без эффекта)
             def restore_formatters():
                 llm_logger.setLevel(original_level)
-                # Восстанавливаем оригинальные форматеры (включая None, если его не было)
-                for handler, original_formatter in original_formatters:
-                    handler.setFormatter(original_formatter)
+                plain_block.close()
 
             try:
                 llm_manager = LLMManager(config_path="config/llm_settings.yaml")
@@ -2976,7 +3772,7 @@ class CodeAgentServer:
 {todo_item.text}
 
 ПЛАН ВЫПОЛНЕНИЯ:
-{plan_content}
+{self.report_digester.digest_plan(plan_content)}
 
 Ответь ТОЛЬКО в формате JSON:
 {{
@@ -3068,12 +3864,106 @@ class CodeAgentServer:
             )
             return True, None  # При ошибке считаем что соответствует
 
+    def _worktree_snapshot(self) -> Optional[str]:
+        """
+        Снимок рабочего дерева для основного потока
+
+        Снимок после предыдущей инструкции используется повторно, если с тех пор
+        агент не запускался (ни основной поток, ни опережающие инструкции):
+        git add -A на большом дереве - самая дорогая часть учета изменений.
+
+        Returns:
+            Хеш дерева или None (трекер недоступен)
+        """
+        if self.change_tracker is None:
+            return None
+        settled = self._settled_snapshot
+        runner = self._instruction_runner
+        lanes = runner.idle_epoch() if runner is not None else 0
+        if settled is not None and lanes is not None and settled[1] == lanes:
+            return settled[0]
+        return self.change_tracker.snapshot()
+
+    def _record_instruction_changes(
+        self,
+        task_id: str,
+        instruction_num: int,
+        before: Optional[str],
+        node: Optional[InstructionNode] = None,
+        started_at: float = 0.0,
+        ran_ahead: bool = False,
+    ) -> Optional[ChangeSummary]:
+        """
+        Сравнить рабочее дерево со снимком до инструкции и сохранить изменения в checkpoint
+
+        Пока выполнялись опережающие инструкции, дерево меняли несколько сессий
+        агента: опережающей инструкции достаются только файлы ее writes,
+        инструкции основного потока - все, кроме writes опережающих инструкций,
+        выполнявшихся одновременно с ней.
+
+        Args:
+            task_id: ID задачи
+            instruction_num: Номер инструкции
+            before: Снимок до инструкции (None если трекер недоступен)
+            node: Узел графа инструкции
+            started_at: Время начала инструкции
+            ran_ahead: Инструкция выполнена опережающим запуском
+
+        Returns:
+            Изменения или None если их не удалось определить
+        """
+        if self.change_tracker is None or before is None:
+            return None
+        runner = self._instruction_runner
+        lanes = runner.idle_epoch() if runner is not None else 0
+        try:
+            after = self.change_tracker.snapshot()
+            if after is not None:
+                self._settled_snapshot = (after, lanes)
+            changes = self.change_tracker.diff(before, after)
+        except Exception as e:
+            logger.debug(f"Не удалось определить изменения инструкции {instruction_num}: {e}")
+            return None
+        if changes is None:
+            return None
+        if node is not None and ran_ahead and runner is not None:
+            changes.files = [
+                change
+                for change in changes.files
+                if node.owns(change.path, runner.graph.nodes)
+            ]
+        elif runner is not None:
+            foreign = [
+                pattern
+                for lane in runner.ran_since(started_at)
+                if lane is not node
+                for pattern in lane.writes
+            ]
+            own_report = [node.report] if node is not None and node.report else []
+            changes.files = [
+                change
+                for change in changes.files
+                if matches_any(change.path, own_report) or not matches_any(change.path, foreign)
+            ]
+        self.checkpoint_manager.record_instruction_changes(
+            task_id, instruction_num, changes.to_dict()
+        )
+        logger.info(
+            f"Изменения инструкции {instruction_num}: файлов {len(changes.files)}, "
+            f"строк +{changes.lines_added}/-{changes.lines_removed}"
+        )
+        return changes
+
     def _verify_real_work_done(
         self, task_id: str, todo_item: TodoItem, result_content: str
     ) -> bool:
         """
         Проверка, что была выполнена реальная работа, а не только создан план
 
+        Если изменения инструкций задачи отслеживались (см. ChangeTracker), решение
+        принимается по ним: работа есть, если инструкции изменили хотя бы один файл
+        вне отчетов агента. Иначе используются ключевые слова отчета и git status.
+
         Args:
             task_id: ID задачи
             todo_item: Элемент todo-листа
@@ -3082,6 +3972,21 @@ class CodeAgentServer:
         Returns:
             True если работа выполнена, False если только план
         """
+        recorded = self.checkpoint_manager.get_instruction_changes(task_id)
+        if recorded:
+            changed_files = {
+                change.path
+                for data in recorded.values()
+                for change in ChangeSummary.from_dict(data).files
+            }
+            if changed_files:
+                logger.info(f"Инструкции задачи {task_id} изменили файлов: {len(changed_files)}")
+                return True
+            logger.warning(
+                f"Для задачи {task_id} выполнен только план, инструкции не изменили файлов"
+            )
+            return False
+
         # Проверяем по ключевым словам в отчете
         result_lower = result_content.lower()
 
@@ -3106,20 +4011,10 @@ class CodeAgentServer:
 
         # Дополнительная проверка - наличие изменений в git (если доступен)
         try:
-            import subprocess
-
-            git_status = subprocess.run(
-                ["git", "status", "--short"],
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            if git_status.returncode == 0:
-                has_git_changes = bool(git_status.stdout.strip())
-                if has_git_changes:
-                    logger.info(f"Обнаружены изменения в git для задачи {task_id}")
-                    return True
+            git_status = GitRepo.for_path(self.project_dir).status(refresh=True)
+            if git_status and git_status.dirty:
+                logger.info(f"Обнаружены изменения в git для задачи {task_id}")
+                return True
         except Exception as e:
             logger.debug(f"Не удалось проверить git статус: {e}")
 
@@ -3209,13 +4104,28 @@ class CodeAgentServer:
                 self.llm_manager = llm_manager
                 logger.info("DEBUG: LLM Manager создан успешно")
 
-            # Анализируем репорт
+            # Фактические изменения инструкции (если отслеживались) дополняют отчет
+            changes_data = self.checkpoint_manager.get_instruction_changes(task_id).get(
+                str(instruction_num)
+            )
+            changes_summary = (
+                ChangeSummary.from_dict(changes_data).format() if changes_data else None
+            )
+
+            # Анализируем репорт (по дайджесту: итоги тестов, ошибки, чеклисты, файлы)
+            report_digest = self.report_digester.digest(report_content)
+            if len(report_digest) < len(report_content):
+                logger.debug(
+                    f"Дайджест репорта {report_file}: "
+                    f"{len(report_content)} -> {len(report_digest)} символов"
+                )
             logger.info("DEBUG: Вызываем llm_manager.analyze_report_and_decide")
             decision_data = await llm_manager.analyze_report_and_decide(
-                report_content=report_content,
+                report_content=report_digest,
                 report_file=report_file,
                 next_instruction_name=next_instruction_name,
                 task_id=task_id,
+                changes_summary=changes_summary,
             )
             logger.info(f"DEBUG: analyze_report_and_decide вернул: {decision_data}")
 
@@ -3232,6 +4142,14 @@ class CodeAgentServer:
 
             logger.info(f"🤖 Решение системы для инструкции {instruction_num}: {action}")
             logger.info(f"📝 Причина: {reason}")
+            publish_event(
+                EventType.LLM_DECISION,
+                task_id=task_id,
+                instruction_num=instruction_num,
+                report_file=report_file,
+                action=action,
+                reason=reason[:500],
+            )
             task_logger.log_info(
                 f"Проверка репорта после инструкции {instruction_num}: {action} - {reason}"
             )
@@ -3450,19 +4368,76 @@ class CodeAgentServer:
         """
         Определить, нужно ли использовать Cursor для задачи
 
-        Args:
-            todo_item: Элемент todo-листа
+        Args:
+            todo_item: Элемент todo-листа
+
+        Returns:
+            True если нужно использовать Cursor, False для CrewAI
+        """
+        # По умолчанию используем Cursor для всех задач
+        # Файловый интерфейс всегда доступен, CLI - если установлен
+        cursor_config = self.config.get("cursor", {})
+        prefer_cursor = cursor_config.get("prefer_cursor", True)
+
+        # Используем Cursor если prefer_cursor=True (по умолчанию True)
+        return prefer_cursor
+
+    @property
+    def agent(self):
+        """
+        Агент CrewAI для выполнения задач без Cursor
+
+        Создается при первом обращении: по умолчанию задачи выполняются через
+        Cursor, и импорт crewai при старте сервера не нужен.
+        """
+        if self._agent is None:
+            from .agents.executor_agent import create_executor_agent
+
+            agent_config = self.config.get("agent", {})
+            self._agent = create_executor_agent(
+                project_dir=self.project_dir,
+                docs_dir=self.docs_dir,
+                role=agent_config.get("role"),
+                goal=agent_config.get("goal"),
+                backstory=agent_config.get("backstory"),
+                allow_code_execution=agent_config.get("allow_code_execution", True),
+                verbose=agent_config.get("verbose", True),
+            )
+        return self._agent
+
+    async def _triage_pending_tasks(self, pending_tasks: List[TodoItem]) -> None:
+        """
+        Пакетная оценка полезности непройденных пунктов без сохраненной оценки
+
+        Один LLMManager и одна загрузка документации на все пакеты; ошибки триажа
+        не останавливают итерацию (задачи без оценки выполняются).
+
+        Args:
+            pending_tasks: Непройденные пункты TODO
+        """
+        triage = self.usefulness_triage
+        texts = triage.pending([item.text for item in pending_tasks]) if triage.enabled else []
+        if not texts:
+            return
+        try:
+            if not getattr(self, "llm_manager", None) or not getattr(
+                self.llm_manager, "clients", None
+            ):
+                from src.llm.llm_manager import LLMManager
+
+                self.llm_manager = LLMManager()
+            llm_manager = self.llm_manager
+            json_response_format = {"type": "json_object"}
 
-        Returns:
-            True если нужно использовать Cursor, False для CrewAI
-        """
-        # По умолчанию используем Cursor для всех задач
-        # Файловый интерфейс всегда доступен, CLI - если установлен
-        cursor_config = self.config.get("cursor", {})
-        prefer_cursor = cursor_config.get("prefer_cursor", True)
+            async def generate(prompt: str) -> Optional[str]:
+                response = await llm_manager.generate_response(
+                    prompt=prompt, use_fastest=False, response_format=json_response_format
+                )
+                return response.content
 
-        # Используем Cursor если prefer_cursor=True (по умолчанию True)
-        return prefer_cursor
+            await triage.triage(texts, generate, context=self._load_documentation())
+        except Exception as e:
+            logger.warning(f"Оценка полезности задач не выполнена: {e}")
 
     def _load_documentation(self) -> str:
         """
@@ -3494,7 +4469,7 @@ class CodeAgentServer:
 
         return "\n".join(docs_content)
 
-    def _create_task_for_agent(self, todo_item: TodoItem, documentation: str) -> Task:
+    def _create_task_for_agent(self, todo_item: TodoItem, documentation: str) -> "Task":
         """
         Создание задачи CrewAI для агента
 
@@ -3520,6 +4495,8 @@ class CodeAgentServer:
 4. Убедитесь, что код соответствует стандартам проекта
 """
 
+        from crewai import Task  # type: ignore[import-untyped]
+
         task = Task(
             description=context,
             agent=self.agent,
@@ -3580,15 +4557,23 @@ class CodeAgentServer:
                 f"🤖 По решению LLM Manager продолжаем выполнение задачи '{todo_item.text[:50]}...'"
             )
 
-        # Проверяем полезность задачи - ВРЕМЕННО ПРОПУСКАЕМ ПРОВЕРКУ ИЗ-ЗА CRASH
-        logger.info(f"Проверка полезности задачи: '{todo_item.text[:60]}...' (ВРЕМЕННО ОТКЛЮЧЕНА)")
-        # usefulness_percent, usefulness_comment = await self._check_task_usefulness(todo_item)
-        usefulness_percent = 100.0
-        usefulness_comment = "Проверка полезности временно отключена для отладки"
-
-        # Выводим результат проверки в консоль с цветовым выделением
-        color_status = "✅ ВЫСОКАЯ ПОЛЕЗНОСТЬ (FORCED)"
-        color = Colors.BRIGHT_GREEN
+        # Полезность задачи берем из оценок триажа в начале итерации (без вызова LLM).
+        # Поштучная проверка _check_task_usefulness остается отключенной из-за CRASH
+        score = self.usefulness_triage.get(todo_item.text)
+        if score is not None:
+            usefulness_percent = score.percent
+            usefulness_comment = score.comment
+            if usefulness_percent < 15:
+                color_status, color = "❌ МУСОР/ШУМ", Colors.BRIGHT_RED
+            elif usefulness_percent <= 50:
+                color_status, color = "⚠️ СЛАБАЯ ПОЛЕЗНОСТЬ", Colors.BRIGHT_YELLOW
+            else:
+                color_status, color = "✅ ПОЛЕЗНАЯ ЗАДАЧА", Colors.BRIGHT_GREEN
+        else:
+            usefulness_percent = 100.0
+            usefulness_comment = "Оценка полезности отсутствует, задача выполняется"
+            color_status = "✅ ВЫСОКАЯ ПОЛЕЗНОСТЬ (FORCED)"
+            color = Colors.BRIGHT_GREEN
 
         usefulness_msg = f"Полезность задачи: {usefulness_percent:.1f}% - {color_status}"
         logger.info(Colors.colorize(usefulness_msg, color))
@@ -3805,7 +4790,21 @@ class CodeAgentServer:
 
             if use_cursor:
                 # Выполнение через Cursor
-                result = await self._execute_task_via_cursor(todo_item, task_type, task_logger)
+                with get_tracer().start_as_current_span(
+                    "task",
+                    {
+                        "task.id": task_id,
+                        "task.type": task_type,
+                        "task.backend": self.cli_interface_type,
+                    },
+                ) as task_span:
+                    try:
+                        result = await self._execute_task_via_cursor(
+                            todo_item, task_type, task_logger
+                        )
+                        task_span.set_status(bool(result))
+                    finally:
+                        self._end_instruction_span(False, "Выполнение задачи прервано")
                 task_logger.log_completion(result, " Задача выполнена через Cli Agent")
                 task_logger.close()
 
@@ -3902,6 +4901,11 @@ class CodeAgentServer:
             with self._task_in_progress_lock:
                 self._task_in_progress = False
 
+            # Отменяем опережающие запуски инструкций, которые задача не дождалась
+            if self._instruction_runner is not None:
+                await asyncio.to_thread(self._instruction_runner.close)
+                self._instruction_runner = None
+
             # Проверяем, был ли запрошен перезапуск во время выполнения задачи
             # Если да, инициируем его после завершения задачи
             with self._reload_lock:
@@ -4345,7 +5349,12 @@ class CodeAgentServer:
         # КРИТИЧНО: Останавливаем активные диалоги и очищаем очередь перед новой задачей
         logger.debug(f"Подготовка к задаче {task_id}: остановка активных диалогов...")
 
-        if self.cursor_cli:
+        self.session_affinity.reset()
+        if self.cursor_cli and self.session_affinity.enabled:
+            # Инструкции продолжают сессию задачи через --resume: чаты предыдущих задач
+            # не мешают, поэтому agent ls / остановка процессов не нужны
+            self.cursor_cli.current_chat_id = None
+        elif self.cursor_cli:
             cleanup_result = self.cursor_cli.prepare_for_new_task()
             if not cleanup_result:
                 logger.warning("Не удалось полностью очистить активные диалоги, продолжаем...")
@@ -4362,6 +5371,35 @@ class CodeAgentServer:
         )  # Минимум 3 инструкции для завершения задачи
         first_instruction_executed = False  # Флаг для логирования chat_id после первой инструкции
 
+        # Граф инструкций: отчеты обрабатываются по порядку списка, а готовые
+        # parallel_safe инструкции запускаются заранее в отдельных сессиях агента
+        graph = self._build_instruction_graph(all_templates)
+        completed_nodes = set((instruction_progress or {}).get("completed_nodes", []))
+        done_nodes = {
+            node.key
+            for node in graph.nodes
+            if self._instruction_node_done(node, start_from_instruction, completed_nodes)
+        }
+        self._settled_snapshot = None
+        if self.parallel_instructions > 1 and any(node.parallel_safe for node in graph.nodes):
+            self._instruction_runner = ParallelInstructionRunner(
+                graph,
+                functools.partial(
+                    self._run_instruction_ahead,
+                    todo_item=todo_item,
+                    task_id=task_id,
+                    task_type=task_type,
+                    task_logger=task_logger,
+                ),
+                max_workers=self.parallel_instructions - 1,
+                skip=done_nodes,
+            )
+
+        # Политика инструкций: решения проверки репорта и инструкции, объединенные
+        # со следующей (их текст выполняется в одной сессии агента)
+        report_actions: Dict[str, str] = {}
+        merged_nodes: List[Tuple[int, InstructionNode, str]] = []
+
         # Выполняем все инструкции последовательно (1, 2, 3, ...)
         # Начинаем с start_from_instruction если есть сохраненный прогресс
         logger.info(
@@ -4371,9 +5409,10 @@ class CodeAgentServer:
             # Получаем информацию об инструкции для логирования
             instruction_id = template.get("instruction_id", instruction_num)
             instruction_name = template.get("name", f"Инструкция {instruction_id}")
+            node = graph.node_at(instruction_num - 1)
 
             # Пропускаем уже выполненные инструкции
-            if instruction_num < start_from_instruction:
+            if node.key in done_nodes:
                 logger.info(
                     f"Пропуск инструкции {instruction_num}/{len(all_templates)}: {instruction_name} (уже выполнена)"
                 )
@@ -4415,13 +5454,57 @@ class CodeAgentServer:
                 f"Инструкция {instruction_num}/{len(all_templates)}: {instruction_name}"
             )
 
+            # Политика инструкций: пропуск, объединение со следующей или более быстрая модель
+            decision, policy_snapshot = self._decide_instruction(
+                node, graph, task_id, task_type, report_actions, carries_merged=bool(merged_nodes)
+            )
+            if decision.action == SKIP:
+                task_logger.log_info(
+                    f"Инструкция {instruction_num} пропущена по политике: {decision.reason}"
+                )
+                if self._instruction_runner is not None:
+                    self._instruction_runner.main_started(node)
+                successful_instructions += 1
+                self.checkpoint_manager.update_instruction_progress(
+                    task_id=task_id,
+                    instruction_num=instruction_num,
+                    total_instructions=len(all_templates),
+                    instruction_key=node.key,
+                )
+                continue
+            if decision.action == MERGE:
+                # Прогресс сохраняется после успешного выполнения объединенной инструкции
+                task_logger.log_info(
+                    f"Инструкция {instruction_num} объединена со следующей: {decision.reason}"
+                )
+                merged_nodes.append(
+                    (
+                        instruction_num,
+                        node,
+                        self._format_instruction(template, todo_item, task_id, instruction_num),
+                    )
+                )
+                continue
+            model = decision.model if decision.action == DOWNGRADE else None
+
             # Форматируем инструкцию из шаблона
             instruction_text = self._format_instruction(
                 template, todo_item, task_id, instruction_num
             )
+            instruction_merged, merged_nodes = merged_nodes, []
+            if instruction_merged:
+                instruction_text = merge_instructions(
+                    [text for _, _, text in instruction_merged], instruction_text
+                )
             wait_for_file = template.get("wait_for_file", "")
             control_phrase = template.get("control_phrase", "")
-            timeout = template.get("timeout", 600)
+            timing_key = TimeoutModel.key(
+                instruction_id,
+                task_type,
+                self.cli_interface_type,
+                model or self._agent_labels()["model"],
+            )
+            timeout = self.timeout_model.deadline(timing_key, template.get("timeout", 600))
 
             # Подстановка переменных в wait_for_file
             original_wait_for_file = wait_for_file
@@ -4447,6 +5530,8 @@ class CodeAgentServer:
                 logger.info(
                     "Инструкция 8 (коммит) - сохраняем TODO файл с отмеченными задачами перед коммитом"
                 )
+                policy_snapshot = None  # TODO файл меняется после снимка политики
+                self._settled_snapshot = None
                 try:
                     # Отмечаем текущую задачу как выполненную в TODO файле с комментарием
                     # Комментарий будет добавлен позже при полном завершении, здесь только предварительная отметка
@@ -4478,20 +5563,66 @@ class CodeAgentServer:
                 instruction_num=instruction_num,
             )
 
+            # Снимок рабочего дерева до инструкции (для точного diff ее изменений)
+            # (снимок, снятый для политики инструкций, еще актуален)
+            change_snapshot = policy_snapshot
+            if change_snapshot is None:
+                change_snapshot = self._worktree_snapshot()
+            self._settled_snapshot = None  # Дальше дерево меняет агент
+
             # Сохраняем время начала выполнения инструкции для корректного расчета времени
             instruction_start_time = time.time()
-
-            # Используем Cursor CLI для выполнения инструкции с обработкой повторяющихся ошибок
-            result = self._execute_cursor_instruction_with_retry(
-                instruction=instruction_text,
+            self._start_instruction_span(
+                task_type=task_type,
+                instruction_num=instruction_num,
+                instruction_id=instruction_id,
+                instruction_name=instruction_name,
+            )
+            publish_event(
+                EventType.INSTRUCTION_STARTED,
                 task_id=task_id,
-                timeout=timeout,
-                task_logger=task_logger,
+                task_type=task_type,
                 instruction_num=instruction_num,
-                wait_for_file=wait_for_file,  # Передаем ожидаемый файл
-                control_phrase=control_phrase,  # Передаем контрольную фразу
+                instruction_id=instruction_id,
+                instruction_name=instruction_name,
+                total_instructions=len(all_templates),
             )
 
+            result = None
+            ran_ahead = False
+            if self._instruction_runner is not None:
+                ahead = await self._await_instruction_ahead(node)
+                if ahead is not None:
+                    # Инструкция уже выполнена опережающим запуском: снимок и время - от его начала
+                    result = ahead["result"]
+                    change_snapshot = ahead["snapshot"]
+                    instruction_start_time = ahead["started_at"]
+                    ran_ahead = True
+
+            native_commit = template.get("native") == NATIVE_COMMIT and self.native_commit_enabled
+            if result is None and native_commit:
+                # Коммит выполняет сервер, агент вызывается только если стадия не удалась
+                result = await self._execute_native_commit(
+                    template, todo_item, task_id, wait_for_file, control_phrase, task_logger
+                )
+                if result.get("success"):
+                    timing_key = TimeoutModel.key(instruction_id, task_type, "native", "-")
+                else:
+                    result = None
+
+            if result is None:
+                # Используем Cursor CLI для выполнения инструкции с обработкой повторяющихся ошибок
+                result = self._execute_cursor_instruction_with_retry(
+                    instruction=instruction_text,
+                    task_id=task_id,
+                    timeout=timeout,
+                    task_logger=task_logger,
+                    instruction_num=instruction_num,
+                    wait_for_file=wait_for_file,  # Передаем ожидаемый файл
+                    control_phrase=control_phrase,  # Передаем контрольную фразу
+                    model=model,
+                )
+
             # Логируем Agent CLI ответ
             task_logger.log_cursor_response(result, brief=True)
 
@@ -4514,6 +5645,10 @@ class CodeAgentServer:
             if not result.get("success"):
                 failed_instructions += 1
                 error_message = result.get("error_message", "Неизвестная ошибка")
+                if result.get("timed_out"):
+                    self.timeout_model.record(
+                        timing_key, time.time() - instruction_start_time, timed_out=True
+                    )
                 logger.warning(
                     f"Инструкция {instruction_num}/{len(all_templates)} завершилась с ошибкой: {error_message}"
                 )
@@ -4621,6 +5756,16 @@ class CodeAgentServer:
                         )
                         return False
 
+                self._on_instruction_finished(
+                    task_id=task_id,
+                    task_type=task_type,
+                    instruction_num=instruction_num,
+                    instruction_id=instruction_id,
+                    instruction_name=instruction_name,
+                    success=False,
+                    started_at=instruction_start_time,
+                )
+
                 # Проверяем необходимость перезапуска после завершения текущей инструкции (с ошибкой)
                 with self._reload_lock:
                     if self._reload_after_instruction:
@@ -4707,13 +5852,17 @@ class CodeAgentServer:
                     task_text=todo_item.text,
                     instruction_num=instruction_num,
                 )
-                task_logger.log_waiting_result(wait_for_file, timeout)
+                # Ожидание отчета получает остаток дедлайна инструкции (не меньше min_result_wait)
+                wait_timeout = int(
+                    max(timeout - (time.time() - instruction_start_time), self.min_result_wait)
+                )
+                task_logger.log_waiting_result(wait_for_file, wait_timeout)
 
                 wait_result = self._wait_for_result_file(
                     task_id=task_id,
                     wait_for_file=wait_for_file,
                     control_phrase=control_phrase,
-                    timeout=timeout,
+                    timeout=wait_timeout,
                 )
 
                 logger.debug(
@@ -4726,6 +5875,20 @@ class CodeAgentServer:
                     task_logger.log_warning("Ожидание результата прервано по запросу остановки")
                     break
                 # Проверка на перезапуск из-за изменения кода больше не нужна - изменения обрабатываются graceful
+                self._record_instruction_changes(
+                    task_id,
+                    instruction_num,
+                    change_snapshot,
+                    node=node,
+                    started_at=instruction_start_time,
+                    ran_ahead=ran_ahead,
+                )
+                if wait_result.get("success") or wait_result.get("timed_out"):
+                    self.timeout_model.record(
+                        timing_key,
+                        time.time() - instruction_start_time,
+                        timed_out=bool(wait_result.get("timed_out")),
+                    )
 
                 if wait_result and wait_result.get("success"):
                     result_content = wait_result.get("content", "")
@@ -4820,6 +5983,15 @@ class CodeAgentServer:
                         f"Файл результата не получен для инструкции {instruction_num}"
                     )
                     # Инструкция не считается успешной если файл результата не получен
+                    self._on_instruction_finished(
+                        task_id=task_id,
+                        task_type=task_type,
+                        instruction_num=instruction_num,
+                        instruction_id=instruction_id,
+                        instruction_name=instruction_name,
+                        success=False,
+                        started_at=instruction_start_time,
+                    )
 
                     # Проверяем необходимость перезапуска после завершения текущей инструкции
                     with self._reload_lock:
@@ -4843,18 +6015,34 @@ class CodeAgentServer:
             else:
                 # Если wait_for_file не указан, считаем инструкцию успешной если команда выполнена успешно
                 instruction_successful = True
+                self._record_instruction_changes(
+                    task_id,
+                    instruction_num,
+                    change_snapshot,
+                    node=node,
+                    started_at=instruction_start_time,
+                    ran_ahead=ran_ahead,
+                )
 
             if instruction_successful:
-                successful_instructions += 1
+                successful_instructions += 1 + len(instruction_merged)
                 logger.info(
                     f"✅ Инструкция {instruction_num}/{len(all_templates)} выполнена успешно"
                 )
 
                 # Сохраняем прогресс выполнения инструкций в checkpoint
+                for merged_num, merged_node, _ in instruction_merged:
+                    self.checkpoint_manager.update_instruction_progress(
+                        task_id=task_id,
+                        instruction_num=merged_num,
+                        total_instructions=len(all_templates),
+                        instruction_key=merged_node.key,
+                    )
                 self.checkpoint_manager.update_instruction_progress(
                     task_id=task_id,
                     instruction_num=instruction_num,
                     total_instructions=len(all_templates),
+                    instruction_key=node.key,
                 )
 
                 # Проверяем, нужно ли выполнять проверку репорта после этой инструкции
@@ -4893,6 +6081,7 @@ class CodeAgentServer:
                     # Обрабатываем результат проверки
                     action = report_check_result.get("action", "continue")
                     reason = report_check_result.get("reason", "")
+                    report_actions[node.key] = action
 
                     if action == "execute_free_instruction":
                         # Вставляем свободную инструкцию
@@ -4969,6 +6158,16 @@ class CodeAgentServer:
                             "Автоматический push отключен в настройках безопасности (security.auto_push_enabled: false)"
                         )
 
+            self._on_instruction_finished(
+                task_id=task_id,
+                task_type=task_type,
+                instruction_num=instruction_num,
+                instruction_id=instruction_id,
+                instruction_name=instruction_name,
+                success=instruction_successful,
+                started_at=instruction_start_time,
+            )
+
             # Проверяем необходимость перезапуска после завершения текущей инструкции
             with self._reload_lock:
                 if self._reload_after_instruction:
@@ -5069,6 +6268,8 @@ class CodeAgentServer:
 
         # Создаем crew и выполняем задачу
         task_logger.set_phase(TaskPhase.CURSOR_EXECUTION)
+        from crewai import Crew  # type: ignore[import-untyped]
+
         crew = Crew(agents=[self.agent], tasks=[task])
         result = crew.kickoff()
 
@@ -5655,6 +6856,8 @@ class CodeAgentServer:
                 # Есть задачи после ревизии, продолжаем выполнение
                 pending_tasks = pending_tasks_after_revision
 
+        await self._triage_pending_tasks(pending_tasks)
+
         # Логируем начало итерации
         self.server_logger.log_iteration_start(iteration, len(pending_tasks))
         logger.info(f"Найдено непройденных задач: {len(pending_tasks)}")
@@ -5813,6 +7016,123 @@ class CodeAgentServer:
 
         return False
 
+    def _build_status(self) -> Dict[str, Any]:
+        """
+        Сформировать данные статуса сервера для /status
+
+        Returns:
+            Словарь со статусом сервера, состоянием и задачами
+        """
+        try:
+            recovery_info = self.checkpoint_manager.get_recovery_info()
+        except Exception as e:
+            logger.warning(f"Ошибка при получении recovery_info для /status: {e}")
+            recovery_info = {
+                "was_clean_shutdown": True,
+                "last_start_time": None,
+                "last_stop_time": None,
+                "session_id": self.session_tracker.current_session_id,
+                "iteration_count": 0,
+            }
+
+        try:
+            stats = self.checkpoint_manager.get_statistics()
+        except Exception as e:
+            logger.warning(f"Ошибка при получении статистики для /status: {e}")
+            stats = {
+                "completed": 0,
+                "failed": 0,
+                "pending": 0,
+                "in_progress": 0,
+                "total_tasks": 0,
+                "iteration_count": 0,
+            }
+
+        try:
+            current_task = self.checkpoint_manager.get_current_task()
+        except Exception as e:
+            logger.warning(f"Ошибка при получении текущей задачи для /status: {e}")
+            current_task = None
+
+        # Получаем текущие задачи из todo_manager
+        try:
+            pending_tasks = self.todo_manager.get_pending_tasks()
+        except Exception as e:
+            logger.warning(f"Ошибка при получении pending_tasks для /status: {e}")
+            pending_tasks = []
+
+        # Определяем, что делает сервер
+        current_activity = "Ожидание"
+        if current_task:
+            current_activity = f"Выполнение задачи: {current_task.get('task_text', 'N/A')[:100]}"
+        elif pending_tasks:
+            current_activity = f"Ожидание выполнения {len(pending_tasks)} задач"
+        else:
+            current_activity = "Все задачи выполнены"
+
+        # Проверяем, есть ли запрос на перезапуск (в том числе после текущей инструкции)
+        with self._reload_lock:
+            pending_restart = self._should_reload or self._reload_after_instruction
+
+        return {
+            "server": {
+                "status": "running" if self._is_running else "stopped",
+                "running": self._is_running,
+                "port": self.http_port,
+                "project_dir": str(self.project_dir),
+                "cursor_cli_available": self.use_cursor_cli,
+                "auto_todo_enabled": self.auto_todo_enabled,
+            },
+            "server_state": {
+                "clean_shutdown": recovery_info["was_clean_shutdown"],
+                "last_start_time": recovery_info["last_start_time"],
+                "last_stop_time": recovery_info["last_stop_time"],
+                "session_id": recovery_info["session_id"],
+                "iteration_count": self._current_iteration or recovery_info["iteration_count"],
+                "current_activity": current_activity,
+                "restart_count": self._restart_count,
+                "pending_restart": pending_restart,
+            },
+            "tasks": {
+                "in_progress": stats["in_progress"],
+                "completed": stats["completed"],
+                "failed": stats["failed"],
+                "pending": stats["pending"],
+                "total": stats["total_tasks"],
+                "pending_in_todo": len(pending_tasks),
+            },
+            "current_task": (
+                {
+                    "task_id": current_task.get("task_id"),
+                    "task_text": current_task.get("task_text", "")[:200],
+                    "state": current_task.get("state"),
+                    "start_time": current_task.get("start_time"),
+                    "attempts": current_task.get("attempts", 0),
+                }
+                if current_task
+                else None
+            ),
+        }
+
+    def _set_running(self, running: bool):
+        """Изменить состояние сервера и обновить снимок статуса"""
+        self._is_running = running
+        self._refresh_status_snapshot()
+
+    def _refresh_status_snapshot(self):
+        """
+        Пересобрать и атомарно опубликовать снимок статуса
+
+        Вызывается при смене состояния сервера (запуск, итерация, запрос
+        перезапуска). Пересборки из разных потоков выполняются по очереди
+        (SnapshotRefresher), поэтому HTTP обработчики не получают ни частично
+        обновленных, ни устаревших данных.
+        """
+        # Может вызываться до окончания __init__ - пропускаем ранние вызовы
+        if not hasattr(self, "_status_refresher") or not hasattr(self, "todo_manager"):
+            return
+        self._status_refresher.refresh()
+
     def _setup_http_server(self):
         """Настройка и запуск HTTP сервера на порту"""
         if not FLASK_AVAILABLE:
@@ -5823,8 +7143,11 @@ class CodeAgentServer:
             logger.info("HTTP сервер отключен в конфигурации")
             return
 
+        # При горячей перезагрузке сокет остается открытым - меняется только WSGI приложение
+        adopted_http_server = self._handoff.http_server if self._handoff else None
+
         # Проверяем занятость порта
-        if self._check_port_in_use(self.http_port):
+        if adopted_http_server is None and self._check_port_in_use(self.http_port):
             logger.warning(f"Порт {self.http_port} занят, пытаемся завершить старый процесс...")
             if self._kill_process_on_port(self.http_port):
                 # Ждем освобождения порта
@@ -5841,6 +7164,8 @@ class CodeAgentServer:
                 logger.error(f"Не удалось завершить процесс на порту {self.http_port}")
                 return
 
+        from flask import Flask, Response, jsonify, request  # type: ignore[import-untyped]
+
         # Создаем Flask приложение
         self.flask_app = Flask(__name__)
 
@@ -5917,103 +7242,80 @@ class CodeAgentServer:
 
         @self.flask_app.route("/status")
         def status():
-            """Статус сервера с подробной информацией"""
+            """Статус сервера с подробной информацией (готовый снимок, без обращения к checkpoint)"""
+            snapshot = self.status_snapshot.get()
+            headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+            if self.status_snapshot.matches(request.headers.get("If-None-Match"), snapshot):
+                return Response(status=304, headers=headers)
+            return Response(snapshot.body, mimetype="application/json", headers=headers)
+
+        @self.flask_app.route("/events")
+        def events():
+            """Поток событий выполнения (Server-Sent Events)"""
+            if not self.events_enabled:
+                return jsonify({"error": "Поток событий отключен в конфигурации"}), 404
+
+            last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+                "last_event_id"
+            )
             try:
-                recovery_info = self.checkpoint_manager.get_recovery_info()
-            except Exception as e:
-                logger.warning(f"Ошибка при получении recovery_info для /status: {e}")
-                recovery_info = {
-                    "was_clean_shutdown": True,
-                    "last_start_time": None,
-                    "last_stop_time": None,
-                    "session_id": self.session_tracker.current_session_id,
-                    "iteration_count": 0,
-                }
+                last_event_id = int(last_event_id) if last_event_id is not None else None
+            except ValueError:
+                last_event_id = None
+
+            stream = stream_sse(
+                get_event_bus(),
+                last_event_id=last_event_id,
+                heartbeat_interval=self.events_heartbeat_interval,
+                should_stop=lambda: self._should_stop,
+            )
+            return Response(
+                stream,
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
-            try:
-                stats = self.checkpoint_manager.get_statistics()
-            except Exception as e:
-                logger.warning(f"Ошибка при получении статистики для /status: {e}")
-                stats = {
-                    "completed": 0,
-                    "failed": 0,
-                    "pending": 0,
-                    "in_progress": 0,
-                    "total_tasks": 0,
-                    "iteration_count": 0,
-                }
+        @self.flask_app.route("/metrics")
+        def metrics():
+            """Метрики в формате Prometheus"""
+            if not self.metrics_enabled:
+                return jsonify({"error": "Метрики отключены в конфигурации"}), 404
+            return Response(
+                METRICS_REGISTRY.render(), headers={"Content-Type": METRICS_CONTENT_TYPE}
+            )
 
+        @self.flask_app.route("/debug/stacks")
+        def debug_stacks():
+            """Стеки всех потоков и дерево задач asyncio основного цикла"""
+            if not self.debug_enabled:
+                return jsonify({"error": "Отладочные endpoints отключены в конфигурации"}), 404
+            return Response(format_stacks(self._main_loop), mimetype="text/plain; charset=utf-8")
+
+        @self.flask_app.route("/debug/profile")
+        def debug_profile():
+            """Статистический профиль всех потоков за ?seconds=N (collapsed или speedscope)"""
+            if not self.debug_enabled:
+                return jsonify({"error": "Отладочные endpoints отключены в конфигурации"}), 404
+            fmt = request.args.get("format", "collapsed")
+            if fmt not in PROFILE_FORMATS:
+                return jsonify({"error": f"format должен быть одним из {PROFILE_FORMATS}"}), 400
             try:
-                current_task = self.checkpoint_manager.get_current_task()
-            except Exception as e:
-                logger.warning(f"Ошибка при получении текущей задачи для /status: {e}")
-                current_task = None
-
-            # Получаем текущие задачи из todo_manager
+                seconds = float(request.args.get("seconds", 10))
+            except ValueError:
+                return jsonify({"error": "seconds должен быть числом"}), 400
             try:
-                pending_tasks = self.todo_manager.get_pending_tasks()
-            except Exception as e:
-                logger.warning(f"Ошибка при получении pending_tasks для /status: {e}")
-                pending_tasks = []
-
-            # Определяем, что делает сервер
-            current_activity = "Ожидание"
-            if current_task:
-                current_activity = (
-                    f"Выполнение задачи: {current_task.get('task_text', 'N/A')[:100]}"
-                )
-            elif pending_tasks:
-                current_activity = f"Ожидание выполнения {len(pending_tasks)} задач"
-            else:
-                current_activity = "Все задачи выполнены"
-
-            # Проверяем, есть ли запрос на перезапуск
-            pending_restart = False
-            with self._reload_lock:
-                pending_restart = self._should_reload
-
+                result = self.profiler.profile(seconds)
+            except ProfilerBusyError as e:
+                return jsonify({"error": str(e)}), 409
+            path = save_profile(result, self.profiles_dir, fmt)
             return jsonify(
                 {
-                    "server": {
-                        "status": "running" if self._is_running else "stopped",
-                        "running": self._is_running,
-                        "port": self.http_port,
-                        "project_dir": str(self.project_dir),
-                        "cursor_cli_available": self.use_cursor_cli,
-                        "auto_todo_enabled": self.auto_todo_enabled,
-                    },
-                    "server_state": {
-                        "clean_shutdown": recovery_info["was_clean_shutdown"],
-                        "last_start_time": recovery_info["last_start_time"],
-                        "last_stop_time": recovery_info["last_stop_time"],
-                        "session_id": recovery_info["session_id"],
-                        "iteration_count": self._current_iteration
-                        or recovery_info["iteration_count"],
-                        "current_activity": current_activity,
-                        "restart_count": self._restart_count,
-                        "pending_restart": pending_restart,
-                    },
-                    "tasks": {
-                        "in_progress": stats["in_progress"],
-                        "completed": stats["completed"],
-                        "failed": stats["failed"],
-                        "pending": stats["pending"],
-                        "total": stats["total_tasks"],
-                        "pending_in_todo": len(pending_tasks),
-                    },
-                    "current_task": (
-                        {
-                            "task_id": current_task.get("task_id") if current_task else None,
-                            "task_text": (
-                                current_task.get("task_text", "")[:200] if current_task else None
-                            ),
-                            "state": current_task.get("state") if current_task else None,
-                            "start_time": current_task.get("start_time") if current_task else None,
-                            "attempts": current_task.get("attempts", 0) if current_task else 0,
-                        }
-                        if current_task
-                        else None
-                    ),
+                    "file": str(path),
+                    "format": fmt,
+                    "duration": round(result.duration, 3),
+                    "samples": result.samples,
+                    "interval": result.interval,
+                    "top": result.top_functions(),
                 }
             )
 
@@ -6043,6 +7345,7 @@ class CodeAgentServer:
             logger.warning("Получен запрос на перезапуск сервера через API")
             with self._reload_lock:
                 self._reload_after_instruction = True
+            self._refresh_status_snapshot()
             logger.warning(
                 f"Флаг перезапуска после инструкции установлен. Текущий счетчик перезапусков: {self._restart_count}"
             )
@@ -6055,6 +7358,15 @@ class CodeAgentServer:
                 }
             )
 
+        if adopted_http_server is not None:
+            # werkzeug берет приложение из server.app на каждый запрос
+            adopted_http_server.app = self.flask_app
+            self.http_server = adopted_http_server
+            self.http_thread = self._handoff.http_thread
+            self._handoff.http_server = None
+            logger.info(f"Горячая перезагрузка: HTTP сервер на порту {self.http_port} перенят")
+            return
+
         # Запускаем Flask в отдельном потоке
         def run_flask():
             try:
@@ -6163,234 +7475,88 @@ class CodeAgentServer:
             logger.info("Автоперезапуск отключен в конфигурации")
             return
 
+        handoff = self._handoff
+        if handoff is not None and handoff.file_observer is not None:
+            handler = handoff.file_handler
+            if handler is not None and not handoff.is_stale(handler.detector):
+                # Observer продолжает работу, обработчик переключается на новый экземпляр
+                handler.server = self
+                self.file_observer, self._file_handler = handoff.file_observer, handler
+                handoff.file_observer = handoff.file_handler = None
+                logger.info("Горячая перезагрузка: file watcher перенят (карта сигнатур сохранена)")
+                return
+            handoff.stop_file_watcher()
+
+        from watchdog.events import FileSystemEventHandler  # type: ignore[import-untyped]
+        from watchdog.observers import Observer  # type: ignore[import-untyped]
+
         class PyFileHandler(FileSystemEventHandler):
             """Обработчик изменений .py файлов"""
 
-            def __init__(self, server_instance):
+            def __init__(self, server_instance, detector: ChangeDetector, debounce: float):
                 self.server = server_instance
+                self.detector = detector
                 self.last_reload_time = 0
                 self.reload_cooldown = 10  # Минимальный интервал между перезапусками (секунды) - увеличено для защиты от ложных срабатываний
-                self.file_hashes = {}  # Кэш хешей файлов для проверки реальных изменений
-                self.pending_changes = set()  # Множество файлов с изменениями в процессе обработки
-                self.ignored_patterns = [
-                    # Игнорируемые директории и паттерны
-                    "__pycache__",
-                    ".pyc",
-                    "/test/",
-                    "\\test\\",
-                    "test_cursor_cli",
-                    "test_",
-                    "/examples/",
-                    "/venv/",
-                    "/env/",
-                    "/.venv/",
-                    "\\venv\\",
-                    "\\env\\",
-                    "\\.venv\\",
-                ]
-
-            def _initialize_file_hashes(self, watch_dirs: List[str]):
-                """Инициализировать хэши всех .py файлов в отслеживаемых директориях"""
-                logger.info("Инициализация хэшей файлов для защиты от ложных срабатываний...")
-                import glob
-
-                for watch_dir in watch_dirs:
-                    # Ищем все .py файлы в директории рекурсивно
-                    pattern = f"{watch_dir}/**/*.py"
-                    try:
-                        for py_file in glob.glob(pattern, recursive=True):
-                            # Проверяем, нужно ли игнорировать файл
-                            if self._should_ignore_file(py_file):
-                                continue
-
-                            # Вычисляем хэш файла
-                            file_hash = self._get_file_hash(py_file)
-                            if file_hash:
-                                self.file_hashes[py_file] = file_hash
-                                logger.debug(f"Инициализирован хэш для файла: {py_file}")
-                    except Exception as e:
-                        logger.warning(
-                            f"Ошибка при инициализации хэшей в директории {watch_dir}: {e}"
-                        )
-
-                logger.info(f"Инициализировано хэшей для {len(self.file_hashes)} файлов")
-                self.ignored_patterns = [
-                    # Игнорируемые директории и паттерны
-                    "__pycache__",
-                    ".pyc",
-                    "/test/",
-                    "\\test\\",
-                    "test_cursor_cli",
-                    "test_",
-                    "/examples/",
-                    "\\examples\\",
-                    "/docs/",
-                    "\\docs\\",
-                    "/logs/",
-                    "\\logs\\",
-                    ".git",
-                    "venv",
-                    "env",
-                    "node_modules",
-                ]
-
-            def _should_ignore_file(self, file_path: str) -> bool:
-                """Проверка, нужно ли игнорировать файл"""
-                file_path_lower = file_path.lower()
-
-                # Проверяем игнорируемые паттерны
-                for pattern in self.ignored_patterns:
-                    if pattern in file_path_lower:
-                        return True
-
-                # Игнорируем временные файлы редакторов (Windows и Unix)
-                temp_patterns = [
-                    "~$",  # Windows временные файлы (например, ~$file.py)
-                    ".tmp",  # Временные файлы
-                    ".swp",  # Vim swap файлы
-                    ".swo",  # Vim swap файлы
-                    ".bak",  # Backup файлы
-                    ".orig",  # Merge conflict файлы
-                    ".rej",  # Rejected patch файлы
-                    ".pyc",  # Python bytecode (на всякий случай)
-                    ".pyo",  # Python optimized bytecode
-                    "__pycache__",  # Python cache
-                    ".git/",  # Git файлы
-                    ".vscode/",  # VS Code настройки
-                    ".idea/",  # IntelliJ/PyCharm настройки
-                    ".cursor/",  # Cursor настройки
-                ]
-                for pattern in temp_patterns:
-                    if pattern in file_path_lower:
-                        return True
-
-                # Проверяем, существует ли файл (может быть временный файл, который уже удален)
-                try:
-                    if not Path(file_path).exists():
-                        return True
-                except Exception:
-                    return True
-
-                # Игнорируем файлы, которые не в src/ директории (если это не main.py или другие важные файлы в корне)
-                src_dir = str(Path(__file__).parent).lower()
-                file_path_normalized = file_path.lower()
-
-                # Разрешаем только файлы в src/ или важные файлы в корне (main.py, setup.py и т.д.)
-                if not file_path_normalized.startswith(src_dir):
-                    # Разрешаем только main.py и другие критичные файлы в корне
-                    filename = Path(file_path).name.lower()
-                    allowed_root_files = ["main.py", "setup.py", "setup.cfg"]
-                    if filename not in allowed_root_files:
-                        return True
+                # События серии сохранений объединяются и проверяются одним вызовом
+                self.debouncer = Debouncer(debounce, self._process_changes)
 
-                return False
-
-            def _get_file_hash(self, file_path: str) -> Optional[str]:
-                """Получить хеш файла для проверки реальных изменений"""
-                try:
-                    import hashlib
-
-                    file = Path(file_path)
-                    if not file.exists():
-                        return None
-
-                    # Используем MD5 хеш содержимого файла для более надежной проверки
-                    # Это гарантирует, что мы реагируем только на реальные изменения содержимого
-                    md5 = hashlib.md5()
-                    try:
-                        with open(file_path, "rb") as f:
-                            # Читаем файл по частям для больших файлов
-                            for chunk in iter(lambda: f.read(4096), b""):
-                                md5.update(chunk)
-                        return md5.hexdigest()
-                    except (OSError, IOError, PermissionError):
-                        # Если не можем прочитать файл (например, он заблокирован), используем fallback
-                        # Но только если файл действительно существует
-                        stat = file.stat()
-                        return f"fallback_{stat.st_size}_{stat.st_mtime}"
-                except Exception:
-                    return None
+            def _on_path(self, path: str):
+                if self.detector.is_tracked(path):
+                    self.debouncer.add(path)
 
             def on_modified(self, event):
-                if event.is_directory:
-                    return
-
-                # Проверяем, что это .py файл
-                if not event.src_path.endswith(".py"):
-                    return
-
-                # Проверяем, нужно ли игнорировать файл (включая временные файлы редакторов)
-                if self._should_ignore_file(event.src_path):
-                    logger.debug(f"Игнорируем изменение файла: {event.src_path}")
-                    return
-
-                # Проверяем, не обрабатывается ли уже этот файл
-                if event.src_path in self.pending_changes:
-                    logger.debug(f"Файл уже в процессе обработки: {event.src_path}")
+                if not event.is_directory:
+                    self._on_path(event.src_path)
+
+            def on_created(self, event):
+                if not event.is_directory:
+                    self._on_path(event.src_path)
+
+            def on_moved(self, event):
+                # Редакторы сохраняют через временный файл с последующим переименованием
+                if not event.is_directory:
+                    self._on_path(event.dest_path)
+
+            def _process_changes(self, paths: Set[str]):
+                """Проверить накопленные файлы и запланировать перезапуск"""
+                # Сигнатура (inode, size, mtime_ns) отсекает события без изменений без чтения файла
+                changed = sorted(path for path in paths if self.detector.check(path))
+                if not changed:
+                    logger.debug(
+                        f"Игнорируем ложные срабатывания (содержимое не изменилось): {len(paths)}"
+                    )
                     return
 
                 # Проверяем cooldown - защита от частых срабатываний
                 current_time = time.time()
                 if current_time - self.last_reload_time < self.reload_cooldown:
-                    logger.debug(f"Cooldown активен, игнорируем изменение: {event.src_path}")
+                    logger.debug(f"Cooldown активен, игнорируем изменения: {changed}")
                     return
 
-                # Добавляем файл в обработку
-                self.pending_changes.add(event.src_path)
+                logger.info(f"Обнаружено РЕАЛЬНОЕ изменение файлов: {', '.join(changed)}")
+                self.last_reload_time = current_time
+                with self.server._reload_lock:
+                    self.server._changed_files.update(changed)
 
-                try:
-                    # Небольшая задержка для стабилизации файла (редакторы могут сохранять в несколько этапов)
-                    time.sleep(0.5)
-
-                    # Проверяем, действительно ли файл изменился (сравниваем хеш содержимого)
-                    file_hash = self._get_file_hash(event.src_path)
-                    if file_hash is None:
-                        # Не удалось получить хеш - возможно, файл удален или недоступен
-                        logger.debug(
-                            f"Не удалось получить хеш файла (возможно, временный файл): {event.src_path}"
-                        )
-                        return
-
-                    # Проверяем, действительно ли содержимое изменилось
-                    if event.src_path in self.file_hashes:
-                        if self.file_hashes[event.src_path] == file_hash:
-                            # Содержимое файла не изменилось - ложное срабатывание
-                            logger.debug(
-                                f"Игнорируем ложное срабатывание (содержимое не изменилось): {event.src_path}"
-                            )
-                            return
-
-                    # Сохраняем новый хеш только после подтверждения реального изменения
-                    self.file_hashes[event.src_path] = file_hash
-
-                    logger.info(f"Обнаружено РЕАЛЬНОЕ изменение файла: {event.src_path}")
-                    self.last_reload_time = current_time
-
-                    # Проверяем, выполняется ли сейчас задача
-                    with self.server._task_in_progress_lock:
-                        task_in_progress = self.server._task_in_progress
-
-                    if task_in_progress:
-                        # Если задача выполняется, перезапуск после завершения инструкции
-                        logger.info(
-                            "Обнаружено изменение кода во время выполнения задачи - перезапуск будет выполнен после завершения текущей инструкции"
-                        )
-                        with self.server._reload_lock:
-                            self.server._reload_after_instruction = True
-                    else:
-                        # Если задачи нет, это изменение в моменте ожидания
-                        logger.info(
-                            f"Обнаружено изменение кода в моменте ожидания: {event.src_path}"
-                        )
-                        with self.server._reload_lock:
-                            self.server._waiting_change_detected = True
-                finally:
-                    # Удаляем файл из обработки через некоторое время
-                    def remove_pending():
-                        time.sleep(2)
-                        self.pending_changes.discard(event.src_path)
+                # Проверяем, выполняется ли сейчас задача
+                with self.server._task_in_progress_lock:
+                    task_in_progress = (
+                        self.server._task_in_progress or self.server._result_waits > 0
+                    )
 
-                    threading.Thread(target=remove_pending, daemon=True).start()
+                if task_in_progress:
+                    # Если задача выполняется, перезапуск после завершения инструкции
+                    logger.info(
+                        "Обнаружено изменение кода во время выполнения задачи - перезапуск будет выполнен после завершения текущей инструкции"
+                    )
+                    with self.server._reload_lock:
+                        self.server._reload_after_instruction = True
+                else:
+                    # Если задачи нет, это изменение в моменте ожидания
+                    logger.info(f"Обнаружено изменение кода в моменте ожидания: {changed[0]}")
+                    with self.server._reload_lock:
+                        self.server._waiting_change_detected = True
 
         # Определяем директории для отслеживания
         watch_dirs = []
@@ -6404,12 +7570,19 @@ class CodeAgentServer:
             logger.warning("Не найдены директории для отслеживания изменений")
             return
 
+        # Строим карту сигнатур файлов (без чтения содержимого), хеши - в фоне
+        detector = ChangeDetector(watch_dirs, PathMatcher(self.reload_ignore_patterns))
+        scan_start = time.monotonic()
+        tracked = detector.scan()
+        logger.info(
+            f"Отслеживается {tracked} файлов (сканирование {time.monotonic() - scan_start:.3f}с)"
+        )
+        detector.start_hashing()
+
         # Создаем observer
         self.file_observer = Observer()
-        handler = PyFileHandler(self)
-
-        # Инициализируем хэши файлов перед запуском отслеживания
-        handler._initialize_file_hashes(watch_dirs)
+        handler = PyFileHandler(self, detector, self.reload_debounce)
+        self._file_handler = handler
 
         for watch_dir in watch_dirs:
             try:
@@ -6422,10 +7595,66 @@ class CodeAgentServer:
         self.file_observer.start()
         logger.info("File watcher запущен для автоперезапуска при изменении .py файлов")
 
+    def _restart_environment_for_reload(self) -> bool:
+        """
+        Перезапуск Docker окружения перед перезагрузкой сервера
+
+        При горячей перезагрузке меняется только Python код сервера, поэтому
+        контейнер агента остается запущенным.
+
+        Returns:
+            True если окружение готово
+        """
+        if self.reload_mode == "hot":
+            logger.info("Горячая перезагрузка: Docker контейнер не перезапускается")
+            return True
+        logger.info("Перезапуск Docker контейнера перед перезапуском сервера...")
+        return self._restart_cursor_environment()
+
+    def _detach_for_reload(self) -> ServerHandoff:
+        """
+        Передать теплые ресурсы следующему экземпляру сервера
+
+        HTTP сервер и file watcher продолжают работать, поэтому ссылки на них
+        снимаются с текущего экземпляра (finally в start() их не остановит).
+
+        Returns:
+            Ресурсы для нового экземпляра
+        """
+        with self._reload_lock:
+            changed_files = set(self._changed_files)
+            self._changed_files.clear()
+        handoff = ServerHandoff(
+            http_server=self.http_server,
+            http_thread=self.http_thread,
+            file_observer=self.file_observer,
+            file_handler=self._file_handler,
+            interfaces={"cursor_cli": self.cursor_cli, "gemini_cli": self.gemini_cli},
+            changed_files=changed_files,
+        )
+        self.http_server = None
+        self.flask_app = None
+        self.file_observer = None
+        return handoff
+
     def _check_reload_needed(self) -> bool:
         """
         Проверка необходимости перезапуска
 
+        Returns:
+            True если требуется перезапуск
+        """
+        needed = self._consume_reload_request()
+        if needed:
+            # Счетчик перезапусков и флаг ожидающего перезапуска изменились
+            # (снимок собирается вне _reload_lock: _build_status берет ее сам)
+            self._refresh_status_snapshot()
+        return needed
+
+    def _consume_reload_request(self) -> bool:
+        """
+        Принять запрос на перезапуск (флаги сбрасываются, счетчик увеличивается)
+
         Returns:
             True если требуется перезапуск
         """
@@ -6446,8 +7675,7 @@ class CodeAgentServer:
                     )
 
                     # Перезапускаем Docker контейнер перед остановкой сервера
-                    logger.info("Перезапуск Docker контейнера перед остановкой сервера...")
-                    docker_restart_success = self._restart_cursor_environment()
+                    docker_restart_success = self._restart_environment_for_reload()
                     if not docker_restart_success:
                         logger.warning(
                             "Не удалось перезапустить Docker контейнер, но продолжаем остановку сервера"
@@ -6462,8 +7690,7 @@ class CodeAgentServer:
                     return True
 
                 # Перезапускаем Docker контейнер перед перезапуском сервера
-                logger.info("Перезапуск Docker контейнера перед перезапуском сервера...")
-                docker_restart_success = self._restart_cursor_environment()
+                docker_restart_success = self._restart_environment_for_reload()
                 if not docker_restart_success:
                     logger.warning(
                         "Не удалось перезапустить Docker контейнер, но продолжаем перезапуск сервера"
@@ -6504,8 +7731,7 @@ class CodeAgentServer:
                         self._waiting_change_count = 0
 
                     # Перезапускаем Docker контейнер перед остановкой сервера
-                    logger.info("Перезапуск Docker контейнера перед остановкой сервера...")
-                    docker_restart_success = self._restart_cursor_environment()
+                    docker_restart_success = self._restart_environment_for_reload()
                     if not docker_restart_success:
                         logger.warning(
                             "Не удалось перезапустить Docker контейнер, но продолжаем остановку сервера"
@@ -6554,7 +7780,7 @@ class CodeAgentServer:
                             )
                             self.checkpoint_manager.mark_server_stop(clean=True)
 
-                        self._is_running = False
+                        self._set_running(False)
                         self.status_manager.append_status(
                             f"Code Agent Server остановлен по запросу через API. Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
                             level=2,
@@ -6568,13 +7794,14 @@ class CodeAgentServer:
                     logger.warning(f"Счетчик перезапусков: {self._restart_count}")
                     logger.warning("Текущая задача будет прервана, checkpoint будет сохранен")
                     self.checkpoint_manager.mark_server_stop(clean=True)
-                    self._is_running = False
+                    self._set_running(False)
                     # Инициируем перезапуск через исключение
                     # main.py перехватит это и перезапустит сервер
                     raise ServerReloadException("Перезапуск сервера")
 
                 iteration += 1
                 self._current_iteration = iteration
+                self._refresh_status_snapshot()
                 logger.info(f"Итерация {iteration}")
 
                 # Выполняем итерацию
@@ -6584,7 +7811,7 @@ class CodeAgentServer:
                     # Перезапуск сервера во время выполнения итерации
                     logger.warning("Перезапуск сервера во время выполнения итерации")
                     self.checkpoint_manager.mark_server_stop(clean=True)
-                    self._is_running = False
+                    self._set_running(False)
                     raise  # Пробрасываем исключение дальше
 
                 # Проверяем флаг остановки после итерации (может быть установлен из-за ошибок Cursor)
@@ -6597,7 +7824,7 @@ class CodeAgentServer:
                     logger.warning("Выполняется перезапуск сервера ПОСЛЕ ИТЕРАЦИИ")
                     logger.warning(f"Счетчик перезапусков: {self._restart_count}")
                     self.checkpoint_manager.mark_server_stop(clean=True)
-                    self._is_running = False
+                    self._set_running(False)
                     raise ServerReloadException("Перезапуск сервера после итерации")
 
                 # Проверяем ограничение итераций
@@ -6695,6 +7922,8 @@ class CodeAgentServer:
         # Настраиваем обработку asyncio исключений и патчи для безопасного закрытия
         setup_asyncio_exception_handling()
         patch_asyncio_for_cleanup()
+        # Цикл нужен /debug/stacks для дампа задач asyncio из HTTP потока
+        self._main_loop = asyncio.get_running_loop()
 
         # Сбрасываем счетчики изменений кода при запуске сервера
         with self._waiting_change_count_lock:
@@ -6710,6 +7939,11 @@ class CodeAgentServer:
         # Запускаем file watcher для автоперезапуска
         self._setup_file_watcher()
 
+        # Ресурсы предыдущего экземпляра, которые не удалось перенять, освобождаем
+        if self._handoff is not None:
+            self._handoff.close()
+            self._handoff = None
+
         # Отмечаем запуск в checkpoint
         session_id = self.session_tracker.current_session_id
         self.checkpoint_manager.mark_server_start(session_id)
@@ -6727,7 +7961,7 @@ class CodeAgentServer:
         # Получаем начальную итерацию из checkpoint (для восстановления)
         iteration = self.checkpoint_manager.get_iteration_count()
         self._current_iteration = iteration
-        self._is_running = True
+        self._set_running(True)
 
         try:
             # Основной цикл сервера - оборачиваем в try/catch для CancelledError
@@ -6746,7 +7980,7 @@ class CodeAgentServer:
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Отмечаем некорректный останов
             self.checkpoint_manager.mark_server_stop(clean=False)
-            self._is_running = False
+            self._set_running(False)
             # Пробрасываем ошибку дальше для диагностики
             raise
 
@@ -6754,9 +7988,12 @@ class CodeAgentServer:
             # Перезапуск сервера
             logger.warning("Перезапуск сервера")
             logger.warning(f"Причина: {str(e)}")
-            self._is_running = False
+            self._set_running(False)
             self.checkpoint_manager.mark_server_stop(clean=True)
             self.server_logger.log_server_shutdown(f"Перезапуск сервера: {str(e)}")
+            if self.reload_mode == "hot":
+                # main.py перезагрузит измененные модули и передаст ресурсы новому экземпляру
+                self.reload_handoff = self._detach_for_reload()
             # Пробрасываем исключение дальше для обработки в main.py
             raise
 
@@ -6810,7 +8047,7 @@ class CodeAgentServer:
                 logger.info("✓ Похоже на реальный Ctrl+C от пользователя")
 
             self.server_logger.log_server_shutdown(reason)
-            self._is_running = False
+            self._set_running(False)
 
             # Отмечаем корректный останов только если это реальный Ctrl+C
             if not is_suspicious:
@@ -6827,7 +8064,7 @@ class CodeAgentServer:
         except Exception as e:
             logger.error(f"Критическая ошибка: {e}", exc_info=True)
             self.server_logger.log_server_shutdown(f"Критическая ошибка: {str(e)}")
-            self._is_running = False
+            self._set_running(False)
 
             # Отмечаем некорректный останов
             self.checkpoint_manager.mark_server_stop(clean=False)
@@ -6839,7 +8076,7 @@ class CodeAgentServer:
             raise
         finally:
             try:
-                self._is_running = False
+                self._set_running(False)
 
                 # Останавливаем file watcher
                 if self.file_observer:
@@ -0,0 +1,146 @@
+"""
+Привязка сессии агента к задаче
+
+Каждая инструкция открывала новый чат Cursor (а перед задачей сервер
+останавливал активные чаты и перечислял их через `agent ls`), поэтому агент
+заново читал одни и те же файлы и документы на каждой инструкции. При
+включенной привязке инструкции одной задачи продолжают одну сессию:
+`--resume <chat_id>` для Cursor CLI и файл сессии (`--session_id`) для Gemini.
+
+Сессия заменяется новой только при переполнении контекста (оценка по числу
+символов промптов и ответов) или после ошибки инструкции: продолжать диалог,
+в котором агент упал или завис, дороже, чем начать заново.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Оценка размера контекста без токенизатора
+
+
+@dataclass
+class AgentSession:
+    """Сессия агента, привязанная к задаче"""
+
+    session_id: str
+    task_id: str
+    instructions: int = 0
+    context_chars: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def context_tokens(self) -> int:
+        return self.context_chars // CHARS_PER_TOKEN
+
+
+class SessionAffinity:
+    """Одна сессия агента на задачу с ротацией при переполнении или ошибке"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_context_tokens: int = 150000,
+        max_instructions: int = 0,
+        rotate_on_error: bool = True,
+    ):
+        """
+        Args:
+            enabled: Продолжать сессию задачи (False - новый чат на каждую инструкцию)
+            max_context_tokens: Оценка контекста, после которой сессия заменяется новой
+            max_instructions: Максимум инструкций в одной сессии (0 - без ограничения)
+            rotate_on_error: Начинать новую сессию после ошибки инструкции
+        """
+        self.enabled = enabled
+        self.max_context_tokens = max_context_tokens
+        self.max_instructions = max_instructions
+        self.rotate_on_error = rotate_on_error
+        self.rotations = 0
+        self._sessions: Dict[str, AgentSession] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SessionAffinity":
+        """
+        Создать политику из секции session_affinity
+
+        Args:
+            config: Словарь enabled, max_context_tokens, max_instructions, rotate_on_error
+        """
+        return cls(
+            enabled=config.get("enabled", True),
+            max_context_tokens=config.get("max_context_tokens", 150000),
+            max_instructions=config.get("max_instructions", 0),
+            rotate_on_error=config.get("rotate_on_error", True),
+        )
+
+    def session(self, task_id: str) -> Optional[AgentSession]:
+        """Текущая сессия задачи"""
+        with self._lock:
+            return self._sessions.get(task_id)
+
+    def acquire(self, task_id: str, create: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        ID сессии для очередной инструкции задачи
+
+        Args:
+            task_id: Идентификатор задачи
+            create: Создание новой сессии агента (возвращает ID или None)
+
+        Returns:
+            ID сессии или None (привязка выключена или сессию создать не удалось -
+            инструкция выполняется в новом чате, как раньше)
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            session = self._sessions.get(task_id)
+            if session is not None:
+                return session.session_id
+        session_id = create()
+        if not session_id:
+            return None
+        with self._lock:
+            self._sessions[task_id] = AgentSession(session_id=session_id, task_id=task_id)
+        logger.info(f"💬 Сессия агента {session_id} привязана к задаче {task_id}")
+        return session_id
+
+    def record(self, task_id: str, chars: int, success: bool) -> None:
+        """
+        Учесть выполненную в сессии инструкцию
+
+        Args:
+            task_id: Идентификатор задачи
+            chars: Символы промпта и ответа агента
+            success: Инструкция выполнена без ошибки
+        """
+        with self._lock:
+            session = self._sessions.get(task_id)
+            if session is None:
+                return
+            session.instructions += 1
+            session.context_chars += chars
+        if not success and self.rotate_on_error:
+            self.rotate(task_id, "ошибка инструкции")
+        elif session.context_tokens >= self.max_context_tokens:
+            self.rotate(task_id, f"контекст ~{session.context_tokens} токенов")
+        elif self.max_instructions and session.instructions >= self.max_instructions:
+            self.rotate(task_id, f"{session.instructions} инструкций")
+
+    def rotate(self, task_id: str, reason: str) -> None:
+        """Завершить сессию задачи: следующая инструкция начнет новую"""
+        with self._lock:
+            session = self._sessions.pop(task_id, None)
+            if session is None:
+                return
+            self.rotations += 1
+        logger.info(f"🔄 Новая сессия агента для задачи {task_id} ({reason})")
+
+    def reset(self) -> None:
+        """Забыть сессии предыдущих задач (новая задача начинает новую сессию)"""
+        with self._lock:
+            self._sessions.clear()
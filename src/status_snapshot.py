@@ -0,0 +1,191 @@
+"""
+Снимок статуса сервера для HTTP API
+
+Сервер формирует статус при изменениях состояния и публикует его атомарно
+(подменой одной ссылки). HTTP обработчики отдают уже сериализованный снимок
+за O(1), без обращения к checkpoint и TODO, и поддерживают условные запросы
+через ETag/If-None-Match.
+
+Сохранения checkpoint (в том числе из рабочих потоков) не пересобирают статус
+сами: SnapshotRefresher объединяет их и пересобирает снимок в фоновом потоке
+не чаще раза в interval. Пересборки выполняются по одной, поэтому более старый
+снимок не может заменить более новый.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(NamedTuple):
+    """Опубликованный снимок: данные, сериализованное тело и ETag"""
+
+    data: Dict[str, Any]
+    body: bytes
+    etag: str
+    version: int
+
+
+class StatusSnapshot:
+    """
+    Атомарно публикуемый снимок статуса
+
+    Писатель (SnapshotRefresher) собирает новый словарь и вызывает publish().
+    Читатели (HTTP потоки) получают неизменяемый Snapshot через get() без блокировок.
+    """
+
+    def __init__(self, initial: Optional[Dict[str, Any]] = None):
+        """
+        Инициализация снимка
+
+        Args:
+            initial: Начальные данные статуса
+        """
+        self._write_lock = threading.Lock()
+        self._version = 0
+        self._snapshot = self._build(initial or {}, self._version)
+
+    @staticmethod
+    def _build(data: Dict[str, Any], version: int) -> Snapshot:
+        """Сериализовать данные и вычислить ETag"""
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        return Snapshot(data=data, body=body, etag=etag, version=version)
+
+    def publish(self, data: Dict[str, Any]) -> bool:
+        """
+        Опубликовать новый снимок
+
+        Args:
+            data: Полные данные статуса (после публикации не изменяются)
+
+        Returns:
+            True если содержимое изменилось
+        """
+        with self._write_lock:
+            return self._publish_locked(data)
+
+    def _publish_locked(self, data: Dict[str, Any]) -> bool:
+        """Подменить снимок (вызывается под _write_lock)"""
+        snapshot = self._build(data, self._version + 1)
+        if snapshot.etag == self._snapshot.etag:
+            return False
+        self._version += 1
+        self._snapshot = snapshot
+        return True
+
+    def get(self) -> Snapshot:
+        """Получить текущий снимок (без блокировок)"""
+        return self._snapshot
+
+    def matches(self, if_none_match: Optional[str], snapshot: Optional[Snapshot] = None) -> bool:
+        """
+        Проверить заголовок If-None-Match
+
+        Args:
+            if_none_match: Значение заголовка If-None-Match
+            snapshot: Снимок, полученный обработчиком через get() (по умолчанию
+                текущий); снимок могут подменить между get() и проверкой
+
+        Returns:
+            True если клиент уже имеет версию snapshot
+        """
+        if not if_none_match:
+            return False
+        etag = (snapshot or self._snapshot).etag
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class SnapshotRefresher:
+    """
+    Пересборка снимка статуса
+
+    refresh() пересобирает снимок сразу (смена состояния сервера), request() -
+    в фоновом потоке с объединением частых запросов (сохранения checkpoint).
+    Сборка и публикация выполняются под одной блокировкой: снимки публикуются
+    в порядке сборки.
+    """
+
+    def __init__(
+        self,
+        snapshot: StatusSnapshot,
+        build: Callable[[], Dict[str, Any]],
+        interval: float = 0.2,
+    ):
+        """
+        Инициализация
+
+        Args:
+            snapshot: Публикуемый снимок
+            build: Сборка полных данных статуса
+            interval: Минимальная пауза между фоновыми пересборками (секунды)
+        """
+        self.snapshot = snapshot
+        self.build = build
+        self.interval = interval
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._pending = False
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        """
+        Пересобрать и опубликовать снимок в текущем потоке
+
+        Returns:
+            True если содержимое изменилось
+        """
+        with self._refresh_lock:
+            try:
+                return self.snapshot.publish(self.build())
+            except Exception as e:
+                logger.warning(f"Не удалось обновить снимок статуса: {e}")
+                return False
+
+    def request(self) -> None:
+        """Запросить фоновую пересборку (не блокирует вызывающий поток)"""
+        with self._state_lock:
+            self._pending = True
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="codeagent-status-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Пересобирать снимок, пока есть запросы (поток завершается без них)"""
+        while True:
+            with self._state_lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            self.refresh()
+            time.sleep(self.interval)
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """
+        Дождаться завершения фоновых пересборок
+
+        Args:
+            timeout: Максимальное время ожидания (секунды)
+
+        Returns:
+            True если запросов больше нет
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._state_lock:
+                thread = self._thread
+            if thread is None:
+                return True
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._state_lock:
+            return self._thread is None
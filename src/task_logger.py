@@ -10,7 +10,8 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
-from .security_utils import SensitiveDataFilter
+from .event_bus import EventType, publish_event
+from .log_pipeline import PAYLOAD_ATTR, BufferedFileHandler, LogPipeline
 
 # Определяем, нужно ли использовать эмодзи (отключаем на Windows из-за проблем с кодировкой cp1251)
 USE_EMOJI = platform.system() != 'Windows'
@@ -110,8 +111,8 @@ class TaskLogger:
         # Удаляем существующие handlers если есть
         self.logger.handlers.clear()
         
-        # File handler - детальное логирование
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        # File handler - детальное логирование (буфер сбрасывается фоновым писателем)
+        file_handler = BufferedFileHandler(self.log_file, encoding='utf-8')
         file_handler.setLevel(logging.DEBUG)
         file_formatter = logging.Formatter(
             '%(asctime)s - %(levelname)s - %(message)s',
@@ -139,12 +140,15 @@ class TaskLogger:
         # Добавляем время в формат консоли
         console_formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S')
         console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
+        self._file_handler = file_handler
 
-        sensitive_filter = SensitiveDataFilter()
-        self.logger.addFilter(sensitive_filter)
-        file_handler.addFilter(sensitive_filter)
-        console_handler.addFilter(sensitive_filter)
+        # Запись в файл и консоль выполняется в фоновом потоке; секреты очищаются
+        # один раз при постановке в очередь, большие выводы агента уходят в файл payloads
+        self._pipeline = LogPipeline(
+            [file_handler, console_handler],
+            payload_file=self.log_file.with_suffix(".payloads.log"),
+        ).start()
+        self.logger.addHandler(self._pipeline.handler)
         
         # Счетчики для статистики
         self.instruction_count = 0
@@ -154,6 +158,7 @@ class TaskLogger:
         
         # Логируем начало
         self._log_header()
+        publish_event(EventType.TASK_STARTED, task_id=self.task_id, task_name=self.task_name[:200])
     
     def _cleanup_old_logs(self, max_logs: int = 20):
         """
@@ -165,19 +170,20 @@ class TaskLogger:
         try:
             # Получаем все лог-файлы задач
             log_files = sorted(
-                self.log_dir.glob("task_*.log"),
+                (p for p in self.log_dir.glob("task_*.log") if not p.name.endswith(".payloads.log")),
                 key=lambda p: p.stat().st_mtime,
                 reverse=True  # Сортируем от новых к старым
             )
             
-            # Удаляем старые логи, оставляя только max_logs последних
+            # Удаляем старые логи (вместе с файлами payloads), оставляя только max_logs последних
             if len(log_files) > max_logs:
                 for old_log in log_files[max_logs:]:
-                    try:
-                        old_log.unlink()
-                    except Exception:
-                        # Игнорируем ошибки удаления отдельных файлов
-                        pass
+                    for path in (old_log, old_log.with_suffix(".payloads.log")):
+                        try:
+                            path.unlink(missing_ok=True)
+                        except Exception:
+                            # Игнорируем ошибки удаления отдельных файлов
+                            pass
         except Exception:
             # Игнорируем ошибки очистки - это не критично
             pass
@@ -192,11 +198,14 @@ ID: {self.task_id}
 НАЧАЛО: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}
 {'=' * 80}
 """
-        # Записываем в файл через debug (чтобы не попало в консоль через info)
-        for handler in self.logger.handlers:
-            if isinstance(handler, logging.FileHandler):
-                handler.stream.write(file_header)
-                handler.flush()
+        # Записываем напрямую в файл (чтобы не попало в консоль), под блокировкой обработчика
+        handler = self._file_handler
+        handler.acquire()
+        try:
+            handler.stream.write(file_header)
+            handler.flush()
+        finally:
+            handler.release()
         
         # В консоль - компактный заголовок с цветом
         task_name_short = self.task_name[:70] + "..." if len(self.task_name) > 70 else self.task_name
@@ -250,6 +259,15 @@ ID: {self.task_id}
         
         self.logger.info(phase_msg)
         self.logger.debug(f"Фаза изменена: {phase.value}")
+
+        publish_event(
+            EventType.TASK_PHASE,
+            task_id=self.task_id,
+            phase=phase.name,
+            phase_text=phase.value,
+            stage=stage,
+            instruction_num=instruction_num,
+        )
     
     def log_instruction(self, instruction_num: int, instruction_text: str, task_type: str):
         """
@@ -368,11 +386,12 @@ ID: {self.task_id}
         self.logger.debug(f"Успех: {success}")
         self.logger.debug(f"Код возврата: {response.get('return_code', 'N/A')}")
         
+        # Большие выводы попадают в лог частично, целиком - в файл payloads
         if 'stdout' in response and response['stdout']:
-            self.logger.debug(f"\nSTDOUT:\n{response['stdout']}")
+            self.logger.debug("\nSTDOUT:", extra={PAYLOAD_ATTR: str(response['stdout'])})
         
         if 'stderr' in response and response['stderr']:
-            self.logger.debug(f"\nSTDERR:\n{response['stderr']}")
+            self.logger.debug("\nSTDERR:", extra={PAYLOAD_ATTR: str(response['stderr'])})
         
         if 'error_message' in response and response['error_message']:
             self.logger.debug(f"\nОшибка: {response['error_message']}")
@@ -487,6 +506,14 @@ ID: {self.task_id}
             self.logger.error(Colors.colorize(f"   Тип: {type(exception).__name__}", Colors.RED))
             self.logger.error(Colors.colorize(f"   Детали: {str(exception)}", Colors.RED))
             self.logger.debug("Traceback:", exc_info=True)
+
+        publish_event(
+            EventType.ERROR,
+            task_id=self.task_id,
+            source="task",
+            error_class=type(exception).__name__ if exception else "error",
+            message=error_msg[:300],
+        )
     
     def log_completion(self, success: bool, summary: str = ""):
         """
@@ -520,6 +547,13 @@ ID: {self.task_id}
         
         self.logger.info(footer)
         self.logger.debug(f"Задача завершена. Успех: {success}, Длительность: {duration:.2f}s")
+        publish_event(
+            EventType.TASK_FINISHED,
+            task_id=self.task_id,
+            success=bool(success),
+            duration=round(duration, 3),
+            instructions=self.instruction_count,
+        )
     
     def log_info(self, message: str):
         """Логировать информационное сообщение"""
@@ -536,10 +570,9 @@ ID: {self.task_id}
         self.logger.debug(message)
     
     def close(self):
-        """Закрыть логгер и освободить ресурсы"""
-        for handler in self.logger.handlers:
-            handler.close()
-            self.logger.removeHandler(handler)
+        """Закрыть логгер: дописать очередь и освободить ресурсы"""
+        self.logger.removeHandler(self._pipeline.handler)
+        self._pipeline.stop()
 
 
 class ServerLogger:
@@ -655,19 +688,20 @@ class ServerLogger:
         try:
             # Получаем все лог-файлы задач
             log_files = sorted(
-                self.log_dir.glob("task_*.log"),
+                (p for p in self.log_dir.glob("task_*.log") if not p.name.endswith(".payloads.log")),
                 key=lambda p: p.stat().st_mtime,
                 reverse=True  # Сортируем от новых к старым
             )
             
-            # Удаляем старые логи, оставляя только max_logs последних
+            # Удаляем старые логи (вместе с файлами payloads), оставляя только max_logs последних
             if len(log_files) > max_logs:
                 for old_log in log_files[max_logs:]:
-                    try:
-                        old_log.unlink()
-                    except Exception:
-                        # Игнорируем ошибки удаления отдельных файлов
-                        pass
+                    for path in (old_log, old_log.with_suffix(".payloads.log")):
+                        try:
+                            path.unlink(missing_ok=True)
+                        except Exception:
+                            # Игнорируем ошибки удаления отдельных файлов
+                            pass
         except Exception:
             # Игнорируем ошибки очистки - это не критично
             pass
@@ -0,0 +1,404 @@
+"""
+Выбор тестов, затронутых изменениями задачи
+
+Инструкции тестирования (3 и 7) просили агента найти и запустить "тесты,
+связанные с текущим функционалом": на практике агент запускал весь набор или
+угадывал, и фаза тестирования занимала до 1000 секунд независимо от размера
+изменений. TestImpactIndex строит соответствие "файл -> тесты" из двух
+источников и по diff задачи возвращает минимальный набор pytest node ID:
+
+- данные покрытия coverage.py с контекстами тестов (pytest --cov-context=test
+  или dynamic_context = test_function): какие тесты исполняли строки файла;
+- граф импортов Python файлов проекта (ast): тестовые файлы, которые прямо или
+  транзитивно импортируют измененный модуль. Используется для файлов, которых
+  нет в данных покрытия (новые модули, покрытие не собиралось).
+
+Индекс импортов хранится в JSON и обновляется инкрементально: повторно
+разбираются только файлы с изменившимися mtime/размером. Данные покрытия
+перечитываются, когда меняется файл .coverage.
+"""
+
+import ast
+import fnmatch
+import json
+import logging
+import os
+import shlex
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+TEST_FILE_PATTERNS = ("test_*.py", "*_test.py")
+# Изменение этих файлов может повлиять на любой тест - нужен полный набор
+DEFAULT_FULL_SUITE_FILES = (
+    "conftest.py",
+    "pytest.ini",
+    "pyproject.toml",
+    "setup.cfg",
+    "setup.py",
+    "tox.ini",
+    "requirements*.txt",
+)
+EXCLUDED_DIRS = {
+    ".git",
+    ".hg",
+    ".venv",
+    "venv",
+    "env",
+    "node_modules",
+    "__pycache__",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    "build",
+    "dist",
+}
+# Корни импорта помимо корня проекта (src-раскладка)
+SOURCE_ROOTS = ("", "src")
+
+
+def is_test_file(path: str) -> bool:
+    """Файл с тестами pytest (test_*.py, *_test.py)"""
+    name = PurePosixPath(path).name
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in TEST_FILE_PATTERNS)
+
+
+def module_names(path: str) -> List[str]:
+    """
+    Имена модуля Python файла относительно корней импорта
+
+    "src/pkg/mod.py" -> ["src.pkg.mod", "pkg.mod"], "pkg/__init__.py" -> ["pkg"]
+    """
+    parts = list(PurePosixPath(path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    names = []
+    for root in SOURCE_ROOTS:
+        if not root:
+            names.append(".".join(parts))
+        elif len(parts) > 1 and parts[0] == root:
+            names.append(".".join(parts[1:]))
+    return [name for name in names if name]
+
+
+def parse_imports(source: str, path: str) -> List[str]:
+    """
+    Абсолютные имена модулей, импортируемых файлом
+
+    Для `from a import b` возвращаются и "a", и "a.b" (b может быть модулем),
+    для `import a.b` - и родительский пакет "a". Относительные импорты
+    разрешаются относительно пакета файла.
+
+    Args:
+        source: Текст файла
+        path: Путь файла относительно проекта (для относительных импортов)
+
+    Returns:
+        Отсортированный список имен (пустой при синтаксической ошибке)
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    package = list(PurePosixPath(path).parent.parts)
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    continue
+                base_parts = package[: len(package) - (node.level - 1)]
+                base = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                names.add(base)
+            names.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names)
+    # Импорт модуля выполняет и его родительские пакеты (__init__.py)
+    for name in list(names):
+        parts = name.split(".")
+        names.update(".".join(parts[:end]) for end in range(1, len(parts)))
+    return sorted(names)
+
+
+def _context_node_id(context: str, test_files: Dict[str, str]) -> Optional[str]:
+    """
+    pytest node ID из контекста coverage
+
+    Args:
+        context: "test/unit/test_a.py::test_x|run" (pytest-cov) или
+            "test.unit.test_a.test_x" (coverage dynamic_context = test_function)
+        test_files: Имя модуля -> путь тестового файла
+
+    Returns:
+        Node ID или None, если тест не найден среди файлов проекта
+    """
+    if "::" in context:
+        return context.split("|", 1)[0]
+    parts = context.split(".")
+    for end in range(len(parts) - 1, 0, -1):
+        test_file = test_files.get(".".join(parts[:end]))
+        if test_file:
+            return "::".join([test_file, *parts[end:]])
+    return None
+
+
+@dataclass
+class AffectedTests:
+    """Результат выбора тестов"""
+
+    tests: List[str] = field(default_factory=list)  # pytest node ID или пути тестовых файлов
+    full_suite: bool = False
+    reason: str = ""
+
+    def format(self, max_tests: int = 100) -> str:
+        """Текст для подстановки {affected_tests} в инструкцию"""
+        if self.full_suite:
+            return f"полный набор тестов ({self.reason})"
+        if not self.tests:
+            return (
+                f"анализ не нашел затронутых тестов ({self.reason}) - "
+                "запусти тесты, связанные с текущей задачей"
+            )
+        tests = self.tests
+        if len(tests) > max_tests:
+            tests = sorted({test.split("::", 1)[0] for test in tests})
+        # ID параметризованных тестов содержат пробелы и скобки
+        return shlex.join(["pytest", *tests])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"tests": self.tests, "full_suite": self.full_suite, "reason": self.reason}
+
+
+class TestImpactIndex:
+    """Индекс "файл -> тесты" проекта (покрытие + граф импортов)"""
+
+    __test__ = False  # Не тестовый класс для pytest
+
+    def __init__(
+        self,
+        project_dir: Path,
+        index_file: Path,
+        coverage_file: str = ".coverage",
+        full_suite_files: Iterable[str] = DEFAULT_FULL_SUITE_FILES,
+    ):
+        """
+        Args:
+            project_dir: Директория проекта
+            index_file: JSON файл индекса импортов и покрытия
+            coverage_file: База coverage.py с контекстами тестов (относительно проекта)
+            full_suite_files: Шаблоны имен файлов, изменение которых требует всех тестов
+        """
+        self.project_dir = Path(project_dir)
+        self.index_file = Path(index_file)
+        self.coverage_file = self.project_dir / coverage_file
+        self.full_suite_files = list(full_suite_files)
+        self._index = self._load()
+
+    def _empty(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "project_dir": str(self.project_dir.resolve()),
+            "files": {},
+            "coverage": {"mtime": None, "files": {}},
+        }
+
+    def _load(self) -> Dict[str, Any]:
+        """Загрузить индекс (другой проект или версия - пустой индекс)"""
+        try:
+            index = json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return self._empty()
+        if index.get("version") != INDEX_VERSION or index.get("project_dir") != str(
+            self.project_dir.resolve()
+        ):
+            return self._empty()
+        return index
+
+    def _save(self) -> None:
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_file.with_suffix(self.index_file.suffix + ".tmp")
+            tmp.write_text(json.dumps(self._index, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.index_file)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить индекс тестов {self.index_file}: {e}")
+
+    def _python_files(self) -> Dict[str, os.stat_result]:
+        """Python файлы проекта (относительный путь -> stat)"""
+        files = {}
+        for root, dirs, names in os.walk(self.project_dir):
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS and not d.startswith(".")]
+            for name in names:
+                if name.endswith(".py"):
+                    path = Path(root) / name
+                    try:
+                        files[path.relative_to(self.project_dir).as_posix()] = path.stat()
+                    except OSError:
+                        continue
+        return files
+
+    def refresh(self) -> int:
+        """
+        Обновить индекс импортов и покрытия
+
+        Returns:
+            Число повторно разобранных файлов
+        """
+        entries: Dict[str, Any] = self._index["files"]
+        current = self._python_files()
+        parsed = 0
+        for path in set(entries) - set(current):
+            del entries[path]
+        for path, stat in current.items():
+            entry = entries.get(path)
+            if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                continue
+            try:
+                source = (self.project_dir / path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            entries[path] = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "imports": parse_imports(source, path),
+            }
+            parsed += 1
+        coverage_changed = self._refresh_coverage()
+        if parsed or coverage_changed:
+            self._save()
+            logger.debug(f"Индекс тестов обновлен: разобрано файлов {parsed}")
+        return parsed
+
+    def _refresh_coverage(self) -> bool:
+        """Перечитать данные покрытия, если база coverage изменилась"""
+        coverage = self._index["coverage"]
+        try:
+            mtime = self.coverage_file.stat().st_mtime_ns
+        except OSError:
+            changed = coverage["mtime"] is not None
+            self._index["coverage"] = {"mtime": None, "files": {}}
+            return changed
+        if coverage["mtime"] == mtime:
+            return False
+        self._index["coverage"] = {"mtime": mtime, "files": self._read_coverage()}
+        return True
+
+    def _read_coverage(self) -> Dict[str, List[str]]:
+        """Файл проекта -> node ID тестов, исполнявших его строки"""
+        test_files = {
+            name: path
+            for path in self._index["files"]
+            if is_test_file(path)
+            for name in module_names(path)
+        }
+        query = (
+            "SELECT DISTINCT file.path, context.context FROM {table} "
+            "JOIN file ON file.id = {table}.file_id "
+            "JOIN context ON context.id = {table}.context_id"
+        )
+        result: Dict[str, Set[str]] = {}
+        try:
+            connection = sqlite3.connect(f"file:{self.coverage_file}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            logger.warning(f"Не удалось открыть данные покрытия {self.coverage_file}: {e}")
+            return {}
+        try:
+            for table in ("line_bits", "arc"):
+                try:
+                    rows = connection.execute(query.format(table=table)).fetchall()
+                except sqlite3.Error:
+                    continue
+                for file_path, context in rows:
+                    node_id = _context_node_id(context, test_files) if context else None
+                    if node_id is None:
+                        continue
+                    try:
+                        relative = Path(file_path).resolve().relative_to(self.project_dir.resolve())
+                    except ValueError:
+                        continue
+                    result.setdefault(relative.as_posix(), set()).add(node_id)
+        finally:
+            connection.close()
+        return {path: sorted(tests) for path, tests in result.items()}
+
+    def _importers(self) -> Dict[str, Set[str]]:
+        """Имя модуля -> файлы, импортирующие его"""
+        importers: Dict[str, Set[str]] = {}
+        for path, entry in self._index["files"].items():
+            for name in entry["imports"]:
+                importers.setdefault(name, set()).add(path)
+        return importers
+
+    def _importing_tests(self, changed: List[str]) -> Set[str]:
+        """Тестовые файлы, транзитивно импортирующие измененные модули"""
+        importers = self._importers()
+        seen: Set[str] = set(changed)
+        queue = list(changed)
+        tests: Set[str] = set()
+        while queue:
+            path = queue.pop()
+            for name in module_names(path):
+                for importer in importers.get(name, ()):
+                    if importer in seen:
+                        continue
+                    seen.add(importer)
+                    if is_test_file(importer):
+                        tests.add(importer)
+                    queue.append(importer)
+        return tests
+
+    def select(self, changed_files: Iterable[str]) -> AffectedTests:
+        """
+        Тесты, затронутые изменениями
+
+        Args:
+            changed_files: Измененные пути относительно проекта (добавленные,
+                измененные и удаленные)
+
+        Returns:
+            Минимальный набор node ID / тестовых файлов или признак полного набора
+        """
+        changed = sorted({path.replace("\\", "/") for path in changed_files})
+        for path in changed:
+            name = PurePosixPath(path).name
+            if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.full_suite_files):
+                return AffectedTests(full_suite=True, reason=f"изменен {path}")
+
+        self.refresh()
+        python_files = [path for path in changed if path.endswith(".py")]
+        if not python_files:
+            return AffectedTests(reason="нет измененных Python файлов")
+
+        existing = self._index["files"]
+        covered = self._index["coverage"]["files"]
+        test_files = {path for path in python_files if is_test_file(path) and path in existing}
+        node_ids: Set[str] = set()
+        uncovered = []
+        for path in python_files:
+            if is_test_file(path):
+                continue
+            if path in covered:
+                node_ids.update(covered[path])
+            else:
+                uncovered.append(path)
+        test_files |= self._importing_tests(uncovered)
+
+        tests = sorted(test_files) + sorted(
+            node_id
+            for node_id in node_ids
+            if node_id.split("::", 1)[0] not in test_files
+            and node_id.split("::", 1)[0] in existing
+        )
+        reason = (
+            f"покрытие: {len(python_files) - len(uncovered)} файлов, "
+            f"импорты: {len(uncovered)} файлов"
+        )
+        return AffectedTests(tests=tests, reason=reason)
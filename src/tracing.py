@@ -0,0 +1,475 @@
+"""
+Трассировка выполнения задач (спаны в стиле OpenTelemetry)
+
+Одна задача TODO порождает трассу: спан задачи, вложенные спаны инструкций,
+запусков агента (subprocess), ожидания результата, вызовов LLM и git операций.
+Контекст передается в дочерние процессы через переменную окружения
+TRACEPARENT (формат W3C Trace Context), поэтому Gemini агент может
+продолжить ту же трассу. Агент в Docker видит только директорию проекта: он
+пишет спаны во временный файл в .git проекта (container_trace_spool), а сервер
+после запуска переносит их в свой файл (collect_trace_spool).
+
+Экспорт работает без сети:
+- file: JSONL файл, каждая строка - объект OTLP/JSON (resourceSpans), совместимый
+  с file exporter OpenTelemetry Collector
+- console: краткая строка в лог на каждый завершенный спан
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_ENV = "TRACEPARENT"
+TRACE_FILE_ENV = "CODEAGENT_TRACE_FILE"
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class SpanContext:
+    """Идентификаторы спана (trace_id - 32 hex, span_id - 16 hex)"""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def to_traceparent(self) -> str:
+        """Сформировать заголовок traceparent"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: Optional[str]) -> Optional["SpanContext"]:
+        """
+        Разобрать заголовок traceparent
+
+        Args:
+            value: Значение traceparent
+
+        Returns:
+            SpanContext или None если значение некорректно
+        """
+        if not value:
+            return None
+        parts = value.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            int(parts[1], 16)
+            int(parts[2], 16)
+            flags = int(parts[3], 16)
+        except ValueError:
+            return None
+        if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+            return None
+        return cls(parts[1], parts[2], bool(flags & 1))
+
+
+class Span:
+    """Единица работы трассы"""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        context: SpanContext,
+        parent_span_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self._tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def is_recording(self) -> bool:
+        """Спан еще не завершен"""
+        return self.end_time_ns is None
+
+    @property
+    def duration(self) -> float:
+        """Длительность спана в секундах (для незавершенного - текущая)"""
+        end = self.end_time_ns if self.end_time_ns is not None else time.time_ns()
+        return (end - self.start_time_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Установить атрибут спана"""
+        if self.is_recording:
+            self.attributes[key] = value
+
+    def set_status(self, ok: bool, message: str = "") -> None:
+        """
+        Установить статус спана
+
+        Args:
+            ok: Успешно ли завершилась работа
+            message: Описание ошибки
+        """
+        self.status_code = STATUS_OK if ok else STATUS_ERROR
+        self.status_message = message[:500] if message else ""
+
+    def end(self) -> None:
+        """Завершить спан и передать его экспортеру"""
+        if not self.is_recording:
+            return
+        self.end_time_ns = time.time_ns()
+        self._tracer._export(self)
+
+
+class _NoopSpan(Span):
+    """Спан для отключенной трассировки"""
+
+    def __init__(self):
+        self.name = ""
+        self.context = SpanContext("0" * 32, "0" * 16, False)
+        self.parent_span_id = None
+        self.attributes = {}
+        self.start_time_ns = 0
+        self.end_time_ns = 0
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, ok: bool, message: str = "") -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "codeagent_current_span", default=None
+)
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    """Преобразовать значение атрибута в формат OTLP/JSON"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def span_to_otlp(span: Span, service_name: str) -> Dict[str, Any]:
+    """
+    Сформировать OTLP/JSON представление спана
+
+    Args:
+        span: Завершенный спан
+        service_name: Имя сервиса (resource service.name)
+
+    Returns:
+        Объект {"resourceSpans": [...]}
+    """
+    otlp_span: Dict[str, Any] = {
+        "traceId": span.context.trace_id,
+        "spanId": span.context.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns),
+        "attributes": [
+            {"key": key, "value": _attribute_value(value)} for key, value in span.attributes.items()
+        ],
+        "status": {"code": span.status_code},
+    }
+    if span.parent_span_id:
+        otlp_span["parentSpanId"] = span.parent_span_id
+    if span.status_message:
+        otlp_span["status"]["message"] = span.status_message
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "codeagent"}, "spans": [otlp_span]}],
+            }
+        ]
+    }
+
+
+class FileSpanExporter:
+    """Экспорт спанов в JSONL файл (OTLP/JSON)"""
+
+    def __init__(self, file_path: Path, service_name: str = "codeagent"):
+        self.file_path = Path(file_path)
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span_to_otlp(span, self.service_name), ensure_ascii=False, default=str)
+        self.export_lines([line])
+
+    def export_lines(self, lines: Iterable[str]) -> None:
+        """Дописать готовые строки OTLP/JSON (спаны дочерних процессов)"""
+        data = "".join(line.rstrip("\n") + "\n" for line in lines if line.strip())
+        if not data:
+            return
+        with self._lock:
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(data)
+
+
+class ConsoleSpanExporter:
+    """Экспорт спанов в лог (по строке на спан)"""
+
+    def __init__(self, service_name: str = "codeagent"):
+        self.service_name = service_name
+
+    def export(self, span: Span) -> None:
+        status = {STATUS_OK: "ok", STATUS_ERROR: "error"}.get(span.status_code, "unset")
+        logger.info(
+            f"[trace {span.context.trace_id[:8]}] {span.name} {span.duration:.3f}s "
+            f"status={status} {span.attributes}"
+        )
+
+
+class Tracer:
+    """Создание спанов и управление текущим контекстом"""
+
+    def __init__(self, exporter: Optional[Any] = None, service_name: str = "codeagent"):
+        """
+        Инициализация трассировщика
+
+        Args:
+            exporter: Экспортер спанов (None - трассировка отключена)
+            service_name: Имя сервиса
+        """
+        self.exporter = exporter
+        self.service_name = service_name
+
+    @property
+    def enabled(self) -> bool:
+        """Включена ли трассировка"""
+        return self.exporter is not None
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None,
+    ) -> Span:
+        """
+        Создать спан (без активации в текущем контексте)
+
+        Args:
+            name: Имя спана
+            attributes: Атрибуты
+            parent: Родительский контекст (по умолчанию - текущий спан)
+
+        Returns:
+            Новый спан
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        if parent is None:
+            current = _current_span.get()
+            if current is not None and current is not _NOOP_SPAN:
+                parent = current.context
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        context = SpanContext(trace_id, secrets.token_hex(8))
+        return Span(
+            self,
+            name,
+            context,
+            parent_span_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+
+    @contextlib.contextmanager
+    def start_as_current_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None,
+    ) -> Iterator[Span]:
+        """
+        Создать спан, сделать его текущим и завершить при выходе
+
+        Исключение внутри блока помечает спан как ошибочный.
+        """
+        span = self.start_span(name, attributes, parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_status(False, f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def activate(self, span: Span) -> contextvars.Token:
+        """Сделать спан текущим (вернуть токен для deactivate)"""
+        return _current_span.set(span)
+
+    @staticmethod
+    def deactivate(token: contextvars.Token) -> None:
+        """Вернуть предыдущий текущий спан"""
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Токен создан в другом контексте - просто снимаем текущий спан
+            _current_span.set(None)
+
+    def _export(self, span: Span) -> None:
+        """Передать завершенный спан экспортеру"""
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.debug(f"Не удалось экспортировать спан {span.name}: {e}")
+
+
+def get_current_span() -> Optional[Span]:
+    """Получить текущий спан"""
+    span = _current_span.get()
+    return None if span is _NOOP_SPAN else span
+
+
+def inject_env(env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Добавить контекст текущего спана в переменные окружения дочернего процесса
+
+    Args:
+        env: Словарь окружения (изменяется на месте); None - новый словарь
+
+    Returns:
+        Словарь окружения
+    """
+    env = env if env is not None else {}
+    span = get_current_span()
+    if span is not None:
+        env[TRACEPARENT_ENV] = span.context.to_traceparent()
+        exporter = _tracer.exporter
+        if isinstance(exporter, FileSpanExporter):
+            env[TRACE_FILE_ENV] = str(exporter.file_path.resolve())
+    return env
+
+
+def container_trace_spool(project_dir: Optional[Path]) -> Optional[Path]:
+    """
+    Временный файл спанов для агента в Docker контейнере
+
+    Контейнер видит только директорию проекта, поэтому файл трассы сервера ему
+    недоступен. Файл создается в .git проекта: он не попадает в рабочее дерево
+    и в учет изменений инструкций.
+
+    Args:
+        project_dir: Директория проекта на хосте (смонтирована в контейнер)
+
+    Returns:
+        Путь на хосте или None (нет текущего спана, экспорт не в файл, проект не в git)
+    """
+    span = get_current_span()
+    if span is None or project_dir is None or not isinstance(_tracer.exporter, FileSpanExporter):
+        return None
+    git_dir = Path(project_dir) / ".git"
+    if not git_dir.is_dir():
+        return None
+    spool_dir = git_dir / "codeagent-traces"
+    try:
+        spool_dir.mkdir(exist_ok=True)
+    except OSError as e:
+        logger.debug(f"Не удалось создать директорию спанов агента: {e}")
+        return None
+    return spool_dir / f"{span.context.span_id}.jsonl"
+
+
+def collect_trace_spool(spool: Optional[Path]) -> int:
+    """
+    Перенести спаны агента из временного файла в файл трассы сервера
+
+    Args:
+        spool: Файл из container_trace_spool (None - ничего не делать)
+
+    Returns:
+        Количество перенесенных спанов
+    """
+    if spool is None or not spool.exists():
+        return 0
+    try:
+        lines = spool.read_text(encoding="utf-8").splitlines()
+        spool.unlink()
+    except OSError as e:
+        logger.debug(f"Не удалось прочитать спаны агента {spool}: {e}")
+        return 0
+    exporter = _tracer.exporter
+    if isinstance(exporter, FileSpanExporter):
+        exporter.export_lines(lines)
+    return len(lines)
+
+
+def extract_env(env: Optional[Dict[str, str]] = None) -> Optional[SpanContext]:
+    """Получить родительский контекст из окружения (TRACEPARENT)"""
+    env = env if env is not None else os.environ
+    return SpanContext.from_traceparent(env.get(TRACEPARENT_ENV))
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Получить глобальный трассировщик процесса"""
+    return _tracer
+
+
+def configure_tracing(tracing_config: Optional[Dict[str, Any]], base_dir: Path) -> Tracer:
+    """
+    Настроить глобальный трассировщик по секции tracing конфигурации
+
+    Args:
+        tracing_config: Секция конфигурации (enabled, exporter, file, service_name)
+        base_dir: Базовая директория для относительного пути файла
+
+    Returns:
+        Настроенный трассировщик
+    """
+    config = tracing_config or {}
+    service_name = config.get("service_name", "codeagent")
+    exporter_type = str(config.get("exporter", "file")).lower()
+
+    exporter: Optional[Any] = None
+    if config.get("enabled", False) and exporter_type != "none":
+        if exporter_type == "console":
+            exporter = ConsoleSpanExporter(service_name)
+        else:
+            file_path = Path(config.get("file", "logs/traces/traces.jsonl"))
+            if not file_path.is_absolute():
+                file_path = Path(base_dir) / file_path
+            exporter = FileSpanExporter(file_path, service_name)
+
+    _tracer.exporter = exporter
+    _tracer.service_name = service_name
+    if exporter is not None:
+        logger.info(f"Трассировка включена (экспорт: {exporter_type})")
+    return _tracer
+
@@ -0,0 +1,277 @@
+"""
+Пакетная оценка полезности пунктов TODO
+
+Проверка полезности оценивала по одному пункту за вызов LLM, причем каждый
+вызов создавал новый LLMManager, заново читал документацию и переключал
+форматеры логов, а результат нигде не сохранялся. При 30+ непройденных
+пунктах старт итерации занимал минуты.
+
+Триаж собирает все пункты без сохраненной оценки в несколько JSON-промптов
+(пакеты ограничены оценкой числа токенов) и отправляет пакеты параллельно.
+Оценки хранятся в JSON-файле по хешу нормализованного текста пункта, поэтому
+повторно оцениваются только новые и измененные пункты.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Оценка размера промпта без токенизатора
+ITEM_OVERHEAD_TOKENS = 12  # JSON-обертка пункта в промпте и его оценка в ответе
+STORE_VERSION = 1
+
+PROMPT_HEADER = """Оцени полезность каждого пункта из TODO списка проекта.
+
+КОНТЕКСТ ПРОЕКТА (документация):
+{context}
+
+Оценка в процентах от 0 до 100:
+- 0-15 - мусор/шум, не является реальной задачей (случайный текст, личные заметки, дубликаты)
+- 16-50 - слабая полезность, возможно неполная или неясная задача
+- 51-80 - средняя полезность, задача понятна но может быть улучшена
+- 81-100 - высокая полезность, четкая и конкретная техническая задача
+
+Технические задачи, связанные с проектом, должны иметь высокую полезность.
+
+ПУНКТЫ TODO (по одному JSON-объекту на строку):
+{items}
+
+Верни JSON объект с оценкой для каждого id:
+{{"items": [{{"id": "1", "usefulness_percent": число, "comment": "краткий комментарий"}}]}}"""
+
+
+def item_hash(text: str) -> str:
+    """Хеш текста пункта (пробелы и регистр не влияют)"""
+    normalized = " ".join(text.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:20]
+
+
+@dataclass
+class UsefulnessScore:
+    """Сохраненная оценка полезности пункта"""
+
+    percent: float
+    comment: str = ""
+    scored_at: float = field(default_factory=time.time)
+
+
+class UsefulnessTriage:
+    """Оценки полезности пунктов TODO с пакетным досчетом новых пунктов"""
+
+    def __init__(
+        self,
+        store_file: Path,
+        enabled: bool = True,
+        chunk_tokens: int = 2000,
+        max_items_per_chunk: int = 25,
+        max_concurrency: int = 4,
+        context_chars: int = 2000,
+    ):
+        """
+        Args:
+            store_file: JSON-файл с оценками
+            enabled: Оценивать пункты при старте итерации
+            chunk_tokens: Бюджет токенов на пункты одного промпта
+            max_items_per_chunk: Максимум пунктов в одном промпте
+            max_concurrency: Одновременных запросов к LLM
+            context_chars: Символов документации в каждом промпте
+        """
+        self.store_file = Path(store_file)
+        self.enabled = enabled
+        self.chunk_tokens = chunk_tokens
+        self.max_items_per_chunk = max_items_per_chunk
+        self.max_concurrency = max(1, max_concurrency)
+        self.context_chars = context_chars
+        self._scores: Dict[str, UsefulnessScore] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base_dir: Path) -> "UsefulnessTriage":
+        """
+        Создать триаж из секции usefulness_triage
+
+        Args:
+            config: Словарь enabled, store_file, chunk_tokens, max_items_per_chunk,
+                max_concurrency, context_chars
+            base_dir: Директория, относительно которой задан store_file
+        """
+        return cls(
+            store_file=base_dir / config.get("store_file", "data/.codeagent_usefulness.json"),
+            enabled=config.get("enabled", True),
+            chunk_tokens=config.get("chunk_tokens", 2000),
+            max_items_per_chunk=config.get("max_items_per_chunk", 25),
+            max_concurrency=config.get("max_concurrency", 4),
+            context_chars=config.get("context_chars", 2000),
+        )
+
+    def _load(self) -> None:
+        if not self.store_file.exists():
+            return
+        try:
+            data = json.loads(self.store_file.read_text(encoding="utf-8"))
+            if data.get("version") != STORE_VERSION:
+                return
+            self._scores = {
+                key: UsefulnessScore(**value) for key, value in data.get("scores", {}).items()
+            }
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Не удалось загрузить оценки полезности {self.store_file}: {e}")
+
+    def _save(self) -> None:
+        with self._lock:
+            data = {
+                "version": STORE_VERSION,
+                "scores": {key: asdict(score) for key, score in self._scores.items()},
+            }
+        try:
+            self.store_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.store_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp_file.replace(self.store_file)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить оценки полезности {self.store_file}: {e}")
+
+    def get(self, text: str) -> Optional[UsefulnessScore]:
+        """Сохраненная оценка пункта или None"""
+        with self._lock:
+            return self._scores.get(item_hash(text))
+
+    def pending(self, texts: List[str]) -> List[str]:
+        """Пункты без сохраненной оценки (без повторов)"""
+        seen = set()
+        result = []
+        with self._lock:
+            for text in texts:
+                key = item_hash(text)
+                if key in self._scores or key in seen:
+                    continue
+                seen.add(key)
+                result.append(text)
+        return result
+
+    def chunk(self, texts: List[str]) -> List[List[str]]:
+        """Разбить пункты на пакеты по бюджету токенов"""
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        tokens = 0
+        for text in texts:
+            cost = len(text) // CHARS_PER_TOKEN + ITEM_OVERHEAD_TOKENS
+            if current and (
+                tokens + cost > self.chunk_tokens or len(current) >= self.max_items_per_chunk
+            ):
+                chunks.append(current)
+                current, tokens = [], 0
+            current.append(text)
+            tokens += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def build_prompt(self, texts: List[str], context: str = "") -> str:
+        """Промпт оценки пакета: пункты пронумерованы с 1"""
+        items = "\n".join(
+            json.dumps({"id": str(index), "text": text}, ensure_ascii=False)
+            for index, text in enumerate(texts, start=1)
+        )
+        return PROMPT_HEADER.format(context=context[: self.context_chars], items=items)
+
+    @staticmethod
+    def parse_response(content: Optional[str], texts: List[str]) -> Dict[str, UsefulnessScore]:
+        """
+        Разобрать ответ LLM на пакет
+
+        Args:
+            content: Текст ответа (JSON, возможно внутри markdown)
+            texts: Пункты пакета в порядке нумерации
+
+        Returns:
+            Оценки по тексту пункта (пункты без валидной оценки отсутствуют)
+        """
+        if not content:
+            return {}
+        data = None
+        decoder = json.JSONDecoder()
+        for index, char in enumerate(content):
+            if char != "{":
+                continue
+            try:
+                data, _end = decoder.raw_decode(content[index:])
+                break
+            except json.JSONDecodeError:
+                continue
+        if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+            return {}
+
+        scores = {}
+        for entry in data["items"]:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                position = int(entry.get("id")) - 1
+                percent = float(entry.get("usefulness_percent"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= position < len(texts):
+                scores[texts[position]] = UsefulnessScore(
+                    percent=max(0.0, min(100.0, percent)),
+                    comment=str(entry.get("comment") or ""),
+                )
+        return scores
+
+    async def triage(
+        self,
+        texts: List[str],
+        generate: Callable[[str], Awaitable[Optional[str]]],
+        context: str = "",
+    ) -> int:
+        """
+        Оценить пункты без сохраненной оценки
+
+        Args:
+            texts: Тексты непройденных пунктов
+            generate: Запрос к LLM: промпт -> текст ответа (None при ошибке)
+            context: Документация проекта для промптов
+
+        Returns:
+            Количество новых оценок (пункты, которые LLM не оценил, будут
+            отправлены снова на следующей итерации)
+        """
+        if not self.enabled:
+            return 0
+        chunks = self.chunk(self.pending(texts))
+        if not chunks:
+            return 0
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def score_chunk(chunk: List[str]) -> Dict[str, UsefulnessScore]:
+            async with semaphore:
+                try:
+                    content = await generate(self.build_prompt(chunk, context))
+                except Exception as e:
+                    logger.warning(f"Ошибка оценки пакета из {len(chunk)} пунктов: {e}")
+                    return {}
+            return self.parse_response(content, chunk)
+
+        results = await asyncio.gather(*(score_chunk(chunk) for chunk in chunks))
+        scored = 0
+        with self._lock:
+            for scores in results:
+                for text, score in scores.items():
+                    self._scores[item_hash(text)] = score
+                    scored += 1
+        if scored:
+            self._save()
+        logger.info(
+            f"📊 Оценка полезности: {scored}/{sum(len(chunk) for chunk in chunks)} пунктов "
+            f"в {len(chunks)} запросах"
+        )
+        return scored
@@ -31,6 +31,7 @@ sys.path.insert(0, str(project_root))
 from src.llm.llm_manager import (
     LLMManager, ModelConfig, ModelRole, ModelResponse
 )
+from src.llm.model_router import ModelRouter
 
 
 class TestLLMManagerConfig:
@@ -613,23 +614,18 @@ class TestLLMManagerOptimization:
 
         return manager
 
-    def test_fastest_model_caching(self, manager_for_optimization):
-        """Тест кэширования самой быстрой модели"""
-        # Устанавливаем время отклика
-        manager_for_optimization.models['fast-model'].last_response_time = 1.0
-        manager_for_optimization.models['slow-model'].last_response_time = 3.0
-
-        # Первый вызов - кэш пустой
-        fastest1 = manager_for_optimization.get_fastest_model()
-        assert fastest1.name == 'fast-model'
+    def test_fastest_model_routing(self, manager_for_optimization):
+        """Тест выбора модели роутером по статистике вызовов"""
+        manager_for_optimization._router = ModelRouter(explore_probability=0.0)
+        manager_for_optimization._router.observe('fast-model', 'test', 1.0, success=True)
+        manager_for_optimization._router.observe('slow-model', 'test', 3.0, success=True)
 
-        # Проверяем что кэш заполнен
-        assert manager_for_optimization._fastest_model_cache is not None
-        assert manager_for_optimization._fastest_model_cache.name == 'fast-model'
+        assert manager_for_optimization.get_fastest_model().name == 'fast-model'
 
-        # Второй вызов должен использовать кэш
-        fastest2 = manager_for_optimization.get_fastest_model()
-        assert fastest2 is fastest1  # Тот же объект из кэша
+        # Ошибки быстрой модели переключают выбор на медленную
+        for _ in range(5):
+            manager_for_optimization._router.observe('fast-model', 'test', 1.0, success=False)
+        assert manager_for_optimization.get_fastest_model().name == 'slow-model'
 
     def test_model_name_caching(self, manager_for_optimization):
         """Тест кэширования моделей по имени"""
@@ -645,16 +641,11 @@ class TestLLMManagerOptimization:
         model2 = manager_for_optimization.get_model_by_name('fast-model')
         assert model2 is model1  # Тот же объект
 
-    def test_cache_invalidation(self, manager_for_optimization):
-        """Тест инвалидации кэша"""
-        # Заполняем кэш
-        manager_for_optimization.get_fastest_model()
-        assert manager_for_optimization._fastest_model_cache is not None
+    def test_fastest_model_without_router(self, manager_for_optimization):
+        """Тест выбора без роутера: модели без ответов не считаются самыми быстрыми"""
+        manager_for_optimization.models['slow-model'].last_response_time = 3.0
 
-        # Инвалидируем кэш
-        manager_for_optimization._invalidate_fastest_cache()
-        assert manager_for_optimization._fastest_model_cache is None
-        assert manager_for_optimization._cache_timestamp == 0.0
+        assert manager_for_optimization.get_fastest_model().name == 'slow-model'
 
     def test_performance_stats(self, manager_for_optimization):
         """Тест получения статистики производительности"""
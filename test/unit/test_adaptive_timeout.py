@@ -0,0 +1,98 @@
+"""
+Тесты для адаптивных таймаутов инструкций
+"""
+
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.adaptive_timeout import (
+    ActivityMonitor,
+    ExtensionPolicy,
+    ProgressDeadline,
+    TimeoutModel,
+    percentile,
+    run_with_progress,
+)
+from src.checkpoint_manager import CheckpointManager
+
+FAST_POLICY = ExtensionPolicy(idle_grace=0.5, max_factor=4.0, check_interval=0.05)
+
+
+@pytest.fixture
+def model(tmp_path):
+    manager = CheckpointManager(tmp_path, "checkpoint.json")
+    return TimeoutModel(manager, min_samples=3, min_timeout=10, max_timeout=1000)
+
+
+def test_deadline_uses_template_until_history(model):
+    key = TimeoutModel.key(2, "default", "cursor", "auto")
+    model.record(key, 50)
+    model.record(key, 60)
+
+    assert model.deadline(key, 600) == 600
+
+
+def test_deadline_from_percentile_with_margin(model):
+    key = TimeoutModel.key(2, "default", "cursor", "auto")
+    for seconds in (40, 50, 60, 70, 80):
+        model.record(key, seconds)
+
+    expected = int(percentile([40, 50, 60, 70, 80], 0.95) * 1.3)
+    assert model.deadline(key, 600) == expected
+    assert model.deadline(TimeoutModel.key(2, "default", "gemini", "auto"), 600) == 600
+
+
+def test_deadline_is_clamped_and_history_bounded(tmp_path):
+    manager = CheckpointManager(tmp_path, "checkpoint.json")
+    model = TimeoutModel(manager, min_samples=1, min_timeout=100, max_timeout=200, window=3)
+    for seconds in (1, 2, 3, 4):
+        model.record("k", seconds)
+
+    assert model.deadline("k", 600) == 100
+    assert manager.get_instruction_timings("k")["durations"] == [2, 3, 4]
+    model.record("k", 10_000, timed_out=True)
+    assert model.deadline("k", 600) == 200
+    reloaded = CheckpointManager(tmp_path, "checkpoint.json")
+    assert reloaded.get_instruction_timings("k")["timeouts"] == 1
+
+
+def test_progress_deadline_extends_while_files_change(tmp_path):
+    progress = ProgressDeadline(0.1, ActivityMonitor(tmp_path), FAST_POLICY)
+    time.sleep(0.15)
+    (tmp_path / "work.py").write_text("x = 1\n")
+
+    assert progress.expired() is False
+    assert progress.extended is True
+    time.sleep(0.6)
+    assert progress.expired() is True
+
+
+def test_monitor_creation_is_not_activity(tmp_path):
+    progress = ProgressDeadline(0.1, ActivityMonitor(tmp_path), FAST_POLICY)
+    time.sleep(0.15)
+
+    assert progress.expired() is True  # Агент молчит и не меняет файлы с самого начала
+    assert progress.extended is False
+
+
+def test_run_with_progress_keeps_active_process():
+    script = "import time\nfor i in range(6):\n    print(i, flush=True)\n    time.sleep(0.1)"
+
+    result = run_with_progress([sys.executable, "-c", script], 0.2, policy=FAST_POLICY)
+
+    assert result.returncode == 0
+    assert result.stdout.split() == [str(i) for i in range(6)]
+
+
+def test_run_with_progress_kills_idle_process():
+    script = "import time\nprint('start', flush=True)\ntime.sleep(30)"
+    started = time.monotonic()
+
+    with pytest.raises(subprocess.TimeoutExpired) as error:
+        run_with_progress([sys.executable, "-c", script], 0.2, policy=FAST_POLICY)
+
+    assert time.monotonic() - started < 5
+    assert "start" in error.value.output
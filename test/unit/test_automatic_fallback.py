@@ -1,182 +1,107 @@
 #!/usr/bin/env python3
 """
-Тест для проверки автоматического fallback режима после billing ошибок
+Тест автоматического переключения на резервную модель Cursor через выключатели моделей
 """
 
 import pytest
-import time
-import tempfile
-import os
-from pathlib import Path
-from unittest.mock import patch, MagicMock
-from src.fallback_state_manager import FallbackStateManager, FallbackState
+from unittest.mock import patch
+
+from src import circuit_breaker
+from src.circuit_breaker import OPEN, CircuitBreakerRegistry
 from src.cursor_cli_interface import CursorCLIInterface, CursorCLIResult
 
+MODEL_CONFIG = {
+    'model': 'auto',
+    'fallback_models': ['grok'],
+    'resilience': {
+        'enable_fallback': True,
+        'max_fallback_attempts': 3,
+        'fallback_retry_delay': 0,
+        'billing_open_seconds': 3600,
+        'fallback_on_errors': ['billing_error', 'timeout', 'unknown_error'],
+    },
+}
+
+
+def billing_error():
+    return CursorCLIResult(
+        success=False,
+        stdout="",
+        stderr="You've hit your usage limit You've saved $245 on API model usage this month.",
+        return_code=1,
+        cli_available=True
+    )
+
+
+def ok():
+    return CursorCLIResult(success=True, stdout="ok", stderr="", return_code=0, cli_available=True)
+
+
+def timeout():
+    return CursorCLIResult(
+        success=False, stdout="", stderr="", return_code=-1, cli_available=True,
+        error_message="Таймаут выполнения (300 секунд)"
+    )
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Отдельный реестр выключателей на тест"""
+    registry = CircuitBreakerRegistry(tmp_path / "breakers.json", defaults={"min_calls": 2})
+    monkeypatch.setattr(circuit_breaker, "_registry", registry)
+    return registry
+
+
+@pytest.fixture
+def cli():
+    with patch.object(CursorCLIInterface, '_get_model_config', return_value=MODEL_CONFIG):
+        yield CursorCLIInterface(container_name="test")
+
+
+@patch('src.cursor_cli_interface.CursorCLIInterface._execute_with_specific_model')
+def test_billing_error_disables_primary_model(mock_execute, cli, registry):
+    """Billing error размыкает выключатель основной модели, следующие вызовы идут в резервную"""
+    mock_execute.side_effect = [billing_error(), ok(), ok()]
+
+    first = cli.execute_with_fallback("test prompt")
+    assert first.success and first.fallback_used and not first.billing_fallback_used
+    assert registry.get("cursor:auto").state == OPEN
+    assert registry.get("cursor:auto").retry_after() > 3000
+
+    second = cli.execute_with_fallback("test prompt")
+    assert second.success and second.billing_fallback_used
+    # Основная модель во втором вызове не запускалась
+    models = [call.kwargs['model'] for call in mock_execute.call_args_list]
+    assert models == ['auto', 'grok', 'grok']
+
+
+@patch('src.cursor_cli_interface.CursorCLIInterface._execute_with_specific_model')
+def test_all_models_open_fail_fast(mock_execute, cli, registry):
+    """Если все модели отключены, вызов завершается ошибкой без запуска агента"""
+    mock_execute.side_effect = lambda **kwargs: timeout()
+
+    cli.execute_with_fallback("test prompt")
+    cli.execute_with_fallback("test prompt")
+    assert mock_execute.call_count == 4
+    assert registry.get("cursor:grok").state == OPEN
+
+    result = cli.execute_with_fallback("test prompt")
+    assert not result.success
+    assert "circuit open" in result.error_message
+    assert mock_execute.call_count == 4
+
+
+@patch('src.cursor_cli_interface.CursorCLIInterface._execute_with_specific_model')
+def test_primary_model_success_keeps_breaker_closed(mock_execute, cli, registry):
+    """Успешные вызовы основной модели не используют резервную"""
+    mock_execute.side_effect = lambda **kwargs: ok()
+
+    result = cli.execute_with_fallback("test prompt")
 
-class TestAutomaticFallback:
-    """Тесты для автоматического fallback режима"""
-
-    def setup_method(self):
-        """Настройка перед каждым тестом"""
-        # Создаем временный файл для состояния
-        self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.json')
-        self.temp_file.close()
-        self.state_file = self.temp_file.name
-
-    def teardown_method(self):
-        """Очистка после каждого теста"""
-        if os.path.exists(self.state_file):
-            os.unlink(self.state_file)
-
-    def test_fallback_state_manager_basic(self):
-        """Тест базовой функциональности FallbackStateManager"""
-        manager = FallbackStateManager(self.state_file)
-
-        # Изначально fallback не активен
-        assert not manager.should_use_fallback()
-
-        # Активируем fallback
-        manager.activate_fallback()
-
-        # Теперь должен быть активен
-        assert manager.should_use_fallback()
-
-        # Проверяем статус
-        status = manager.get_status()
-        assert status['fallback_active'] == True
-        assert status['request_count'] == 0
-        assert status['max_requests'] == 25
-
-    def test_fallback_request_counting(self):
-        """Тест подсчета обращений в fallback режиме"""
-        manager = FallbackStateManager(self.state_file)
-
-        # Активируем fallback
-        manager.activate_fallback()
-        assert manager.should_use_fallback()
-
-        # Записываем несколько обращений
-        for i in range(5):
-            manager.record_request()
-            assert manager.should_use_fallback()
-
-        # Проверяем счетчик
-        status = manager.get_status()
-        assert status['request_count'] == 5
-
-    def test_fallback_auto_deactivation(self):
-        """Тест автоматической деактивации после 25 обращений"""
-        manager = FallbackStateManager(self.state_file)
-
-        # Активируем fallback
-        manager.activate_fallback()
-
-        # Записываем 24 обращения (еще должен быть активен)
-        for i in range(24):
-            manager.record_request()
-            assert manager.should_use_fallback()
-
-        # Проверяем что после 24 обращений еще активен
-        status = manager.get_status()
-        assert status['fallback_active'] == True
-        assert status['request_count'] == 24
-
-        # 25-е обращение должно деактивировать fallback
-        manager.record_request()
-        assert not manager.should_use_fallback()
-
-        # Проверяем статус
-        status = manager.get_status()
-        assert status['fallback_active'] == False
-        assert status['request_count'] == 25  # Не сбрасывается, сохраняется для статистики
-
-    def test_fallback_state_persistence(self):
-        """Тест сохранения и загрузки состояния"""
-        # Создаем первый менеджер и активируем fallback
-        manager1 = FallbackStateManager(self.state_file)
-        manager1.activate_fallback()
-        manager1.record_request()
-
-        # Создаем второй менеджер (имитация перезапуска)
-        manager2 = FallbackStateManager(self.state_file)
-
-        # Состояние должно сохраниться
-        assert manager2.should_use_fallback()
-        status = manager2.get_status()
-        assert status['request_count'] == 1
-
-    def test_fallback_time_expiration(self):
-        """Тест истечения времени fallback режима"""
-        manager = FallbackStateManager(self.state_file)
-
-        # Активируем fallback с коротким временем
-        manager.state.fallback_active = True
-        manager.state.fallback_until = time.time() - 1  # Время уже истекло
-        manager.state.request_count = 5
-        manager._save_state()
-
-        # Fallback должен быть неактивен из-за истечения времени
-        assert not manager.should_use_fallback()
-
-    @patch('src.cursor_cli_interface.CursorCLIInterface._execute_with_specific_model')
-    def test_cursor_cli_automatic_fallback(self, mock_execute):
-        """Тест автоматического fallback в CursorCLIInterface"""
-        # Создаем интерфейс с тестовым файлом состояния
-        cli = CursorCLIInterface()
-        cli.fallback_state = FallbackStateManager(self.state_file)
-
-        # Активируем fallback режим
-        cli.fallback_state.activate_fallback()
-
-        # Мокаем успешное выполнение
-        mock_result = CursorCLIResult(
-            success=True,
-            stdout="Test output",
-            stderr="",
-            return_code=0,
-            cli_available=True
-        )
-        mock_execute.return_value = mock_result
-
-        # Выполняем команду
-        result = cli.execute_with_fallback("test prompt")
-
-        # Проверяем что команда выполнена успешно
-        assert result.success
-        assert result.fallback_used == True
-
-        # Проверяем что обращение записано
-        status = cli.fallback_state.get_status()
-        assert status['request_count'] == 1
-
-    @patch('src.cursor_cli_interface.CursorCLIInterface._execute_with_specific_model')
-    def test_cursor_cli_billing_error_activation(self, mock_execute):
-        """Тест активации fallback режима при billing error"""
-        cli = CursorCLIInterface()
-        cli.fallback_state = FallbackStateManager(self.state_file)
-
-        # Мокаем billing error
-        error_result = CursorCLIResult(
-            success=False,
-            stdout="",
-            stderr="You've hit your usage limit You've saved $245 on API model usage this month with Pro.",
-            return_code=1,
-            cli_available=True
-        )
-
-        # Сначала возвращаем ошибку (billing), потом успех
-        mock_execute.side_effect = [error_result, error_result]  # Оба раза ошибка для тестирования
-
-        # Выполняем команду (должна активировать fallback)
-        result = cli.execute_with_fallback("test prompt")
-
-        # Проверяем что fallback активирован
-        assert cli.fallback_state.should_use_fallback()
-
-        # Проверяем статус
-        status = cli.fallback_state.get_status()
-        assert status['fallback_active'] == True
+    assert result.success and not result.fallback_used
+    assert registry.allow("cursor:auto")
+    assert not registry.state_file.exists()  # Смены состояния не было
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
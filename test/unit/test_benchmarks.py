@@ -0,0 +1,54 @@
+"""
+Тесты для раннера бенчмарков и поддельного агента
+"""
+
+import json
+
+from benchmarks.fakes import FakeAgentCLI
+from benchmarks.harness import Benchmark, BenchResult, compare, run_benchmark, save_results
+
+
+def test_run_benchmark_takes_median_and_default_seconds():
+    values = iter([3.0, 1.0, 2.0])
+    bench = Benchmark(name="x.y", func=lambda: {"value": next(values)}, repeat=3)
+
+    result = run_benchmark(bench)
+
+    assert result.metrics["value"] == 2.0
+    assert "seconds" in result.metrics
+    assert len(result.runs) == 3
+
+
+def test_compare_respects_direction(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    save_results(
+        [
+            BenchResult(
+                name="bench",
+                metrics={"seconds": 1.0, "rate": 100.0},
+                higher_is_better=["rate"],
+            )
+        ],
+        baseline_path,
+    )
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    current = BenchResult(
+        name="bench", metrics={"seconds": 1.1, "rate": 50.0}, higher_is_better=["rate"]
+    )
+
+    rows = {row["metric"]: row for row in compare([current], baseline, threshold=0.25)}
+
+    assert rows["seconds"]["regression"] is False
+    assert rows["rate"]["regression"] is True
+
+
+def test_fake_agent_writes_reports_with_control_phrases(tmp_path):
+    agent = FakeAgentCLI(tmp_path)
+    instruction = 'Создай отчет в docs/results/current_plan.md и в конце напиши "План готов!"'
+
+    result = agent.execute_instruction(instruction, task_id="task_1")
+
+    assert result["success"] is True
+    report = (tmp_path / "docs" / "results" / "current_plan.md").read_text(encoding="utf-8")
+    assert "План готов!" in report
+    assert (tmp_path / "src" / "task_1.py").exists()
@@ -0,0 +1,129 @@
+"""
+Тесты для отслеживания изменений рабочего дерева по инструкциям
+"""
+
+import subprocess
+
+import pytest
+
+from src.change_tracker import ChangeSummary, ChangeTracker, parse_diff_tree
+from src.checkpoint_manager import CheckpointManager
+from src.git_utils import GitRepo
+
+
+def _git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Репозиторий с одним коммитом и незакоммиченным изменением"""
+    work = tmp_path / "work"
+    work.mkdir()
+    _git("init", "-b", "main", cwd=work)
+    _git("config", "user.name", "Test User", cwd=work)
+    _git("config", "user.email", "test@example.com", cwd=work)
+    (work / ".gitignore").write_text("build/\n")
+    (work / "app.py").write_text("a = 1\nb = 2\n")
+    _git("add", "-A", cwd=work)
+    _git("commit", "-m", "Initial commit", cwd=work)
+    (work / "dirty.py").write_text("old = True\n")
+    yield work
+    GitRepo.close_all()
+
+
+def test_diff_counts_only_changes_after_snapshot(repo):
+    """Учитываются только изменения после снимка, включая неотслеживаемые файлы"""
+    tracker = ChangeTracker(repo)
+    before = tracker.snapshot()
+
+    (repo / "app.py").write_text("a = 1\nb = 3\nc = 4\n")
+    (repo / "new module.py").write_text("x = 1\n")
+    (repo / "build").mkdir()
+    (repo / "build" / "out.bin").write_bytes(b"\0\1")
+    changes = tracker.diff(before, tracker.snapshot())
+
+    assert {change.path: change.status for change in changes.files} == {
+        "app.py": "M",
+        "new module.py": "A",
+    }
+    assert (changes.lines_added, changes.lines_removed) == (3, 1)
+    assert "dirty.py" not in changes.format()
+
+
+def test_snapshot_does_not_touch_repository_index(repo):
+    """Снимок не меняет индекс репозитория"""
+    tracker = ChangeTracker(repo)
+    status_before = _git("status", "--porcelain", cwd=repo)
+
+    tracker.snapshot()
+    (repo / "other.py").write_text("y = 2\n")
+    tracker.snapshot()
+
+    assert _git("status", "--porcelain", cwd=repo) == status_before + "?? other.py\n"
+
+
+def test_ignored_prefixes_and_deletions(repo):
+    """Отчеты агента не считаются работой, удаления и бинарные файлы учитываются"""
+    tracker = ChangeTracker(repo, ignore=["docs/results/"])
+    before = tracker.snapshot()
+
+    (repo / "docs" / "results").mkdir(parents=True)
+    (repo / "docs" / "results" / "last_result.md").write_text("Отчет завершен!\n")
+    (repo / "app.py").unlink()
+    (repo / "logo.png").write_bytes(b"\0\1\2")
+    changes = tracker.diff(before, tracker.snapshot())
+
+    assert [(change.path, change.status) for change in changes.files] == [
+        ("app.py", "D"),
+        ("logo.png", "A"),
+    ]
+    assert changes.files[1].added is None
+    assert "бинарный" in changes.format()
+
+
+def test_no_changes_and_non_git_directory(repo, tmp_path):
+    """Без изменений diff пуст, вне git снимок недоступен"""
+    tracker = ChangeTracker(repo)
+    snapshot = tracker.snapshot()
+
+    assert not tracker.diff(snapshot, tracker.snapshot()).changed
+    assert ChangeTracker(tmp_path / "missing").snapshot() is None
+    assert tracker.diff(snapshot, None) is None
+
+
+def test_parse_diff_tree():
+    """Разбор вывода diff-tree с -z"""
+    fields = [
+        ":100644 100644 aaa bbb M",
+        "src/a.py",
+        ":000000 100644 000 ccc A",
+        "img.png",
+        "5\t2\tsrc/a.py",
+        "-\t-\timg.png",
+        "",
+    ]
+    output = "\0".join(fields)
+
+    changes = parse_diff_tree(output)
+
+    assert [(c.path, c.status, c.added, c.removed) for c in changes] == [
+        ("src/a.py", "M", 5, 2),
+        ("img.png", "A", None, None),
+    ]
+
+
+def test_checkpoint_stores_instruction_changes(tmp_path):
+    """Изменения инструкций сохраняются в checkpoint и переживают перезагрузку"""
+    manager = CheckpointManager(tmp_path)
+    manager.add_task("task_1", "Задача")
+    files = parse_diff_tree(":100644 100644 aaa bbb M\0app.py\0" "4\t1\tapp.py\0")
+    summary = ChangeSummary(before="a", after="b", files=files)
+
+    manager.record_instruction_changes("task_1", 2, summary.to_dict())
+
+    stored = CheckpointManager(tmp_path).get_instruction_changes("task_1")
+    assert stored["2"]["lines_added"] == 4
+    assert ChangeSummary.from_dict(stored["2"]).files[0].path == "app.py"
@@ -0,0 +1,157 @@
+"""
+Тесты для выключателей бэкендов
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from src import circuit_breaker
+from src.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerSettings,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+from src.llm.llm_manager import LLMManager, ModelConfig
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **settings):
+    settings.setdefault("jitter", 0.0)
+    return CircuitBreaker(
+        "cursor:auto", BreakerSettings(**settings), rng=random.Random(1), clock=clock
+    )
+
+
+def test_failure_rate_opens_and_probe_closes():
+    clock = Clock()
+    breaker = _breaker(clock, min_calls=4, failure_rate=0.5, open_seconds=30)
+
+    for ok in (True, True, False):
+        breaker.record_success() if ok else breaker.record_failure("timeout")
+    assert breaker.state == CLOSED  # 1 ошибка из 3 вызовов
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30
+
+    clock.now += 30
+    assert breaker.allow()  # Пробный вызов
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # Второй пробный вызов не разрешен
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probe_doubles_pause_and_window_expires():
+    clock = Clock()
+    breaker = _breaker(clock, min_calls=2, open_seconds=10, max_open_seconds=25)
+
+    breaker.record_failure()
+    clock.now += 400  # Ошибка вышла из окна (300 с)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.retry_after() == 10
+    for pause in (20, 25):  # Пауза удваивается, но не больше max_open_seconds
+        clock.now += 100
+        assert breaker.allow()
+        breaker.record_failure("probe")
+        assert breaker.retry_after() == pause
+
+
+def test_probe_jitter_is_bounded():
+    pauses = []
+    for seed in range(50):
+        clock = Clock()
+        breaker = CircuitBreaker(
+            "x", BreakerSettings(open_seconds=100, jitter=0.2), rng=random.Random(seed), clock=clock
+        )
+        breaker.trip("billing")
+        pauses.append(breaker.retry_after())
+
+    assert all(80 <= pause <= 120 for pause in pauses)
+    assert len(set(pauses)) > 1
+
+
+def test_registry_persists_only_transitions(tmp_path):
+    state = tmp_path / "breakers.json"
+    registry = CircuitBreakerRegistry(
+        state, defaults={"min_calls": 1}, kinds={"docker": {"open_seconds": 600, "jitter": 0}}
+    )
+
+    registry.record("cursor:auto", success=True)
+    assert not state.exists()  # Успешные вызовы файл не пишут
+    registry.record("docker:agent", success=False, reason="daemon down")
+    assert state.exists()
+    assert not registry.allow("docker:agent")
+    assert registry.allow("cursor:auto")
+
+    restored = CircuitBreakerRegistry(state)
+    assert not restored.allow("docker:agent")  # Разомкнут и после перезапуска
+    assert 590 < restored.get("docker:agent").retry_after() <= 600
+    assert restored.status()["docker:agent"]["reason"] == "daemon down"
+
+    # Смена состояния другого выключателя не стирает еще не запрошенный восстановленный
+    untouched = CircuitBreakerRegistry(state)
+    untouched.trip("cursor:auto", "billing", 3600)
+    reloaded = CircuitBreakerRegistry(state)
+    assert not reloaded.allow("docker:agent") and not reloaded.allow("cursor:auto")
+
+    disabled = CircuitBreakerRegistry(enabled=False)
+    disabled.trip("cursor:auto", "billing", 3600)
+    assert disabled.allow("cursor:auto")
+
+
+def test_lost_probe_expires_and_cancelled_probe_is_released():
+    clock = Clock()
+    breaker = _breaker(clock, open_seconds=10, probe_timeout=60)
+    breaker.trip("timeout")
+    clock.now += 10
+
+    assert breaker.allow()  # Пробный вызов, результат которого так и не записан
+    assert not breaker.allow() and not breaker.available()
+    clock.now += 60
+    assert breaker.available() and breaker.allow()  # Потерянная проба истекла
+
+    breaker.release()  # Проба отменена
+    assert breaker.state == HALF_OPEN and breaker.allow()
+
+
+def test_cancelled_llm_call_releases_probe(monkeypatch):
+    registry = CircuitBreakerRegistry(defaults={"jitter": 0, "open_seconds": 0})
+    monkeypatch.setattr(circuit_breaker, "_registry", registry)
+    registry.trip("openrouter:m", "timeout", 0)
+
+    class SlowCompletions:
+        async def create(self, **kwargs):
+            await asyncio.sleep(10)
+
+    class Client:
+        chat = type("Chat", (), {"completions": SlowCompletions()})()
+
+    manager = LLMManager.__new__(LLMManager)
+    manager.clients = {"openrouter": Client()}
+    manager._router = None
+    model = ModelConfig("m", 1024, 4096)
+
+    async def run():
+        await asyncio.wait_for(manager._call_model("prompt", model), 0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+
+    assert registry.get("openrouter:m").state == HALF_OPEN
+    assert registry.available("openrouter:m") and registry.allow("openrouter:m")
@@ -0,0 +1,83 @@
+"""
+Тесты для встроенной стадии коммита
+"""
+
+import subprocess
+
+import pytest
+
+from src.commit_stage import CommitStage, fallback_commit_message, normalize_commit_message
+from src.git_utils import GitError, GitRepo
+
+
+def _git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Репозиторий с одним коммитом"""
+    work = tmp_path / "work"
+    work.mkdir()
+    _git("init", "-b", "main", cwd=work)
+    _git("config", "user.name", "Test User", cwd=work)
+    _git("config", "user.email", "test@example.com", cwd=work)
+    (work / ".gitignore").write_text("build/\n")
+    (work / "app.py").write_text("a = 1\n")
+    _git("add", "-A", cwd=work)
+    _git("commit", "-m", "Initial commit", cwd=work)
+    yield work
+    GitRepo.close_all()
+
+
+def test_commit_cleans_reports_and_ignored_files(repo):
+    (repo / "app.py").write_text("a = 2\n")
+    (repo / "docs" / "results").mkdir(parents=True)
+    (repo / "docs" / "results" / "plan.md").write_text("# План\n")
+    (repo / "build").mkdir()
+    (repo / "build" / "out.bin").write_bytes(b"\0")
+    stage = CommitStage(repo)
+
+    changes = stage.prepare()
+    info = stage.commit("fix: обновить a")
+
+    assert "app.py" in changes.stat and "plan.md" not in changes.stat
+    assert not (repo / "build").exists()
+    assert info["message"] == "fix: обновить a"
+    assert _git("log", "-1", "--format=%H", cwd=repo).strip() == info["hash_full"]
+    assert _git("status", "--porcelain", cwd=repo) == ""
+
+
+def test_report_contains_commit_and_control_phrase(repo):
+    (repo / "app.py").write_text("a = 3\n")
+    stage = CommitStage(repo)
+    stage.prepare()
+    info = stage.commit("feat: a = 3")
+
+    report = stage.write_report("docs/results/last_result.md", info, "Коммит выполнен!")
+
+    text = report.read_text(encoding="utf-8")
+    assert info["hash_full"] in text and "feat: a = 3" in text
+    assert text.rstrip().endswith("Коммит выполнен!")
+
+
+def test_nothing_to_commit(repo):
+    stage = CommitStage(repo)
+
+    assert stage.prepare().empty
+    with pytest.raises(GitError):
+        stage.commit("feat: пусто")
+    report = stage.write_report("docs/results/last_result.md", None, "Коммит выполнен!")
+    assert "нет изменений" in report.read_text(encoding="utf-8")
+
+
+def test_commit_messages():
+    assert normalize_commit_message('```\n"feat: add cache"\n```') == "feat: add cache"
+    assert len(normalize_commit_message("feat: " + "x" * 200)) == 72
+    assert normalize_commit_message("  \n") is None
+    message = fallback_commit_message(
+        "feat: {task_name} (задача {task_id})\n\n{task_description}", "Добавить кеш", "t1"
+    )
+    assert message == "feat: Добавить кеш (задача t1)\n\nДобавить кеш"
@@ -0,0 +1,117 @@
+"""
+Тесты для шины событий live-мониторинга
+"""
+
+import json
+
+from src.event_bus import EventBus, EventType, format_sse, get_event_bus, stream_sse
+from src.task_logger import TaskLogger, TaskPhase
+
+
+def test_publish_delivers_to_subscribers():
+    """Событие доставляется всем подписчикам"""
+    bus = EventBus()
+    first = bus.subscribe()
+    second = bus.subscribe()
+
+    bus.publish(EventType.INSTRUCTION_STARTED, task_id="t1", instruction_num=1)
+
+    for subscription in (first, second):
+        event = subscription.get(timeout=1)
+        assert event["type"] == EventType.INSTRUCTION_STARTED
+        assert event["data"]["task_id"] == "t1"
+
+    first.close()
+    assert bus.subscriber_count == 1
+
+
+def test_disabled_bus_publishes_nothing():
+    """Выключенная шина не заполняет историю и очереди подписчиков"""
+    bus = EventBus()
+    subscription = bus.subscribe()
+    bus.enabled = False
+
+    assert bus.publish(EventType.WAIT_PROGRESS, elapsed=1) is None
+    assert bus.get_recent() == []
+    assert subscription.get(timeout=0.01) is None
+
+    bus.enabled = True
+    assert bus.publish(EventType.WAIT_PROGRESS, elapsed=2)["id"] == 1
+
+
+def test_replay_from_last_event_id():
+    """При переподключении доставляются только новые события из истории"""
+    bus = EventBus(history_size=10)
+    for i in range(5):
+        bus.publish(EventType.WAIT_PROGRESS, elapsed=i)
+
+    subscription = bus.subscribe(last_event_id=3)
+    ids = [subscription.get(timeout=1)["id"] for _ in range(2)]
+    assert ids == [4, 5]
+    assert subscription.get(timeout=0.01) is None
+
+
+def test_slow_subscriber_drops_oldest():
+    """Переполненная очередь подписчика не блокирует публикацию"""
+    bus = EventBus(subscriber_queue_size=2)
+    subscription = bus.subscribe()
+    for i in range(5):
+        bus.publish(EventType.WAIT_PROGRESS, elapsed=i)
+
+    assert subscription.dropped == 3
+    assert subscription.get(timeout=1)["data"]["elapsed"] == 3
+
+
+def test_format_sse():
+    """Формат сообщения text/event-stream"""
+    event = {
+        "id": 7,
+        "type": EventType.LLM_DECISION,
+        "timestamp": 0,
+        "data": {"action": "continue"},
+    }
+    message = format_sse(event)
+
+    assert message.startswith("id: 7\nevent: llm_decision\ndata: ")
+    assert message.endswith("\n\n")
+    payload = json.loads(message.split("data: ", 1)[1])
+    assert payload["data"]["action"] == "continue"
+
+
+def test_stream_sse_heartbeat_and_stop():
+    """Поток отдает heartbeat без событий и завершается по should_stop"""
+    bus = EventBus()
+    stop = {"value": False}
+    stream = stream_sse(bus, heartbeat_interval=0.01, should_stop=lambda: stop["value"])
+
+    assert next(stream).startswith("retry:")
+    assert next(stream) == ": heartbeat\n\n"
+    bus.publish(EventType.SERVER_STATE, running=True)
+    assert "event: server_state" in next(stream)
+
+    stop["value"] = True
+    assert list(stream) == []
+    assert bus.subscriber_count == 0
+
+
+def test_task_logger_publishes_phase(tmp_path):
+    """TaskLogger публикует смену фаз в глобальную шину"""
+    subscription = get_event_bus().subscribe()
+    try:
+        task_logger = TaskLogger("task_events", "Задача", tmp_path)
+        task_logger.set_phase(TaskPhase.CURSOR_EXECUTION, instruction_num=2)
+        task_logger.close()
+
+        events = []
+        while True:
+            event = subscription.get(timeout=0.1)
+            if event is None:
+                break
+            events.append(event)
+    finally:
+        subscription.close()
+
+    phases = [e for e in events if e["type"] == EventType.TASK_PHASE]
+    assert phases[-1]["data"]["phase"] == "CURSOR_EXECUTION"
+    assert phases[-1]["data"]["instruction_num"] == 2
+    assert events[0]["type"] == EventType.TASK_STARTED
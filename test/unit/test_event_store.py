@@ -0,0 +1,156 @@
+"""
+Тесты для хранилища событий и офлайн аналитики
+"""
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from src.event_analytics import EventAnalytics, LatencyHistogram
+from src.event_bus import EventBus, EventType
+from src.event_store import EventStore, iter_events, list_segments
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _bus_event(event_type, timestamp, **data):
+    return {"id": 0, "type": event_type, "timestamp": timestamp, "data": data}
+
+
+def _stored(event, run="r1"):
+    """Событие шины в формате хранилища"""
+    return {"ts": event["timestamp"], "run": run, "type": event["type"], "data": event["data"]}
+
+
+def _instruction(timestamp, duration, success=True, instruction_id=1, model="auto", container="c1"):
+    return _bus_event(
+        EventType.INSTRUCTION_FINISHED,
+        timestamp,
+        instruction_id=instruction_id,
+        instruction_name="Анализ",
+        success=success,
+        duration=duration,
+        model=model,
+        container=container,
+    )
+
+
+def test_store_rotates_compresses_and_prunes(tmp_path):
+    """Сегменты сжимаются при достижении лимита, лишние удаляются"""
+    store = EventStore(tmp_path, max_segment_bytes=300, max_segments=2, run_id="run1")
+
+    for index in range(20):
+        store.write([_bus_event(EventType.TASK_FINISHED, 1000.0 + index, success=True)])
+    store.close()
+
+    segments = list_segments(tmp_path)
+    compressed = [path for path in segments if path.suffix == ".gz"]
+    assert len(compressed) == 2
+    events = list(iter_events(tmp_path))
+    assert events and all(event["run"] == "run1" for event in events)
+    assert [event["ts"] for event in events] == sorted(event["ts"] for event in events)
+    assert events[-1]["ts"] == 1019.0
+
+
+def test_iter_events_filters_and_skips_broken_lines(tmp_path):
+    """Чтение фильтрует по типу и времени и пропускает поврежденные строки"""
+    store = EventStore(tmp_path, run_id="run1")
+    store.write(
+        [
+            _bus_event(EventType.TASK_STARTED, 100.0),
+            _bus_event(EventType.TASK_FINISHED, 200.0, success=True),
+            _bus_event(EventType.WAIT_PROGRESS, 250.0),
+            _bus_event(EventType.TASK_FINISHED, 300.0, success=False),
+        ]
+    )
+    store.close()
+    with open(tmp_path / "events.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"ts": 400, "type": "task_fini')
+
+    events = list(iter_events(tmp_path, since=150.0, types=[EventType.TASK_FINISHED]))
+
+    assert [event["ts"] for event in events] == [200.0, 300.0]
+    assert all(event["type"] != EventType.WAIT_PROGRESS for event in iter_events(tmp_path))
+
+
+def test_store_records_bus_events(tmp_path):
+    """Хранилище записывает события, опубликованные в шину"""
+    bus = EventBus()
+    store = EventStore(tmp_path, run_id="run1").attach(bus)
+
+    bus.publish(EventType.LLM_CALL, model="m1", success=True, duration=0.5)
+    deadline = time.time() + 5
+    while not list(iter_events(tmp_path)) and time.time() < deadline:
+        time.sleep(0.05)
+    store.close()
+
+    events = list(iter_events(tmp_path))
+    assert events[0]["type"] == EventType.LLM_CALL
+    assert events[0]["data"]["model"] == "m1"
+    assert bus.subscriber_count == 0
+
+
+def test_histogram_quantiles_are_close():
+    """Квантили гистограммы близки к точным"""
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.add(value / 10)
+
+    assert abs(histogram.quantile(0.5) - 50.0) / 50.0 < 0.03
+    assert abs(histogram.quantile(0.95) - 95.0) / 95.0 < 0.03
+
+
+def test_analytics_report():
+    """Пропускная способность, задержки и доли неудач по моделям и контейнерам"""
+    events = [
+        {"ts": 0.0, "run": "r1", "type": EventType.TASK_FINISHED, "data": {"success": True}},
+        {"ts": 7200.0, "run": "r1", "type": EventType.TASK_FINISHED, "data": {"success": False}},
+    ]
+    for index, (model, success) in enumerate([("m1", True), ("m1", False), ("m2", True)]):
+        events.append(_stored(_instruction(100.0 + index, 10.0, success=success, model=model)))
+
+    report = EventAnalytics().consume(events).report()
+
+    assert report["throughput"]["tasks_per_hour"] == 1.0
+    assert report["latency"]["instructions"]["1 Анализ"]["count"] == 3
+    assert report["failures"]["instructions_by_model"]["m1"]["failure_rate"] == 0.5
+    assert report["failures"]["instructions_by_container"]["c1"]["failed"] == 1
+
+
+def test_regressions_between_last_runs():
+    """Рост p95 задержки инструкции между двумя последними запусками"""
+    events = []
+    for run, duration in (("r0", 1.0), ("r1", 10.0), ("r2", 20.0)):
+        for index in range(5):
+            events.append(_stored(_instruction(float(index), duration), run))
+
+    analytics = EventAnalytics().consume(events)
+    result = analytics.regressions(threshold=0.2)
+
+    assert analytics.run_count == 3
+    assert (result["baseline"], result["candidate"]) == ("r1", "r2")
+    assert result["regressions"][0]["metric"] == "p95"
+    assert result["regressions"][0]["change"] > 0.8
+
+
+def test_cli_outputs_json(tmp_path):
+    """CLI аналитики читает хранилище и выводит JSON отчет"""
+    store = EventStore(tmp_path, run_id="run1")
+    store.write([_instruction(100.0, 2.0), _instruction(200.0, 4.0, success=False)])
+    store.close()
+
+    result = subprocess.run(
+        [sys.executable, "scripts/event_analytics.py", "failures", "--dir", str(tmp_path)]
+        + ["--json"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert report["failures"]["instructions_by_model"]["auto"]["failed"] == 1
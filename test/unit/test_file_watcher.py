@@ -0,0 +1,119 @@
+"""
+Тесты для отслеживания изменений файлов (автоперезапуск)
+"""
+
+import os
+import threading
+
+from src.file_watcher import ChangeDetector, Debouncer, PathMatcher
+
+
+def test_path_matcher_gitignore_style():
+    """Паттерны директорий совпадают с компонентами пути, а не с подстроками"""
+    matcher = PathMatcher()
+
+    assert matcher.matches("__pycache__/server.py")
+    assert matcher.matches("agents/test_agent.py")
+    assert matcher.matches("env/lib/module.py")
+    assert matcher.matches("module.py.swp")
+    # Подстрока "env" в имени файла не приводит к игнорированию
+    assert not matcher.matches("environment.py")
+    assert not matcher.matches("agents/gemini_agent/gemini_agent_cli.py")
+
+
+def test_path_matcher_anchored_pattern():
+    """Паттерн со слешем применяется к пути относительно корня"""
+    matcher = PathMatcher(["agents/*.py"])
+
+    assert matcher.matches("agents/executor_agent.py")
+    assert not matcher.matches("llm/agents/executor_agent.py")
+
+
+def test_scan_builds_signatures_without_hashing(tmp_path):
+    """Сканирование не читает файлы и отсекает игнорируемые директории"""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "module.py").write_text("x = 1\n")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "cached.py").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+
+    detector = ChangeDetector([tmp_path])
+
+    assert detector.scan() == 1
+    assert detector._hashes == {}
+    assert detector.hash_baseline() == 1
+    assert list(detector._hashes) == [str(tmp_path / "pkg" / "module.py")]
+
+
+def test_check_detects_only_real_changes(tmp_path):
+    """Изменение определяется по сигнатуре, перезапись тем же содержимым отбрасывается"""
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\n")
+    detector = ChangeDetector([tmp_path])
+    detector.scan()
+    detector.hash_baseline()
+
+    # Сигнатура не менялась - файл не читается
+    assert not detector.check(str(module))
+
+    # Первая перезапись тем же содержимым после подсчета базовых хешей
+    module.write_text("x = 1\n")
+    os.utime(module, ns=(3, 3))
+    assert not detector.check(str(module))
+
+    module.write_text("x = 2\n")
+    os.utime(module, ns=(1, 1))
+    assert detector.check(str(module))
+
+    # Новая сигнатура при том же содержимом
+    os.utime(module, ns=(2, 2))
+    assert not detector.check(str(module))
+
+    module.unlink()
+    assert not detector.check(str(module))
+
+
+def test_change_before_baseline_hash_is_real(tmp_path):
+    """Без базового хеша изменение сигнатуры считается реальным, фоновый хеш его не скрывает"""
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\n")
+    detector = ChangeDetector([tmp_path])
+    detector.scan()
+
+    module.write_text("x = 2\n")
+    os.utime(module, ns=(1, 1))
+    # Фоновый подсчет после изменения не записывает хеш нового содержимого как базовый
+    assert detector.hash_baseline() == 0
+    assert detector.check(str(module))
+
+    detector.start_hashing()
+    detector._hashing.join(5)
+    os.utime(module, ns=(2, 2))
+    assert not detector.check(str(module))
+
+
+def test_is_tracked(tmp_path):
+    """Отслеживаются только файлы с нужным расширением внутри корней"""
+    detector = ChangeDetector([tmp_path / "src"])
+
+    assert detector.is_tracked(str(tmp_path / "src" / "server.py"))
+    assert not detector.is_tracked(str(tmp_path / "src" / "server.txt"))
+    assert not detector.is_tracked(str(tmp_path / "src" / "test_server.py"))
+    assert not detector.is_tracked(str(tmp_path / "other" / "server.py"))
+
+
+def test_debouncer_coalesces_events():
+    """Серия событий обрабатывается одним вызовом"""
+    calls = []
+    done = threading.Event()
+
+    def callback(items):
+        calls.append(items)
+        done.set()
+
+    debouncer = Debouncer(0.05, callback)
+    for name in ("a.py", "b.py", "a.py"):
+        debouncer.add(name)
+
+    assert done.wait(2)
+    assert calls == [{"a.py", "b.py"}]
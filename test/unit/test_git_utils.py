@@ -2,16 +2,11 @@
 Тесты для git_utils
 """
 
-import sys
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 
-# Add src to path for imports
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root / "src"))
-
-from git_utils import (
+from src.git_utils import (
     execute_git_command,
     get_current_branch,
     get_last_commit_info,
@@ -20,7 +15,9 @@ from git_utils import (
     check_unpushed_commits,
     push_to_remote,
     auto_push_after_commit,
-    GitError
+    GitError,
+    GitRepo,
+    parse_porcelain_v2,
 )
 
 
@@ -125,7 +122,7 @@ class TestGitUtils:
         has_unpushed = check_unpushed_commits(temp_git_dir)
         assert has_unpushed is False
 
-    @patch('git_utils.execute_git_command')
+    @patch('src.git_utils.execute_git_command')
     def test_push_to_remote_success(self, mock_execute):
         """Тест успешной отправки в remote"""
         mock_execute.return_value = (True, "pushed successfully", "")
@@ -136,7 +133,7 @@ class TestGitUtils:
         assert stdout == "pushed successfully"
         assert stderr == ""
 
-    @patch('git_utils.execute_git_command')
+    @patch('src.git_utils.execute_git_command')
     def test_push_to_remote_failure(self, mock_execute):
         """Тест неуспешной отправки в remote"""
         mock_execute.return_value = (False, "", "push failed")
@@ -147,8 +144,8 @@ class TestGitUtils:
         assert stdout == ""
         assert stderr == "push failed"
 
-    @patch('git_utils.check_unpushed_commits')
-    @patch('git_utils.push_to_remote')
+    @patch('src.git_utils.check_unpushed_commits')
+    @patch('src.git_utils.push_to_remote')
     def test_auto_push_after_commit_with_unpushed(self, mock_push, mock_check):
         """Тест авто-push при наличии неотправленных коммитов"""
         mock_check.return_value = True
@@ -160,7 +157,7 @@ class TestGitUtils:
         assert result["push_success"] is True
         mock_push.assert_called_once()
 
-    @patch('git_utils.check_unpushed_commits')
+    @patch('src.git_utils.check_unpushed_commits')
     def test_auto_push_after_commit_no_unpushed(self, mock_check):
         """Тест авто-push при отсутствии неотправленных коммитов"""
         mock_check.return_value = False
@@ -171,6 +168,87 @@ class TestGitUtils:
         assert result["push_success"] is False
 
 
+class TestGitRepo:
+    """Тесты для GitRepo (porcelain v2, кеш, cat-file)"""
+
+    @pytest.fixture
+    def repo_with_remote(self, tmp_path):
+        """Репозиторий с bare remote и отслеживаемой веткой"""
+        import subprocess
+
+        def git(*args, cwd):
+            subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+        remote = tmp_path / "remote.git"
+        git("init", "--bare", str(remote), cwd=tmp_path)
+        work = tmp_path / "work"
+        work.mkdir()
+        git("init", "-b", "main", cwd=work)
+        git("config", "user.name", "Test User", cwd=work)
+        git("config", "user.email", "test@example.com", cwd=work)
+        (work / "a.txt").write_text("a")
+        git("add", "a.txt", cwd=work)
+        git("commit", "-m", "Initial commit", cwd=work)
+        git("remote", "add", "origin", str(remote), cwd=work)
+        git("push", "-u", "origin", "main", cwd=work)
+        yield work, git
+        GitRepo.close_all()
+
+    def test_parse_porcelain_v2(self):
+        """Разбор ветки, upstream, ahead/behind и изменений"""
+        output = "\n".join([
+            "# branch.oid 1234567890abcdef1234567890abcdef12345678",
+            "# branch.head feature",
+            "# branch.upstream origin/feature",
+            "# branch.ab +2 -1",
+            "1 .M N... 100644 100644 100644 aaa bbb src/app.py",
+            "? new.txt",
+        ])
+
+        status = parse_porcelain_v2(output)
+
+        assert status.branch == "feature"
+        assert status.head.startswith("1234567")
+        assert (status.upstream, status.ahead, status.behind) == ("origin/feature", 2, 1)
+        assert status.dirty is True
+        assert parse_porcelain_v2("# branch.oid (initial)\n# branch.head (detached)").branch is None
+
+    def test_status_is_cached_until_refs_change(self, repo_with_remote):
+        """Повторный запрос без изменений HEAD/индекса не запускает git"""
+        work, git = repo_with_remote
+        repo = GitRepo(work)
+
+        first = repo.status()
+        with patch('src.git_utils.execute_git_command') as mock_execute:
+            assert repo.status() is first
+            mock_execute.assert_not_called()
+
+        (work / "b.txt").write_text("b")
+        git("add", "b.txt", cwd=work)
+        git("commit", "-m", "Second", cwd=work)
+        second = repo.status()
+
+        assert second is not first
+        assert second.ahead == 1 and second.dirty is False
+        repo.close()
+
+    def test_unpushed_and_commit_info(self, repo_with_remote):
+        """Неотправленные коммиты и информация о коммите без отдельных git log"""
+        work, git = repo_with_remote
+        assert check_unpushed_commits(work) is False
+
+        (work / "b.txt").write_text("b")
+        git("add", "b.txt", cwd=work)
+        git("commit", "-m", "Second commit", cwd=work)
+
+        assert check_unpushed_commits(work) is True
+        info = get_last_commit_info(work)
+        assert info["message"] == "Second commit"
+        assert info["hash_short"] == info["hash_full"][:7]
+        assert check_commit_exists(info["hash_full"], work) is True
+        assert check_commit_exists("0" * 40, work) is False
+
+
 class TestGitError:
     """Тесты для GitError исключения"""
 
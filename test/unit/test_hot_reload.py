@@ -0,0 +1,116 @@
+"""
+Тесты для горячей перезагрузки модулей сервера
+"""
+
+import importlib
+import sys
+import uuid
+
+import pytest
+
+from src.hot_reload import ServerHandoff, module_name_for_path, plan_reload, reload_changed_files
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """Временный пакет: base <- service <- app, independent"""
+    name = f"hotpkg_{uuid.uuid4().hex[:8]}"
+    package_dir = tmp_path / name
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("")
+    (package_dir / "base.py").write_text("VALUE = 1\n\n\nclass Client:\n    pass\n")
+    (package_dir / "service.py").write_text("from .base import VALUE\n\nDOUBLE = VALUE * 2\n")
+    (package_dir / "app.py").write_text("from .service import DOUBLE\n\nRESULT = DOUBLE + 1\n")
+    (package_dir / "independent.py").write_text("X = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for module in ("app", "independent"):
+        importlib.import_module(f"{name}.{module}")
+    yield name, package_dir
+    for module in list(sys.modules):
+        if module == name or module.startswith(name + "."):
+            del sys.modules[module]
+
+
+def test_module_name_for_path(tmp_path):
+    """Путь файла пакета преобразуется в имя модуля"""
+    package_dir = tmp_path / "src"
+
+    assert module_name_for_path(str(package_dir / "llm" / "llm_manager.py"), package_dir) == (
+        "src.llm.llm_manager"
+    )
+    assert module_name_for_path(str(package_dir / "llm" / "__init__.py"), package_dir) == "src.llm"
+    assert module_name_for_path(str(tmp_path / "other.txt"), package_dir) is None
+
+
+def test_plan_reload_includes_dependents_in_order(package):
+    """Зависимые модули перезагружаются после своих зависимостей"""
+    name, _ = package
+
+    order = plan_reload({f"{name}.base"}, name)
+
+    assert order.index(f"{name}.base") < order.index(f"{name}.service") < order.index(f"{name}.app")
+    assert f"{name}.independent" not in order
+
+
+def test_reload_changed_files_applies_new_code(package):
+    """После перезагрузки зависимые модули видят новые значения"""
+    name, package_dir = package
+    (package_dir / "base.py").write_text("VALUE = 10\n\n\nclass Client:\n    pass\n")
+
+    reloaded = reload_changed_files([str(package_dir / "base.py")], package_dir)
+
+    assert f"{name}.independent" not in reloaded
+    assert sys.modules[f"{name}.app"].RESULT == 21
+
+
+def test_syntax_error_leaves_modules_untouched(package):
+    """Синтаксическая ошибка обнаруживается до перезагрузки любого модуля"""
+    name, package_dir = package
+    (package_dir / "service.py").write_text("DOUBLE = (\n")
+    (package_dir / "base.py").write_text("VALUE = 10\n\n\nclass Client:\n    pass\n")
+
+    with pytest.raises(SyntaxError):
+        reload_changed_files(
+            [str(package_dir / "base.py"), str(package_dir / "service.py")], package_dir
+        )
+
+    assert sys.modules[f"{name}.base"].VALUE == 1
+    assert sys.modules[f"{name}.app"].RESULT == 3
+
+
+def test_import_error_restores_reloaded_modules(package):
+    """Ошибка при импорте нового кода возвращает уже перезагруженные модули"""
+    name, package_dir = package
+    base = sys.modules[f"{name}.base"]
+    client_class = base.Client
+    (package_dir / "base.py").write_text("VALUE = 10\n\n\nclass Client:\n    pass\n")
+    (package_dir / "service.py").write_text(
+        "from . import extra\nfrom .base import VALUE\n\n"
+        "DOUBLE = VALUE * 2\nraise KeyError('boom')\n"
+    )
+    (package_dir / "extra.py").write_text("")
+
+    with pytest.raises(KeyError):
+        reload_changed_files(
+            [str(package_dir / "base.py"), str(package_dir / "service.py")], package_dir
+        )
+
+    assert sys.modules[f"{name}.base"] is base
+    assert base.VALUE == 1 and base.Client is client_class
+    assert sys.modules[f"{name}.service"].DOUBLE == 2
+    assert sys.modules[f"{name}.app"].RESULT == 3
+    assert f"{name}.extra" not in sys.modules
+
+
+def test_handoff_skips_interfaces_from_reloaded_modules(package):
+    """Интерфейс из перезагруженного модуля не переносится"""
+    name, _ = package
+    client = sys.modules[f"{name}.base"].Client()
+    handoff = ServerHandoff(interfaces={"cursor_cli": client, "gemini_cli": client})
+
+    handoff.reloaded_modules = {f"{name}.base"}
+    assert handoff.take_interface("cursor_cli") is None
+
+    handoff.reloaded_modules = set()
+    assert handoff.take_interface("gemini_cli") is client
+    assert handoff.take_interface("gemini_cli") is None
@@ -0,0 +1,66 @@
+"""
+Проверка времени импорта сервера (python -X importtime)
+
+Сервер перезапускается при каждом изменении кода, поэтому тяжелые SDK
+(CrewAI, OpenAI, Google GenAI, Flask, watchdog) должны загружаться при первом
+использовании, а не при импорте src.server.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Бюджет суммарного времени импорта src.server (мс), можно переопределить на медленных машинах
+IMPORT_BUDGET_MS = int(os.getenv("CODEAGENT_IMPORT_BUDGET_MS", "1500"))
+
+LAZY_MODULES = ("crewai", "crewai_tools", "openai", "google.genai", "flask", "watchdog")
+
+
+def _import_profile(module: str):
+    """Импортировать модуль в отдельном процессе и разобрать вывод -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=False,
+    )
+    if result.returncode != 0:
+        if "ModuleNotFoundError" in result.stderr:
+            pytest.skip(f"Не установлены зависимости для импорта {module}")
+        pytest.fail(result.stderr[-2000:])
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:") :].split("|")]
+        if len(parts) == 3 and parts[1].isdigit():
+            cumulative[parts[2]] = int(parts[1])
+    return cumulative
+
+
+def test_server_import_does_not_load_heavy_sdks():
+    """Импорт src.server не загружает тяжелые SDK"""
+    imported = _import_profile("src.server")
+
+    loaded = sorted(
+        name
+        for name in imported
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+    assert loaded == []
+
+
+def test_server_import_time_budget():
+    """Импорт src.server укладывается в бюджет времени"""
+    imported = _import_profile("src.server")
+
+    total_ms = imported["src.server"] / 1000
+    assert total_ms < IMPORT_BUDGET_MS, f"Импорт src.server занял {total_ms:.0f} мс"
@@ -0,0 +1,174 @@
+"""
+Тесты для графа инструкций и опережающего запуска
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.checkpoint_manager import CheckpointManager
+from src.instruction_graph import (
+    InstructionGraph,
+    ParallelInstructionRunner,
+    matches_any,
+    patterns_overlap,
+)
+
+TEMPLATES = [
+    {"instruction_id": 1, "wait_for_file": "docs/results/last_result.md"},
+    {"instruction_id": 2, "wait_for_file": "docs/results/plan_{task_id}.md"},
+    {"instruction_id": 3, "wait_for_file": "docs/results/test_{task_id}.md"},
+    {
+        "instruction_id": 4,
+        "depends_on": [2],
+        "parallel_safe": True,
+        "wait_for_file": "docs/results/docs_{task_id}.md",
+    },
+    {"instruction_id": 5, "depends_on": [4], "parallel_safe": True, "reads": ["src/**"]},
+    {"instruction_id": 6, "wait_for_file": "docs/results/last_result.md"},
+]
+
+
+def test_graph_dependencies_and_writes():
+    graph = InstructionGraph.from_templates(TEMPLATES)
+
+    assert graph.by_key["3"].depends_on == {"2"}
+    assert graph.by_key["4"].depends_on == {"2"}
+    assert graph.by_key["6"].depends_on == {"5"}
+    assert graph.by_key["2"].writes == ("docs/results/plan_*.md",)
+    assert graph.by_key["1"].conflicts_with(graph.by_key["6"])
+    assert [node.key for node in graph.ready({"1", "2"}, [graph.by_key["3"]])] == ["4"]
+
+
+def test_broad_writes_do_not_claim_other_reports():
+    templates = [dict(template) for template in TEMPLATES]
+    templates[3]["writes"] = ["docs/**"]
+    graph = InstructionGraph.from_templates(templates)
+    testing, docs = graph.by_key["3"], graph.by_key["4"]
+
+    assert not docs.conflicts_with(testing)
+    assert [node.key for node in graph.ready({"1", "2"}, [testing])] == ["4"]
+    assert docs.owns("docs/guide.md", graph.nodes)
+    assert docs.owns("docs/results/docs_t1.md", graph.nodes)
+    assert not docs.owns("docs/results/test_t1.md", graph.nodes)
+    assert testing.owns("docs/results/test_t1.md", graph.nodes)
+
+
+def test_forward_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        InstructionGraph.from_templates([{"instruction_id": 1, "depends_on": [2]}, {}])
+    graph = InstructionGraph.linear([{"instruction_id": 1, "depends_on": [2]}, {}])
+    assert graph.by_key["2"].depends_on == {"1"}
+
+
+def test_patterns_overlap():
+    assert patterns_overlap("src/**", "src/app/main.py")
+    assert patterns_overlap("docs/results/test_*.md", "docs/results/test_t1.md")
+    assert not patterns_overlap("docs/results/test_*.md", "docs/reviews/skeptic.md")
+    assert matches_any("src/test/test_api.py", ["docs/*.md", "src/**"])
+    assert not matches_any("README.md", ["docs/*.md", "src/**"])
+
+
+def test_runner_starts_parallel_safe_nodes_ahead():
+    graph = InstructionGraph.from_templates(TEMPLATES)
+    release = threading.Event()
+    started = []
+
+    def run_node(node):
+        started.append(node.key)
+        release.wait(5)
+        return {"success": True}
+
+    runner = ParallelInstructionRunner(graph, run_node, max_workers=2)
+    try:
+        idle = runner.idle_epoch()
+        runner.main_started(graph.by_key["3"])
+        time.sleep(0.05)
+        assert started == ["4"]
+        assert runner.idle_epoch() is None  # Дерево меняет опережающая инструкция
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while started != ["4", "5"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert started == ["4", "5"]
+        runner.take(graph.by_key["5"]).result()
+        assert runner.idle_epoch() not in (None, idle)
+        assert runner.take(graph.by_key["4"]).result() == {"success": True}
+        assert runner.take(graph.by_key["6"]) is None
+    finally:
+        runner.close()
+
+
+def test_runner_skips_completed_nodes():
+    graph = InstructionGraph.from_templates(TEMPLATES)
+    runner = ParallelInstructionRunner(graph, lambda node: {"success": True}, 1, skip={"4"})
+    try:
+        runner.main_started(graph.by_key["3"])
+        assert runner.take(graph.by_key["4"]) is None
+    finally:
+        runner.close()
+
+
+def test_close_waits_for_running_nodes():
+    graph = InstructionGraph.from_templates(TEMPLATES)
+    finished = []
+
+    def run_node(node):
+        time.sleep(0.1)
+        finished.append(node.key)
+        return {"success": True}
+
+    runner = ParallelInstructionRunner(graph, run_node, max_workers=1)
+    started_at = time.time()
+    runner.main_started(graph.by_key["3"])
+    time.sleep(0.02)
+    assert [node.key for node in runner.ran_since(started_at)] == ["4"]
+
+    runner.close()
+
+    assert finished == ["4"]  # Следующая задача не застанет опережающую инструкцию
+    assert runner.ran_since(time.time()) == []
+
+
+def test_exclusive_waits_for_lanes_and_pauses_scheduling():
+    graph = InstructionGraph.from_templates(TEMPLATES)
+    started = []
+    finished = []
+
+    def run_node(node):
+        started.append(node.key)
+        time.sleep(0.1)
+        finished.append(node.key)
+        return {"success": True}
+
+    runner = ParallelInstructionRunner(graph, run_node, max_workers=1)
+    try:
+        runner.main_started(graph.by_key["3"])
+        time.sleep(0.02)
+        assert runner.active() == 1
+
+        with runner.exclusive():
+            # Перезапуск окружения не застанет сессию опережающей инструкции
+            assert finished == ["4"]
+            time.sleep(0.05)
+            assert started == ["4"] and runner.active() == 0
+
+        deadline = time.monotonic() + 5
+        while started != ["4", "5"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert started == ["4", "5"]
+    finally:
+        runner.close()
+
+
+def test_checkpoint_records_completed_nodes(tmp_path):
+    manager = CheckpointManager(tmp_path, "checkpoint.json")
+    manager.add_task("t1", "Задача")
+
+    manager.update_instruction_progress("t1", 4, 8, instruction_key="4")
+    manager.update_instruction_progress("t1", 2, 8, instruction_key="2")
+
+    progress = CheckpointManager(tmp_path, "checkpoint.json").get_instruction_progress("t1")
+    assert progress["completed_nodes"] == ["4", "2"]
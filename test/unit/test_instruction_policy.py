@@ -0,0 +1,104 @@
+"""
+Тесты для политики пропуска инструкций
+"""
+
+import subprocess
+
+from src.change_tracker import ChangeTracker
+from src.checkpoint_manager import CheckpointManager
+from src.git_utils import GitRepo
+from src.instruction_policy import (
+    DOWNGRADE,
+    RUN,
+    SKIP,
+    InstructionPolicy,
+    PolicyContext,
+    merge_instructions,
+)
+
+TESTING = {
+    "instruction_id": 3,
+    "policy": [
+        {"when": {"no_changes": True}, "action": "skip"},
+        {"when": {"only_extensions": [".md", ".txt"]}, "action": "skip", "reason": "документация"},
+        {"when": {"max_lines": 40}, "action": "downgrade"},
+    ],
+}
+
+
+def test_first_matching_rule_wins():
+    policy = InstructionPolicy(downgrade_model="fast")
+
+    nothing = policy.evaluate(TESTING, PolicyContext("default", changed_files=[]))
+    docs = policy.evaluate(TESTING, PolicyContext("default", ["README.md"], lines_changed=3))
+    small = policy.evaluate(TESTING, PolicyContext("default", ["app.py"], lines_changed=10))
+    large = policy.evaluate(TESTING, PolicyContext("default", ["app.py"], lines_changed=500))
+
+    assert (nothing.action, nothing.rule) == (SKIP, 1)
+    assert (docs.action, docs.reason) == (SKIP, "документация")
+    assert (small.action, small.model) == (DOWNGRADE, "fast")
+    assert large.action == RUN
+
+
+def test_unknown_changes_and_disabled_policy_run_instruction():
+    unknown = PolicyContext("default", changed_files=None)
+
+    assert InstructionPolicy(downgrade_model="fast").evaluate(TESTING, unknown).action == RUN
+    disabled = InstructionPolicy(enabled=False)
+    assert disabled.evaluate(TESTING, PolicyContext("default", [])).action == RUN
+    # downgrade без модели и неизвестный предикат не срабатывают
+    context = PolicyContext("default", ["a.py"], 1)
+    assert InstructionPolicy().evaluate(TESTING, context).action == RUN
+    broken = {"policy": [{"when": {"typo": True}, "action": "skip"}]}
+    assert InstructionPolicy().evaluate(broken, PolicyContext("default", [])).action == RUN
+
+
+def test_previous_instruction_predicates():
+    when = {"previous_changed": False, "previous_failed": False}
+    template = {"policy": [{"when": when, "action": "skip"}]}
+    policy = InstructionPolicy()
+
+    unchanged = PolicyContext("default", ["app.py"], 5, previous_changed=False)
+    assert policy.evaluate(template, unchanged).action == SKIP
+    unknown = PolicyContext("default", ["app.py"], 5, previous_changed=None)
+    assert policy.evaluate(template, unknown).action == RUN
+    failed = PolicyContext("default", ["app.py"], 5, previous_failed=True, previous_changed=False)
+    assert policy.evaluate(template, failed).action == RUN
+
+
+def test_merge_instructions():
+    assert merge_instructions([], "Запусти тесты") == "Запусти тесты"
+    text = merge_instructions(["Исправь замечания\n"], "Запусти тесты")
+    assert text.index("Шаг 1:\nИсправь замечания") < text.index("Шаг 2:\nЗапусти тесты")
+
+
+def test_changes_since_head_and_decision_record(tmp_path):
+    work = tmp_path / "work"
+    work.mkdir()
+    for args in (
+        ["init", "-b", "main"],
+        ["config", "user.name", "Test User"],
+        ["config", "user.email", "test@example.com"],
+    ):
+        subprocess.run(["git", *args], cwd=work, check=True, capture_output=True)
+    (work / "app.py").write_text("a = 1\n")
+    tracker = ChangeTracker(work)
+    try:
+        assert tracker.since_head() is None  # Коммитов еще нет
+
+        subprocess.run(["git", "add", "-A"], cwd=work, check=True, capture_output=True)
+        subprocess.run(["git", "commit", "-m", "init"], cwd=work, check=True, capture_output=True)
+        assert not tracker.since_head().changed
+
+        (work / "app.py").write_text("a = 2\nb = 3\n")
+        changes = tracker.since_head()
+        assert [change.path for change in changes.files] == ["app.py"]
+        assert changes.lines_added + changes.lines_removed == 3
+    finally:
+        GitRepo.close_all()
+
+    manager = CheckpointManager(tmp_path, "checkpoint.json")
+    manager.add_task("t1", "Задача")
+    manager.record_instruction_decision("t1", "3", {"action": SKIP, "reason": "no_changes=True"})
+    task = CheckpointManager(tmp_path, "checkpoint.json")._find_task("t1")
+    assert task["instruction_decisions"]["3"]["action"] == SKIP
@@ -0,0 +1,140 @@
+"""
+Тесты для асинхронного конвейера логирования
+"""
+
+import logging
+
+from src import log_pipeline
+from src.log_pipeline import (
+    PAYLOAD_ATTR,
+    BufferedFileHandler,
+    LogPipeline,
+    PlainAwareFormatter,
+    plain_output,
+)
+from src.task_logger import TaskLogger
+
+
+def _make_logger(name, pipeline):
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(pipeline.handler)
+    return logger
+
+
+def test_secrets_are_redacted_once(tmp_path, monkeypatch):
+    """Секреты очищаются один раз на запись, до записи в файл"""
+    calls = []
+    original = log_pipeline.redact_secrets_in_text
+
+    def counting(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(log_pipeline, "redact_secrets_in_text", counting)
+    log_file = tmp_path / "app.log"
+    pipeline = LogPipeline([BufferedFileHandler(log_file, encoding="utf-8")]).start()
+    logger = _make_logger("test.pipeline.redact", pipeline)
+
+    logger.info("api_key=%s", "sk-abcdefghijklmnopqrstuvwxyz")
+    pipeline.stop()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "sk-abcdefghijklmnopqrstuvwxyz" not in content
+    assert "***REDACTED***" in content
+    assert len(calls) == 1
+
+
+def test_plain_output_marks_only_own_records(tmp_path):
+    """Записи из plain_output() без префиксов, остальные - с префиксами форматтера"""
+    log_file = tmp_path / "app.log"
+    handler = BufferedFileHandler(log_file, encoding="utf-8")
+    formatter = PlainAwareFormatter("%(levelname)s - %(message)s")
+    handler.setFormatter(formatter)
+    pipeline = LogPipeline([handler]).start()
+    logger = _make_logger("test.pipeline.plain", pipeline)
+
+    with plain_output():
+        logger.info("block line")
+    logger.info("regular line")
+    pipeline.stop()
+
+    assert log_file.read_text(encoding="utf-8").splitlines() == [
+        "block line",
+        "INFO - regular line",
+    ]
+    assert handler.formatter is formatter  # Общий обработчик не меняется
+
+
+def test_large_payload_goes_to_side_file(tmp_path):
+    """Большой блок текста хранится в файле payloads, в логе - начало и ссылка"""
+    log_file = tmp_path / "task.log"
+    payload_file = tmp_path / "task.payloads.log"
+    pipeline = LogPipeline(
+        [BufferedFileHandler(log_file, encoding="utf-8")],
+        payload_file=payload_file,
+        inline_limit=10,
+    ).start()
+    logger = _make_logger("test.pipeline.payload", pipeline)
+    payload = "line\n" * 100
+
+    logger.debug("STDOUT:", extra={PAYLOAD_ATTR: payload})
+    logger.debug("STDERR:", extra={PAYLOAD_ATTR: "short"})
+    pipeline.stop()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "STDERR:\nshort" in content
+    reference = content.split("полный текст: ")[1].split("]")[0]
+    name, position = reference.split(":")
+    offset, length = (int(value) for value in position.split("+"))
+    assert name == payload_file.name
+    assert payload_file.read_bytes()[offset : offset + length].decode("utf-8") == payload
+
+
+def test_payload_file_is_size_capped(tmp_path):
+    """При достижении лимита файла payloads блок не сохраняется"""
+    log_file = tmp_path / "task.log"
+    pipeline = LogPipeline(
+        [BufferedFileHandler(log_file, encoding="utf-8")],
+        payload_file=tmp_path / "task.payloads.log",
+        payload_max_bytes=100,
+        inline_limit=10,
+    ).start()
+    logger = _make_logger("test.pipeline.cap", pipeline)
+
+    logger.debug("STDOUT:", extra={PAYLOAD_ATTR: "x" * 1000})
+    pipeline.stop()
+
+    assert "достигнут лимит файла payloads" in log_file.read_text(encoding="utf-8")
+
+
+def test_full_queue_drops_without_blocking(tmp_path):
+    """Переполнение очереди не блокирует вызывающий поток, пропуски учитываются"""
+    log_file = tmp_path / "app.log"
+    pipeline = LogPipeline([BufferedFileHandler(log_file, encoding="utf-8")], queue_size=2)
+    logger = _make_logger("test.pipeline.full", pipeline)
+
+    for index in range(5):
+        logger.info(f"message {index}")
+    pipeline.start()
+    pipeline.stop()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "message 0" in content and "message 1" in content
+    assert "message 4" not in content
+    assert "переполнения очереди: 3" in content
+
+
+def test_task_logger_spills_agent_output(tmp_path):
+    """Полный вывод агента из TaskLogger попадает в файл payloads"""
+    logger = TaskLogger("test_payload", "Задача с большим выводом", tmp_path)
+    stdout = "\n".join(f"строка {index}" for index in range(1000))
+
+    logger.log_cursor_response({"success": True, "stdout": stdout, "return_code": 0})
+    logger.close()
+
+    payload_file = logger.log_file.with_suffix(".payloads.log")
+    assert "полный текст: " in logger.log_file.read_text(encoding="utf-8")
+    assert "строка 999" in payload_file.read_text(encoding="utf-8")
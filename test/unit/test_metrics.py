@@ -0,0 +1,82 @@
+"""
+Тесты для метрик в формате Prometheus
+"""
+
+import pytest
+
+from src.circuit_breaker import CircuitBreakerRegistry
+from src.metrics import CIRCUIT_TRANSITIONS, MetricsRegistry
+
+
+def test_counter_with_labels():
+    """Счетчик хранит значения по наборам меток"""
+    registry = MetricsRegistry()
+    errors = registry.counter("test_errors_total", "Ошибки", ["error_class"])
+
+    errors.inc(error_class="critical")
+    errors.inc(2, error_class="other")
+
+    assert errors.get(error_class="critical") == 1
+    assert errors.get(error_class="other") == 2
+    text = registry.render()
+    assert "# TYPE test_errors_total counter" in text
+    assert 'test_errors_total{error_class="other"} 2' in text
+
+
+def test_counter_rejects_wrong_labels_and_negative():
+    """Неверные метки и отрицательное приращение - ошибка"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Тест", ["kind"])
+
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+
+
+def test_histogram_buckets_are_cumulative():
+    """Бакеты гистограммы кумулятивны, есть _sum и _count"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "test_duration_seconds", "Длительность", ["stage"], buckets=(1, 10)
+    )
+
+    for value in (0.5, 5, 50):
+        histogram.observe(value, stage="wait")
+
+    text = registry.render()
+    assert 'test_duration_seconds_bucket{stage="wait",le="1"} 1' in text
+    assert 'test_duration_seconds_bucket{stage="wait",le="10"} 2' in text
+    assert 'test_duration_seconds_bucket{stage="wait",le="+Inf"} 3' in text
+    assert 'test_duration_seconds_sum{stage="wait"} 55.5' in text
+    assert 'test_duration_seconds_count{stage="wait"} 3' in text
+    assert histogram.get_count(stage="wait") == 3
+
+
+def test_registry_returns_existing_metric():
+    """Повторная регистрация возвращает ту же метрику"""
+    registry = MetricsRegistry()
+    first = registry.counter("test_total", "Тест", ["kind"])
+    assert registry.counter("test_total", "Тест", ["kind"]) is first
+
+    with pytest.raises(ValueError):
+        registry.histogram("test_total", "Тест", ["kind"])
+
+
+def test_label_values_are_escaped():
+    """Кавычки и переводы строк в значениях меток экранируются"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Тест", ["model"])
+    counter.inc(model='a"b\nc')
+
+    assert 'test_total{model="a\\"b\\nc"} 1' in registry.render()
+
+
+def test_circuit_transitions_are_counted(tmp_path):
+    """Смены состояния выключателей учитываются по виду бэкенда"""
+    opened = CIRCUIT_TRANSITIONS.get(kind="cursor", state="open")
+
+    registry = CircuitBreakerRegistry(tmp_path / "breakers.json")
+    registry.trip("cursor:auto", "billing error", 3600)
+
+    assert CIRCUIT_TRANSITIONS.get(kind="cursor", state="open") == opened + 1
@@ -0,0 +1,104 @@
+"""
+Тесты для выбора модели по задержке и доле успешных ответов
+"""
+
+import random
+
+import pytest
+
+from src.llm import model_router
+from src.llm.llm_manager import LLMManager, ModelConfig, ModelRole
+from src.llm.model_router import ModelRouter
+
+
+def _router(**kwargs):
+    kwargs.setdefault("explore_probability", 0.0)
+    return ModelRouter(rng=random.Random(1), **kwargs)
+
+
+def test_latency_and_errors_decide_selection():
+    router = _router()
+    assert router.select(["a", "b"]) == "a"  # Статистики нет - порядок конфигурации
+    assert router.select([]) is None
+
+    router.observe("a", "p1", 1.5, success=True)
+    router.observe("b", "p2", 0.5, success=True)
+    router.observe("c", "p2", 0.1, success=True)
+    assert router.select(["a", "b", "c"]) == "c"
+    assert router.select(["a", "b"]) == "b"  # Лучшая модель не среди кандидатов
+    assert router.select(["a", "new"]) == "a"  # Модель без вызовов не считается быстрой
+
+    for _ in range(5):
+        router.observe("c", "p2", 5.0, success=False)
+    # Ошибки c снижают и оценку b через долю успехов провайдера p2
+    assert router.select(["a", "b", "c"]) == "a"
+    assert router.provider_stats("p2").success_rate < 0.5
+
+
+def test_latency_statistics():
+    router = _router()
+    for latency in [1.0] * 50 + [3.0]:
+        router.observe("a", "p", latency, success=True)
+    stats = router.stats("a")
+
+    assert 1.0 < stats.ewma_latency < 1.5
+    assert stats.p95_latency >= 1.0
+    assert stats.success_rate == 1.0
+    assert stats.weight == pytest.approx(51)
+
+
+def test_exploration_is_bounded():
+    router = ModelRouter(explore_probability=0.2, rng=random.Random(7))
+    router.observe("known", "p", 1.0, success=True)
+
+    picks = [router.select(["known", "untried"]) for _ in range(1000)]
+
+    assert 100 < picks.count("untried") < 300
+
+
+def test_statistics_decay(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_router.time, "time", lambda: now[0])
+    router = _router(half_life=10.0)
+    router.observe("a", "p", 0.1, success=True)
+    router.observe("b", "p", 1.0, success=True)
+    assert router.select(["a", "b"]) == "a"
+
+    now[0] += 15
+    router.observe("b", "p", 1.0, success=True)
+    # Вес a затух ниже min_weight: модель снова ждет исследования
+    assert router.select(["a", "b"]) == "b"
+
+    now[0] += 100
+    router.observe("a", "p", 3.0, success=True)
+    # Устаревшая статистика заменена первым новым наблюдением
+    assert router.stats("a").ewma_latency == pytest.approx(3.0, abs=0.01)
+
+
+def test_state_persists_and_manager_uses_router(tmp_path):
+    state = tmp_path / "router.json"
+    router = _router(state_file=state, save_interval=3600)
+    router.observe("slow", "p", 3.0, success=True)
+    router.observe("fast", "p", 0.2, success=True)
+    router.save()
+
+    manager = LLMManager.__new__(LLMManager)
+    manager.models = {
+        name: ModelConfig(name, 1024, 4096, role=ModelRole.PRIMARY) for name in ("slow", "fast")
+    }
+    manager._router = _router(state_file=state)
+
+    assert manager.get_fastest_model().name == "fast"
+    assert manager._router.stats("slow").ewma_latency == 3.0
+
+
+def test_router_is_shared_per_state_file(tmp_path):
+    config = {"state_file": str(tmp_path / "router.json"), "save_interval": 0}
+    first, second = model_router.get_model_router(config), model_router.get_model_router(config)
+    other = model_router.get_model_router({"state_file": str(tmp_path / "other.json")})
+
+    assert first is second and first is not other
+    first.observe("a", "p", 1.0, success=True)
+    second.observe("b", "p", 2.0, success=True)
+    # Сохранение одного менеджера не теряет наблюдения другого
+    assert set(ModelRouter(state_file=tmp_path / "router.json")._models) == {"a", "b"}
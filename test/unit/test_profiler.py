@@ -0,0 +1,84 @@
+"""
+Тесты для сэмплирующего профилировщика и дампа стеков
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from src.profiler import ProfilerBusyError, SamplingProfiler, format_stacks, save_profile
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(200))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="busy-worker")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_profile_samples_other_threads(busy_thread):
+    result = SamplingProfiler(interval=0.002).profile(0.1)
+
+    assert result.samples > 5
+    threads = {thread for thread, _ in result.stacks}
+    assert "busy-worker" in threads
+    assert "codeagent-profiler" not in threads
+    assert any("_spin" in row["function"] for row in result.top_functions())
+
+
+def test_profile_is_exclusive():
+    profiler = SamplingProfiler()
+    profiler._lock.acquire()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profiler.profile(0.01)
+    finally:
+        profiler._lock.release()
+
+
+def test_save_profile_formats(tmp_path, busy_thread):
+    result = SamplingProfiler(interval=0.002).profile(0.05)
+
+    collapsed = save_profile(result, tmp_path)
+    speedscope = save_profile(result, tmp_path, "speedscope")
+
+    line = collapsed.read_text(encoding="utf-8").splitlines()[0]
+    assert int(line.rsplit(" ", 1)[1]) > 0
+    data = json.loads(speedscope.read_text(encoding="utf-8"))
+    assert data["profiles"][0]["type"] == "sampled"
+    frames = data["shared"]["frames"]
+    for profile in data["profiles"]:
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(index < len(frames) for sample in profile["samples"] for index in sample)
+    assert save_profile(result, tmp_path) != collapsed
+
+
+def test_format_stacks_includes_asyncio_await_chain():
+    async def inner():
+        await asyncio.sleep(10)
+
+    async def outer():
+        await inner()
+
+    async def main():
+        task = asyncio.create_task(outer(), name="waiting-task")
+        await asyncio.sleep(0)
+        text = await asyncio.to_thread(format_stacks, asyncio.get_running_loop())
+        task.cancel()
+        return text
+
+    text = asyncio.run(main())
+
+    assert "MainThread" in text
+    assert "waiting-task" in text
+    assert "in outer" in text and "in inner" in text
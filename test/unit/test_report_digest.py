@@ -0,0 +1,101 @@
+"""
+Тесты для дайджеста отчетов и планов
+"""
+
+from src.metrics import CACHE_HITS
+from src.report_digest import ReportDigester, count_tests, digest_report, parse_sections
+
+
+def _test_report(passed: int = 500) -> str:
+    lines = ["# Отчет о тестировании", "Тесты запущены командой pytest.", "", "## Результаты"]
+    lines.append("```")
+    lines += [f"test/unit/test_mod{i}.py::test_case PASSED" for i in range(passed)]
+    lines += ["test/unit/test_api.py::test_login FAILED", "```"]
+    lines += ["## Ошибки", "```", "Traceback (most recent call last):"]
+    lines += [f'  File "src/mod{i}.py", line {i}, in run' for i in range(30)]
+    lines += ["KeyError: 'token'", "```"]
+    lines += [
+        "## Итог",
+        "- [x] Запустить тесты",
+        "- [ ] Исправить test_login в src/auth.py",
+        f"===== 1 failed, {passed} passed in 9.1s =====",
+        "Отчет завершен!",
+    ]
+    return "\n".join(lines)
+
+
+def test_digest_keeps_failures_checklists_and_files():
+    report = _test_report()
+
+    digest = digest_report(report, 3000)
+
+    assert len(digest) * 10 < len(report)
+    assert "Итоги тестов: 1 failed, 500 passed" in digest
+    assert "test_login FAILED" in digest
+    assert "KeyError: 'token'" in digest
+    assert "- [ ] Исправить test_login в src/auth.py" in digest
+    assert "Файлы: src/auth.py" in digest
+    assert "Отчет завершен!" in digest
+    assert "test_mod17.py::test_case PASSED" not in digest  # Успешные тесты опущены
+
+
+def test_short_text_is_unchanged_and_sections_are_parsed():
+    text = "# План\n## Шаг 1\n- [ ] Добавить API\n```\n# не заголовок\n```\n## Шаг 2\nТекст"
+
+    assert digest_report(text, 3000) == text
+    assert [section.heading for section in parse_sections(text)] == [
+        "# План",
+        "## Шаг 1",
+        "## Шаг 2",
+    ]
+    assert count_tests("3 passed, 1 error\n=== 5 passed, 2 failed ===") == {
+        "passed": 5,
+        "errors": 1,
+        "failed": 2,
+    }
+
+
+def test_open_items_take_priority_within_section_budget():
+    plan = "\n".join(
+        ["# План"]
+        + [f"Пояснение к плану номер {i} без конкретных задач." for i in range(200)]
+        + [f"- [ ] Задача {i}" for i in range(20)]
+        + ["## Заметки"]
+        + [f"- [x] Выполнено {i}" for i in range(200)]
+    )
+
+    digest = digest_report(plan, 2000)
+
+    assert all(f"- [ ] Задача {i}" in digest for i in range(20))
+    assert "## Заметки" in digest and "- [x] Выполнено 0" in digest
+    assert "опущено строк" in digest
+    assert len(digest) <= 2000
+
+
+def test_many_sections_respect_budget():
+    report = "\n".join(
+        f"## Шаг {i}\nОписание шага {i} с деталями реализации и проверкой результата."
+        for i in range(600)
+    ) + "\n## Ошибки\nValueError: bad config"
+
+    digest = digest_report(report, 3000)
+
+    assert len(digest) <= 3000
+    assert "ValueError: bad config" in digest  # Раздел с ошибкой выбирается первым
+    assert "## Шаг 0\nОписание шага 0" in digest
+    assert digest.endswith(f"разделов: {601 - digest.count('## ')})")
+
+
+def test_digester_caches_by_hash_and_can_be_disabled():
+    report = _test_report()
+    digester = ReportDigester(budget_chars=2000, cache_size=1)
+    hits = CACHE_HITS.get(cache="report_digest")
+
+    first = digester.digest(report)
+    assert digester.digest(report) is first
+    assert CACHE_HITS.get(cache="report_digest") == hits + 1
+    digester.digest_plan(report)  # Другой бюджет - другой ключ, вытесняет первый дайджест
+    digester.digest(report)
+    assert CACHE_HITS.get(cache="report_digest") == hits + 1
+
+    assert ReportDigester(enabled=False).digest(report) == report
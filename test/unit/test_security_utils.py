@@ -0,0 +1,78 @@
+"""
+Тесты для очистки секретов в логах
+"""
+
+import random
+
+import pytest
+
+from src.security_utils import (
+    _SECRET_RE,
+    _redact,
+    _redact_match,
+    redact_secrets_in_text,
+    sanitize_for_logging,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("api_key=abc123", "api_key=***REDACTED***"),
+        ("PASSWORD: hunter2, user=admin", "PASSWORD: ***REDACTED***, user=admin"),
+        ("token\tzzz; next", "token\t***REDACTED***; next"),
+        ("use Bearer abcdefghijk now", "use Bearer ***REDACTED*** now"),
+        (f"key sk-{'a' * 24} end", "key ***REDACTED*** end"),
+        (f"sk-or-v1-{'b' * 30}", "***REDACTED***"),
+        (f"sk-ant-{'c' * 22}", "***REDACTED***"),
+        ("tokens and passwords are words", "tokens and passwords are words"),
+        ("короткий", "короткий"),
+        ("", ""),
+    ],
+)
+def test_redact_secrets_in_text(text, expected):
+    """Значения секретов заменяются, обычный текст не меняется"""
+    assert redact_secrets_in_text(text) == expected
+
+
+def test_glued_keys_leave_no_remainder():
+    """Склеенные ключи скрываются целиком"""
+    text = f"sk-or-v1-{'b' * 30}sk-{'a' * 25}"
+
+    assert redact_secrets_in_text(text) == "***REDACTED***"
+
+
+def test_candidate_scan_matches_full_regex():
+    """Поиск по кандидатам дает тот же результат, что и полный проход регулярного выражения"""
+    random.seed(7)
+    parts = [
+        "api_key=abc", "API-KEY: zz", "token", "Bearer abcdefghijk", f"sk-{'a' * 25}",
+        "password=hunter2,", "pwd", "x", "secret:", " ", "\n", "İ", "mytoken=1", "SK-",
+    ]
+    for _ in range(2000):
+        text = "".join(random.choice(parts) for _ in range(random.randint(1, 8)))
+        assert _redact(text) == _SECRET_RE.sub(_redact_match, text)
+
+
+def test_large_output_is_redacted():
+    """Большой вывод без кеша обрабатывается так же, как короткий"""
+    text = "line without secrets\n" * 10000 + "export API_KEY=value\n"
+
+    assert redact_secrets_in_text(text).endswith("API_KEY=***REDACTED***\n")
+
+
+def test_sanitize_for_logging():
+    """Чувствительные ключи и строки, похожие на ключи API, скрываются"""
+    data = {
+        "Authorization": "Bearer x",
+        "nested": [{"refresh_token": 1}, "a" * 31, "a" * 32],
+        "name": "codeagent",
+    }
+
+    sanitized = sanitize_for_logging(data)
+
+    assert sanitized["Authorization"] == "***REDACTED*** (length: 8)"
+    assert sanitized["nested"][0]["refresh_token"] == "***REDACTED***"
+    assert sanitized["nested"][1] == "a" * 31
+    assert sanitized["nested"][2].startswith("***REDACTED*** (matches API key pattern")
+    assert sanitized["name"] == "codeagent"
@@ -0,0 +1,58 @@
+"""
+Тесты для привязки сессии агента к задаче
+"""
+
+from src.session_affinity import SessionAffinity
+
+
+class ChatFactory:
+    def __init__(self):
+        self.created = 0
+
+    def __call__(self):
+        self.created += 1
+        return f"chat-{self.created}"
+
+
+def test_instructions_of_task_share_session():
+    affinity = SessionAffinity()
+    create = ChatFactory()
+
+    first = affinity.acquire("t1", create)
+    affinity.record("t1", 1000, success=True)
+    second = affinity.acquire("t1", create)
+
+    assert first == second == "chat-1"
+    assert affinity.acquire("t2", create) == "chat-2"
+    assert affinity.session("t1").instructions == 1
+
+    affinity.reset()
+    assert affinity.acquire("t1", create) == "chat-3"
+
+
+def test_session_rotates_on_error_and_overflow():
+    affinity = SessionAffinity(max_context_tokens=100, max_instructions=3)
+    create = ChatFactory()
+
+    affinity.acquire("t1", create)
+    affinity.record("t1", 10, success=False)
+    assert affinity.acquire("t1", create) == "chat-2"
+
+    affinity.record("t1", 400, success=True)  # ~100 токенов
+    assert affinity.acquire("t1", create) == "chat-3"
+
+    for _ in range(3):
+        affinity.record("t1", 1, success=True)
+    assert affinity.acquire("t1", create) == "chat-4"
+    assert affinity.rotations == 3
+
+
+def test_disabled_or_unavailable_session():
+    create = ChatFactory()
+
+    assert SessionAffinity(enabled=False).acquire("t1", create) is None
+    assert create.created == 0
+    affinity = SessionAffinity()
+    assert affinity.acquire("t1", lambda: None) is None
+    affinity.record("t1", 10, success=True)  # Без сессии - ничего не учитывается
+    assert affinity.session("t1") is None
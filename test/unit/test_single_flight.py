@@ -0,0 +1,173 @@
+"""
+Тесты для объединения одинаковых одновременных запросов к LLM
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.llm.llm_manager import LLMManager, ModelConfig, ModelResponse, ModelRole
+from src.llm.single_flight import SingleFlight
+from src.metrics import LLM_COALESCED
+
+
+def test_identical_calls_share_one_execution():
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"answer {key}"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do(key, lambda key=key: fetch(key)) for key in ("a", "a", "b", "a"))
+        )
+        return flight, results
+
+    flight, results = asyncio.run(run())
+
+    assert sorted(calls) == ["a", "b"]
+    assert [result for result, _ in results] == ["answer a", "answer a", "answer b", "answer a"]
+    assert [shared for _, shared in results] == [False, True, False, True]
+    assert len(flight) == 0  # Завершенные запросы забыты
+
+
+def test_leader_cancellation_does_not_poison_followers():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        flight = SingleFlight()
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ("ok", True)
+
+
+def test_abandoned_call_is_cancelled_and_restarted():
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(1)
+        return "late"
+
+    async def fast():
+        return "fresh"
+
+    async def run():
+        flight = SingleFlight()
+        waiter = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert len(flight) == 0
+        return await flight.do("k", fast)
+
+    assert asyncio.run(run()) == ("fresh", False)
+    assert started == [1]
+
+
+def test_requests_from_different_loops_do_not_interfere():
+    flight = SingleFlight()
+    leaders_started = threading.Barrier(2, timeout=5)
+    calls = []
+    results = {}
+
+    async def fetch(name):
+        calls.append(name)
+        await asyncio.sleep(0.2)
+        return f"answer {name}"
+
+    async def run(name):
+        leader = asyncio.ensure_future(flight.do("same", lambda: fetch(name)))
+        await asyncio.sleep(0)
+        # Ведомый присоединяется после того, как лидер другого loop начал свой вызов
+        await asyncio.to_thread(leaders_started.wait)
+        follower = await flight.do("same", lambda: fetch(name))
+        return [await leader, follower]
+
+    threads = [
+        threading.Thread(target=lambda name=name: results.update({name: asyncio.run(run(name))}))
+        for name in ("first", "second")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    # Внутри каждого loop запросы объединены, между loop - выполняются независимо
+    assert sorted(calls) == ["first", "second"]
+    assert results["first"] == [("answer first", False), ("answer first", True)]
+    assert results["second"] == [("answer second", False), ("answer second", True)]
+    assert len(flight) == 0
+
+
+def _manager(calls, models=("m",)):
+    """Менеджер без конфигурации: _call_model записывает вызовы"""
+    manager = LLMManager.__new__(LLMManager)
+    manager.config_path = "config/llm_settings.yaml"
+    manager.models = {
+        name: ModelConfig(name, 1024, 4096, role=ModelRole.PRIMARY) for name in models
+    }
+    manager._router = None
+    manager._coalesce_requests = True
+
+    async def call_model(prompt, model_config, response_format=None):
+        calls.append((prompt, model_config.name, response_format))
+        await asyncio.sleep(0.01)
+        return ModelResponse(model_config.name, "{}", 0.01, success=True)
+
+    manager._call_model = call_model
+    return manager
+
+
+def test_managers_coalesce_by_role_prompt_and_format():
+    calls = []
+    # Отдельные менеджеры на каждую проверку, как в сервере
+    first, second, third = (_manager(calls) for _ in range(3))
+    coalesced = LLM_COALESCED.get(model="m")
+    json_format = {"type": "json_object"}
+
+    async def run():
+        return await asyncio.gather(
+            first.generate_response("same", response_format=json_format),
+            second.generate_response("same", response_format={"type": "json_object"}),
+            third.generate_response("same"),
+            first.generate_response("other", response_format=json_format),
+            second.generate_response("same", response_format=json_format, use_fastest=False),
+        )
+
+    responses = asyncio.run(run())
+
+    assert len(calls) == 4
+    assert LLM_COALESCED.get(model="m") == coalesced + 1
+    assert all(response.success for response in responses)
+    assert responses[0] is not responses[1]  # Участники получают отдельные копии
+
+
+def test_coalescing_key_is_taken_before_model_selection():
+    calls = []
+    managers = [_manager(calls, models=("a", "b")) for _ in range(2)]
+    # Роутер (исследование) выбрал бы для одинаковых запросов разные модели
+    managers[0].get_fastest_model = lambda: managers[0].models["a"]
+    managers[1].get_fastest_model = lambda: managers[1].models["b"]
+
+    async def run():
+        return await asyncio.gather(*(m.generate_response("prompt-x") for m in managers))
+
+    responses = asyncio.run(run())
+
+    assert [name for _, name, _ in calls] == ["a"]
+    assert [response.model_name for response in responses] == ["a", "a"]
@@ -0,0 +1,137 @@
+"""
+Тесты для снимка статуса сервера
+"""
+
+import json
+import threading
+import time
+
+from src.checkpoint_manager import CheckpointManager
+from src.status_snapshot import SnapshotRefresher, StatusSnapshot
+
+
+def test_publish_serializes_once_and_sets_etag():
+    """Снимок хранит готовое тело и ETag"""
+    snapshot = StatusSnapshot()
+    assert snapshot.publish({"tasks": {"completed": 1}})
+
+    current = snapshot.get()
+    assert json.loads(current.body) == {"tasks": {"completed": 1}}
+    assert current.etag.startswith('"') and current.etag.endswith('"')
+    assert current.version == 1
+
+
+def test_publish_same_content_keeps_version():
+    """Публикация идентичных данных не меняет версию и ETag"""
+    snapshot = StatusSnapshot({"a": 1})
+    etag = snapshot.get().etag
+
+    assert not snapshot.publish({"a": 1})
+    assert snapshot.get().etag == etag
+    assert snapshot.get().version == 0
+
+
+def test_refresher_coalesces_requests_from_threads():
+    """Частые запросы из разных потоков дают несколько пересборок, последняя - актуальная"""
+    snapshot = StatusSnapshot()
+    state = {"saves": 0}
+    builds = []
+    lock = threading.Lock()
+
+    def build():
+        with lock:
+            builds.append(state["saves"])
+            return {"saves": state["saves"]}
+
+    refresher = SnapshotRefresher(snapshot, build, interval=0.05)
+
+    def save_many():
+        for _ in range(50):
+            with lock:
+                state["saves"] += 1
+            refresher.request()
+
+    threads = [threading.Thread(target=save_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refresher.wait_idle()
+    assert len(builds) < 20
+    assert snapshot.get().data == {"saves": 200}
+
+
+def test_refresher_publishes_in_build_order():
+    """Медленная пересборка не перезаписывает более новую"""
+    snapshot = StatusSnapshot()
+    state = {"version": 0}
+
+    def build():
+        version = state["version"]
+        time.sleep(0.05 if version == 1 else 0)
+        return {"version": version}
+
+    refresher = SnapshotRefresher(snapshot, build)
+    state["version"] = 1
+    slow = threading.Thread(target=refresher.refresh)
+    slow.start()
+    time.sleep(0.01)
+    state["version"] = 2
+    refresher.refresh()
+    slow.join()
+
+    assert snapshot.get().data == {"version": 2}
+
+
+def test_if_none_match():
+    """Проверка условного запроса"""
+    snapshot = StatusSnapshot({"a": 1})
+    etag = snapshot.get().etag
+
+    assert snapshot.matches(etag)
+    assert snapshot.matches(f'"other", {etag}')
+    assert snapshot.matches(f"W/{etag}")
+    assert snapshot.matches("*")
+    assert not snapshot.matches('"other"')
+    assert not snapshot.matches(None)
+
+
+def test_if_none_match_uses_captured_snapshot():
+    """Условный запрос сверяется со снимком, который отдает обработчик"""
+    snapshot = StatusSnapshot({"running": True})
+    served = snapshot.get()
+    snapshot.publish({"running": False})
+
+    assert snapshot.matches(served.etag, served)
+    assert not snapshot.matches(snapshot.get().etag, served)
+    assert not snapshot.matches(served.etag)
+
+
+def test_checkpoint_change_listener(tmp_path):
+    """CheckpointManager уведомляет подписчиков после сохранения"""
+    checkpoint = CheckpointManager(tmp_path, "data/checkpoint.json")
+    calls = []
+    checkpoint.add_change_listener(lambda: calls.append(checkpoint.get_statistics()))
+
+    checkpoint.add_task("task_1", "Задача")
+    checkpoint.mark_task_start("task_1")
+    checkpoint.mark_task_completed("task_1")
+
+    assert calls[-1]["completed"] == 1
+    assert calls[-1]["in_progress"] == 0
+    assert calls[-1]["total_tasks"] == 1
+
+
+def test_checkpoint_listener_errors_are_isolated(tmp_path):
+    """Ошибка в подписчике не ломает сохранение checkpoint"""
+    checkpoint = CheckpointManager(tmp_path, "data/checkpoint.json")
+
+    def broken():
+        raise RuntimeError("boom")
+
+    checkpoint.add_change_listener(broken)
+    checkpoint.add_task("task_1", "Задача")
+
+    assert checkpoint.checkpoint_file.exists()
+    assert checkpoint.get_statistics()["pending"] == 1
@@ -0,0 +1,96 @@
+"""
+Тесты для выбора затронутых изменениями тестов
+"""
+
+import sqlite3
+
+import pytest
+
+from src.test_impact import AffectedTests, TestImpactIndex, module_names, parse_imports
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Проект с src-раскладкой: core импортирует util"""
+    root = tmp_path / "project"
+    files = {
+        "src/pkg/__init__.py": "",
+        "src/pkg/util.py": "def helper():\n    return 1\n",
+        "src/pkg/core.py": "from .util import helper\n\ndef run():\n    return helper()\n",
+        "src/pkg/cli.py": "import os\n",
+        "tests/test_core.py": "from pkg.core import run\n\ndef test_run():\n    assert run()\n",
+        "tests/test_util.py": "from pkg import util\n\ndef test_helper():\n    assert util\n",
+        "tests/test_cli.py": "import pkg.cli\n",
+    }
+    for path, text in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(text)
+    return root
+
+
+def _index(tmp_path, project):
+    return TestImpactIndex(project, tmp_path / "index.json")
+
+
+def test_imports_and_module_names():
+    assert module_names("src/pkg/core.py") == ["src.pkg.core", "pkg.core"]
+    assert module_names("pkg/__init__.py") == ["pkg"]
+    assert parse_imports("from .util import helper\nimport a.b", "src/pkg/core.py") == [
+        "a",
+        "a.b",
+        "src",
+        "src.pkg",
+        "src.pkg.util",
+        "src.pkg.util.helper",
+    ]
+
+
+def test_select_by_import_graph(tmp_path, project):
+    index = _index(tmp_path, project)
+
+    assert index.select(["src/pkg/util.py"]).tests == ["tests/test_core.py", "tests/test_util.py"]
+    assert index.select(["src/pkg/core.py"]).tests == ["tests/test_core.py"]
+    assert index.select(["tests/test_cli.py"]).tests == ["tests/test_cli.py"]
+    assert index.select(["README.md"]).tests == []
+    assert index.select(["tests/conftest.py", "src/pkg/cli.py"]).full_suite
+
+
+def test_index_is_updated_incrementally(tmp_path, project):
+    index = _index(tmp_path, project)
+    assert index.refresh() == 7
+    assert _index(tmp_path, project).refresh() == 0  # Индекс загружен из файла
+
+    (project / "tests" / "test_cli.py").write_text("import pkg.cli\nfrom pkg.core import run\n")
+    assert index.refresh() == 1
+    assert "tests/test_cli.py" in index.select(["src/pkg/core.py"]).tests
+
+
+def test_select_by_coverage_contexts(tmp_path, project):
+    connection = sqlite3.connect(project / ".coverage")
+    connection.executescript(
+        "CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+        "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+        "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB);"
+    )
+    connection.execute("INSERT INTO file VALUES (1, ?)", (str(project / "src/pkg/util.py"),))
+    connection.executemany(
+        "INSERT INTO context VALUES (?, ?)",
+        [(1, ""), (2, "tests/test_util.py::test_helper|run"), (3, "tests.test_core.test_run")],
+    )
+    connection.executemany("INSERT INTO line_bits VALUES (1, ?, x'01')", [(1,), (2,), (3,)])
+    connection.commit()
+    connection.close()
+
+    selection = _index(tmp_path, project).select(["src/pkg/util.py"])
+
+    assert selection.tests == ["tests/test_core.py::test_run", "tests/test_util.py::test_helper"]
+    assert selection.format() == "pytest " + " ".join(selection.tests)
+    assert selection.format(max_tests=1) == "pytest tests/test_core.py tests/test_util.py"
+
+
+def test_format_quotes_test_ids():
+    selection = AffectedTests(tests=["tests/test_api.py::test_get[a b]", "tests/test_x.py::test_y"])
+
+    assert selection.format() == (
+        "pytest 'tests/test_api.py::test_get[a b]' tests/test_x.py::test_y"
+    )
@@ -0,0 +1,130 @@
+"""
+Тесты для трассировки выполнения задач
+"""
+
+import json
+
+import pytest
+
+from src.tracing import (
+    STATUS_ERROR,
+    TRACEPARENT_ENV,
+    FileSpanExporter,
+    SpanContext,
+    Tracer,
+    collect_trace_spool,
+    configure_tracing,
+    container_trace_spool,
+    extract_env,
+    get_current_span,
+)
+
+
+class _MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_traceparent_round_trip():
+    """Контекст сериализуется в traceparent и обратно"""
+    context = SpanContext("a" * 32, "b" * 16)
+    parsed = SpanContext.from_traceparent(context.to_traceparent())
+
+    assert parsed.trace_id == "a" * 32
+    assert parsed.span_id == "b" * 16
+    assert parsed.sampled
+
+
+@pytest.mark.parametrize(
+    "value", [None, "", "garbage", "00-" + "0" * 32 + "-" + "b" * 16 + "-01", "00-xyz-abc-01"]
+)
+def test_invalid_traceparent(value):
+    """Некорректный traceparent игнорируется"""
+    assert SpanContext.from_traceparent(value) is None
+
+
+def test_nested_spans_share_trace():
+    """Вложенный спан получает trace_id и parent_span_id текущего"""
+    exporter = _MemoryExporter()
+    tracer = Tracer(exporter)
+
+    with tracer.start_as_current_span("task") as task_span:
+        with tracer.start_as_current_span("instruction") as instruction_span:
+            assert get_current_span() is instruction_span
+        assert get_current_span() is task_span
+    assert get_current_span() is None
+
+    instruction, task = exporter.spans
+    assert instruction.context.trace_id == task.context.trace_id
+    assert instruction.parent_span_id == task.context.span_id
+    assert task.parent_span_id is None
+
+
+def test_exception_marks_span_as_error():
+    """Исключение в блоке помечает спан как ошибочный"""
+    exporter = _MemoryExporter()
+    tracer = Tracer(exporter)
+
+    with pytest.raises(RuntimeError), tracer.start_as_current_span("llm.call"):
+        raise RuntimeError("timeout")
+
+    assert exporter.spans[0].status_code == STATUS_ERROR
+    assert "timeout" in exporter.spans[0].status_message
+
+
+def test_disabled_tracer_is_noop():
+    """Отключенный трассировщик ничего не экспортирует и не задает контекст"""
+    tracer = Tracer()
+
+    with tracer.start_as_current_span("task") as span:
+        span.set_attribute("task_id", "x")
+        assert get_current_span() is None
+
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    """Файловый экспортер пишет по строке OTLP/JSON на спан"""
+    trace_file = tmp_path / "traces" / "traces.jsonl"
+    tracer = Tracer(FileSpanExporter(trace_file, "codeagent"))
+
+    parent = SpanContext.from_traceparent("00-" + "c" * 32 + "-" + "d" * 16 + "-01")
+    with tracer.start_as_current_span("git", {"git.command": "status", "attempt": 1}, parent):
+        pass
+
+    record = json.loads(trace_file.read_text(encoding="utf-8").strip())
+    resource_span = record["resourceSpans"][0]
+    span = resource_span["scopeSpans"][0]["spans"][0]
+    assert resource_span["resource"]["attributes"][0]["value"]["stringValue"] == "codeagent"
+    assert span["traceId"] == "c" * 32
+    assert span["parentSpanId"] == "d" * 16
+    assert {"key": "attempt", "value": {"intValue": "1"}} in span["attributes"]
+
+
+def test_extract_env():
+    """Родительский контекст читается из TRACEPARENT"""
+    env = {TRACEPARENT_ENV: "00-" + "e" * 32 + "-" + "f" * 16 + "-01"}
+
+    assert extract_env(env).trace_id == "e" * 32
+    assert extract_env({}) is None
+
+
+def test_container_spans_are_collected(tmp_path):
+    """Спаны агента из контейнера переносятся из .git проекта в файл трассы"""
+    project = tmp_path / "project"
+    (project / ".git").mkdir(parents=True)
+    tracer = configure_tracing({"enabled": True, "file": "traces.jsonl"}, tmp_path)
+    try:
+        assert container_trace_spool(project) is None  # Нет текущего спана
+        with tracer.start_as_current_span("agent.exec"):
+            spool = container_trace_spool(project)
+            spool.write_text('{"resourceSpans": []}\n', encoding="utf-8")
+
+        assert spool.parent == project / ".git" / "codeagent-traces"
+        assert collect_trace_spool(spool) == 1
+        assert not spool.exists()
+        lines = (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2 and lines[-1] == '{"resourceSpans": []}'
+    finally:
+        configure_tracing({}, tmp_path)
@@ -0,0 +1,81 @@
+"""
+Тесты для пакетной оценки полезности пунктов TODO
+"""
+
+import asyncio
+import json
+import re
+
+from src.usefulness_triage import UsefulnessTriage, item_hash
+
+
+class FakeLLM:
+    """Оценивает каждый пункт пакета: 10% для пунктов со словом "заметка", иначе 90%"""
+
+    def __init__(self, skip_ids=()):
+        self.prompts = []
+        self.skip_ids = set(skip_ids)
+
+    async def __call__(self, prompt):
+        self.prompts.append(prompt)
+        items = [json.loads(line) for line in re.findall(r"^\{\"id\".*\}$", prompt, re.MULTILINE)]
+        scores = [
+            {
+                "id": item["id"],
+                "usefulness_percent": 10 if "заметка" in item["text"] else 90,
+                "comment": "оценка",
+            }
+            for item in items
+            if item["id"] not in self.skip_ids
+        ]
+        return "```json\n" + json.dumps({"items": scores}, ensure_ascii=False) + "\n```"
+
+
+def test_batch_triage_is_chunked_and_persisted(tmp_path):
+    store = tmp_path / "usefulness.json"
+    triage = UsefulnessTriage(store, max_items_per_chunk=4)
+    texts = [f"Реализовать обработчик {index}" for index in range(9)] + ["личная заметка"]
+    llm = FakeLLM()
+
+    assert asyncio.run(triage.triage(texts, llm, context="# Проект")) == 10
+    assert len(llm.prompts) == 3
+    assert triage.get("личная заметка").percent == 10
+    assert triage.get("  Реализовать  обработчик 0 ").percent == 90  # Нормализация текста
+
+    reloaded = UsefulnessTriage(store)
+    assert asyncio.run(reloaded.triage(texts, llm)) == 0  # Все оценки уже сохранены
+    assert len(llm.prompts) == 3
+    assert asyncio.run(reloaded.triage(texts + ["Новая задача"], llm)) == 1
+    assert "Реализовать" not in llm.prompts[-1]
+
+
+def test_chunking_by_token_budget(tmp_path):
+    triage = UsefulnessTriage(tmp_path / "s.json", chunk_tokens=100, max_items_per_chunk=50)
+    texts = ["x" * 200, "y" * 200, "z" * 10, "w" * 1000]
+
+    assert [len(chunk) for chunk in triage.chunk(texts)] == [1, 2, 1]
+    assert triage.pending(texts + ["x" * 200]) == texts
+
+
+def test_unscored_and_failed_chunks_are_retried(tmp_path):
+    triage = UsefulnessTriage(tmp_path / "s.json")
+
+    assert asyncio.run(triage.triage(["a", "b"], FakeLLM(skip_ids={"2"}))) == 1
+    assert triage.pending(["a", "b"]) == ["b"]
+
+    async def broken(prompt):
+        raise RuntimeError("timeout")
+
+    assert asyncio.run(triage.triage(["b"], broken)) == 0
+    assert UsefulnessTriage.parse_response("не JSON", ["b"]) == {}
+    assert UsefulnessTriage.parse_response('{"items": [{"id": "1"}]}', ["b"]) == {}
+    assert item_hash("Задача") == item_hash("задача ")
+
+
+def test_disabled_triage_does_not_call_llm(tmp_path):
+    llm = FakeLLM()
+    triage = UsefulnessTriage(tmp_path / "s.json", enabled=False)
+
+    assert asyncio.run(triage.triage(["a"], llm)) == 0
+    assert llm.prompts == []
+    assert not (tmp_path / "s.json").exists()